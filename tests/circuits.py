@@ -0,0 +1,28 @@
+"""Circuits shared by the integration tests."""
+
+from zero import Circuit
+
+
+def amplifier_circuit(opamp="LT1124"):
+    """Inverting amplifier with a gain of -100 from node "n1" to node "nout".
+
+    The components are named "c1", "r1", "r2", "c2" and "op1", in that order. Tests add any
+    further components they need to the returned circuit.
+
+    Parameters
+    ----------
+    opamp : :class:`str`, optional
+        The library op-amp model.
+
+    Returns
+    -------
+    :class:`~zero.circuit.Circuit`
+        The circuit.
+    """
+    circuit = Circuit()
+    circuit.add_capacitor(value="10u", node1="gnd", node2="n1")
+    circuit.add_resistor(value="430", node1="n1", node2="nm")
+    circuit.add_resistor(value="43k", node1="nm", node2="nout")
+    circuit.add_capacitor(value="47p", node1="nm", node2="nout")
+    circuit.add_library_opamp(model=opamp, node1="gnd", node2="nm", node3="nout")
+    return circuit
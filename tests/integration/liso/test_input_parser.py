@@ -175,6 +175,23 @@ uoutput no ni allop
         # 3 op-amp outputs, one of which is no, plus ni
         self.assertEqual(4, self.parser.n_response_outputs)
 
+    def test_output_responses(self):
+        """Test only the responses to the outputs are calculated"""
+        self.parser.parse("""
+r r1 1k n1 n2
+r r2 2k n2 n3
+r r3 3k n3 gnd
+freq log 1 100 10
+uinput n1 0
+uoutput n3 n2:db
+""")
+        solution = self.parser.solution()
+        self.assertEqual({str(response.sink) for response in solution.responses[
+            solution.DEFAULT_GROUP_NAME]}, {"n2", "n3"})
+        # All responses are calculated if requested.
+        solution = self.parser.solution(force=True, sinks=None)
+        self.assertEqual(len(solution.responses[solution.DEFAULT_GROUP_NAME]), 7)
+
 
 class CurrentOutputTestCase(LisoInputParserTestCase):
     """Current output command tests"""
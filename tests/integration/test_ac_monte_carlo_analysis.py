@@ -0,0 +1,76 @@
+"""AC Monte Carlo analysis integration tests"""
+
+from unittest import TestCase
+import numpy as np
+
+from zero.analysis import (AcSignalAnalysis, AcNoiseAnalysis, AcSignalMonteCarloAnalysis,
+                           AcNoiseMonteCarloAnalysis)
+from ..circuits import amplifier_circuit
+
+
+class AcMonteCarloAnalysisTestCase(TestCase):
+    """AC Monte Carlo analysis tests"""
+    def setUp(self):
+        self.f = np.logspace(0, 6, 50)
+        self.circuit = amplifier_circuit(opamp="OP27")
+        self.tolerances = {"r1": 0.01, "r2": 0.01, "c2": 0.05}
+
+    def signal(self, batch_size=None, **kwargs):
+        analysis = AcSignalMonteCarloAnalysis(self.circuit, batch_size=batch_size)
+        return analysis.calculate(input_type="voltage", node="n1", tolerances=self.tolerances,
+                                  frequencies=self.f, sinks=["nout"], **kwargs)
+
+    def test_signal(self):
+        """Test response statistics"""
+        solution = self.signal(n_samples=200, seed=1)
+        self.assertEqual(solution.n_samples, 200)
+        self.assertTrue(solution.has_response("nout"))
+        self.assertFalse(solution.has_response("nm"))
+        self.assertEqual(len(solution.responses), 1)
+        statistics = solution.response("nout")
+        self.assertEqual(statistics.count, 200)
+        nominal = AcSignalAnalysis(self.circuit).calculate(frequencies=self.f, input_type="voltage",
+                                                           node="n1")
+        magnitude = np.abs(nominal.get_response(sink="nout").complex_magnitude)
+        # Small tolerances give small spreads around the nominal response.
+        np.testing.assert_allclose(statistics.mean, magnitude, rtol=0.01)
+        np.testing.assert_allclose(statistics.quantile(0.5), magnitude, rtol=0.01)
+        self.assertTrue(np.all(statistics.quantile(0.05) <= statistics.quantile(0.95)))
+        self.assertTrue(np.all(statistics.std < 0.05 * magnitude))
+        # Circuit is unchanged.
+        self.assertEqual(self.circuit["r2"].resistance, 43e3)
+
+    def test_reproducible(self):
+        """Test seeded analyses draw the same samples whatever the batch size"""
+        first = self.signal(n_samples=60, seed=2, batch_size=7).response("nout")
+        second = self.signal(n_samples=60, seed=2, batch_size=25).response("nout")
+        third = self.signal(n_samples=60, seed=3, batch_size=25).response("nout")
+        np.testing.assert_allclose(first.mean, second.mean, rtol=1e-12)
+        np.testing.assert_allclose(first.quantile(0.95), second.quantile(0.95), rtol=1e-12)
+        self.assertFalse(np.allclose(first.mean, third.mean, rtol=1e-12, atol=0))
+
+    def test_noise(self):
+        """Test noise statistics"""
+        analysis = AcNoiseMonteCarloAnalysis(self.circuit, batch_size=30)
+        solution = analysis.calculate(input_type="voltage", node="n1", sink="nout",
+                                      tolerances=self.tolerances, n_samples=100,
+                                      frequencies=self.f, seed=1, distribution="normal")
+        self.assertEqual(solution.noise.count, 100)
+        self.assertEqual(solution.n_samples, 100)
+        self.assertEqual(solution.integrated_noise.shape, (100,))
+        nominal = AcNoiseAnalysis(self.circuit).calculate(frequencies=self.f, input_type="voltage",
+                                                          node="n1", sink="nout",
+                                                          incoherent_sum=True)
+        noise = nominal.get_noise_sum(sink="nout").spectral_density
+        np.testing.assert_allclose(solution.noise.quantile(0.5), noise, rtol=0.01)
+        power = np.square(noise)
+        integrated = np.sqrt(np.sum(np.diff(self.f) * (power[1:] + power[:-1]) / 2))
+        np.testing.assert_allclose(np.median(solution.integrated_noise), integrated, rtol=0.01)
+
+    def test_invalid(self):
+        """Test invalid Monte Carlo settings"""
+        self.assertRaises(ValueError, self.signal, n_samples=0)
+        self.assertRaises(ValueError, self.signal, n_samples=10, distribution="cauchy")
+        self.assertRaises(ValueError, AcSignalMonteCarloAnalysis, self.circuit, batch_size=0)
+        self.tolerances = {}
+        self.assertRaises(ValueError, self.signal, n_samples=10)
@@ -4,7 +4,10 @@ from unittest import TestCase
 import numpy as np
 
 from zero import Circuit
-from zero.analysis import AcNoiseAnalysis
+from zero.components import Resistor
+from zero.analysis import AcSignalAnalysis, AcNoiseAnalysis
+from zero.solve import MixedPrecisionSolver
+from ..circuits import amplifier_circuit
 
 
 class AcNoiseAnalysisIntegrationTestCase(TestCase):
@@ -26,12 +29,7 @@ class AcNoiseAnalysisIntegrationTestCase(TestCase):
 
     def test_input_noise_units(self):
         """Check units when projecting noise to input."""
-        circuit = Circuit()
-        circuit.add_capacitor(value="10u", node1="gnd", node2="n1")
-        circuit.add_resistor(value="430", node1="n1", node2="nm", name="r1")
-        circuit.add_resistor(value="43k", node1="nm", node2="nout")
-        circuit.add_capacitor(value="47p", node1="nm", node2="nout")
-        circuit.add_library_opamp(model="LT1124", node1="gnd", node2="nm", node3="nout")
+        circuit = amplifier_circuit()
         analysis = AcNoiseAnalysis(circuit=circuit)
         kwargs = {"frequencies": self.f, "node": "n1", "sink": "nout", "incoherent_sum": True}
         # Check the analysis without projecting.
@@ -70,3 +68,118 @@ class AcNoiseAnalysisIntegrationTestCase(TestCase):
                 # Double the resistance gives only sqrt(2) more noise.
                 self.assertTrue(np.allclose(noise1.spectral_density,
                                             1 / np.sqrt(factor) * noise2.spectral_density))
+
+    def test_batched_calculation(self):
+        """Test batched solve gives the same noise as the frequency-by-frequency solve"""
+        circuit = amplifier_circuit()
+        kwargs = {"frequencies": self.f, "node": "n1", "sink": "nout", "incoherent_sum": True,
+                  "input_refer": True}
+        serial = AcNoiseAnalysis(circuit=circuit).calculate(input_type="voltage", **kwargs)
+        batched = AcNoiseAnalysis(circuit=circuit, batch=True).calculate(input_type="voltage",
+                                                                         **kwargs)
+        self.assertTrue(serial.equivalent_to(batched))
+
+    def test_parallel_calculation(self):
+        """Test parallel solve gives the same noise as the serial solve"""
+        circuit = amplifier_circuit()
+        kwargs = {"frequencies": self.f, "node": "n1", "sink": "nout", "incoherent_sum": True,
+                  "input_refer": True}
+        serial = AcNoiseAnalysis(circuit=circuit).calculate(input_type="voltage", **kwargs)
+        for parallel in ("thread", "process"):
+            with self.subTest(parallel):
+                solution = AcNoiseAnalysis(circuit=circuit, parallel=parallel).calculate(
+                    input_type="voltage", **kwargs)
+                self.assertTrue(serial.equivalent_to(solution))
+
+    def test_compact_calculation(self):
+        """Test compact solves give the same noise as solves of the full circuit matrix"""
+        circuit = amplifier_circuit()
+        for sink in ("nout", "r1"):
+            kwargs = {"frequencies": self.f, "node": "n1", "sink": sink, "incoherent_sum": True,
+                      "input_refer": True}
+            full = AcNoiseAnalysis(circuit=circuit).calculate(input_type="voltage", **kwargs)
+            for batch in (False, True):
+                with self.subTest((sink, batch)):
+                    solution = AcNoiseAnalysis(circuit=circuit, batch=batch,
+                                               compact=True).calculate(input_type="voltage",
+                                                                       **kwargs)
+                    self.assertTrue(full.equivalent_to(solution))
+        # Signal analyses created from the noise analysis are also compact.
+        self.assertTrue(AcNoiseAnalysis(circuit, compact=True).to_signal_analysis().compact)
+
+    def test_mixed_precision_calculation(self):
+        """Test mixed precision solves give the same noise as double precision solves"""
+        circuit = amplifier_circuit()
+        kwargs = {"frequencies": self.f, "node": "n1", "sink": "nout", "incoherent_sum": True,
+                  "input_refer": True}
+        reference = AcNoiseAnalysis(circuit=circuit).calculate(input_type="voltage", **kwargs)
+        for batch in (False, True):
+            with self.subTest(batch):
+                analysis = AcNoiseAnalysis(circuit=circuit, batch=batch)
+                analysis.solver = MixedPrecisionSolver()
+                solution = analysis.calculate(input_type="voltage", **kwargs)
+                self.assertTrue(reference.equivalent_to(solution))
+
+    def test_incremental_calculation(self):
+        """Test incremental analysis updates give the same noise as full solves"""
+        circuit = amplifier_circuit()
+        kwargs = {"frequencies": self.f, "node": "n1", "sink": "nout", "incoherent_sum": True,
+                  "input_refer": True}
+        analysis = AcNoiseAnalysis(circuit=circuit, incremental=True)
+        analysis.calculate(input_type="voltage", **kwargs)
+        for change in (lambda: setattr(circuit["r1"], "resistance", 1e3),
+                       lambda: circuit.replace_component("r2", Resistor(name="r3", value="10k"))):
+            change()
+            with self.subTest(change):
+                with self.assertLogs("zero.analysis.ac.update", level="INFO"):
+                    solution = analysis.calculate(input_type="voltage", **kwargs)
+                full = AcNoiseAnalysis(circuit=circuit).calculate(input_type="voltage", **kwargs)
+                self.assertTrue(solution.equivalent_to(full))
+
+    def test_adaptive_calculation(self):
+        """Test adaptive sweep gives the same noise as a serial sweep at the refined frequencies"""
+        circuit = Circuit()
+        circuit.add_resistor(value="50", node1="n1", node2="n2", name="r1")
+        circuit.add_inductor(value="1m", node1="n2", node2="n3", name="l1")
+        circuit.add_capacitor(value="1n", node1="n3", node2="gnd")
+        circuit.add_inductor(value="1m", node1="n4", node2="gnd", name="l2")
+        circuit.add_capacitor(value="1.1n", node1="n4", node2="nout")
+        circuit.add_resistor(value="100k", node1="nout", node2="gnd")
+        circuit.set_inductor_coupling("l1", "l2", 0.95)
+        kwargs = {"node": "n1", "sink": "nout", "incoherent_sum": True, "input_refer": True,
+                  "responses": True}
+        analysis = AcNoiseAnalysis(circuit=circuit)
+        adaptive = analysis.calculate(input_type="voltage", frequencies=np.logspace(3, 7, 21),
+                                      adaptive=True, **kwargs)
+        self.assertGreater(analysis.n_freqs, 21)
+        serial = AcNoiseAnalysis(circuit=circuit).calculate(
+            input_type="voltage", frequencies=analysis.frequencies, **kwargs)
+        self.assertTrue(serial.equivalent_to(adaptive))
+
+    def test_responses_match_signal_analysis(self):
+        """Test responses solved alongside noise match those of a separate signal analysis"""
+        circuit = amplifier_circuit()
+        for input_type in ("voltage", "current"):
+            for batch in (False, True):
+                with self.subTest((input_type, batch)):
+                    noise = AcNoiseAnalysis(circuit=circuit, batch=batch).calculate(
+                        frequencies=self.f, input_type=input_type, node="n1", sink="nout",
+                        responses=True)
+                    signal = AcSignalAnalysis(circuit=circuit, batch=batch).calculate(
+                        frequencies=self.f, input_type=input_type, node="n1")
+                    responses = signal.responses[signal.DEFAULT_GROUP_NAME]
+                    self.assertEqual(len(noise.responses[noise.DEFAULT_GROUP_NAME]),
+                                     len(responses))
+                    for response in responses:
+                        self.assertTrue(response.series_equivalent(
+                            noise.get_response(source=response.source, sink=response.sink)))
+                    # Input-referred noise is the sink noise divided by the response.
+                    referred = AcNoiseAnalysis(circuit=circuit, batch=batch).calculate(
+                        frequencies=self.f, input_type=input_type, node="n1", sink="nout",
+                        input_refer=True)
+                    response = signal.get_response(sink="nout")
+                    for spectral_density in noise.noise[noise.DEFAULT_GROUP_NAME]:
+                        referred_density = referred.get_noise(source=spectral_density.source)
+                        self.assertTrue(np.allclose(referred_density.spectral_density,
+                                                    spectral_density.spectral_density
+                                                    / np.abs(response.complex_magnitude)))
@@ -0,0 +1,96 @@
+"""AC op-amp ranking analysis integration tests"""
+
+from unittest import TestCase
+import numpy as np
+
+from zero import Circuit
+from zero.analysis import AcNoiseAnalysis, AcOpAmpRankingAnalysis
+
+
+class AcOpAmpRankingAnalysisTestCase(TestCase):
+    """AC op-amp ranking analysis tests"""
+    MODELS = ["OP27", "LT1007", "AD797", "LT1124", "OP00"]
+
+    def setUp(self):
+        self.f = np.logspace(0, 5, 40)
+        self.circuit = Circuit()
+        self.circuit.add_resistor(value="430", node1="n1", node2="nm", name="r1")
+        self.circuit.add_resistor(value="43k", node1="nm", node2="nmid", name="r2")
+        self.circuit.add_capacitor(value="47p", node1="nm", node2="nmid", name="c2")
+        self.circuit.add_library_opamp(model="OP27", node1="gnd", node2="nm", node3="nmid",
+                                       name="op1")
+        self.circuit.add_resistor(value="1k", node1="nmid", node2="nm2", name="r3")
+        self.circuit.add_resistor(value="2k", node1="nm2", node2="nout", name="r4")
+        self.circuit.add_library_opamp(model="OP27", node1="gnd", node2="nm2", node3="nout",
+                                       name="op2")
+
+    def rank(self, slots, batch_size=None, **kwargs):
+        analysis = AcOpAmpRankingAnalysis(self.circuit, batch_size=batch_size)
+        return analysis.calculate(input_type="voltage", node="n1", sink="nout", slots=slots,
+                                  frequencies=self.f, impedance=50, **kwargs)
+
+    def individual_noise(self, model, slots, input_refer=False):
+        """Integrated noise calculated with the slots' op-amps replaced"""
+        circuit = Circuit()
+
+        for component in self.circuit.components:
+            if component.name in slots:
+                circuit.add_library_opamp(model=model, node1=component.node1,
+                                          node2=component.node2, node3=component.node3,
+                                          name=component.name)
+            else:
+                circuit.add_component(component)
+
+        solution = AcNoiseAnalysis(circuit).calculate(frequencies=self.f, input_type="voltage",
+                                                      node="n1", sink="nout", impedance=50,
+                                                      incoherent_sum=True, input_refer=input_refer)
+        power = np.square(solution.get_noise_sum().spectral_density)
+        return np.sqrt(np.sum(np.diff(self.f) * (power[1:] + power[:-1]) / 2))
+
+    def test_integrated_noise(self):
+        """Test candidates' integrated noise matches that of individual analyses"""
+        for slots in (["op1"], ["op1", "op2"]):
+            for input_refer in (False, True):
+                ranking = self.rank(slots, candidates=self.MODELS, batch_size=2,
+                                    input_refer=input_refer)
+                self.assertEqual(ranking.models, self.MODELS)
+
+                for model in self.MODELS:
+                    with self.subTest((slots, input_refer, model)):
+                        noise = ranking.integrated_noise[ranking.index(model)]
+                        self.assertAlmostEqual(
+                            noise / self.individual_noise(model, slots, input_refer), 1, places=10)
+
+        # Circuit is unchanged.
+        self.assertEqual(self.circuit["op1"].model, "OP27")
+        self.assertEqual(self.circuit["op2"].gbw, 8e6)
+
+    def test_ranked(self):
+        """Test candidates are ranked by integrated noise and response deviation"""
+        ranking = self.rank("op1", candidates=self.MODELS)
+        noise = [ranking.integrated_noise[ranking.index(model)] for model in ranking.ranked()]
+        self.assertEqual(noise, sorted(noise))
+        # The circuit as given has no deviation.
+        self.assertEqual(ranking.ranked(by="deviation")[0], "OP27")
+        self.assertAlmostEqual(ranking.deviation[ranking.index("OP27")], 0)
+        self.assertGreater(ranking.deviation[ranking.index("OP00")], 0)
+        solution = ranking.solution("ad797")
+        self.assertEqual(solution.name, "AD797")
+        self.assertRaises(ValueError, ranking.ranked, by="gain")
+
+    def test_library_candidates(self):
+        """Test library op-amps and queries select candidates without repeating aliases"""
+        ranking = self.rank("op1")
+        self.assertEqual(len(set(ranking.models)), len(ranking))
+        # OP27 is in the library once, under its own name.
+        self.assertIn("OP27", ranking.models)
+        queried = self.rank("op1", query="vnoise < 3n")
+        self.assertTrue(set(queried.models) < set(ranking.models))
+
+    def test_invalid(self):
+        """Test invalid ranking settings"""
+        self.assertRaises(ValueError, self.rank, "r1")
+        self.assertRaises(ValueError, self.rank, "op3")
+        self.assertRaises(ValueError, self.rank, [])
+        self.assertRaises(ValueError, self.rank, "op1", candidates=[])
+        self.assertRaises(ValueError, AcOpAmpRankingAnalysis, self.circuit, batch_size=0)
@@ -0,0 +1,74 @@
+"""AC pole-zero analysis integration tests"""
+
+from unittest import TestCase
+import numpy as np
+
+from zero import Circuit
+from zero.analysis import AcSignalAnalysis, AcPoleZeroAnalysis, RationalModel
+from ..circuits import amplifier_circuit
+
+
+class AcPoleZeroAnalysisTestCase(TestCase):
+    """AC pole-zero analysis tests"""
+    def setUp(self):
+        self.f = np.logspace(0, 6, 200)
+
+    def assert_model_matches_signal_analysis(self, circuit, sinks, input_type="voltage"):
+        signal = AcSignalAnalysis(circuit).calculate(frequencies=self.f, input_type=input_type,
+                                                     node="n1")
+        for sink in sinks:
+            with self.subTest((input_type, sink)):
+                model = AcPoleZeroAnalysis(circuit).calculate(input_type=input_type, sink=sink,
+                                                              node="n1")
+                response = signal.get_response(sink=sink)
+                self.assertEqual(model.sink, response.sink)
+                self.assertTrue(np.allclose(model(self.f), response.complex_magnitude,
+                                            rtol=1e-6, atol=0))
+                self.assertTrue(model.response(self.f).series_equivalent(response))
+
+    def test_rlc_low_pass(self):
+        """Test poles and zeros of a series RLC low pass filter"""
+        circuit = Circuit()
+        circuit.add_resistor(value="10", node1="n1", node2="n2")
+        circuit.add_inductor(value="1m", node1="n2", node2="nout")
+        circuit.add_capacitor(value="1u", node1="nout", node2="gnd")
+        model = AcPoleZeroAnalysis(circuit).calculate(input_type="voltage", sink="nout",
+                                                      node="n1")
+        # H(s) = 1 / (LC s^2 + RC s + 1)
+        expected_poles = np.roots([1e-3 * 1e-6, 10 * 1e-6, 1])
+        self.assertEqual(model.order, 2)
+        self.assertEqual(len(model.zeros), 0)
+        np.testing.assert_allclose(np.sort_complex(model.poles), np.sort_complex(expected_poles))
+        np.testing.assert_allclose(model.gain, 1 / (1e-3 * 1e-6))
+        self.assert_model_matches_signal_analysis(circuit, ["nout", "n2", "c1"])
+        self.assert_model_matches_signal_analysis(circuit, ["nout"], input_type="current")
+
+    def test_op_amp_and_coupled_inductors(self):
+        """Test models of circuits with op-amps and coupled inductors"""
+        circuit = amplifier_circuit(opamp="OP27")
+        circuit.add_library_opamp(model="OP27", node1="nout", node2="nbuf", node3="nbuf")
+        circuit.add_inductor(value="1m", node1="nbuf", node2="n2", name="l1")
+        circuit.add_inductor(value="9m", node1="n3", node2="gnd", name="l2")
+        circuit.add_resistor(value="1k", node1="n2", node2="gnd")
+        circuit.add_resistor(value="1k", node1="n3", node2="gnd")
+        circuit.set_inductor_coupling("l1", "l2", 0.9)
+        self.assert_model_matches_signal_analysis(circuit, ["nout", "nbuf", "n3", "l2"])
+
+    def test_delay(self):
+        """Test op-amp delays are approximated"""
+        circuit = Circuit()
+        circuit.add_resistor(value="1k", node1="n1", node2="nm")
+        circuit.add_resistor(value="10k", node1="nm", node2="nout")
+        circuit.add_library_opamp(model="OP27", node1="gnd", node2="nm", node3="nout",
+                                  delay=10e-9)
+        self.assert_model_matches_signal_analysis(circuit, ["nout"])
+
+    def test_model(self):
+        """Test model evaluation"""
+        model = RationalModel(zeros=[-10], poles=[-100, -1000], gain=1e5)
+        self.assertEqual(model.order, 2)
+        np.testing.assert_allclose(model(0), 10)
+        np.testing.assert_allclose(model.pole_frequencies, [100 / (2 * np.pi),
+                                                            1000 / (2 * np.pi)])
+        s = 2j * np.pi * self.f
+        np.testing.assert_allclose(model(self.f), 1e5 * (s + 10) / ((s + 100) * (s + 1000)))
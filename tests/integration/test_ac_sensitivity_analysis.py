@@ -0,0 +1,93 @@
+"""AC sensitivity analysis integration tests"""
+
+from unittest import TestCase
+import numpy as np
+
+from zero.analysis import AcSignalAnalysis, AcNoiseAnalysis, AcSensitivityAnalysis
+from ..circuits import amplifier_circuit
+
+
+class AcSensitivityAnalysisTestCase(TestCase):
+    """AC sensitivity analysis tests"""
+    def setUp(self):
+        self.f = np.logspace(0, 6, 50)
+        self.circuit = amplifier_circuit(opamp="OP27")
+        self.circuit.add_inductor(value="1m", node1="nout", node2="n2", name="l1")
+        self.circuit.add_inductor(value="9m", node1="n3", node2="gnd", name="l2")
+        self.circuit.add_resistor(value="1k", node1="n2", node2="gnd", name="r3")
+        self.circuit.add_resistor(value="1k", node1="n3", node2="gnd", name="r4")
+        self.circuit.set_inductor_coupling("l1", "l2", 0.9)
+
+    def response(self):
+        solution = AcSignalAnalysis(self.circuit).calculate(frequencies=self.f,
+                                                            input_type="voltage", node="n1")
+        return solution.get_response(sink="n3").complex_magnitude
+
+    def noise(self):
+        solution = AcNoiseAnalysis(self.circuit).calculate(frequencies=self.f,
+                                                           input_type="voltage", node="n1",
+                                                           sink="n3", impedance=50,
+                                                           incoherent_sum=True)
+        return solution.get_noise_sum(sink="n3").spectral_density
+
+    def finite_difference(self, function, sensitivities, parameter):
+        """Relative sensitivity calculated by central differences of full analyses"""
+        component, _, attribute = parameter.partition(".")
+        component = self.circuit[component]
+        attribute = attribute or "value"
+        value = float(getattr(component, attribute))
+        step = 1e-4 * value
+        setattr(component, attribute, value + step)
+        upper = function()
+        setattr(component, attribute, value - step)
+        lower = function()
+        setattr(component, attribute, value)
+        return (upper - lower) / (2 * step) * value / sensitivities.nominal
+
+    def test_default_parameters(self):
+        """Test sensitivities are calculated for passive components and op-amp parameters"""
+        analysis = AcSensitivityAnalysis(self.circuit)
+        self.assertCountEqual(analysis.default_parameters,
+                              ["c1", "r1", "r2", "c2", "l1", "l2", "r3", "r4", "op1.a0", "op1.gbw",
+                               "op1.vnoise", "op1.inoise"])
+
+    def test_response_sensitivities(self):
+        """Test response sensitivities match finite differences"""
+        for batch in (False, True):
+            sensitivities = AcSensitivityAnalysis(self.circuit, batch=batch).calculate(
+                input_type="voltage", node="n1", sink="n3", frequencies=self.f)
+            np.testing.assert_allclose(sensitivities.nominal, self.response())
+
+            for parameter in sensitivities.parameters:
+                with self.subTest((batch, parameter)):
+                    np.testing.assert_allclose(
+                        sensitivities.relative(parameter),
+                        self.finite_difference(self.response, sensitivities, parameter),
+                        rtol=0, atol=1e-6)
+
+            # Noise parameters don't affect responses.
+            self.assertTrue(np.all(sensitivities.derivative("op1.vnoise") == 0))
+
+    def test_noise_sensitivities(self):
+        """Test noise sensitivities match finite differences"""
+        for batch in (False, True):
+            sensitivities = AcSensitivityAnalysis(self.circuit, batch=batch).calculate(
+                input_type="voltage", node="n1", sink="n3", frequencies=self.f, noise=True,
+                impedance=50)
+            np.testing.assert_allclose(sensitivities.nominal, self.noise())
+
+            for parameter in sensitivities.parameters:
+                with self.subTest((batch, parameter)):
+                    np.testing.assert_allclose(
+                        sensitivities.relative(parameter),
+                        self.finite_difference(self.noise, sensitivities, parameter),
+                        rtol=0, atol=1e-6)
+
+    def test_invalid(self):
+        """Test invalid sensitivity settings"""
+        analysis = AcSensitivityAnalysis(self.circuit)
+        self.assertRaises(ValueError, analysis.calculate, input_type="voltage", node="n1",
+                          sink="n3", frequencies=self.f, parameters=["r1.gbw"])
+        self.assertRaises(ValueError, analysis.calculate, input_type="voltage", node="n1",
+                          sink="n3", frequencies=self.f, parameters=[])
+        self.assertRaises(ValueError, AcSensitivityAnalysis, self.circuit, incremental=True)
@@ -1,10 +1,16 @@
 """AC signal analysis integration tests"""
 
+import warnings
 from unittest import TestCase
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 
-from zero.analysis import AcSignalAnalysis
+from zero.analysis import AcSignalAnalysis, AcMultiSignalAnalysis, StructurallySingularError
 from zero import Circuit
+from zero.components import Resistor
+from zero.elements import ElementNotFoundError
+from zero.solve import MixedPrecisionSolver
+from ..circuits import amplifier_circuit
 
 
 class AcSignalAnalysisTestCase(TestCase):
@@ -22,3 +28,321 @@ class AcSignalAnalysisTestCase(TestCase):
                 self.assertEqual(analysis.n_freqs, len(self.f))
                 # Circuit should have input component and node.
                 self.assertCountEqual(analysis.element_names, ["input", "nin"])
+
+    def test_open_circuit_current_input(self):
+        """Test a current input with nowhere to flow is structurally singular"""
+        circuit = Circuit()
+        circuit.add_resistor(value="1k", node1="nin", node2="n1")
+        analysis = AcSignalAnalysis(circuit)
+        self.assertRaises(StructurallySingularError, analysis.calculate, frequencies=self.f,
+                          input_type="current", node="nin")
+
+    def test_element_order(self):
+        """Test matrix elements are ordered by component then by first node appearance"""
+        circuit = Circuit()
+        circuit.add_resistor(name="r2", value="1k", node1="nb", node2="na")
+        circuit.add_resistor(name="r1", value="1k", node1="na", node2="gnd")
+        circuit.add_capacitor(name="c1", value="1u", node1="nc", node2="nb")
+        analysis = AcSignalAnalysis(circuit)
+        analysis.calculate(frequencies=self.f, input_type="voltage", node="nc")
+        self.assertEqual(analysis.element_names,
+                         ["r2", "r1", "c1", "input", "nb", "na", "nc"])
+        self.assertEqual(analysis.component_matrix_index(circuit["c1"]), 2)
+        self.assertEqual(analysis.node_matrix_index(circuit["nc"]), 6)
+        self.assertRaises(ValueError, analysis.node_matrix_index, circuit["r1"])
+        self.assertRaises(ValueError, analysis.component_matrix_index, circuit["na"])
+
+    def test_batched_calculation(self):
+        """Test batched solve gives the same responses as the frequency-by-frequency solve"""
+        circuit = amplifier_circuit()
+        circuit.add_inductor(value="1m", node1="nout", node2="n2", name="l1")
+        circuit.add_inductor(value="9m", node1="n3", node2="gnd", name="l2")
+        circuit.add_resistor(value="1k", node1="n2", node2="gnd")
+        circuit.add_resistor(value="1k", node1="n3", node2="gnd")
+        circuit.set_inductor_coupling("l1", "l2", 0.9)
+        for input_type in ("voltage", "current"):
+            with self.subTest(input_type):
+                serial = AcSignalAnalysis(circuit).calculate(frequencies=self.f,
+                                                             input_type=input_type, node="n1")
+                batched = AcSignalAnalysis(circuit, batch=True).calculate(frequencies=self.f,
+                                                                          input_type=input_type,
+                                                                          node="n1")
+                self.assertTrue(serial.equivalent_to(batched))
+
+    def test_batched_singular_frequency(self):
+        """Test batched solves give NaN responses at singular frequencies, like serial solves"""
+        # The parallel inductors form a loop with zero impedance at zero frequency.
+        circuit = Circuit()
+        circuit.add_inductor(value="1m", node1="n1", node2="n2", name="l1")
+        circuit.add_inductor(value="2m", node1="n1", node2="n2", name="l2")
+        circuit.add_resistor(value="1k", node1="n2", node2="gnd")
+        frequencies = np.array([0, 1, 1e3])
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            serial = AcSignalAnalysis(circuit).calculate(frequencies=frequencies,
+                                                         input_type="voltage", node="n1")
+            batched = AcSignalAnalysis(circuit, batch=True).calculate(
+                frequencies=frequencies, input_type="voltage", node="n1")
+        for sink in ("n2", "l1"):
+            with self.subTest(sink):
+                response = batched.get_response(source="n1", sink=sink).complex_magnitude
+                self.assertTrue(np.isnan(response[0]))
+                self.assertTrue(np.allclose(
+                    response, serial.get_response(source="n1", sink=sink).complex_magnitude,
+                    equal_nan=True))
+
+    def test_mixed_precision_calculation(self):
+        """Test mixed precision solves give the same responses as double precision solves"""
+        circuit = amplifier_circuit()
+        reference = AcSignalAnalysis(circuit).calculate(frequencies=self.f, input_type="voltage",
+                                                        node="n1")
+        for batch in (False, True):
+            with self.subTest(batch):
+                analysis = AcSignalAnalysis(circuit, batch=batch)
+                analysis.solver = MixedPrecisionSolver()
+                solution = analysis.calculate(frequencies=self.f, input_type="voltage",
+                                              node="n1")
+                self.assertTrue(reference.equivalent_to(solution))
+                # Solutions are stored in single precision.
+                response = solution.get_response(source="n1", sink="nout")
+                self.assertEqual(response.complex_magnitude.dtype, np.complex64)
+
+    def test_parallel_calculation(self):
+        """Test parallel solve gives the same responses as the serial solve"""
+        circuit = amplifier_circuit()
+        serial = AcSignalAnalysis(circuit).calculate(frequencies=self.f, input_type="voltage",
+                                                     node="n1")
+        for batch in (False, True):
+            for parallel in ("thread", "process", True):
+                with self.subTest((batch, parallel)):
+                    analysis = AcSignalAnalysis(circuit, batch=batch, parallel=parallel)
+                    solution = analysis.calculate(frequencies=self.f, input_type="voltage",
+                                                  node="n1")
+                    self.assertTrue(serial.equivalent_to(solution))
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            solution = AcSignalAnalysis(circuit, parallel=executor).calculate(
+                frequencies=self.f, input_type="voltage", node="n1")
+            self.assertTrue(serial.equivalent_to(solution))
+        analysis = AcSignalAnalysis(circuit, parallel="fork")
+        self.assertRaises(ValueError, analysis.calculate, frequencies=self.f,
+                          input_type="voltage", node="n1")
+
+    def test_compact_calculation(self):
+        """Test compact solves give the same responses as solves of the full circuit matrix"""
+        circuit = amplifier_circuit()
+        circuit.add_inductor(value="1m", node1="nout", node2="n2", name="l1")
+        circuit.add_inductor(value="9m", node1="n3", node2="gnd", name="l2")
+        circuit.add_inductor(value="2m", node1="n2", node2="n4", name="l3")
+        circuit.add_resistor(value="1k", node1="n4", node2="gnd")
+        circuit.add_resistor(value="1k", node1="n3", node2="gnd")
+        circuit.set_inductor_coupling("l1", "l2", 0.9)
+        for input_type in ("voltage", "current"):
+            full = AcSignalAnalysis(circuit).calculate(frequencies=self.f, input_type=input_type,
+                                                       node="n1")
+            for kwargs in (dict(), dict(batch=True), dict(parallel="process")):
+                with self.subTest((input_type, kwargs)):
+                    compact = AcSignalAnalysis(circuit, compact=True, **kwargs).calculate(
+                        frequencies=self.f, input_type=input_type, node="n1")
+                    self.assertTrue(full.equivalent_to(compact))
+            # Currents through sinks are solved for directly.
+            with self.subTest((input_type, "sinks")):
+                nodes = ["n1", ("nm", "n1")]
+                full = AcMultiSignalAnalysis(circuit).calculate(
+                    frequencies=self.f, input_type=input_type, nodes=nodes)
+                compact = AcMultiSignalAnalysis(circuit, compact=True).calculate(
+                    frequencies=self.f, input_type=input_type, nodes=nodes, sinks=["r1"])
+                for response in compact.responses[compact.DEFAULT_GROUP_NAME]:
+                    full_response = full.get_response(source=response.source,
+                                                      sink=response.sink)
+                    self.assertTrue(np.allclose(response.complex_magnitude,
+                                                full_response.complex_magnitude))
+        self.assertRaises(ValueError, AcSignalAnalysis, circuit, incremental=True, compact=True)
+
+    def test_compact_zero_frequency(self):
+        """Test compact solves of circuits with inductors at zero frequency"""
+        circuit = Circuit()
+        circuit.add_inductor(value="1m", node1="n1", node2="n2")
+        circuit.add_resistor(value="1k", node1="n2", node2="n3")
+        circuit.add_resistor(value="1k", node1="n3", node2="gnd")
+        frequencies = np.array([0, 1, 1e3])
+        for kwargs in (dict(), dict(batch=True)):
+            with self.subTest(kwargs):
+                full = AcSignalAnalysis(circuit, **kwargs).calculate(
+                    frequencies=frequencies, input_type="voltage", node="n1")
+                compact = AcSignalAnalysis(circuit, compact=True, **kwargs).calculate(
+                    frequencies=frequencies, input_type="voltage", node="n1")
+                self.assertTrue(full.equivalent_to(compact))
+                response = compact.get_response(source="n1", sink="n3").complex_magnitude
+                self.assertAlmostEqual(response[0], 0.5)
+
+    def test_independent_blocks(self):
+        """Test subnetworks not connected to the input have zero responses"""
+        circuit = Circuit()
+        circuit.add_resistor(value="1k", node1="n1", node2="n2")
+        circuit.add_resistor(value="2k", node1="n2", node2="gnd")
+        circuit.add_resistor(value="1k", node1="n3", node2="n4", name="r3")
+        circuit.add_capacitor(value="1n", node1="n4", node2="gnd")
+        for kwargs in (dict(), dict(batch=True), dict(compact=True), dict(incremental=True)):
+            with self.subTest(kwargs):
+                solution = AcSignalAnalysis(circuit, **kwargs).calculate(
+                    frequencies=self.f, input_type="voltage", node="n1")
+                self.assertTrue(np.allclose(solution.get_response(sink="n2").complex_magnitude,
+                                            2 / 3))
+                for sink in ("r3", "n4"):
+                    self.assertFalse(np.any(solution.get_response(sink=sink).complex_magnitude))
+
+    def test_structurally_singular(self):
+        """Test structurally singular circuits are detected before they are solved"""
+        circuits = {"floating node": Circuit(), "op-amp outputs": Circuit()}
+        circuits["floating node"].add_resistor(value="1k", node1="n1", node2="gnd")
+        circuits["floating node"].add_capacitor(value="1n", node1="n2", node2="n3")
+        for name in ("op1", "op2"):
+            circuits["op-amp outputs"].add_library_opamp(model="OP27", node1="n1", node2="nout",
+                                                         node3="nout", name=name)
+        for name, circuit in circuits.items():
+            with self.subTest(name):
+                with self.assertRaises(StructurallySingularError):
+                    AcSignalAnalysis(circuit).calculate(frequencies=self.f, input_type="voltage",
+                                                        node="n1")
+
+    def test_adaptive_calculation(self):
+        """Test adaptive sweep resolves a sharp resonance with fewer solves than a dense sweep"""
+        circuit = Circuit()
+        circuit.add_resistor(value="1k", node1="n1", node2="n2")
+        circuit.add_inductor(value="1m", node1="n2", node2="n3")
+        circuit.add_resistor(value="0.1", node1="n3", node2="gnd")
+        circuit.add_capacitor(value="1u", node1="n2", node2="gnd")
+        dense_frequencies = np.logspace(2, 6, 20001)
+        dense = AcSignalAnalysis(circuit, batch=True).calculate(
+            frequencies=dense_frequencies, input_type="voltage", node="n1")
+        analysis = AcSignalAnalysis(circuit)
+        solution = analysis.calculate(frequencies=np.logspace(2, 6, 21), input_type="voltage",
+                                      node="n1", adaptive=True)
+        frequencies = solution.get_response(sink="n2").series.x
+        self.assertLess(len(frequencies), 1000)
+        self.assertTrue(np.all(np.diff(frequencies) > 0))
+        # Interpolated adaptive response matches the dense response, including the peak.
+        magnitude = 20 * np.log10(np.abs(dense.get_response(sink="n2").series.y))
+        adaptive_magnitude = 20 * np.log10(np.abs(solution.get_response(sink="n2").series.y))
+        interpolated = np.interp(np.log(dense_frequencies), np.log(frequencies),
+                                 adaptive_magnitude)
+        self.assertLess(np.max(np.abs(interpolated - magnitude)), 0.1)
+        # Cap on total solves.
+        with self.assertLogs("zero.analysis.ac.adaptive", level="WARNING"):
+            solution = analysis.calculate(frequencies=np.logspace(2, 6, 21),
+                                          input_type="voltage", node="n1", adaptive=True,
+                                          max_solves=50)
+        self.assertEqual(len(solution.get_response(sink="n2").series.x), 50)
+        self.assertRaises(ValueError, analysis.calculate, frequencies=[0, 1, 10],
+                          input_type="voltage", node="n1", adaptive=True)
+
+    def test_incremental_calculation(self):
+        """Test incremental analysis updates match full solves after components are changed"""
+        circuit = amplifier_circuit()
+        circuit.add_inductor(value="1m", node1="nout", node2="n2", name="l1")
+        circuit.add_inductor(value="9m", node1="n3", node2="gnd", name="l2")
+        circuit.add_resistor(value="1k", node1="n2", node2="gnd")
+        circuit.add_resistor(value="1k", node1="n3", node2="gnd")
+        analysis = AcSignalAnalysis(circuit, incremental=True)
+
+        def check(rank):
+            with self.assertLogs("zero.analysis.ac.update", level="INFO") as logs:
+                solution = analysis.calculate(frequencies=self.f, input_type="voltage", node="n1")
+            self.assertIn(f"updated 1000 of 1000 frequencies with rank {rank} corrections",
+                          logs.output[0])
+            full = AcSignalAnalysis(circuit).calculate(frequencies=self.f, input_type="voltage",
+                                                       node="n1")
+            self.assertTrue(solution.equivalent_to(full))
+
+        analysis.calculate(frequencies=self.f, input_type="voltage", node="n1")
+        circuit["r1"].resistance = 1e3
+        check(rank=1)
+        # Updates are relative to the factorised matrices, so their rank accumulates.
+        circuit["c2"].capacitance = 100e-12
+        circuit["l1"].inductance = 2e-3
+        check(rank=3)
+        circuit.set_inductor_coupling("l1", "l2", 0.9)
+        check(rank=4)
+        # Replacement with a different type of component with a different name.
+        circuit.replace_component("c2", Resistor(name="rnew", value="100k"))
+        check(rank=4)
+        # Different frequencies are factorised again.
+        analysis.calculate(frequencies=self.f[:10], input_type="voltage", node="n1")
+        self.assertEqual(len(analysis._factorised_sweep.factorisations), 10)
+        self.assertRaises(ValueError, AcSignalAnalysis, circuit, incremental=True, batch=True)
+
+    def test_multi_input_calculation(self):
+        """Test multi-input responses match those of separate single-input analyses"""
+        circuit = amplifier_circuit()
+        circuit.add_resistor(value="1k", node1="nout", node2="n2")
+        circuit.add_resistor(value="2k", node1="n2", node2="gnd")
+        inputs = [dict(node="n1"), dict(node="n2"), dict(node_p="nm", node_n="n1")]
+        nodes = ["n1", "n2", ("nm", "n1")]
+        names = ["input_n1", "input_n2", "input_nm_n1"]
+        for input_type in ("voltage", "current"):
+            for batch in (False, True):
+                with self.subTest((input_type, batch)):
+                    multi = AcMultiSignalAnalysis(circuit, batch=batch).calculate(
+                        frequencies=self.f, input_type=input_type, nodes=nodes)
+                    for kwargs, name in zip(inputs, names):
+                        single = AcSignalAnalysis(circuit, batch=batch).calculate(
+                            frequencies=self.f, input_type=input_type, **kwargs)
+                        for response in single.responses[single.DEFAULT_GROUP_NAME]:
+                            sink = name if response.sink.name == "input" else response.sink.name
+                            source = response.source.name if input_type == "voltage" else name
+                            multi_response = multi.get_response(source=source, sink=sink)
+                            self.assertTrue(response.series_equivalent(multi_response))
+
+    def test_multi_input_invalid(self):
+        """Test invalid multi-input specifications"""
+        circuit = Circuit()
+        circuit.add_resistor(value="1k", node1="n1", node2="n2")
+        circuit.add_resistor(value="1k", node1="n2", node2="gnd")
+        analysis = AcMultiSignalAnalysis(circuit)
+        for input_type in ("voltage", "current"):
+            with self.subTest(input_type):
+                self.assertRaises(ValueError, analysis.calculate, frequencies=self.f,
+                                  input_type=input_type, nodes=[])
+                self.assertRaises(ValueError, analysis.calculate, frequencies=self.f,
+                                  input_type=input_type, nodes=["n1", "n1"])
+                self.assertRaises(ValueError, analysis.calculate, frequencies=self.f,
+                                  input_type=input_type, nodes=[("n1", "n2", "gnd")])
+        # Voltage inputs sharing a positive node.
+        self.assertRaises(ValueError, analysis.calculate, frequencies=self.f,
+                          input_type="voltage", nodes=["n1", ("n1", "n2")])
+
+    def test_sink_calculation(self):
+        """Test responses to specified sinks match those of the full analyses"""
+        circuit = amplifier_circuit()
+        circuit.add_resistor(value="1k", node1="nout", node2="n2")
+        circuit.add_resistor(value="2k", node1="n2", node2="gnd")
+        nodes = ["n1", "n2", ("nm", "n1")]
+        sinks = ["nout", "r1"]
+
+        def check(full, solution, n_responses):
+            responses = solution.responses[solution.DEFAULT_GROUP_NAME]
+            self.assertEqual(len(responses), n_responses)
+            for response in responses:
+                self.assertIn(response.sink.name, sinks)
+                full_response = full.get_response(source=response.source, sink=response.sink)
+                self.assertTrue(np.allclose(response.complex_magnitude,
+                                            full_response.complex_magnitude, rtol=1e-6))
+
+        for input_type in ("voltage", "current"):
+            full = AcSignalAnalysis(circuit).calculate(frequencies=self.f, input_type=input_type,
+                                                       node="n1")
+            solution = AcSignalAnalysis(circuit).calculate(frequencies=self.f,
+                                                           input_type=input_type, node="n1",
+                                                           sinks=sinks)
+            check(full, solution, 2)
+            full = AcMultiSignalAnalysis(circuit).calculate(frequencies=self.f,
+                                                            input_type=input_type, nodes=nodes)
+            # Fewer sinks than inputs are solved using the transposed circuit.
+            for kwargs in (dict(), dict(batch=True), dict(incremental=True)):
+                with self.subTest((input_type, kwargs)):
+                    solution = AcMultiSignalAnalysis(circuit, **kwargs).calculate(
+                        frequencies=self.f, input_type=input_type, nodes=nodes, sinks=sinks)
+                    check(full, solution, 6)
+        # Unknown sink.
+        self.assertRaises(ElementNotFoundError, AcSignalAnalysis(circuit).calculate,
+                          frequencies=self.f, input_type="voltage", node="n1", sinks=["n3"])
@@ -0,0 +1,102 @@
+"""AC parameter sweep analysis integration tests"""
+
+from unittest import TestCase
+from unittest.mock import patch
+import numpy as np
+
+from zero.analysis import (AcSignalAnalysis, AcNoiseAnalysis, AcSignalSweepAnalysis,
+                           AcNoiseSweepAnalysis)
+from zero.analysis.ac.stamp import StampPattern
+from ..circuits import amplifier_circuit
+
+
+class AcSweepAnalysisTestCase(TestCase):
+    """AC parameter sweep analysis tests"""
+    def setUp(self):
+        self.f = np.logspace(0, 6, 100)
+        self.circuit = amplifier_circuit(opamp="OP27")
+        self.parameters = {"r2": [1e3, 10e3, 100e3], "op1.gbw": [1e6, 8e6, 20e6]}
+
+    def set_point(self, point):
+        self.circuit["r2"].resistance = self.parameters["r2"][point]
+        self.circuit["op1"].gbw = self.parameters["op1.gbw"][point]
+
+    def test_signal_sweep(self):
+        """Test signal sweep responses match those of separate analyses"""
+        sweep = AcSignalSweepAnalysis(self.circuit).calculate(
+            input_type="voltage", node="n1", parameters=self.parameters, frequencies=self.f,
+            sinks=["nout", "r1"])
+        self.assertEqual(len(sweep), 3)
+        self.assertEqual(sweep.response("nout").shape, (3, len(self.f)))
+        # Circuit is unchanged.
+        self.assertEqual(self.circuit["r2"].resistance, 43e3)
+
+        for point, solution in enumerate(sweep):
+            with self.subTest(point):
+                self.set_point(point)
+                expected = AcSignalAnalysis(self.circuit).calculate(
+                    frequencies=self.f, input_type="voltage", node="n1")
+
+                for sink in ("nout", "r1"):
+                    expected_response = expected.get_response(sink=sink)
+                    np.testing.assert_allclose(sweep.response(sink)[point],
+                                               expected_response.complex_magnitude)
+                    self.assertTrue(solution.get_response(sink=sink).series_equivalent(
+                        expected_response))
+
+    def test_noise_sweep(self):
+        """Test noise sweep spectral densities match those of separate analyses"""
+        for input_refer in (False, True):
+            sweep = AcNoiseSweepAnalysis(self.circuit).calculate(
+                input_type="voltage", node="n1", sink="nout", parameters=self.parameters,
+                frequencies=self.f, input_refer=input_refer, incoherent_sum=True)
+
+            for point in range(len(sweep)):
+                with self.subTest((input_refer, point)):
+                    self.set_point(point)
+                    expected = AcNoiseAnalysis(self.circuit).calculate(
+                        frequencies=self.f, input_type="voltage", node="n1", sink="nout",
+                        input_refer=input_refer, incoherent_sum=True)
+                    self.circuit["r2"].resistance = 43e3
+                    self.circuit["op1"].gbw = 8e6
+
+                    for noise in expected.noise[expected.DEFAULT_GROUP_NAME]:
+                        np.testing.assert_allclose(sweep.noise(noise.source)[point],
+                                                   noise.spectral_density)
+
+                    np.testing.assert_allclose(
+                        sweep.noise_sum()[point],
+                        expected.get_noise_sum().spectral_density)
+                    np.testing.assert_allclose(
+                        sweep.noise("R(r2)")[point],
+                        expected.get_noise(source="R(r2)").spectral_density)
+
+    def test_circuit_unchanged_during_sweep(self):
+        """Test the swept parameters are not set on the analysed circuit"""
+        resistances = []
+        values = StampPattern.values
+
+        def record_values(pattern, frequencies):
+            resistances.append(self.circuit["r2"].resistance)
+            return values(pattern, frequencies)
+
+        with patch.object(StampPattern, "values", record_values):
+            AcNoiseSweepAnalysis(self.circuit).calculate(
+                input_type="voltage", node="n1", sink="nout", parameters=self.parameters,
+                frequencies=self.f)
+
+        self.assertTrue(resistances)
+        self.assertTrue(all(resistance == 43e3 for resistance in resistances))
+
+    def test_invalid_parameters(self):
+        """Test invalid sweep parameters"""
+        analysis = AcSignalSweepAnalysis(self.circuit)
+        kwargs = dict(input_type="voltage", node="n1", frequencies=self.f)
+
+        for parameters in ({}, {"r2": []}, {"r2": [1, 2], "r1": [1]}, {"r2.gbw": [1]}):
+            with self.subTest(parameters):
+                self.assertRaises(ValueError, analysis.calculate, parameters=parameters, **kwargs)
+
+        self.assertRaises(ValueError, analysis.calculate, parameters={"r2": [1]}, adaptive=True,
+                          **kwargs)
+        self.assertRaises(ValueError, AcSignalSweepAnalysis, self.circuit, incremental=True)
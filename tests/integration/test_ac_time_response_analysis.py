@@ -0,0 +1,66 @@
+"""Time response analysis integration tests"""
+
+from unittest import TestCase
+import numpy as np
+
+from zero import Circuit
+from zero.analysis import AcTimeResponseAnalysis
+
+
+class TimeResponseAnalysisTestCase(TestCase):
+    """Time response analysis tests"""
+    def setUp(self):
+        # RC low pass filter with a 1 ms time constant.
+        self.circuit = Circuit()
+        self.circuit.add_resistor(name="r1", value="1k", node1="nin", node2="nout")
+        self.circuit.add_capacitor(name="c1", value="1u", node1="nout", node2="gnd")
+        self.tau = 1e-3
+
+    def calculate(self, **kwargs):
+        analysis = AcTimeResponseAnalysis(circuit=self.circuit)
+        return analysis.calculate(input_type="voltage", node="nin", sinks=["nout", "r1"],
+                                  duration=10e-3, sample_rate=1e6, **kwargs)
+
+    def test_step_response(self):
+        solution = self.calculate()
+        step = solution.step_response("nout")
+        self.assertEqual(len(step.x), 10000)
+        # Away from the band limited edge at zero time.
+        np.testing.assert_allclose(step.y[20:], 1 - np.exp(-step.x[20:] / self.tau), atol=1e-4)
+        # The current through the resistor decays from 1 mA.
+        current = solution.step_response("r1")
+        np.testing.assert_allclose(current.y[20:], np.exp(-current.x[20:] / self.tau) / 1e3,
+                                   atol=1e-7)
+
+    def test_impulse_response(self):
+        solution = self.calculate(window="hann")
+        impulse = solution.impulse_response("nout", source="nin")
+        np.testing.assert_allclose(impulse.y[20:] * self.tau,
+                                   np.exp(-impulse.x[20:] / self.tau), atol=1e-4)
+        self.assertLess(solution.non_causal_fraction("nout"), 1e-3)
+
+    def test_frequency_solution(self):
+        solution = self.calculate()
+        response = solution.frequency_solution.get_response("nin", "nout")
+        self.assertTrue(np.all(np.diff(solution.frequencies) > 0))
+        self.assertEqual(len(response.frequencies), len(solution.frequencies))
+        # Close to unity at the (approximated) zero frequency.
+        self.assertAlmostEqual(abs(response.complex_magnitude[0]), 1)
+
+    def test_non_causal_warning(self):
+        # The response has not decayed within the transform length.
+        with self.assertLogs("zero.analysis.ac.time_response", level="WARNING"):
+            analysis = AcTimeResponseAnalysis(circuit=self.circuit)
+            solution = analysis.calculate(input_type="voltage", node="nin", sinks=["nout"],
+                                          duration=1e-3, sample_rate=1e6)
+        self.assertGreater(solution.non_causal_fraction("nout"), 1e-3)
+
+    def test_invalid_parameters(self):
+        analysis = AcTimeResponseAnalysis(circuit=self.circuit)
+        for kwargs in (dict(duration=0, sample_rate=1e6, sinks=["nout"]),
+                       dict(duration=1, sample_rate=1e6, sinks=[]),
+                       dict(duration=1, sample_rate=1e6, sinks=["nout"], frequencies=[1, 2]),
+                       dict(duration=1, sample_rate=1e6, sinks=["nout"], adaptive=True)):
+            with self.subTest(kwargs=kwargs):
+                self.assertRaises(ValueError, analysis.calculate, input_type="voltage",
+                                  node="nin", **kwargs)
@@ -0,0 +1,79 @@
+"""Compiled circuit integration tests"""
+
+from unittest import TestCase
+import numpy as np
+
+from zero.analysis import AcSignalAnalysis, AcNoiseAnalysis, CompiledCircuit
+from ..circuits import amplifier_circuit
+
+
+class CompiledCircuitTestCase(TestCase):
+    """Compiled circuit tests"""
+    def setUp(self):
+        self.f = np.logspace(0, 5, 100)
+        self.circuit = amplifier_circuit()
+
+    def _signal(self, **kwargs):
+        return AcSignalAnalysis(self.circuit).calculate(frequencies=self.f, **kwargs)
+
+    def _noise(self, **kwargs):
+        return AcNoiseAnalysis(self.circuit).calculate(frequencies=self.f, impedance=50,
+                                                       **kwargs)
+
+    def test_signal(self):
+        """Test compiled signal solutions match those of signal analyses"""
+        compiled = CompiledCircuit(self.circuit)
+        for input_type in ("voltage", "current"):
+            for inputs in (dict(node="n1"), dict(node_p="nm", node_n="n1")):
+                with self.subTest((input_type, inputs)):
+                    expected = self._signal(input_type=input_type, **inputs)
+                    for _ in range(2):
+                        solution = compiled.solve_signal(self.f, input_type, **inputs)
+                        self.assertTrue(solution.equivalent_to(expected))
+        self.assertEqual(compiled.n_inputs, 4)
+        # Other frequencies and sinks reuse the compiled input.
+        solution = compiled.solve_signal(self.f[::2], "voltage", node="n1", sinks=["nout"])
+        expected = self._signal(input_type="voltage", node="n1")
+        self.assertTrue(np.allclose(solution.get_response(sink="nout").complex_magnitude,
+                                    expected.get_response(sink="nout").complex_magnitude[::2]))
+        self.assertEqual(compiled.n_inputs, 4)
+
+    def test_noise(self):
+        """Test compiled noise solutions match those of noise analyses"""
+        compiled = CompiledCircuit(self.circuit, batch=True)
+        for sink in ("nout", "nm", "r1"):
+            with self.subTest(sink):
+                expected = self._noise(input_type="voltage", node="n1", sink=sink,
+                                       incoherent_sum=True, input_refer=True)
+                solution = compiled.solve_noise(self.f, sink, "voltage", impedance=50,
+                                                node="n1", incoherent_sum=True,
+                                                input_refer=True)
+                self.assertTrue(solution.equivalent_to(expected))
+        self.assertEqual(compiled.n_inputs, 1)
+
+    def test_invalidation(self):
+        """Test compiled inputs are discarded when the circuit changes"""
+        compiled = CompiledCircuit(self.circuit)
+        changes = {
+            "value": lambda: setattr(self.circuit["r1"], "resistance", 500),
+            "op-amp": lambda: setattr(self.circuit["op1"], "gbw", 1e6),
+            "component": lambda: self.circuit.add_resistor(value="1k", node1="nout",
+                                                           node2="gnd"),
+            "node": lambda: setattr(self.circuit["r1"], "node1", "nout"),
+        }
+        for name, change in changes.items():
+            with self.subTest(name):
+                compiled.solve_signal(self.f, "voltage", node="n1")
+                compiled.solve_noise(self.f, "nout", "voltage", impedance=50, node="n1")
+                self.assertEqual(compiled.n_inputs, 2)
+                change()
+                solution = compiled.solve_signal(self.f, "voltage", node="n1")
+                self.assertEqual(compiled.n_inputs, 1)
+                self.assertTrue(solution.equivalent_to(self._signal(input_type="voltage",
+                                                                    node="n1")))
+        compiled.invalidate()
+        self.assertEqual(compiled.n_inputs, 0)
+
+    def test_incremental(self):
+        """Test compiled circuits cannot be solved incrementally"""
+        self.assertRaises(ValueError, CompiledCircuit, self.circuit, incremental=True)
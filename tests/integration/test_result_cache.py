@@ -0,0 +1,178 @@
+"""Analysis result cache integration tests"""
+
+import os
+import tempfile
+from unittest import TestCase
+import numpy as np
+
+from zero import Circuit
+from zero.analysis import AcSignalAnalysis, AcNoiseAnalysis, ResultCache
+from zero.analysis.ac.cache import UncacheableError
+from ..circuits import amplifier_circuit
+
+
+class ResultCacheTestCase(TestCase):
+    """Result cache tests"""
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = ResultCache(path=self.directory.name, max_bytes=1e8)
+        self.f = np.logspace(0, 5, 100)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _circuit(self):
+        circuit = amplifier_circuit()
+        circuit.add_inductor(value="1m", node1="nout", node2="n2", name="l1")
+        circuit.add_inductor(value="2m", node1="n2", node2="gnd", name="l2")
+        circuit.set_inductor_coupling("l1", "l2", 0.5)
+        return circuit
+
+    def _noise(self, circuit, **kwargs):
+        analysis = AcNoiseAnalysis(circuit, cache=self.cache)
+        return analysis.calculate(frequencies=self.f, input_type="voltage", node="n1",
+                                  sink="nout", impedance="50", incoherent_sum=True, **kwargs)
+
+    def test_signal_hit(self):
+        """Test repeated signal analyses load the cached solution"""
+        analysis = AcSignalAnalysis(self._circuit(), cache=self.cache)
+        solution = analysis.calculate(frequencies=self.f, input_type="voltage", node="n1")
+        self.assertEqual(self.cache.statistics,
+                         {"hits": 0, "misses": 1, "stores": 1, "evictions": 0})
+
+        # An identical circuit built separately has the same key.
+        analysis = AcSignalAnalysis(self._circuit(), cache=self.cache)
+        cached = analysis.calculate(frequencies=list(self.f), input_type="voltage", node="n1")
+        self.assertEqual(self.cache.hits, 1)
+        self.assertTrue(cached.equivalent_to(solution))
+        self.assertTrue(np.array_equal(analysis.frequencies, self.f))
+
+    def test_noise_hit(self):
+        """Test repeated noise analyses load the cached solution"""
+        solution = self._noise(self._circuit())
+        cached = self._noise(self._circuit())
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+        self.assertTrue(cached.equivalent_to(solution))
+        # Different noise parameters are cached separately.
+        self._noise(self._circuit(), input_refer=True)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 2))
+        self.assertEqual(len(self.cache), 2)
+
+    def test_circuit_changes(self):
+        """Test changes to the circuit change the key"""
+        circuit = self._circuit()
+        key = self.cache.key(AcSignalAnalysis(circuit), frequencies=self.f)
+        self.assertEqual(self.cache.key(AcSignalAnalysis(self._circuit()), frequencies=self.f),
+                         key)
+
+        def changed(change):
+            circuit = self._circuit()
+            change(circuit)
+            return self.cache.key(AcSignalAnalysis(circuit), frequencies=self.f)
+
+        changes = {
+            "value": lambda circuit: setattr(circuit["r1"], "resistance", 431),
+            "op-amp": lambda circuit: setattr(circuit["op1"], "gbw", 1e6),
+            "coupling": lambda circuit: circuit.set_inductor_coupling("l1", "l2", 0.4),
+            "node": lambda circuit: setattr(circuit["r1"], "node1", "n3"),
+            "component": lambda circuit: circuit.add_resistor(value="1k", node1="n2",
+                                                              node2="gnd"),
+        }
+
+        for name, change in changes.items():
+            with self.subTest(name):
+                self.assertNotEqual(changed(change), key)
+
+        for name, parameters in {"frequencies": dict(frequencies=self.f[1:]),
+                                 "input": dict(frequencies=self.f, node="n2")}.items():
+            with self.subTest(name):
+                self.assertNotEqual(self.cache.key(AcSignalAnalysis(circuit), **parameters), key)
+
+    def test_eviction(self):
+        """Test least recently used solutions are evicted"""
+        def calculate(frequencies):
+            analysis = AcSignalAnalysis(self._circuit(), cache=self.cache)
+            analysis.calculate(frequencies=frequencies, input_type="voltage", node="n1")
+
+        calculate(self.f)
+        self.cache = ResultCache(path=self.directory.name, max_bytes=2.5 * self.cache.size)
+        calculate(self.f[1:])
+        # Use the first solution, making the second the least recently used.
+        os.utime(self.cache._entries()[0][0], (0, 0))
+        calculate(self.f)
+        calculate(self.f[2:])
+        self.assertEqual(self.cache.evictions, 1)
+        self.assertEqual(len(self.cache), 2)
+        self.assertLessEqual(self.cache.size, self.cache.max_bytes)
+        calculate(self.f)
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 2))
+        calculate(self.f[1:])
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 3))
+
+    def test_clear(self):
+        """Test clearing the cache"""
+        self._noise(self._circuit())
+        self.cache.clear()
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual(self.cache.size, 0)
+
+    def test_disabled(self):
+        """Test analyses are not cached unless enabled"""
+        analysis = AcSignalAnalysis(self._circuit())
+        self.assertIsNone(analysis.result_cache)
+        analysis = AcSignalAnalysis(self._circuit(), cache=False)
+        self.assertIsNone(analysis.result_cache)
+
+        analysis = AcSignalAnalysis(self._circuit(), cache=self.cache, incremental=True)
+        analysis.calculate(frequencies=self.f, input_type="voltage", node="n1")
+        analysis.calculate(frequencies=self.f, input_type="voltage", node="n1")
+        self.assertEqual(self.cache.statistics,
+                         {"hits": 0, "misses": 0, "stores": 0, "evictions": 0})
+
+    def test_uncacheable(self):
+        """Test parameters without canonical representations are not cached"""
+        with self.assertRaises(UncacheableError):
+            self.cache.key(AcSignalAnalysis(self._circuit()), frequencies=self.f,
+                           node=object())
+
+    def test_corrupt(self):
+        """Test unreadable cached solutions are removed"""
+        self._noise(self._circuit())
+        path = self.cache._entries()[0][0]
+
+        with open(path, "wb") as file:
+            file.write(b"corrupt")
+
+        self._noise(self._circuit())
+        self.assertEqual((self.cache.hits, self.cache.misses, self.cache.stores), (0, 2, 2))
+
+    def test_stored_arrays(self):
+        """Test solutions are stored as arrays without pickled objects"""
+        solution = self._noise(self._circuit(), input_refer=True)
+        cached = self._noise(self._circuit(), input_refer=True)
+        self.assertEqual(self.cache.hits, 1)
+        self.assertTrue(cached.equivalent_to(solution))
+        self.assertEqual(cached.get_noise_sum(sink="n1").label, "Incoherent sum")
+
+        with np.load(self.cache._entries()[0][0], allow_pickle=False) as archive:
+            self.assertFalse(any(archive[name].dtype.hasobject for name in archive.files))
+
+    def test_subcircuit_hit(self):
+        """Test cached solutions with responses to subcircuit ports"""
+        subcircuit = Circuit()
+        subcircuit.add_resistor(value="1k", node1="a", node2="b")
+        subcircuit.add_capacitor(value="1u", node1="b", node2="gnd")
+
+        def calculate():
+            circuit = Circuit()
+            circuit.add_subcircuit(subcircuit, ports=["a", "b"], nodes=["n1", "n2"], name="x1")
+            circuit.add_resistor(value="1k", node1="n2", node2="gnd")
+            analysis = AcSignalAnalysis(circuit, cache=self.cache)
+            return analysis.calculate(frequencies=self.f, input_type="voltage", node="n1")
+
+        solution = calculate()
+        cached = calculate()
+        self.assertEqual(self.cache.hits, 1)
+        self.assertTrue(cached.equivalent_to(solution))
+        self.assertTrue(np.allclose(cached.get_response(sink="x1.a").complex_magnitude,
+                                    solution.get_response(sink="x1.a").complex_magnitude))
@@ -0,0 +1,138 @@
+"""Subcircuit integration tests"""
+
+from unittest import TestCase
+import numpy as np
+
+from zero import Circuit
+from zero.analysis import AcSignalAnalysis, AcNoiseAnalysis, StructurallySingularError
+from zero.analysis.ac.macromodel import MACROMODELS
+
+
+def esr_capacitor():
+    """Capacitor with equivalent series resistance."""
+    circuit = Circuit()
+    circuit.add_capacitor(name="c1", value="1u", node1="p", node2="i")
+    circuit.add_resistor(name="r1", value="0.5", node1="i", node2="n")
+    return circuit
+
+
+def whitening_stage():
+    """Inverting whitening stage, containing an ESR capacitor subcircuit."""
+    circuit = Circuit()
+    circuit.add_resistor(name="r1", value="430", node1="nin", node2="nm")
+    circuit.add_resistor(name="r2", value="43k", node1="nm", node2="nout")
+    circuit.add_subcircuit(esr_capacitor(), ports=["p", "n"], nodes=["nm", "nout"], name="xc")
+    circuit.add_library_opamp(name="op1", model="OP27", node1="gnd", node2="nm", node3="nout")
+    return circuit
+
+
+class SubcircuitTestCase(TestCase):
+    """Subcircuit tests"""
+    def setUp(self):
+        self.f = np.logspace(0, 5, 100)
+        MACROMODELS.clear()
+
+        # Three whitening channels summed at a resistor, as subcircuits and as separate components.
+        self.circuit = Circuit()
+        self.flat_circuit = Circuit()
+
+        for channel in range(3):
+            self.circuit.add_subcircuit(whitening_stage(), ports=["nin", "nout"],
+                                        nodes=["nin", f"nout{channel}"], name=f"x{channel}")
+
+            self.flat_circuit.add_resistor(name=f"r1_{channel}", value="430", node1="nin",
+                                           node2=f"nm{channel}")
+            self.flat_circuit.add_resistor(name=f"r2_{channel}", value="43k",
+                                           node1=f"nm{channel}", node2=f"nout{channel}")
+            self.flat_circuit.add_capacitor(name=f"c1_{channel}", value="1u",
+                                            node1=f"nm{channel}", node2=f"ni{channel}")
+            self.flat_circuit.add_resistor(name=f"esr_{channel}", value="0.5",
+                                           node1=f"ni{channel}", node2=f"nout{channel}")
+            self.flat_circuit.add_library_opamp(name=f"op1_{channel}", model="OP27", node1="gnd",
+                                                node2=f"nm{channel}", node3=f"nout{channel}")
+
+        for circuit in (self.circuit, self.flat_circuit):
+            for channel in range(3):
+                circuit.add_resistor(name=f"rs{channel}", value="1k", node1=f"nout{channel}",
+                                     node2="nsum")
+
+            circuit.add_resistor(name="rl", value="1k", node1="nsum", node2="gnd")
+
+    def assert_close(self, first, second):
+        self.assertTrue(np.allclose(first, second, rtol=1e-8, atol=0))
+
+    def test_signal(self):
+        """Test subcircuit responses match those of the equivalent circuit without subcircuits"""
+        kwargs = {"frequencies": self.f, "input_type": "voltage", "node": "nin"}
+        flat = AcSignalAnalysis(self.flat_circuit).calculate(**kwargs)
+
+        for batch in (False, True):
+            with self.subTest(batch):
+                solution = AcSignalAnalysis(self.circuit, batch=batch).calculate(**kwargs)
+                self.assert_close(solution.get_response("nin", "nsum").complex_magnitude,
+                                  flat.get_response("nin", "nsum").complex_magnitude)
+                # The current into each stage's input port is that through its input resistor.
+                self.assert_close(solution.get_response("nin", "x1.nin").complex_magnitude,
+                                  flat.get_response("nin", "r1_1").complex_magnitude)
+
+    def test_noise(self):
+        """Test subcircuit noise matches that of the equivalent circuit without subcircuits"""
+        kwargs = {"frequencies": self.f, "input_type": "voltage", "node": "nin", "sink": "nsum",
+                  "impedance": 50, "incoherent_sum": True}
+        flat = AcNoiseAnalysis(self.flat_circuit).calculate(**kwargs)
+        solution = AcNoiseAnalysis(self.circuit).calculate(**kwargs)
+
+        for source, flat_source in (("x2.R(r1)", "R(r1_2)"), ("x2.xc.R(r1)", "R(esr_2)"),
+                                    ("x2.V(op1)", "V(op1_2)"), ("x2.I(op1, nm)", "I(op1_2, nm2)"),
+                                    ("R(rl)", "R(rl)")):
+            with self.subTest(source):
+                self.assert_close(solution.get_noise(source, "nsum").spectral_density,
+                                  flat.get_noise(flat_source, "nsum").spectral_density)
+
+        self.assert_close(solution.noise_sums[solution.DEFAULT_GROUP_NAME][0].spectral_density,
+                          flat.noise_sums[flat.DEFAULT_GROUP_NAME][0].spectral_density)
+        self.assertEqual(len(solution.resistor_noise[solution.DEFAULT_GROUP_NAME]),
+                         len(flat.resistor_noise[flat.DEFAULT_GROUP_NAME]))
+
+    def test_shared_macromodel(self):
+        """Test identical subcircuits share port relations computed once per frequency vector"""
+        AcSignalAnalysis(self.circuit).calculate(frequencies=self.f, input_type="voltage",
+                                                 node="nin")
+        AcNoiseAnalysis(self.circuit).calculate(frequencies=self.f, input_type="voltage",
+                                                node="nin", sink="nsum", impedance=50)
+        # One macromodel for the stages, and one for the capacitors within them.
+        self.assertEqual(len(MACROMODELS), 2)
+
+        for macromodel in MACROMODELS._macromodels.values():
+            self.assertEqual(macromodel.n_computations, 1)
+
+    def test_changed_shared_subcircuit(self):
+        """Test changing a subcircuit's component does not change identical subcircuits"""
+        AcSignalAnalysis(self.circuit).calculate(frequencies=self.f, input_type="voltage",
+                                                 node="nin")
+
+        # Change the first stage's capacitor, in the subcircuit nested in its subcircuit.
+        self.circuit["x0"].circuit["xc"].circuit["c1"].capacitance = "10n"
+        self.flat_circuit["c1_0"].capacitance = "10n"
+
+        # Different frequencies, for which the port relations are not yet computed.
+        kwargs = {"frequencies": np.logspace(0, 5, 51), "input_type": "voltage", "node": "nin"}
+        solution = AcSignalAnalysis(self.circuit).calculate(**kwargs)
+        flat = AcSignalAnalysis(self.flat_circuit).calculate(**kwargs)
+
+        for sink, flat_sink in (("nsum", "nsum"), ("x0.nin", "r1_0"), ("x1.nin", "r1_1")):
+            with self.subTest(sink):
+                self.assert_close(solution.get_response("nin", sink).complex_magnitude,
+                                  flat.get_response("nin", flat_sink).complex_magnitude)
+
+    def test_structurally_singular(self):
+        """Test subcircuit with a floating node"""
+        circuit = Circuit()
+        circuit.add_resistor(value="1k", node1="a", node2="b")
+        circuit.add_library_opamp(model="OP27", node1="nfloat", node2="b", node3="b")
+        top = Circuit()
+        top.add_subcircuit(circuit, ports=["a", "b"], nodes=["nin", "nout"])
+        top.add_resistor(value="1k", node1="nout", node2="gnd")
+        analysis = AcSignalAnalysis(top)
+        self.assertRaises(StructurallySingularError, analysis.calculate, frequencies=self.f,
+                          input_type="voltage", node="nin")
@@ -0,0 +1,113 @@
+"""Transient analysis integration tests"""
+
+import os
+import tempfile
+from unittest import TestCase
+import numpy as np
+
+from zero import Circuit
+from zero.analysis import TransientAnalysis, AcTimeResponseAnalysis
+
+
+def step(times):
+    """Unit step starting after zero time."""
+    return (times > 0).astype(float)
+
+
+class TransientAnalysisTestCase(TestCase):
+    """Transient analysis tests"""
+    def setUp(self):
+        # RC low pass filter with a 1 ms time constant.
+        self.circuit = Circuit()
+        self.circuit.add_resistor(name="r1", value="1k", node1="nin", node2="nout")
+        self.circuit.add_capacitor(name="c1", value="1u", node1="nout", node2="gnd")
+        self.tau = 1e-3
+
+    def calculate(self, circuit=None, sinks=("nout",), waveform=step, time_step=1e-6,
+                  duration=5e-3, **kwargs):
+        if circuit is None:
+            circuit = self.circuit
+
+        analysis = TransientAnalysis(circuit=circuit)
+        return analysis.calculate(input_type="voltage", node="nin", sinks=list(sinks),
+                                  waveform=waveform, time_step=time_step, duration=duration,
+                                  **kwargs)
+
+    def test_rc_step_response(self):
+        for method in TransientAnalysis.METHODS:
+            with self.subTest(method=method):
+                response = self.calculate(method=method).response("nout")
+                self.assertEqual(len(response.x), 5001)
+                # The input rises between the first two steps, so the response is half a step
+                # late.
+                expected = 1 - np.exp(-(response.x - 0.5e-6) / self.tau)
+                np.testing.assert_allclose(response.y[10:], expected[10:], atol=1e-5)
+
+    def test_rc_sine_response(self):
+        # The steady state response to a sine at the corner frequency.
+        frequency = 1 / (2 * np.pi * self.tau)
+        solution = self.calculate(waveform=lambda times: np.sin(2 * np.pi * frequency * times),
+                                  duration=20e-3)
+        response = solution.response("nout")
+        expected = np.sin(2 * np.pi * frequency * response.x - np.pi / 4) / np.sqrt(2)
+        np.testing.assert_allclose(response.y[-1000:], expected[-1000:], atol=1e-5)
+
+    def test_opamp_step_response(self):
+        # Non-inverting amplifier with a gain of 10 buffering the filter. OP07 has a pole and a
+        # delay, which make the descriptor matrices complex.
+        circuit = self.circuit
+        circuit.add_library_opamp(name="op1", model="OP07", node1="nout", node2="nm",
+                                  node3="nop")
+        circuit.add_resistor(name="r2", value="1k", node1="nm", node2="gnd")
+        circuit.add_resistor(name="r3", value="9k", node1="nm", node2="nop")
+
+        reference = AcTimeResponseAnalysis(circuit=circuit).calculate(
+            input_type="voltage", node="nin", sinks=["nop"], duration=10e-3, sample_rate=1e6)
+        expected = reference.step_response("nop").y[:5001]
+
+        for method in TransientAnalysis.METHODS:
+            with self.subTest(method=method):
+                solution = self.calculate(circuit=circuit, sinks=["nop", "op1"], method=method)
+                response = solution.response("nop")
+                self.assertTrue(np.all(np.isfinite(response.y)))
+                np.testing.assert_allclose(response.y[20:], expected[20:], atol=1e-2)
+                self.assertAlmostEqual(solution.settling_time("nop", 1e-2, final_value=10),
+                                       self.tau * np.log(100), delta=1e-4)
+
+    def test_initial_operating_point(self):
+        # The input is held at its initial value before the start.
+        response = self.calculate(waveform=np.ones(5001)).response("nout")
+        np.testing.assert_allclose(response.y, 1)
+
+    def test_chunks(self):
+        analysis = TransientAnalysis(circuit=self.circuit)
+        chunks = list(analysis.iter_responses("voltage", ["nout", "r1"], step, 1e-6, 5e-3,
+                                              chunk_size=700, node="nin"))
+        self.assertEqual(len(chunks), 8)
+        times = np.concatenate([times for times, _ in chunks])
+        responses = np.concatenate([responses for _, responses in chunks], axis=1)
+        np.testing.assert_allclose(times, np.arange(5001) * 1e-6)
+
+        solution = self.calculate(sinks=["nout", "r1"])
+        np.testing.assert_allclose(responses[0], solution.response("nout").y)
+        np.testing.assert_allclose(responses[1], solution.response("r1").y)
+
+    def test_memory_mapped_responses(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "responses.npy")
+            solution = self.calculate(path=path, chunk_size=1000)
+            self.assertIsInstance(solution.responses, np.memmap)
+            np.testing.assert_allclose(np.load(path)[0], self.calculate().response("nout").y)
+            del solution
+
+    def test_invalid_parameters(self):
+        for kwargs in (dict(method="euler"), dict(sinks=[]), dict(time_step=0),
+                       dict(waveform=np.ones(10)), dict(chunk_size=0)):
+            with self.subTest(kwargs=kwargs):
+                self.assertRaises(ValueError, self.calculate, **kwargs)
+
+    def test_no_operating_point(self):
+        # Node between series capacitors has no resistive path to ground.
+        self.circuit.add_capacitor(name="c2", value="1u", node1="nout", node2="nfloat")
+        self.circuit.add_capacitor(name="c3", value="1u", node1="nfloat", node2="gnd")
+        self.assertRaises(ValueError, self.calculate)
@@ -1,8 +1,11 @@
 """Component tests"""
 
+import pickle
 from unittest import TestCase
 
-from zero.components import Component as ComponentBase, Resistor, Capacitor, Inductor, Node
+from zero import Circuit
+from zero.components import (Component as ComponentBase, Resistor, Capacitor, Inductor, Subcircuit,
+                             Node)
 
 
 class Component(ComponentBase):
@@ -111,6 +114,17 @@ class InductorTestCase(TestCase):
         # cannot couple to a resistor
         self.assertRaises(TypeError, l1.coupling_factors.__setitem__, r1, 1)
 
+    def test_pickle_coupling_factor(self):
+        """Test pickling coupled inductors"""
+        l1 = Inductor(value=10, node1="n1", node2="n2", name="l1")
+        l2 = Inductor(value=40, node1="n2", node2="n3", name="l2")
+        l1.coupling_factors[l2] = 0.5
+        l2.coupling_factors[l1] = 0.5
+        l1, l2 = pickle.loads(pickle.dumps([l1, l2]))
+        self.assertEqual(l1.coupling_factors[l2], 0.5)
+        self.assertEqual(l2.coupling_factors[l1], 0.5)
+        self.assertEqual(l1.inductance_from(l2), 10)
+
     def test_mutual_inductance(self):
         """Test set coupling factor between two inductors"""
         l1 = Inductor(value="10u", node1="n1", node2="n2")
@@ -138,3 +152,41 @@ class InductorTestCase(TestCase):
         # mutual inductance to inductor where coupling hasn't been set is still 0
         self.assertEqual(l1.inductance_from(l3), 0)
         self.assertEqual(l3.inductance_from(l1), 0)
+
+
+class SubcircuitTestCase(TestCase):
+    """Subcircuit component tests"""
+    def setUp(self):
+        self.circuit = Circuit()
+        self.circuit.add_capacitor(name="c1", value="10u", node1="p", node2="i")
+        self.circuit.add_resistor(name="r1", value="0.1", node1="i", node2="n")
+
+    def test_ports(self):
+        """Test subcircuit ports"""
+        subcircuit = Subcircuit(self.circuit, ports=["p", "n"], nodes=["n1", "gnd"], name="x1")
+        ports = subcircuit.port_components
+        self.assertEqual([port.name for port in ports], ["x1.p", "x1.n"])
+        self.assertEqual([port.node for port in ports], [Node("n1"), Node("gnd")])
+
+    def test_noise(self):
+        """Test subcircuit noise is that of its circuit"""
+        subcircuit = Subcircuit(self.circuit, ports=["p", "n"], nodes=["n1", "gnd"], name="x1")
+        self.assertEqual([noise.label for noise in subcircuit.noise], ["x1.R(r1)"])
+        self.assertEqual(subcircuit.noise[0].component_type, "resistor")
+        self.assertRaises(ValueError, subcircuit.add_noise, subcircuit.noise[0])
+
+    def test_invalid_ports(self):
+        """Test subcircuit ports must be distinct, non-ground nodes of its circuit"""
+        for ports, nodes in ((["p", "p"], ["n1", "n2"]), (["p", "gnd"], ["n1", "n2"]),
+                             (["p", "n3"], ["n1", "n2"]), (["p", "n"], ["n1"]), ([], [])):
+            with self.subTest(ports):
+                self.assertRaises(ValueError, Subcircuit, self.circuit, ports=ports, nodes=nodes)
+
+
+class NodeTestCase(TestCase):
+    """Node tests"""
+    def test_pickle(self):
+        """Test unpickled nodes are the named instances"""
+        node = Node("n1")
+        self.assertIs(pickle.loads(pickle.dumps(node)), node)
+        self.assertIs(pickle.loads(pickle.dumps(Node("nA"))), Node("na"))
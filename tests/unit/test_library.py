@@ -92,3 +92,13 @@ class OpAmpPolesTestCase(unittest.TestCase):
                                                8138297.87234042 - 76065880.04973753j,
                                                8138297.87234042 + 76065880.04973753j]),
                                      model.zeros)
+
+    def test_vector_gain(self):
+        """Test op-amp gain evaluated over a frequency vector matches scalar evaluation"""
+        model = self._parse_and_return({"poles": ["12M", "43.4M 3.1"],
+                                        "zeros": ["17.3M", "66.5M 2.7"]})
+        frequencies = np.logspace(0, 9, 10)
+
+        np_assert_array_almost_equal(np.array([model.gain(frequency)
+                                               for frequency in frequencies]),
+                                     model.gain(frequencies))
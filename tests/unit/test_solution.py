@@ -64,6 +64,67 @@ class SolutionFilterTestCase(ZeroDataTestCase):
         sol.add_response(resp2)
         self.assertRaises(ValueError, sol.get_response, sink=res1)
 
+    def test_add_responses(self):
+        f = self._freqs()
+        resp1 = self._i_i_response(f)
+        resp2 = self._i_v_response(f)
+        resp3 = self._v_v_response(f)
+        sol = Solution(f)
+        sol.add_response(resp1)
+        sol.add_responses([resp2, resp3])
+        self.assertEqual(sol.responses[sol.DEFAULT_GROUP_NAME], [resp1, resp2, resp3])
+        self.assertEqual(sol.function_group(resp3), sol.DEFAULT_GROUP_NAME)
+        # Duplicates of existing or other added responses.
+        self.assertRaises(ValueError, sol.add_responses, [resp1])
+        self.assertRaises(ValueError, sol.add_responses, [resp2, resp2], group="c")
+        # Incompatible frequencies.
+        self.assertRaises(ValueError, sol.add_responses, [self._v_v_response(self._freqs(10))])
+
+    def test_add_response_data(self):
+        f = self._freqs()
+        source = self._node()
+        sinks = [self._node(), self._resistor(), self._node()]
+        data = self._data((3, len(f)), cplx=True)
+        sol = Solution(f)
+        sol.add_response_data(source, sinks, data)
+        block = sol._functions[sol.DEFAULT_GROUP_NAME][0]
+        self.assertTrue(sol.has_responses)
+        self.assertEqual(sol.response_sinks, set(sinks))
+        # Only requested responses are created.
+        response = sol.get_response(source=source, sink=sinks[1].name)
+        self.assertIs(response.sink, sinks[1])
+        self.assertTrue(np.array_equal(response.complex_magnitude, data[1]))
+        self.assertEqual(list(block._responses), [1])
+        sol.set_response_as_default(response)
+        self.assertEqual(list(block._responses), [1])
+        self.assertEqual(sol.function_group(response), sol.DEFAULT_GROUP_NAME)
+        # Requesting every response keeps those already created, in order.
+        responses = sol.responses[sol.DEFAULT_GROUP_NAME]
+        self.assertEqual([response.sink for response in responses], sinks)
+        self.assertIs(responses[1], response)
+        self.assertEqual(sol.functions[sol.DEFAULT_GROUP_NAME], responses)
+
+    def test_add_response_data_duplicates(self):
+        f = self._freqs()
+        source = self._node()
+        sinks = [self._node(), self._node()]
+        data = self._data((2, len(f)), cplx=True)
+        sol = Solution(f)
+        sol.add_response_data(source, sinks, data)
+        self.assertRaises(ValueError, sol.add_response_data, source, sinks[1:], data[1:])
+        # Responses equal to those stored as data.
+        sol2 = Solution(f)
+        sol2.add_response_data(source, sinks, data)
+        response = sol2.get_response(source=source, sink=sinks[0])
+        self.assertRaises(ValueError, sol.add_response, response)
+        self.assertRaises(ValueError, sol.add_responses, [response])
+        # Other groups and sources are allowed.
+        sol.add_response_data(source, sinks, data, group="b")
+        sol.add_response_data(self._node(), sinks, data)
+        # Incompatible data.
+        self.assertRaises(ValueError, sol.add_response_data, source, sinks, data[:, 1:],
+                          group="c")
+
     def test_get_noise_no_group(self):
         f = self._freqs()
         noise1 = self._vnoise_at_comp(f)
@@ -0,0 +1,192 @@
+"""Matrix solver tests"""
+
+from unittest import TestCase
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from zero.solve import ScipySolver, ScipyLuSolver, NumpySolver, AutoSolver, MixedPrecisionSolver
+
+
+class ScipyLuSolverTestCase(TestCase):
+    """Sparse LU solver tests"""
+    def setUp(self):
+        self.solver = ScipyLuSolver()
+        self.rhs = np.array([1, 0, 0, 2j, 0], dtype="complex128")
+
+    @staticmethod
+    def matrix(frequency):
+        """Sparse matrix with a fixed pattern and frequency-dependent values"""
+        full = np.array([[4, 1, 0, 0, 2j * frequency],
+                         [0, 3, 0, 1, 0],
+                         [1, 0, 5 + frequency, 0, 0],
+                         [0, 0, 1j, 2, 1],
+                         [frequency, 0, 0, 1, 6]], dtype="complex128")
+        return csr_matrix(full)
+
+    def test_solve(self):
+        """Test solutions match default solver"""
+        reference = ScipySolver()
+
+        for frequency in (0.1, 1, 10):
+            with self.subTest(frequency):
+                matrix = self.matrix(frequency)
+                np.testing.assert_allclose(self.solver.solve(matrix, self.rhs),
+                                           reference.solve(matrix, self.rhs))
+
+    def test_transposed_solve(self):
+        """Test solution of transposed system using factorisation"""
+        for frequency in (0.1, 1, 10):
+            for sparse_format in ("csr", "csc"):
+                with self.subTest((frequency, sparse_format)):
+                    matrix = self.matrix(frequency).asformat(sparse_format)
+                    factorisation = self.solver.factorise(matrix)
+                    np.testing.assert_allclose(factorisation.solve(self.rhs),
+                                               np.linalg.solve(matrix.toarray(), self.rhs))
+                    np.testing.assert_allclose(factorisation.solve(self.rhs, trans="T"),
+                                               np.linalg.solve(matrix.toarray().T, self.rhs))
+
+    def test_ordering_reuse(self):
+        """Test column ordering is computed once per sparsity pattern"""
+        for frequency in (0.1, 1, 10):
+            self.solver.solve(self.matrix(frequency), self.rhs)
+
+        self.assertEqual(self.solver.statistics["factorisations"], 3)
+        self.assertEqual(self.solver.statistics["orderings"], 1)
+        self.assertGreaterEqual(self.solver.fill_ratio, 1)
+
+        # different pattern
+        self.solver.solve(csr_matrix(np.eye(5, dtype="complex128")), self.rhs)
+        self.assertEqual(self.solver.statistics["orderings"], 2)
+
+        self.solver.reset()
+        self.assertEqual(self.solver.statistics["factorisations"], 0)
+        self.assertIsNone(self.solver.fill_ratio)
+
+    def test_invalid_trans(self):
+        """Test invalid transpose flag"""
+        factorisation = self.solver.factorise(self.matrix(1))
+        self.assertRaises(ValueError, factorisation.solve, self.rhs, trans="H")
+
+
+class NumpySolverTestCase(TestCase):
+    """Dense solver tests"""
+    def setUp(self):
+        self.solver = NumpySolver()
+        self.matrix = ScipyLuSolverTestCase.matrix(3).toarray()
+        self.rhs = np.array([1, 0, 0, 2j, 0], dtype="complex128")
+
+    def test_solve(self):
+        """Test solutions of full and sparse matrices"""
+        expected = ScipySolver().solve(csr_matrix(self.matrix), self.rhs)
+        np.testing.assert_allclose(self.solver.solve(self.matrix, self.rhs), expected)
+        np.testing.assert_allclose(self.solver.solve(csr_matrix(self.matrix), self.rhs), expected)
+        # Single column right hand sides give vector solutions.
+        self.assertEqual(self.solver.solve(self.matrix, self.rhs[:, np.newaxis]).shape, (5,))
+
+    def test_transposed_solve(self):
+        """Test solution of transposed system using factorisation"""
+        factorisation = self.solver.factorise(self.matrix)
+        np.testing.assert_allclose(factorisation.solve(self.rhs),
+                                   np.linalg.solve(self.matrix, self.rhs))
+        np.testing.assert_allclose(factorisation.solve(self.rhs, trans="T"),
+                                   np.linalg.solve(self.matrix.T, self.rhs))
+        self.assertRaises(ValueError, factorisation.solve, self.rhs, trans="H")
+
+
+class AutoSolverTestCase(TestCase):
+    """Automatic solver selection tests"""
+    def setUp(self):
+        self.solver = AutoSolver()
+
+    def test_selection(self):
+        """Test dense solver is chosen for small or dense matrices"""
+        for shape, nnz, sparse in (((10, 10), 30, False), ((5000, 5000), 15000, True),
+                                   ((1000, 1000), 500000, False)):
+            with self.subTest((shape, nnz)):
+                with self.assertLogs("zero.solve.auto", level="DEBUG"):
+                    self.solver.prepare(shape, nnz)
+                self.assertEqual(self.solver.is_sparse, sparse)
+
+    def test_solve(self):
+        """Test solutions match default solver with either choice"""
+        matrix = ScipyLuSolverTestCase.matrix(3)
+        rhs = np.array([1, 0, 0, 2j, 0], dtype="complex128")
+        expected = ScipySolver().solve(matrix, rhs)
+        for nnz in (matrix.nnz, 1):
+            with self.subTest(nnz):
+                # Fake a large matrix to force the sparse solver when nnz is small.
+                self.solver.prepare(matrix.shape if nnz > 1 else (10000, 10000), nnz)
+                np.testing.assert_allclose(self.solver.solve(matrix, rhs), expected)
+                np.testing.assert_allclose(self.solver.factorise(matrix).solve(rhs), expected)
+
+
+class MixedPrecisionSolverTestCase(TestCase):
+    """Mixed precision solver tests"""
+    def setUp(self):
+        self.solver = MixedPrecisionSolver()
+        self.matrix = ScipyLuSolverTestCase.matrix(3)
+        self.rhs = np.array([1, 0, 0, 2j, 0], dtype="complex128")
+
+    @staticmethod
+    def ill_conditioned(size=5):
+        """Matrix too ill-conditioned for single precision factors to converge"""
+        matrix = np.eye(size, dtype="complex128")
+        matrix[0, 1] = 1
+        # representable in single precision only to around 20%
+        matrix[1, 0] = 1 + 2e-7
+        return matrix
+
+    def test_solve(self):
+        """Test refined solutions reach double precision with either factorisation"""
+        expected = np.linalg.solve(self.matrix.toarray(), self.rhs)
+        for nnz in (self.matrix.nnz, 1):
+            with self.subTest(nnz):
+                # Fake a large matrix to force the sparse solver when nnz is small.
+                self.solver.prepare(self.matrix.shape if nnz > 1 else (10000, 10000), nnz)
+                np.testing.assert_allclose(self.solver.solve(self.matrix, self.rhs), expected,
+                                           rtol=1e-12)
+                factorisation = self.solver.factorise(self.matrix)
+                np.testing.assert_allclose(factorisation.solve(self.rhs), expected, rtol=1e-12)
+                np.testing.assert_allclose(factorisation.solve(self.rhs, trans="T"),
+                                           np.linalg.solve(self.matrix.toarray().T, self.rhs),
+                                           rtol=1e-12)
+        self.assertEqual(self.solver.statistics["fallbacks"], 0)
+        self.assertGreater(self.solver.statistics["refinements"], 0)
+
+    def test_solve_batch(self):
+        """Test refined batched solutions reach double precision"""
+        matrices = np.stack([ScipyLuSolverTestCase.matrix(frequency).toarray()
+                             for frequency in (0.1, 1, 10)])
+        rhs = np.stack((self.rhs, 2 * self.rhs), axis=1)
+        np.testing.assert_allclose(self.solver.solve_batch(matrices, rhs),
+                                   np.linalg.solve(matrices, np.broadcast_to(rhs, (3, 5, 2))),
+                                   rtol=1e-12)
+        self.assertEqual(self.solver.statistics["systems"], 3)
+        self.assertEqual(self.solver.statistics["fallbacks"], 0)
+
+    def test_fallback(self):
+        """Test ill-conditioned systems are solved in double precision"""
+        matrix = self.ill_conditioned()
+        expected = np.linalg.solve(matrix, self.rhs)
+        self.solver.prepare(matrix.shape, np.count_nonzero(matrix))
+        np.testing.assert_allclose(self.solver.factorise(matrix).solve(self.rhs), expected)
+        self.assertEqual(self.solver.statistics["fallbacks"], 1)
+        matrices = np.stack((matrix, self.matrix.toarray()))
+        solutions = self.solver.solve_batch(matrices, self.rhs[:, np.newaxis])
+        np.testing.assert_allclose(solutions[0, :, 0], expected)
+        self.assertEqual(self.solver.statistics["fallbacks"], 2)
+        self.solver.reset()
+        self.assertEqual(self.solver.statistics["systems"], 0)
+
+    def test_empty_rhs(self):
+        """Test solving against right hand sides with no columns"""
+        rhs = np.zeros((5, 0), dtype="complex128")
+        self.assertEqual(self.solver.factorise(self.matrix).solve(rhs, trans="T").shape, (5, 0))
+        matrices = np.stack([self.matrix.toarray()] * 2)
+        self.assertEqual(self.solver.solve_batch(matrices, rhs).shape, (2, 5, 0))
+        self.assertEqual(self.solver.statistics["fallbacks"], 0)
+
+    def test_invalid_trans(self):
+        """Test invalid transpose flag"""
+        factorisation = self.solver.factorise(self.matrix)
+        self.assertRaises(ValueError, factorisation.solve, self.rhs, trans="H")
@@ -0,0 +1,187 @@
+"""Compiled circuit matrix stamp tests"""
+
+import pickle
+from unittest import TestCase
+import numpy as np
+
+from zero.analysis.ac.stamp import StampPattern, BlockPattern, CompactPattern
+
+
+class StampPatternTestCase(TestCase):
+    """Stamp pattern tests"""
+    def setUp(self):
+        self.coefficients = [(2, 0, 1), (0, 1, -1), (0, 0, lambda f: 2j * f), (1, 2, 5),
+                             (1, 1, lambda f: 1 / (1 + 1j * f)), (2, 2, 3)]
+        self.pattern = StampPattern.from_coefficients((3, 3), self.coefficients,
+                                                      dtype="complex128")
+
+    def expected_matrix(self, frequency):
+        matrix = np.zeros((3, 3), dtype="complex128")
+        for row, column, value in self.coefficients:
+            matrix[row, column] = value(frequency) if callable(value) else value
+        return matrix
+
+    def test_pattern(self):
+        """Test stored elements are in compressed sparse row order"""
+        self.assertEqual(self.pattern.nnz, 6)
+        self.assertEqual(list(self.pattern.rows), [0, 0, 1, 1, 2, 2])
+        self.assertEqual(list(self.pattern.columns), [0, 1, 1, 2, 0, 2])
+        self.assertEqual(len(self.pattern.generators), 2)
+
+    def test_matrix(self):
+        """Test sparse matrix for a single frequency"""
+        for frequency in (0.1, 1, 10):
+            with self.subTest(frequency):
+                np.testing.assert_array_equal(self.pattern.matrix(frequency).toarray(),
+                                              self.expected_matrix(frequency))
+
+    def test_stack(self):
+        """Test full matrix stack for a frequency vector"""
+        frequencies = np.logspace(-1, 1, 5)
+        stack = self.pattern.stack(frequencies)
+        self.assertEqual(stack.shape, (5, 3, 3))
+        for matrix, frequency in zip(stack, frequencies):
+            np.testing.assert_allclose(matrix, self.expected_matrix(frequency))
+
+    def test_transpose(self):
+        """Test transposed pattern"""
+        transposed = self.pattern.transpose()
+        self.assertEqual(list(transposed.rows), [0, 0, 1, 1, 2, 2])
+        for frequency in (0.1, 1, 10):
+            with self.subTest(frequency):
+                np.testing.assert_array_equal(transposed.matrix(frequency).toarray(),
+                                              self.expected_matrix(frequency).T)
+
+    def test_without_generators(self):
+        """Test matrices built from values by a pattern without generators"""
+        pattern = pickle.loads(pickle.dumps(self.pattern.without_generators()))
+        values = self.pattern.values(np.array([1, 10]))
+        np.testing.assert_allclose(pattern.matrix_from_values(values[0]).toarray(),
+                                   self.expected_matrix(1))
+        np.testing.assert_allclose(pattern.full_from_values(values[1]), self.expected_matrix(10))
+        np.testing.assert_array_equal(pattern.stack_from_values(values),
+                                      self.pattern.stack([1, 10]))
+
+    def test_submatrix(self):
+        """Test pattern of a submatrix"""
+        submatrix = self.pattern.submatrix([0, 2], [0, 1])
+        self.assertEqual(submatrix.shape, (2, 2))
+        self.assertEqual(len(submatrix.generators), 1)
+        for frequency in (0.1, 1, 10):
+            with self.subTest(frequency):
+                np.testing.assert_array_equal(submatrix.full(frequency),
+                                              self.expected_matrix(frequency)[[0, 2]][:, [0, 1]])
+
+    def test_duplicate_coefficient(self):
+        """Test later coefficients for the same element take precedence"""
+        pattern = StampPattern.from_coefficients((2, 2), [(0, 0, 1), (1, 1, 2), (0, 0, 3)],
+                                                 dtype="complex128")
+        self.assertEqual(pattern.nnz, 2)
+        np.testing.assert_array_equal(pattern.matrix(1).toarray(), [[3, 0], [0, 2]])
+
+    def test_blocks(self):
+        """Test independent blocks and structural singularity"""
+        self.assertEqual(len(set(self.pattern.blocks())), 1)
+        self.assertEqual(len(self.pattern.unmatched_columns()), 0)
+        pattern = StampPattern.from_coefficients((4, 4), [(0, 0, 1), (1, 2, 1), (2, 1, 1),
+                                                          (3, 1, 2)], dtype="complex128")
+        labels = pattern.blocks()
+        self.assertEqual(labels[1], labels[2])
+        self.assertEqual(labels[1], labels[3])
+        self.assertNotEqual(labels[0], labels[1])
+        # Rows 2 and 3 both only have elements in column 1.
+        self.assertEqual(len(pattern.unmatched_columns()), 1)
+
+
+class BlockPatternTestCase(TestCase):
+    """Block pattern tests"""
+    def setUp(self):
+        coefficients = [(0, 0, 2), (0, 2, 1), (1, 1, lambda f: 1j * f), (2, 0, 1),
+                        (2, 2, lambda f: 1 + 1j * f), (3, 3, 4)]
+        self.pattern = StampPattern.from_coefficients((4, 4), coefficients, dtype="complex128")
+        self.frequencies = np.array([0.1, 1, 10])
+        self.values = self.pattern.values(self.frequencies)
+        self.block = BlockPattern(self.pattern, [2, 0])
+
+    def test_solve(self):
+        """Test full solutions are recovered from those of the excited blocks"""
+        rhs = np.zeros((4, 2), dtype="complex128")
+        rhs[0, 0] = 1
+        rhs[2, 1] = 1j
+        self.assertEqual(list(self.block.kept), [0, 2])
+        self.assertEqual(self.block.shape, (2, 2))
+        for transpose in (False, True):
+            with self.subTest(transpose):
+                results = []
+                for data in self.block.values(self.values):
+                    matrix = self.block.pattern.full_from_values(data)
+                    if transpose:
+                        matrix = matrix.T
+                    results.append(np.linalg.solve(matrix, self.block.reduce(rhs)))
+                results = self.block.expand(np.stack(results, axis=-1), self.values,
+                                            transpose=transpose)
+                for index, matrix in enumerate(self.pattern.stack(self.frequencies)):
+                    if transpose:
+                        matrix = matrix.T
+                    np.testing.assert_allclose(results[:, :, index],
+                                               np.linalg.solve(matrix, rhs))
+
+    def test_invalid(self):
+        """Test blocks must be kept whole and other unknowns cannot be excited"""
+        self.assertRaises(ValueError, BlockPattern, self.pattern, [0])
+        self.assertRaises(ValueError, self.block.reduce, np.ones((4, 1)))
+
+
+class CompactPatternTestCase(TestCase):
+    """Compact pattern tests"""
+    def setUp(self):
+        # Two component currents and three node voltages.
+        self.coefficients = [(0, 0, lambda f: 2j * f), (0, 2, -1), (0, 3, 1), (1, 1, 5), (1, 3, -1),
+                             (2, 0, -1), (2, 4, 3), (3, 0, 1), (3, 1, -1), (3, 3, 2), (4, 1, 1),
+                             (4, 2, 1), (4, 4, lambda f: 1 + 1j * f)]
+        self.pattern = StampPattern.from_coefficients((5, 5), self.coefficients,
+                                                      dtype="complex128")
+        self.frequencies = np.array([0.1, 1, 10])
+        self.values = self.pattern.values(self.frequencies)
+        self.compact = CompactPattern(self.pattern, [1, 0])
+        self.rhs = np.zeros((5, 2), dtype="complex128")
+        self.rhs[2, 0] = 1
+        self.rhs[3:, 1] = [1j, 2]
+
+    def solve(self, rhs, transpose=False):
+        compact_values = self.compact.values(self.values)
+        results = []
+        for data in compact_values:
+            matrix = self.compact.pattern.full_from_values(data)
+            if transpose:
+                matrix = matrix.T
+            results.append(np.linalg.solve(matrix, self.compact.reduce(rhs)))
+        return self.compact.expand(np.stack(results, axis=-1), self.values, transpose=transpose)
+
+    def test_pattern(self):
+        """Test compact matrix has a row for each kept unknown"""
+        self.assertEqual(list(self.compact.eliminated), [0, 1])
+        self.assertEqual(list(self.compact.kept), [2, 3, 4])
+        self.assertEqual(self.compact.shape, (3, 3))
+        self.assertEqual(self.compact.nnz, 8)
+
+    def test_solve(self):
+        """Test full solutions are recovered from those of the compact system"""
+        for transpose in (False, True):
+            with self.subTest(transpose):
+                results = self.solve(self.rhs, transpose=transpose)
+                for index, matrix in enumerate(self.pattern.stack(self.frequencies)):
+                    if transpose:
+                        matrix = matrix.T
+                    np.testing.assert_allclose(results[:, :, index],
+                                               np.linalg.solve(matrix, self.rhs))
+
+    def test_invalid(self):
+        """Test coupled and excited currents cannot be eliminated"""
+        pattern = StampPattern.from_coefficients((3, 3), [(0, 0, 1), (0, 1, 2), (1, 1, 1),
+                                                          (2, 2, 1)], dtype="complex128")
+        self.assertRaises(ValueError, CompactPattern, pattern, [0, 1])
+        self.assertRaises(ValueError, self.compact.reduce, np.ones((5, 1)))
+        values = self.values.copy()
+        values[0, 0] = 0
+        self.assertRaises(ValueError, self.compact.values, values)
@@ -0,0 +1,41 @@
+"""Streaming statistics tests"""
+
+from unittest import TestCase
+import numpy as np
+
+from zero.analysis import StreamingStatistics
+
+
+class StreamingStatisticsTestCase(TestCase):
+    """Streaming statistics tests"""
+    def setUp(self):
+        generator = np.random.default_rng(0)
+        self.samples = generator.standard_normal(size=(2000, 3))
+
+    def test_statistics(self):
+        """Test statistics accumulated in batches match those of all samples"""
+        statistics = StreamingStatistics((0.05, 0.5, 0.95))
+        for batch in np.array_split(self.samples, 7):
+            statistics.update(batch)
+        self.assertEqual(statistics.count, 2000)
+        np.testing.assert_allclose(statistics.mean, np.mean(self.samples, axis=0), atol=1e-14)
+        np.testing.assert_allclose(statistics.variance, np.var(self.samples, axis=0, ddof=1))
+        for quantile in statistics.quantiles:
+            with self.subTest(quantile):
+                # Quantiles are estimates.
+                np.testing.assert_allclose(statistics.quantile(quantile),
+                                           np.quantile(self.samples, quantile, axis=0), atol=0.1)
+
+    def test_few_samples(self):
+        """Test quantiles are exact before the estimator is initialised"""
+        statistics = StreamingStatistics((0.5,))
+        self.assertRaises(ValueError, statistics.quantile, 0.5)
+        statistics.update(self.samples[:3])
+        np.testing.assert_allclose(statistics.quantile(0.5), np.median(self.samples[:3], axis=0))
+        self.assertRaises(ValueError, statistics.quantile, 0.9)
+
+    def test_invalid_quantiles(self):
+        """Test quantiles must be between 0 and 1"""
+        for quantile in (0, 1, 1.5):
+            with self.subTest(quantile):
+                self.assertRaises(ValueError, StreamingStatistics, (quantile,))
@@ -6,6 +6,7 @@ import logging
 import csv
 from pprint import pformat
 import click
+import numpy as np
 from tabulate import tabulate
 
 from . import __version__, PROGRAM, DESCRIPTION, set_log_verbosity
@@ -13,6 +14,9 @@ from .solution import Solution
 from .liso import LisoInputParser, LisoOutputParser, LisoRunner, LisoParserError
 from .datasheet import PartRequest
 from .components import OpAmp
+from .analysis import AcOpAmpRankingAnalysis
+from .analysis.ac.cache import RESULT_CACHE
+from .format import Quantity
 from .display import OpAmpVoltageNoisePlotter, OpAmpCurrentNoisePlotter, OpAmpGainPlotter
 from .config import (ZeroConfig, OpAmpLibrary, ConfigDoesntExistException,
                      ConfigAlreadyExistsException, LibraryQueryEngine, LibraryParserError)
@@ -416,6 +420,104 @@ def library_search(query, sort_a0, sort_gbw, sort_delay, sort_vnoise, sort_vcorn
     _plot_save_figure(plot_current_noise, save_current_noise_figure, OpAmpCurrentNoisePlotter)
     _plot_save_figure(plot_gain, save_gain_figure, OpAmpGainPlotter)
 
+@library.command("rank")
+@click.argument("file", type=click.File())
+@click.argument("slots", nargs=-1, required=True, metavar="SLOT...")
+@click.option("--query", help="Library query selecting the candidate op-amps. Defaults to every "
+              "library op-amp. See 'zero library search --help' for the syntax.")
+@click.option("--sink", help="Noise sink node or component. Defaults to the file's noise output.")
+@click.option("--sort", type=click.Choice(("noise", "deviation"), case_sensitive=False),
+              default="noise", show_default=True, help="Rank by integrated noise or response "
+              "deviation.")
+@click.option("--limit", type=click.IntRange(1), help="Number of ranked op-amps to show.")
+@click.option("--fstart", type=str, help="Start frequency. Defaults to the file's.")
+@click.option("--fstop", type=str, help="Stop frequency. Defaults to the file's.")
+@click.option("--npoints", type=click.IntRange(2), help="Number of frequencies. Defaults to the "
+              "file's.")
+@click.option("--input-refer", is_flag=True, default=False,
+              help="Refer noise to the input. Always enabled if the file refers noise to the "
+              "input.")
+@click.option("--paged", is_flag=True, default=False, help="Print results with paging.")
+@click.pass_context
+def library_rank(ctx, file, slots, query, sink, sort, limit, fstart, fstop, npoints, input_refer,
+                 paged):
+    """Rank library op-amps by their performance in a circuit.
+
+    The circuit, its input and the frequencies are read from the specified LISO input file. Each
+    candidate op-amp is placed in every specified op-amp slot, e.g. "op1", and the noise at the sink
+    is integrated over the frequencies. The maximum deviation of the response from the input to
+    the sink, relative to that of the circuit as given, is also shown.
+    """
+    state = ctx.ensure_object(State)
+
+    parser = LisoInputParser()
+
+    try:
+        parser.parse(path=file.name)
+        parser.build()
+    except LisoParserError as error:
+        click.echo(str(error), err=True)
+        sys.exit(1)
+
+    if sink is None:
+        sink = parser.noise_output_element
+
+        if sink is None:
+            click.echo("No noise output in file; specify --sink.", err=True)
+            sys.exit(1)
+
+    if sink not in parser.circuit:
+        click.echo(f"Sink '{sink}' is not present in the circuit.", err=True)
+        sys.exit(1)
+
+    # Default to the file's frequencies.
+    frequencies = parser.frequencies
+    fstart = frequencies[0] if fstart is None else Quantity(fstart, "Hz")
+    fstop = frequencies[-1] if fstop is None else Quantity(fstop, "Hz")
+    npoints = len(frequencies) if npoints is None else npoints
+
+    if fstart <= 0 or fstop <= fstart:
+        click.echo("Frequencies must be positive and increasing.", err=True)
+        sys.exit(1)
+
+    frequencies = np.logspace(np.log10(fstart), np.log10(fstop), npoints)
+
+    if parser.input_node_n is None:
+        # Grounded input.
+        nodes = {"node": parser.input_node_p}
+    else:
+        # Floating input.
+        nodes = {"node_p": parser.input_node_p, "node_n": parser.input_node_n}
+
+    analysis = AcOpAmpRankingAnalysis(parser.circuit, print_progress=state.verbose)
+
+    try:
+        ranking = analysis.calculate(input_type=parser.input_type, sink=parser.circuit[sink],
+                                     slots=slots, frequencies=frequencies, query=query,
+                                     impedance=parser.input_impedance,
+                                     input_refer=input_refer or parser.input_refer, **nodes)
+    except (LibraryParserError, ValueError) as error:
+        click.echo(str(error), err=True)
+        sys.exit(1)
+
+    models = ranking.ranked(by=sort)[:limit]
+    rows = []
+
+    for rank, model in enumerate(models, 1):
+        index = ranking.index(model)
+        rows.append([rank, model, str(Quantity(ranking.integrated_noise[index])),
+                     f"{ranking.deviation[index]:.3g}"])
+
+    table = tabulate(rows, ["rank", "model", "integrated noise", "response deviation"],
+                     tablefmt=CONF["format"]["table"])
+
+    click.echo(f"{len(ranking)} op-amps ranked by {sort.lower()}:")
+
+    if paged:
+        click.echo_via_pager(table)
+    else:
+        click.echo(table)
+
 
 @cli.group()
 def config():
@@ -466,6 +568,34 @@ def config_show(paged):
     echo = click.echo_via_pager if paged else click.echo
     echo(pformat(CONF))
 
+@cli.group()
+def cache():
+    """Analysis result cache functions."""
+    pass
+
+@cache.command("path")
+def cache_path():
+    """Print result cache directory path.
+
+    Note: this path may not exist.
+    """
+    click.echo(click.format_filename(RESULT_CACHE.path))
+
+@cache.command("show")
+def cache_show():
+    """Print the number and size of cached solutions."""
+    size = Quantity(RESULT_CACHE.size, units="B")
+    max_size = Quantity(RESULT_CACHE.max_bytes, units="B")
+    click.echo(f"{len(RESULT_CACHE)} cached solution(s) using {size.render()} of "
+               f"{max_size.render()}")
+
+@cache.command("clear")
+def cache_clear():
+    """Remove every cached solution."""
+    path = click.format_filename(RESULT_CACHE.path)
+    click.confirm(f"Delete cached solutions in {path}?", abort=True)
+    RESULT_CACHE.clear()
+
 @cli.command()
 @click.argument("term")
 @click.option("-f", "--first", is_flag=True, default=False,
@@ -1,2 +1,8 @@
 # analyses
-from .ac import AcSignalAnalysis, AcNoiseAnalysis
+from .ac import (AcSignalAnalysis, AcMultiSignalAnalysis, AcNoiseAnalysis, AcPoleZeroAnalysis,
+                 RationalModel, AcSignalSweepAnalysis, AcNoiseSweepAnalysis, SweepSolution,
+                 AcSignalMonteCarloAnalysis, AcNoiseMonteCarloAnalysis, MonteCarloSolution,
+                 StreamingStatistics, AcSensitivityAnalysis, SensitivitySolution,
+                 AcOpAmpRankingAnalysis, OpAmpRanking, ResultCache, CompiledCircuit,
+                 StructurallySingularError, AcTimeResponseAnalysis, TimeResponseSolution)
+from .transient import TransientAnalysis, TransientSolution
@@ -1,3 +1,13 @@
 # AC analyses
-from .signal import AcSignalAnalysis
+from .structure import StructurallySingularError
+from .signal import AcSignalAnalysis, AcMultiSignalAnalysis
 from .noise import AcNoiseAnalysis
+from .pole_zero import AcPoleZeroAnalysis, RationalModel
+from .sweep import AcSignalSweepAnalysis, AcNoiseSweepAnalysis, SweepSolution
+from .sensitivity import AcSensitivityAnalysis, SensitivitySolution
+from .montecarlo import (AcSignalMonteCarloAnalysis, AcNoiseMonteCarloAnalysis, MonteCarloSolution,
+                         StreamingStatistics)
+from .ranking import AcOpAmpRankingAnalysis, OpAmpRanking
+from .cache import ResultCache
+from .compiled import CompiledCircuit
+from .time_response import AcTimeResponseAnalysis, TimeResponseSolution
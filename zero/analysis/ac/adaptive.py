@@ -0,0 +1,170 @@
+"""Adaptive frequency refinement of AC analyses"""
+
+import logging
+import numpy as np
+
+from ...config import ZeroConfig
+
+LOGGER = logging.getLogger(__name__)
+CONF = ZeroConfig()
+
+
+class AdaptiveSolveMixin:
+    """Mixin solving an AC analysis at frequencies refined where its results change quickly."""
+    def _solve_adaptive(self, max_solves=None):
+        """Solve the circuit, refining the frequencies where the results change quickly.
+
+        The circuit is first solved at the current frequencies. Each interior frequency's
+        monitored quantities (see :meth:`_adaptive_quantities`) are compared to the linear
+        interpolation, in log frequency, of those at the neighbouring frequencies. Where the
+        magnitude, in dB, or the phase, in degrees, deviates by more than the
+        ``analysis.adaptive.magnitude_tolerance`` or ``analysis.adaptive.phase_tolerance``
+        configuration settings, respectively, the circuit is solved again at the geometric mean of
+        each pair of neighbouring frequencies. This is repeated until no deviation is above
+        tolerance or the total number of solves reaches `max_solves`, after which the frequencies
+        are left as they are.
+
+        Parameters
+        ----------
+        max_solves : :class:`int`, optional
+            The maximum total number of frequencies to solve. Defaults to the
+            ``analysis.adaptive.max_solves`` configuration setting.
+
+        Returns
+        -------
+        :class:`~np.ndarray`
+            The results of :meth:`solve` for the refined frequencies.
+        """
+        if max_solves is None:
+            max_solves = int(CONF["analysis"]["adaptive"]["max_solves"])
+
+        magnitude_tolerance = float(CONF["analysis"]["adaptive"]["magnitude_tolerance"])
+        phase_tolerance = float(CONF["analysis"]["adaptive"]["phase_tolerance"])
+
+        frequencies = self.frequencies
+        results = self._solve_frequencies(frequencies)
+
+        while True:
+            # Score each interval between frequencies by the largest deviation, relative to the
+            # tolerance, at the frequencies at either end.
+            magnitude_error, phase_error = _interpolation_errors(
+                frequencies, self._adaptive_quantities(results))
+            error = np.maximum(magnitude_error / magnitude_tolerance,
+                               phase_error / phase_tolerance)
+            interval_error = np.zeros(len(frequencies) - 1)
+            interval_error[:-1] = error
+            interval_error[1:] = np.maximum(interval_error[1:], error)
+
+            # Don't refine intervals that can no longer be split.
+            lower, upper = frequencies[:-1], frequencies[1:]
+            midpoints = np.sqrt(lower * upper)
+            interval_error[(midpoints <= lower) | (midpoints >= upper)] = 0
+
+            refine = np.flatnonzero(interval_error > 1)
+
+            if not len(refine):
+                break
+
+            n_remaining = max_solves - len(frequencies)
+
+            if len(refine) > n_remaining:
+                LOGGER.warning("adaptive sweep reached the maximum of %i solves before "
+                               "converging", max_solves)
+
+                if n_remaining <= 0:
+                    break
+
+                # Refine the worst intervals.
+                refine = np.sort(refine[np.argsort(interval_error[refine])[::-1][:n_remaining]])
+
+            new_frequencies = midpoints[refine]
+            new_results = self._solve_frequencies(new_frequencies)
+
+            # Merge the new frequencies and results into the existing ones, keeping them in order.
+            frequencies = np.concatenate((frequencies, new_frequencies))
+            order = np.argsort(frequencies, kind="stable")
+            frequencies = frequencies[order]
+            results = [np.concatenate((array, new_array), axis=-1)[..., order]
+                       for array, new_array in zip(results, new_results)]
+
+        LOGGER.debug("adaptive sweep solved %i frequencies", len(frequencies))
+
+        return self._set_frequency_results(frequencies, results)
+
+    def _solve_frequencies(self, frequencies):
+        """Solve the circuit at the specified frequencies.
+
+        Returns
+        -------
+        :class:`list` of :class:`~np.ndarray`
+            The results needed to build the solution, each with frequency along the last axis.
+        """
+        self.frequencies = frequencies
+        return [self.solve()]
+
+    def _set_frequency_results(self, frequencies, results):
+        """Set the frequencies and results returned by :meth:`_solve_frequencies`.
+
+        Returns
+        -------
+        :class:`~np.ndarray`
+            The results of :meth:`solve`.
+        """
+        self.frequencies = frequencies
+        return results[0]
+
+    def _adaptive_quantities(self, results):
+        """Quantities monitored by adaptive sweeps.
+
+        Parameters
+        ----------
+        results : :class:`list` of :class:`~np.ndarray`
+            The results returned by :meth:`_solve_frequencies`.
+
+        Returns
+        -------
+        :class:`~np.ndarray`
+            The complex quantities, with shape (n_quantities, n_freqs).
+        """
+        return results[0].reshape(-1, results[0].shape[-1])
+
+
+def _interpolation_errors(frequencies, quantities):
+    """Deviation of quantities from the interpolation of their neighbours.
+
+    Parameters
+    ----------
+    frequencies : :class:`~np.ndarray`
+        The positive frequencies, in ascending order.
+    quantities : :class:`~np.ndarray`
+        The complex quantities, with shape (n_quantities, n_freqs).
+
+    Returns
+    -------
+    :class:`~np.ndarray`
+        The largest magnitude deviation, in dB, at each interior frequency.
+    :class:`~np.ndarray`
+        The largest phase deviation, in degrees, at each interior frequency.
+    """
+    magnitudes = np.abs(quantities)
+
+    # Ignore quantities that are negligible compared to the largest at a frequency, such as
+    # numerically zero responses.
+    significant = magnitudes > 1e-10 * np.max(magnitudes, axis=0, initial=0)
+    significant = significant[:, :-2] & significant[:, 1:-1] & significant[:, 2:]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratios = quantities[:, 1:] / quantities[:, :-1]
+        magnitude_steps = 20 * np.log10(np.abs(ratios))
+        phase_steps = np.degrees(np.angle(ratios))
+
+    # Position of each interior frequency between its neighbours, in log frequency.
+    log_frequencies = np.log(frequencies)
+    weights = ((log_frequencies[1:-1] - log_frequencies[:-2])
+               / (log_frequencies[2:] - log_frequencies[:-2]))
+
+    def deviation(steps):
+        error = np.abs(steps[:, :-1] - weights * (steps[:, :-1] + steps[:, 1:]))
+        return np.max(np.where(significant, error, 0), axis=0, initial=0)
+
+    return deviation(magnitude_steps), deviation(phase_steps)
@@ -1,29 +1,94 @@
 """Base AC analysis tools"""
 
-import sys
 import abc
 import logging
 import statistics
 from copy import copy
 from collections import defaultdict
 import numpy as np
-
+from scipy.sparse import issparse
+
+from .cache import ResultCache, UncacheableError, RESULT_CACHE
+from .macromodel import MACROMODELS
+from .structure import MatrixStructureMixin, ElementIndexMap
+from .chunk import ChunkSolverMixin
+from .adaptive import AdaptiveSolveMixin
+from .equations import (ComponentEquation, NodeEquation, ImpedanceCoefficient, CurrentCoefficient,
+                        VoltageCoefficient)
 from ..base import BaseAnalysis
+from ...config import ZeroConfig
 from ...solve import DefaultSolver
 from ...components import Component, Input, Node
 from ...solution import Solution
 from ...display import MatrixDisplay, EquationDisplay
 
 LOGGER = logging.getLogger(__name__)
+CONF = ZeroConfig()
+
 
+class BaseAcAnalysis(MatrixStructureMixin, ChunkSolverMixin, AdaptiveSolveMixin, BaseAnalysis,
+                     metaclass=abc.ABCMeta):
+    """Small signal circuit analysis
 
-class BaseAcAnalysis(BaseAnalysis, metaclass=abc.ABCMeta):
-    """Small signal circuit analysis"""
-    def __init__(self, *args, **kwargs):
+    Parameters
+    ----------
+    batch : :class:`bool`, optional
+        Whether to assemble and solve the circuit matrices for blocks of frequencies together
+        instead of one frequency at a time. This avoids per-frequency overhead, which dominates
+        the solve time for small to medium sized circuits, at the expense of memory.
+    parallel : :class:`bool`, :class:`str` or :class:`concurrent.futures.Executor`, optional
+        Whether to solve chunks of frequencies in parallel. If "thread" or "process", the chunks
+        are solved on a pool of threads or processes, respectively, with the number of workers set
+        by the ``algebra.parallel_workers`` configuration setting. If True, threads are used in
+        batched mode, where the solver releases the GIL, and processes otherwise. An existing
+        executor can also be specified. Defaults to solving the chunks in turn.
+    incremental : :class:`bool`, optional
+        Whether to retain each frequency's circuit matrix factorisation so that, when the analysis
+        is calculated again for the same frequencies after components are changed, the changes are
+        applied as low-rank updates to the factorisations instead of refactorising the matrices.
+        Incremental analyses cannot be batched or run in parallel.
+    cache : :class:`bool` or :class:`.ResultCache`, optional
+        Whether to store signal and noise analysis solutions in, and load them from, the on-disk
+        result cache. A specific cache can also be specified. Defaults to the ``cache.enabled``
+        configuration setting. Incremental analyses, and calculations printing the circuit
+        equations or matrix, are not cached.
+    compact : :class:`bool`, optional
+        Whether to solve the compact, modified nodal analysis form of the circuit matrices, in which
+        the currents through resistors and capacitors are eliminated. Only node voltages and the
+        currents through op-amps, inputs, inductors and excited components remain, roughly halving
+        the size of the matrices of passive networks. The eliminated currents are recovered from
+        the node voltages after each solve. Incremental analyses cannot be compact.
+
+    Other Parameters
+    ----------------
+    circuit : :class:`.Circuit`
+        The circuit to analyse.
+    print_progress : :class:`bool`, optional
+        Whether to print analysis output.
+    stream : :class:`io.IOBase`, optional
+        Stream to print analysis output to.
+    """
+    def __init__(self, *args, batch=False, parallel=None, incremental=False, cache=None,
+                 compact=False, **kwargs):
         super().__init__(*args, **kwargs)
 
         # Create solver.
         self.solver = DefaultSolver()
+        self.batch = bool(batch)
+        self.parallel = parallel
+        self.incremental = bool(incremental)
+        self.cache = cache
+        self.compact = bool(compact)
+
+        if self.incremental and (self.batch or self.parallel):
+            raise ValueError("incremental analyses cannot be batched or run in parallel")
+
+        if self.incremental and self.compact:
+            raise ValueError("incremental analyses cannot be compact")
+
+        # Factorisations retained by incremental analyses. These are kept when the analysis is
+        # reset.
+        self._factorised_sweep = None
 
         # Empty fields.
         self.frequencies = None
@@ -32,15 +97,23 @@ class BaseAcAnalysis(BaseAnalysis, metaclass=abc.ABCMeta):
         self._solution = None
         self._node_sources = None
         self._node_sinks = None
+        self._element_index_map = None
+        self._stamp_pattern = None
+        # Reductions of the circuit matrix for each set of excited rows.
+        self._matrix_reductions = {}
 
     def reset(self):
         """Reset state of the analysis"""
+        self.solver.reset()
         self.frequencies = None
         self.input_type = None
         self._current_circuit = None
         self._solution = None
         self._node_sources = None
         self._node_sinks = None
+        self._element_index_map = None
+        self._stamp_pattern = None
+        self._matrix_reductions = {}
 
     def validate_circuit(self):
         """Validate circuit"""
@@ -48,6 +121,31 @@ class BaseAcAnalysis(BaseAnalysis, metaclass=abc.ABCMeta):
         if self._current_circuit.input_component.input_type not in ["voltage", "current"]:
             raise ValueError("circuit input type must be either 'voltage' or 'current'")
 
+    @property
+    def element_index_map(self):
+        """Map of circuit elements to circuit matrix indices
+
+        The map is built from the analysis circuit the first time it is
+        requested after the analysis is reset, and reused for every lookup
+        thereafter.
+
+        Returns
+        -------
+        :class:`.ElementIndexMap`
+            the element index map
+        """
+        if self._element_index_map is None:
+            previous = None
+
+            if self._factorised_sweep is not None:
+                # Keep the matrix ordering of the retained factorisations.
+                previous = self._factorised_sweep.element_index_map
+
+            self._element_index_map = ElementIndexMap.from_circuit(self._current_circuit,
+                                                                   previous=previous)
+
+        return self._element_index_map
+
     def component_index(self, component):
         """Get component serial number.
 
@@ -66,7 +164,7 @@ class BaseAcAnalysis(BaseAnalysis, metaclass=abc.ABCMeta):
         ValueError
             if component not found
         """
-        return self._current_circuit.components.index(component)
+        return self.element_index_map.component_index(component)
 
     def node_index(self, node):
         """Get node serial number.
@@ -89,10 +187,10 @@ class BaseAcAnalysis(BaseAnalysis, metaclass=abc.ABCMeta):
         ValueError
             if ground node is specified or specified node is not found
         """
-        if node == Node("gnd"):
+        if node is Node("gnd"):
             raise ValueError("ground node does not have an index")
 
-        return list(self._current_circuit.non_gnd_nodes).index(node)
+        return self.element_index_map.node_index(node)
 
     @property
     def elements(self):
@@ -106,8 +204,7 @@ class BaseAcAnalysis(BaseAnalysis, metaclass=abc.ABCMeta):
         :class:`~.components.Component`, :class:`~.components.Node`
             matrix elements
         """
-        yield from self._current_circuit.components
-        yield from self._current_circuit.non_gnd_nodes
+        yield from self.element_index_map.elements
 
     @property
     def element_names(self):
@@ -138,7 +235,7 @@ class BaseAcAnalysis(BaseAnalysis, metaclass=abc.ABCMeta):
 
         # Dimension size is the number of components added to circuit, including the input, plus the
         # number of non-ground nodes.
-        return self._current_circuit.n_components + len(list(self._current_circuit.non_gnd_nodes))
+        return len(self.element_index_map)
 
     @property
     def n_freqs(self):
@@ -171,26 +268,90 @@ class BaseAcAnalysis(BaseAnalysis, metaclass=abc.ABCMeta):
         """
         return self.solver.full((self.dim_size, *depth))
 
+    @property
+    def result_cache(self):
+        """The result cache used by the analysis, or None if solutions are not cached"""
+        cache = self.cache
+
+        if cache is None:
+            cache = CONF["cache"]["enabled"]
+
+        if isinstance(cache, ResultCache):
+            return cache
+        elif cache:
+            return RESULT_CACHE
+
+        return None
+
     @abc.abstractmethod
     def calculate(self):
         """Calculate solution."""
         raise NotImplementedError
 
+    def _cached_calculate(self, calculate, **parameters):
+        """Calculate solution, loading it from the result cache if it is enabled and contains it.
+
+        Parameters
+        ----------
+        calculate : callable
+            Function calculating the solution from the parameters.
+        **parameters
+            The calculation parameters, which together with the circuit determine the solution.
+
+        Returns
+        -------
+        :class:`~.solution.Solution`
+            The solution.
+        """
+        cache = self.result_cache
+
+        if (cache is None or self.incremental or "frequencies" not in parameters
+                or parameters.get("print_equations") or parameters.get("print_matrix")):
+            return calculate(**parameters)
+
+        parameters["frequencies"] = np.asarray(parameters["frequencies"], dtype=float)
+
+        try:
+            key = cache.key(self, **parameters)
+        except UncacheableError as error:
+            LOGGER.debug("not caching solution: %s", error)
+            return calculate(**parameters)
+
+        solution = cache.get(key, self.circuit)
+
+        if solution is not None:
+            # The analysis state other than the solution is not restored.
+            self.reset()
+            self.frequencies = solution.frequencies
+            self._solution = solution
+            return solution
+
+        solution = calculate(**parameters)
+
+        try:
+            cache.put(key, solution)
+        except (OSError, UncacheableError) as error:
+            LOGGER.warning("could not cache solution: %s", error)
+
+        return solution
+
     def _do_calculate(self, input_type, frequencies, print_equations=False, print_matrix=False,
-                      **inputs):
+                      adaptive=False, max_solves=None, **inputs):
         """Calculate analysis results."""
         # Reset state.
         self.reset()
 
         self.frequencies = np.array(frequencies)
 
-        # Make a copy of the circuit. This allows us to call calculate(), which adds an input
-        # component, multiple times.
-        self._current_circuit = copy(self.circuit)
-        # Add input.
-        self._set_input(input_type, **inputs)
-        # Validate.
-        self.validate_circuit()
+        if adaptive:
+            # Frequencies are the starting grid, in ascending order.
+            self.frequencies = np.unique(self.frequencies)
+
+            if len(self.frequencies) < 2 or self.frequencies[0] <= 0:
+                raise ValueError("adaptive sweeps require at least two positive starting "
+                                 "frequencies")
+
+        self._set_up_circuit(input_type, **inputs)
 
         if print_equations:
             print(self.circuit_equation_display(), file=self.stream)
@@ -200,10 +361,23 @@ class BaseAcAnalysis(BaseAnalysis, metaclass=abc.ABCMeta):
 
         # Calculate transfer functions by solving the transfer matrix for input at the circuit's
         # input node/component.
-        responses = self.solve()
+        if adaptive:
+            responses = self._solve_adaptive(max_solves=max_solves)
+        else:
+            responses = self.solve()
 
         self._build_solution(responses)
 
+    def _set_up_circuit(self, input_type, **inputs):
+        """Set up the circuit to solve, with the input added."""
+        # Make a copy of the circuit. This allows us to call calculate(), which adds an input
+        # component, multiple times.
+        self._current_circuit = copy(self.circuit)
+        # Add input.
+        self._set_input(input_type, **inputs)
+        # Validate.
+        self.validate_circuit()
+
     def _set_input(self, input_type, impedance=None, is_noise=False, node=None, node_p=None,
                    node_n=None):
         """Set circuit input.
@@ -280,8 +454,10 @@ class BaseAcAnalysis(BaseAnalysis, metaclass=abc.ABCMeta):
         """Calculate and return matrix used to solve for circuit transfer \
         functions for a given frequency
 
-        This constructs a sparse matrix containing the voltage and current
-        equations for each component and node.
+        This constructs a matrix containing the voltage and current equations
+        for each component and node by filling the circuit's compiled
+        :attr:`stamp pattern <stamp_pattern>`. The matrix is sparse unless the
+        solver operates on full matrices.
 
         Parameters
         ----------
@@ -290,7 +466,7 @@ class BaseAcAnalysis(BaseAnalysis, metaclass=abc.ABCMeta):
 
         Returns
         -------
-        :class:`scipy.sparse.spmatrix`
+        :class:`scipy.sparse.spmatrix` or :class:`np.ndarray`
             circuit matrix
 
         Raises
@@ -298,23 +474,62 @@ class BaseAcAnalysis(BaseAnalysis, metaclass=abc.ABCMeta):
         ValueError
             if an invalid coefficient type is encountered
         """
-        # create new sparse matrix
-        matrix = self.solver.sparse((self.dim_size, self.dim_size))
+        if self.solver.is_sparse:
+            return self.stamp_pattern.matrix(frequency)
+
+        return self.stamp_pattern.full(frequency)
+
+    def circuit_matrix_stack(self, frequencies):
+        """Calculate and return full circuit matrices for a sequence of frequencies
+
+        The frequency-dependent coefficients are evaluated for all of the
+        specified frequencies at once, and the results are stacked along the
+        first axis.
+
+        Parameters
+        ----------
+        frequencies : :class:`np.ndarray` or sequence
+            frequencies at which to calculate circuit impedances
+
+        Returns
+        -------
+        :class:`np.ndarray`
+            circuit matrices, with shape (n_freqs, dim_size, dim_size)
+
+        Raises
+        ------
+        ValueError
+            if an invalid coefficient type is encountered
+        """
+        return self.stamp_pattern.stack(frequencies)
+
+    def matrix_coefficients(self):
+        """Circuit matrix coefficients
+
+        Sets up the circuit's sources and sinks then yields the position and
+        value of each coefficient of the component and node equations. The
+        value is either a constant or a callable accepting a frequency or
+        frequency vector.
 
+        Yields
+        ------
+        :class:`tuple`
+            row index, column index and value of coefficient
+
+        Raises
+        ------
+        ValueError
+            if an invalid coefficient type is encountered
+        """
         # add sources and sinks
         self.set_up_sources_and_sinks()
 
         # Kirchoff's voltage law / op-amp voltage gain equations
         for equation in self.component_equations:
-            for coefficient in equation.coefficients:
-                # default row index
-                row = self.component_matrix_index(equation.component)
-
-                if callable(coefficient.value):
-                    value = coefficient.value(frequency)
-                else:
-                    value = coefficient.value
+            # row index
+            row = self.component_matrix_index(equation.component)
 
+            for coefficient in equation.coefficients:
                 if coefficient.TYPE == "impedance":
                     # use target component column
                     column = self.component_matrix_index(coefficient.component)
@@ -324,63 +539,19 @@ class BaseAcAnalysis(BaseAnalysis, metaclass=abc.ABCMeta):
                 else:
                     raise ValueError("invalid coefficient type")
 
-                matrix[row, column] = value
+                yield row, column, coefficient.value
 
         # Kirchoff's current law
         for equation in self.node_equations:
+            row = self.node_matrix_index(equation.node)
+
             for coefficient in equation.coefficients:
                 if not coefficient.TYPE == "current":
                     raise ValueError("invalid coefficient type")
 
-                row = self.node_matrix_index(equation.node)
                 column = self.component_matrix_index(coefficient.component)
 
-                if callable(coefficient.value):
-                    value = coefficient.value(frequency)
-                else:
-                    value = coefficient.value
-
-                matrix[row, column] = value
-
-        return matrix
-
-    def solve(self):
-        """Solve the circuit.
-
-        Solves matrix equation Ax = b, where A is the circuit matrix and b is the right hand side.
-
-        Returns
-        -------
-        :class:`~np.ndarray`
-            The inverse of the circuit matrix.
-        """
-        # results matrix
-        results = self.get_empty_results_matrix(self.n_freqs)
-
-        # update progress every 1% of the way there
-        update = self.n_freqs // 100
-
-        # if there are less than 100 frequencies, update progress after
-        # every frequency
-        if update == 0:
-            update += 1
-
-        # create frequency generator with progress bar
-        freq_gen = self.progress(self.frequencies, self.n_freqs, update=update)
-
-        # right hand side to solve against
-        rhs = self.right_hand_side()
-
-        # frequency loop
-        for index, frequency in enumerate(freq_gen):
-            # get matrix for this frequency, converting to CSR format for
-            # efficient solving
-            matrix = self.circuit_matrix(frequency).tocsr()
-
-            # call solver function
-            results[:, index] = self.solver.solve(matrix, rhs)
-
-        return results
+                yield row, column, coefficient.value
 
     def reset_sources_and_sinks(self):
         """Reset circuit's sources and sinks"""
@@ -400,7 +571,7 @@ class BaseAcAnalysis(BaseAnalysis, metaclass=abc.ABCMeta):
 
         # list of single-input, single-output components
         siso_components = list(self._current_circuit.passive_components)
-        siso_components += [self._current_circuit.input_component]
+        siso_components += self.input_components
 
         # single-input, single-output components sink to their first node and source from
         # their second
@@ -415,6 +586,47 @@ class BaseAcAnalysis(BaseAnalysis, metaclass=abc.ABCMeta):
         for component in self._current_circuit.opamps:
             self._node_sources[component.node3].add(component) # current flows out of here
 
+        # subcircuit ports sink current from the nodes they connect to
+        for subcircuit in self._current_circuit.subcircuits:
+            for port in subcircuit.port_components:
+                self._node_sinks[port.node].add(port) # current flows into the subcircuit here
+
+    @property
+    def input_components(self):
+        """Input components added to the circuit by the analysis
+
+        Returns
+        -------
+        :class:`list` of :class:`.Input`
+            the input components
+        """
+        return [component for component in self._current_circuit.components
+                if component.element_type == "input"]
+
+    def _macromodel(self, subcircuit):
+        """Port macromodel of a subcircuit
+
+        Macromodels are shared by subcircuits with identical contents and ports.
+
+        Parameters
+        ----------
+        subcircuit : :class:`.Subcircuit`
+            the subcircuit
+
+        Returns
+        -------
+        :class:`.PortMacromodel`
+            the macromodel
+
+        Raises
+        ------
+        StructurallySingularError
+            if the subcircuit's interior unknowns are not determined by its ports
+        """
+        # The subcircuit analysis is itself an AC analysis, so it is imported here.
+        from .subcircuit import _SubcircuitAnalysis
+        return MACROMODELS.get(subcircuit, lambda: _SubcircuitAnalysis(subcircuit).macromodel())
+
     def component_equation(self, component):
         """Equation representing circuit component
 
@@ -427,6 +639,9 @@ class BaseAcAnalysis(BaseAnalysis, metaclass=abc.ABCMeta):
         Note that special behaviour is applied to op-amp voltage outputs if they are
         configured as voltage followers.
 
+        Each subcircuit port's equation is one of the subcircuit's relations between the voltages
+        at, and the currents into, its ports (see :class:`.PortMacromodel`).
+
         Returns
         -------
         :class:`~ComponentEquation`
@@ -437,7 +652,24 @@ class BaseAcAnalysis(BaseAnalysis, metaclass=abc.ABCMeta):
         # impedance * current + voltage = 0
         coefficients = []
 
-        if hasattr(component, "input_type"):
+        if component.element_type == "port":
+            # this is a subcircuit port
+            subcircuit = component.subcircuit
+            macromodel = self._macromodel(subcircuit)
+            # voltage coefficients, summed over ports connected to the same node
+            voltages = defaultdict(list)
+
+            for other, port in enumerate(subcircuit.port_components):
+                if port.node is not Node("gnd"):
+                    voltages[port.node].append(macromodel.voltage_coefficient(component.index,
+                                                                              other))
+
+                coefficients.append(ImpedanceCoefficient(
+                    component=port, value=macromodel.current_coefficient(component.index, other)))
+
+            for node, values in voltages.items():
+                coefficients.append(VoltageCoefficient(node=node, value=_sum_values(values)))
+        elif hasattr(component, "input_type"):
             # this is an input component
             if (component.input_type == "current"
                 or (hasattr(component, "is_noise") and component.is_noise)):
@@ -532,7 +764,8 @@ class BaseAcAnalysis(BaseAnalysis, metaclass=abc.ABCMeta):
             component equation
         """
 
-        return [self.component_equation(component) for component in self._current_circuit.components]
+        return [self.component_equation(component)
+                for component in self.element_index_map.components]
 
     @property
     def node_equations(self):
@@ -544,7 +777,7 @@ class BaseAcAnalysis(BaseAnalysis, metaclass=abc.ABCMeta):
             sequence of node equations
         """
 
-        return [self.node_equation(node) for node in self._current_circuit.non_gnd_nodes]
+        return [self.node_equation(node) for node in self.element_index_map.nodes]
 
     def component_matrix_index(self, component):
         """Circuit matrix index corresponding to a component
@@ -576,7 +809,47 @@ class BaseAcAnalysis(BaseAnalysis, metaclass=abc.ABCMeta):
             node index
         """
 
-        return self._current_circuit.n_components + self.node_index(node)
+        return self.element_index_map.n_components + self.node_index(node)
+
+    def _element_matrix_index(self, element):
+        """Matrix index of a component or node."""
+        if isinstance(element, Node):
+            return self.node_matrix_index(element)
+
+        return self.component_matrix_index(element)
+
+    def _noise_source_indices(self, noise):
+        """Matrix indices of the elements a noise source enters the circuit at.
+
+        Noise from within a subcircuit enters at the rows of the subcircuit's ports.
+        """
+        if noise.element_type == "component":
+            if noise.component.element_type == "subcircuit":
+                return [self.component_matrix_index(port)
+                        for port in noise.component.port_components]
+
+            # noise is from a component; use its matrix index
+            return [self.component_matrix_index(noise.component)]
+        elif noise.element_type == "node":
+            # noise is from a node; use its matrix index
+            return [self.node_matrix_index(noise.node)]
+
+        raise ValueError("unrecognised noise source present in circuit")
+
+    def _noise_source_excitation(self, noise, frequencies):
+        """Right hand side entries of a noise source, per unit noise, at the matrix indices
+        returned by :meth:`_noise_source_indices`.
+
+        Returns
+        -------
+        :class:`np.ndarray`
+            The right hand side entries, with shape (n_indices, n_freqs).
+        """
+        if noise.element_type == "component" and noise.component.element_type == "subcircuit":
+            macromodel = self._macromodel(noise.component)
+            return macromodel.noise_excitation(noise.source.label, frequencies)
+
+        return np.ones((1, len(frequencies)))
 
     def format_element(self, element):
         """Format matrix element for pretty printing.
@@ -630,8 +903,9 @@ class BaseAcAnalysis(BaseAnalysis, metaclass=abc.ABCMeta):
 
         matrix = self.circuit_matrix(frequency=frequency)
 
-        # convert matrix to full (non-sparse) format
-        matrix = matrix.toarray()
+        if issparse(matrix):
+            # convert matrix to full (non-sparse) format
+            matrix = matrix.toarray()
 
         return EquationDisplay(matrix, self.right_hand_side(), self.elements)
 
@@ -646,8 +920,9 @@ class BaseAcAnalysis(BaseAnalysis, metaclass=abc.ABCMeta):
 
         matrix = self.circuit_matrix(frequency=frequency)
 
-        # convert matrix to full (non-sparse) format
-        matrix = matrix.toarray()
+        if issparse(matrix):
+            # convert matrix to full (non-sparse) format
+            matrix = matrix.toarray()
 
         # column headers, with extra columns for component names and RHS
         headers = [""] + self.element_headers + ["RHS"]
@@ -658,123 +933,10 @@ class BaseAcAnalysis(BaseAnalysis, metaclass=abc.ABCMeta):
         return MatrixDisplay(lhs, matrix, self.right_hand_side(), headers)
 
 
-class BaseEquation(metaclass=abc.ABCMeta):
-    """Represents an equation.
-
-    Parameters
-    ----------
-    coefficients : sequence of :class:`BaseCoefficient`
-        Coefficients that make up the equation.
-    """
-
-    def __init__(self, coefficients):
-        """Instantiate a new equation."""
-
-        self.coefficients = []
-
-        for coefficient in coefficients:
-            self.add_coefficient(coefficient)
-
-    def add_coefficient(self, coefficient):
-        """Add coefficient to equation.
-
-        Parameters
-        ----------
-        coefficient : :class:`BaseCoefficient`
-            Coefficient to add.
-        """
-
-        self.coefficients.append(coefficient)
-
-
-class ComponentEquation(BaseEquation):
-    """Represents a component equation.
-
-    Parameters
-    ----------
-    component : :class:`Component`
-        Component associated with the equation.
-    """
-
-    def __init__(self, component, **kwargs):
-        """Instantiate a new component equation."""
-
-        # call parent constructor
-        super().__init__(**kwargs)
-
-        self.component = component
-
-
-class NodeEquation(BaseEquation):
-    """Represents a node equation.
-
-    Parameters
-    ----------
-    node : :class:`Node`
-        Node associated with the equation.
-    """
-
-    def __init__(self, node, **kwargs):
-        """Instantiate a new node equation."""
-
-        # call parent constructor
-        super().__init__(**kwargs)
-
-        self.node = node
-
-
-class BaseCoefficient(metaclass=abc.ABCMeta):
-    """Represents a coefficient.
-
-    Parameters
-    ----------
-    value : :class:`float`
-        Coefficient value.
-    """
-
-    TYPE = ""
-
-    def __init__(self, value):
-        """Instantiate a new coefficient."""
-        self.value = value
-
-
-class ComponentCoefficient(BaseCoefficient):
-    """Represents a component coefficient.
-
-    Parameters
-    ----------
-    component : :class:`Component`
-        Component this coefficient represents.
-    """
-    def __init__(self, component, **kwargs):
-        super().__init__(**kwargs)
-        self.component = component
-
-
-class ImpedanceCoefficient(ComponentCoefficient):
-    """Represents an impedance coefficient."""
-    TYPE = "impedance"
-
-
-class CurrentCoefficient(ComponentCoefficient):
-    """Represents an current coefficient."""
-    TYPE = "current"
-
-
-class VoltageCoefficient(BaseCoefficient):
-    """Represents a voltage coefficient.
-
-    Parameters
-    ----------
-    node : :class:`Node`
-        Node this voltage coefficient represents.
-    """
-
-    TYPE = "voltage"
-
-    def __init__(self, node, **kwargs):
-        self.node = node
+def _sum_values(values):
+    """Sum of coefficient values, which may be callables accepting a frequency or frequency
+    vector."""
+    if len(values) == 1:
+        return values[0]
 
-        # call parent constructor
-        super().__init__(**kwargs)
+    return lambda frequencies: sum(value(frequencies) for value in values)
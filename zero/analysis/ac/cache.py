@@ -0,0 +1,545 @@
+"""Persistent analysis result cache"""
+
+import os
+import json
+import hashlib
+import logging
+import tempfile
+from numbers import Number
+import click
+import numpy as np
+
+from ... import __version__, PROGRAM
+from ...config import ZeroConfig
+from ...elements import BaseElement
+from ...components import (Component, PassiveComponent, Inductor, OpAmp, Input, Subcircuit,
+                           SubcircuitPort, Node)
+from ...noise import Noise
+from ...data import Series, Response, NoiseDensity, MultiNoiseDensity
+from ...solution import Solution, ResponseBlock
+
+LOGGER = logging.getLogger(__name__)
+CONF = ZeroConfig()
+
+
+class UncacheableError(TypeError):
+    """Analysis parameter without a canonical representation"""
+    pass
+
+
+class ResultCache:
+    """On-disk cache of AC analysis solutions.
+
+    Solutions are stored in files named after the hash of everything that determines them: the
+    analysis type and solver, the circuit's components, values, op-amp parameters and inductor
+    couplings, the input and the other analysis parameters, the frequency vector and the Zero
+    version. A changed circuit therefore has a different key, and stale results are never loaded;
+    they are instead eventually evicted. When the cached files exceed the maximum size, the least
+    recently used are removed.
+
+    Solutions are stored as NumPy ``.npz`` archives of their data, alongside a JSON description of
+    their functions in which the circuit elements and noise sources are identified by name. Loading
+    a solution therefore never executes code from the cache directory. The elements are resolved
+    against the analysed circuit when the solution is loaded. The cache directory is created
+    readable only by the user.
+
+    Parameters
+    ----------
+    path : :class:`str`, optional
+        The cache directory. Defaults to the ``cache.path`` configuration setting or, if that is not
+        set, a directory within the user's Zero configuration directory.
+    max_bytes : :class:`int`, optional
+        The maximum total size of the cached files. Defaults to the ``cache.max_bytes``
+        configuration setting.
+
+    Attributes
+    ----------
+    hits, misses : :class:`int`
+        The number of solutions loaded from the cache, and not found in it, since the last reset.
+    stores, evictions : :class:`int`
+        The number of solutions stored in and evicted from the cache since the last reset.
+    """
+    # Cached file extension.
+    EXTENSION = ".npz"
+
+    def __init__(self, path=None, max_bytes=None):
+        self._path = path
+        self._max_bytes = max_bytes
+        self.reset_statistics()
+
+    @property
+    def path(self):
+        """The cache directory"""
+        path = self._path
+
+        if path is None:
+            path = CONF["cache"]["path"]
+
+        if not path:
+            path = os.path.join(click.get_app_dir(PROGRAM), "cache")
+
+        return os.path.expanduser(path)
+
+    @property
+    def max_bytes(self):
+        """The maximum total size of the cached files"""
+        max_bytes = self._max_bytes
+
+        if max_bytes is None:
+            max_bytes = CONF["cache"]["max_bytes"]
+
+        return int(float(max_bytes))
+
+    def reset_statistics(self):
+        """Reset the hit, miss, store and eviction counters."""
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    @property
+    def statistics(self):
+        """Cache statistics.
+
+        Returns
+        -------
+        :class:`dict`
+            The number of hits, misses, stores and evictions since the last reset.
+        """
+        return {"hits": self.hits, "misses": self.misses, "stores": self.stores,
+                "evictions": self.evictions}
+
+    def key(self, analysis, **parameters):
+        """Cache key of an analysis calculation.
+
+        Parameters
+        ----------
+        analysis : :class:`.BaseAcAnalysis`
+            The analysis.
+        **parameters
+            The parameters the analysis is calculated with.
+
+        Returns
+        -------
+        :class:`str`
+            The key.
+
+        Raises
+        ------
+        :class:`UncacheableError`
+            If a parameter has no canonical representation.
+        """
+        hasher = hashlib.sha256()
+        analysis_type = type(analysis)
+
+        _update(hasher, ("zero", __version__))
+        _update(hasher, ("analysis", f"{analysis_type.__module__}.{analysis_type.__qualname__}",
+                         analysis.solver.NAME, analysis.solver.DTYPE))
+        _update(hasher, ("temperature", CONF["constants"]["T"]))
+
+        if parameters.get("adaptive"):
+            _update(hasher, ("adaptive", CONF["analysis"]["adaptive"]))
+
+        _update(hasher, ("circuit", _circuit_description(analysis.circuit)))
+        _update(hasher, ("parameters", parameters))
+
+        return hasher.hexdigest()
+
+    def get(self, key, circuit):
+        """Load a solution from the cache.
+
+        Parameters
+        ----------
+        key : :class:`str`
+            The cache key.
+        circuit : :class:`.Circuit`
+            The analysed circuit, which contains the elements and noise sources of the solution's
+            functions.
+
+        Returns
+        -------
+        :class:`.Solution` or None
+            The solution, or None if it is not cached.
+        """
+        path = self._file_path(key)
+
+        try:
+            with np.load(path, allow_pickle=False) as archive:
+                solution = _load_solution(archive, circuit)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception as error:
+            # The file is corrupt, from an incompatible version or does not match the circuit.
+            LOGGER.warning("removing unreadable cached result %s: %s", path, error)
+            self._remove(path)
+            self.misses += 1
+            return None
+
+        # Mark the result as recently used.
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        self.hits += 1
+        LOGGER.debug("loaded cached result %s", key)
+        return solution
+
+    def put(self, key, solution):
+        """Store a solution in the cache, evicting the least recently used if necessary.
+
+        Parameters
+        ----------
+        key : :class:`str`
+            The cache key.
+        solution : :class:`.Solution`
+            The solution.
+
+        Raises
+        ------
+        :class:`UncacheableError`
+            If the solution contains functions that cannot be stored.
+        """
+        arrays = _solution_arrays(solution)
+        path = self.path
+        # Other users must not be able to add or change results.
+        os.makedirs(path, mode=0o700, exist_ok=True)
+
+        # Write to a temporary file first so that other processes never read partial results.
+        handle, temporary_path = tempfile.mkstemp(suffix=".tmp", dir=path)
+
+        try:
+            with os.fdopen(handle, "wb") as file:
+                np.savez(file, **arrays)
+
+            os.replace(temporary_path, self._file_path(key))
+        except BaseException:
+            self._remove(temporary_path)
+            raise
+
+        self.stores += 1
+        LOGGER.debug("stored result %s", key)
+        self.evict()
+
+    def evict(self):
+        """Remove the least recently used results until the cache is within its maximum size."""
+        entries = self._entries()
+        size = sum(entry_size for _, entry_size, _ in entries)
+        max_bytes = self.max_bytes
+
+        for path, entry_size, _ in sorted(entries, key=lambda entry: entry[2]):
+            if size <= max_bytes:
+                break
+
+            if self._remove(path):
+                size -= entry_size
+                self.evictions += 1
+                LOGGER.debug("evicted cached result %s", path)
+
+    def clear(self):
+        """Remove every cached result."""
+        for path, _, _ in self._entries():
+            self._remove(path)
+
+    def __len__(self):
+        return len(self._entries())
+
+    @property
+    def size(self):
+        """Total size of the cached files, in bytes"""
+        return sum(entry_size for _, entry_size, _ in self._entries())
+
+    def _file_path(self, key):
+        return os.path.join(self.path, key + self.EXTENSION)
+
+    def _entries(self):
+        """Path, size and modification time of each cached file."""
+        entries = []
+
+        try:
+            files = os.scandir(self.path)
+        except FileNotFoundError:
+            return entries
+
+        with files:
+            for file in files:
+                if not file.name.endswith(self.EXTENSION):
+                    continue
+
+                try:
+                    stat = file.stat()
+                except FileNotFoundError:
+                    # Removed by another process.
+                    continue
+
+                entries.append((file.path, stat.st_size, stat.st_mtime))
+
+        return entries
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return False
+
+        return True
+
+
+# Default result cache.
+RESULT_CACHE = ResultCache()
+
+
+def circuit_digest(circuit):
+    """Hash of the circuit elements that determine analysis results.
+
+    Parameters
+    ----------
+    circuit : :class:`.Circuit`
+        The circuit.
+
+    Returns
+    -------
+    :class:`str`
+        The hash, which changes whenever the circuit's components, values, op-amp parameters or
+        inductor couplings do.
+
+    Raises
+    ------
+    :class:`UncacheableError`
+        If a component property has no canonical representation.
+    """
+    return _digest(_circuit_description(circuit))
+
+
+def _circuit_description(circuit):
+    """Canonical description of the circuit elements that determine analysis results."""
+    description = []
+
+    for component in sorted(circuit.components, key=lambda component: component.name):
+        properties = [type(component).__name__, component.name,
+                      [node.name for node in component.nodes],
+                      sorted(noise.label for noise in component.noise)]
+
+        if isinstance(component, PassiveComponent):
+            properties.append(component.value)
+
+        if isinstance(component, Inductor):
+            properties.append({inductor.name: factor
+                               for inductor, factor in component.coupling_factors.items()})
+
+        if isinstance(component, OpAmp):
+            properties.append(component.params)
+
+        if isinstance(component, Input):
+            properties.extend([component.input_type, component.impedance, component.is_noise])
+
+        if isinstance(component, Subcircuit):
+            properties.extend([[port.name for port in component.ports],
+                               _circuit_description(component.circuit)])
+
+        description.append(properties)
+
+    return description
+
+
+def _solution_arrays(solution):
+    """Arrays to store a solution in, with its functions described by the JSON "metadata" array."""
+    if solution.response_references or solution.noise_references:
+        raise UncacheableError("cannot cache solutions with reference functions")
+
+    arrays = {"frequencies": np.asarray(solution.frequencies)}
+
+    def add(data):
+        name = f"data{len(arrays)}"
+        arrays[name] = np.asarray(data)
+        return name
+
+    groups = []
+
+    for group, functions in solution.stored_functions.items():
+        records = []
+        default_responses = solution.default_responses.get(group, [])
+        default_noise = solution.default_noise.get(group, [])
+        default_noise_sums = solution.default_noise_sums.get(group, [])
+
+        for function in functions:
+            if isinstance(function, ResponseBlock):
+                defaults = [function.sinks.index(response.sink) for response in default_responses
+                            if response.source == function.source and response.sink in function]
+                record = {"type": "block", "source": _element_record(function.source),
+                          "sinks": [_element_record(sink) for sink in function.sinks],
+                          "defaults": defaults}
+                data = function.data
+            elif isinstance(function, Response):
+                record = {"type": "response", "source": _element_record(function.source),
+                          "sink": _element_record(function.sink),
+                          "default": function in default_responses}
+                data = function.series.y
+            elif isinstance(function, NoiseDensity):
+                record = {"type": "noise", "source": _element_record(function.source),
+                          "sink": _element_record(function.sink),
+                          "default": function in default_noise}
+                data = function.series.y
+            elif isinstance(function, MultiNoiseDensity):
+                if function.constituent_noise is None:
+                    constituents = None
+                else:
+                    constituents = add([series.y for series in function.constituent_noise])
+
+                record = {"type": "noise_sum",
+                          "sources": [_element_record(source) for source in function.sources],
+                          "sink": _element_record(function.sink), "label": function.label,
+                          "constituents": constituents, "default": function in default_noise_sums}
+                data = function.series.y
+            else:
+                raise UncacheableError(f"cannot cache solutions with function '{function}'")
+
+            record["data"] = add(data)
+            records.append(record)
+
+        groups.append([group, records])
+
+    metadata = {"name": solution.name, "groups": groups}
+    arrays["metadata"] = np.array(json.dumps(metadata))
+    return arrays
+
+
+def _element_record(element):
+    """Description of a function's source or sink by the names of the circuit elements."""
+    if isinstance(element, Node):
+        return {"node": element.name}
+    if isinstance(element, Input):
+        # The input is added to a copy of the circuit by the analysis, so it is recreated.
+        impedance = float(element.impedance) if element.impedance is not None else None
+        return {"input": [node.name for node in element.nodes], "input_type": element.input_type,
+                "impedance": impedance, "is_noise": element.is_noise}
+    if isinstance(element, SubcircuitPort):
+        return {"port": element.subcircuit.name, "index": element.index}
+    if isinstance(element, Component):
+        return {"component": element.name}
+    if isinstance(element, Noise):
+        return {"noise": element.label}
+
+    raise UncacheableError(f"cannot cache solutions with element '{element!r}'")
+
+
+def _load_solution(archive, circuit):
+    """Solution stored in an archive, with its elements resolved against the circuit."""
+    metadata = json.loads(archive["metadata"].item())
+    frequencies = archive["frequencies"]
+    components = {component.name: component for component in circuit.components}
+    noise_sources = {noise.label: noise for noise in circuit.noise_sources}
+    inputs = {}
+
+    def element(record):
+        if "node" in record:
+            return Node(record["node"])
+        if "input" in record:
+            key = json.dumps(record, sort_keys=True)
+
+            # Functions share the same input.
+            if key not in inputs:
+                inputs[key] = Input([Node(name) for name in record["input"]],
+                                    record["input_type"], impedance=record["impedance"],
+                                    is_noise=record["is_noise"])
+
+            return inputs[key]
+        if "port" in record:
+            return SubcircuitPort(components[record["port"]], record["index"])
+        if "component" in record:
+            return components[record["component"]]
+
+        return noise_sources[record["noise"]]
+
+    solution = Solution(frequencies, name=metadata["name"])
+
+    for group, records in metadata["groups"]:
+        if group == solution.DEFAULT_GROUP_NAME:
+            group = None
+        else:
+            solution.stored_functions.setdefault(group, [])
+
+        for record in records:
+            data = archive[record["data"]]
+
+            if record["type"] == "block":
+                source = element(record["source"])
+                sinks = [element(sink) for sink in record["sinks"]]
+                solution.add_response_data(source, sinks, data, group=group)
+
+                for index in record["defaults"]:
+                    response = Response(source=source, sink=sinks[index],
+                                        series=Series(frequencies, data[index]))
+                    solution.set_response_as_default(response, group=group)
+            elif record["type"] == "response":
+                response = Response(source=element(record["source"]),
+                                    sink=element(record["sink"]), series=Series(frequencies, data))
+                solution.add_response(response, default=record["default"], group=group)
+            elif record["type"] == "noise":
+                noise = NoiseDensity(source=element(record["source"]),
+                                     sink=element(record["sink"]), series=Series(frequencies, data))
+                solution.add_noise(noise, default=record["default"], group=group)
+            else:
+                noise_sum = MultiNoiseDensity(
+                    sources=[element(source) for source in record["sources"]],
+                    sink=element(record["sink"]), series=Series(frequencies, data),
+                    label=record["label"])
+
+                if record["constituents"] is not None:
+                    noise_sum.constituent_noise = [
+                        Series(frequencies, spectral_density)
+                        for spectral_density in archive[record["constituents"]]]
+
+                solution.add_noise_sum(noise_sum, default=record["default"], group=group)
+
+    return solution
+
+
+def _update(hasher, value):
+    """Add the canonical representation of a value to a hash."""
+    if value is None or isinstance(value, (bool, np.bool_, str)):
+        hasher.update(f"{type(value).__name__}:{value};".encode())
+    elif isinstance(value, (BaseElement, Noise)):
+        # Elements and noise sources are identified within the circuit by their names.
+        hasher.update(f"{type(value).__name__}:{value.label};".encode())
+    elif isinstance(value, Number):
+        hasher.update(f"number:{complex(value)!r};".encode())
+    elif isinstance(value, dict):
+        hasher.update(f"dict:{len(value)}(".encode())
+
+        # Keys are sorted by their canonical representation.
+        for key in sorted(value, key=_digest):
+            _update(hasher, key)
+            _update(hasher, value[key])
+
+        hasher.update(b")")
+    elif isinstance(value, (set, frozenset)):
+        hasher.update(f"set:{len(value)}(".encode())
+
+        for digest in sorted(_digest(item) for item in value):
+            hasher.update(digest.encode())
+
+        hasher.update(b")")
+    elif isinstance(value, (list, tuple)):
+        hasher.update(f"sequence:{len(value)}(".encode())
+
+        for item in value:
+            _update(hasher, item)
+
+        hasher.update(b")")
+    elif isinstance(value, np.ndarray) and value.dtype.kind in "biufc":
+        value = np.ascontiguousarray(value)
+        hasher.update(f"array:{value.dtype.str}:{value.shape}(".encode())
+        hasher.update(value.tobytes())
+        hasher.update(b")")
+    else:
+        raise UncacheableError(f"cannot cache analyses with parameter '{value!r}'")
+
+
+def _digest(value):
+    """Hash of the canonical representation of a value."""
+    hasher = hashlib.sha256()
+    _update(hasher, value)
+    return hasher.hexdigest()
@@ -0,0 +1,424 @@
+"""Chunked solving of AC analysis circuit matrices"""
+
+import os
+import logging
+from concurrent.futures import (Executor, ThreadPoolExecutor, ProcessPoolExecutor, wait,
+                                FIRST_COMPLETED)
+import numpy as np
+
+from .update import FactorisedSweep
+from ...config import ZeroConfig
+
+LOGGER = logging.getLogger(__name__)
+CONF = ZeroConfig()
+
+
+class ChunkSolverMixin:
+    """Mixin solving an AC analysis's circuit matrices for chunks of frequencies.
+
+    The chunks are solved in turn or, in parallel mode, on an executor. Incremental analyses instead
+    solve every frequency in turn, retaining the factorisations.
+    """
+    def solve(self):
+        """Solve the circuit.
+
+        Solves matrix equation Ax = b, where A is the circuit matrix and b is the right hand side.
+        The frequencies are solved in chunks, either in turn or, in parallel mode, on an executor.
+        In batched mode, the circuit matrices for each chunk are assembled and solved together;
+        otherwise each frequency is solved in turn.
+
+        Returns
+        -------
+        :class:`~np.ndarray`
+            The inverse of the circuit matrix.
+        """
+        # right hand side to solve against
+        rhs = self.right_hand_side()
+
+        return self.solve_block(rhs)[:, 0, :]
+
+    def solve_block(self, rhs):
+        """Solve the circuit against a block of right hand sides.
+
+        Each frequency's circuit matrix is factorised once and solved against every column of the
+        right hand side.
+
+        Parameters
+        ----------
+        rhs : :class:`~np.ndarray`
+            The right hand sides, with shape (dim_size, n_rhs).
+
+        Returns
+        -------
+        :class:`~np.ndarray`
+            The solutions, with shape (dim_size, n_rhs, n_freqs).
+        """
+        return self._solve(rhs)
+
+    def solve_block_and_transpose(self, rhs, transposed_rhs):
+        """Solve the circuit and its transpose against blocks of right hand sides.
+
+        Solves Ax = b and A^T y = c, where A is the circuit matrix. In serial mode, each frequency's
+        circuit matrix is factorised once and the factorisation used to solve both systems. In
+        batched mode, the circuit matrices are assembled once for both systems.
+
+        Parameters
+        ----------
+        rhs : :class:`~np.ndarray`
+            The right hand sides b, with shape (dim_size, n_rhs).
+        transposed_rhs : :class:`~np.ndarray`
+            The right hand sides c, with shape (dim_size, n_transposed_rhs).
+
+        Returns
+        -------
+        :class:`~np.ndarray`
+            The solutions x, with shape (dim_size, n_rhs, n_freqs).
+        :class:`~np.ndarray`
+            The solutions y, with shape (dim_size, n_transposed_rhs, n_freqs).
+        """
+        return self._solve(rhs, transposed_rhs)
+
+    def _solve(self, rhs, transposed_rhs=None, rows=None, transposed_rows=None):
+        """Solve the circuit, and optionally its transpose, for each chunk of frequencies.
+
+        If `rows` or `transposed_rows` are specified, only the solutions' elements with those
+        matrix indices are kept, in that order. This reduces the memory used by long sweeps.
+        """
+        for subcircuit in self._current_circuit.subcircuits:
+            # Compute the subcircuit's port relations for every frequency at once, rather than for
+            # each chunk.
+            self._macromodel(subcircuit).relations(np.unique(self.frequencies))
+
+        if self.incremental:
+            solutions = self._solve_incremental(rhs, transposed_rhs)
+
+            if transposed_rhs is None:
+                return _select_rows(solutions, rows)
+
+            return _select_rows(solutions[0], rows), _select_rows(solutions[1], transposed_rows)
+
+        # results matrices
+        n_rows = self.dim_size if rows is None else len(rows)
+        results = self.solver.full((n_rows, rhs.shape[1], self.n_freqs))
+
+        if transposed_rhs is not None:
+            n_rows = self.dim_size if transposed_rows is None else len(transposed_rows)
+            transposed_results = self.solver.full((n_rows, transposed_rhs.shape[1],
+                                                   self.n_freqs))
+
+        chunks = [slice(start, start + self.chunk_size)
+                  for start in range(0, self.n_freqs, self.chunk_size)]
+        reductions = self._reductions(rhs, transposed_rhs)
+
+        if self.parallel:
+            solved_chunks = self._solve_chunks_parallel(chunks, rhs, transposed_rhs, reductions)
+        else:
+            solved_chunks = self._solve_chunks_serial(chunks, rhs, transposed_rhs, reductions)
+
+        # create chunk generator with progress bar
+        chunk_gen = self.progress(solved_chunks, len(chunks), update=1)
+
+        for chunk, chunk_results, chunk_transposed_results in chunk_gen:
+            results[:, :, chunk] = _select_rows(chunk_results, rows)
+
+            if transposed_rhs is not None:
+                transposed_results[:, :, chunk] = _select_rows(chunk_transposed_results,
+                                                               transposed_rows)
+
+        if transposed_rhs is None:
+            return results
+
+        return results, transposed_results
+
+    def _solve_incremental(self, rhs, transposed_rhs=None):
+        """Solve the circuit, and optionally its transpose, using retained factorisations.
+
+        If the factorisations retained from the previous solve are for the same frequencies and
+        matrix shape, the differences between the current and factorised circuit matrices are
+        applied as low-rank updates (see :class:`.FactorisedSweep`). Frequencies at which the
+        update's backward error exceeds the ``algebra.update_tolerance`` configuration setting, or
+        all frequencies if its rank exceeds the ``algebra.update_max_rank`` setting, are
+        refactorised instead. Otherwise, every frequency is factorised and the factorisations
+        retained.
+        """
+        values = self.stamp_pattern.values(self.frequencies)
+        sweep = self._factorised_sweep
+
+        if sweep is not None and sweep.is_compatible(self.frequencies, self.stamp_pattern):
+            # update the retained factorisations
+            sweep.element_index_map = self.element_index_map
+            results, transposed_results = sweep.solve(
+                self.stamp_pattern, values, self.solver, rhs, transposed_rhs,
+                max_rank=int(CONF["algebra"]["update_max_rank"]),
+                tolerance=float(CONF["algebra"]["update_tolerance"]))
+        else:
+            results = self.get_empty_results_matrix(rhs.shape[1], self.n_freqs)
+
+            if transposed_rhs is not None:
+                transposed_results = self.get_empty_results_matrix(transposed_rhs.shape[1],
+                                                                   self.n_freqs)
+
+            factorisations = []
+            solutions = self._factorise_and_solve(values, factorisations, rhs, transposed_rhs)
+
+            # create solution generator with progress bar
+            solution_gen = self.progress(solutions, self.n_freqs)
+
+            for index, (solution, transposed_solution) in enumerate(solution_gen):
+                results[:, :, index] = solution
+
+                if transposed_rhs is not None:
+                    transposed_results[:, :, index] = transposed_solution
+
+            # retain the factorisations for subsequent solves
+            self._factorised_sweep = FactorisedSweep(
+                self.frequencies, self.element_index_map, self.stamp_pattern.rows,
+                self.stamp_pattern.columns, values, factorisations)
+
+        if transposed_rhs is None:
+            return results
+
+        return results, transposed_results
+
+    def _factorise_and_solve(self, values, factorisations, rhs, transposed_rhs):
+        """Factorise the circuit matrix at each frequency, yielding the solutions.
+
+        The factorisations are appended to `factorisations`.
+        """
+        for data in values:
+            if self.solver.is_sparse:
+                matrix = self.stamp_pattern.matrix_from_values(data)
+            else:
+                matrix = self.stamp_pattern.full_from_values(data)
+
+            factorisation = self.solver.factorise(matrix)
+            factorisations.append(factorisation)
+            solution = factorisation.solve(rhs).reshape(self.dim_size, -1)
+
+            if transposed_rhs is None:
+                yield solution, None
+            else:
+                yield solution, factorisation.solve(transposed_rhs,
+                                                    trans="T").reshape(self.dim_size, -1)
+
+    def _solve_chunks_serial(self, chunks, rhs, transposed_rhs, reductions=()):
+        """Solve chunks of frequencies in turn, yielding each chunk's results."""
+        for chunk in chunks:
+            yield (chunk, *_solve_chunk(self.stamp_pattern, self._chunk_values(chunk), self.solver,
+                                       rhs, transposed_rhs, self.batch, reductions))
+
+    def _solve_chunks_parallel(self, chunks, rhs, transposed_rhs, reductions=()):
+        """Solve chunks of frequencies on an executor, yielding each chunk's results as they
+        become available."""
+        if isinstance(self.parallel, Executor):
+            # use the executor as given, leaving it to the caller to shut it down
+            executor = self.parallel
+            own_executor = False
+        else:
+            executor = self._create_executor()
+            own_executor = True
+
+        # the compiled stamp pattern's value generators cannot be pickled, so workers receive only
+        # its structure and the values computed for their chunk
+        pattern = self.stamp_pattern.without_generators()
+
+        # limit the chunks awaiting solution, and therefore the memory used by their values
+        max_pending = 2 * self.parallel_workers
+
+        try:
+            pending = {}
+            remaining = iter(chunks)
+
+            while True:
+                for chunk in remaining:
+                    future = executor.submit(_solve_chunk, pattern, self._chunk_values(chunk),
+                                             self.solver, rhs, transposed_rhs, self.batch,
+                                             reductions)
+                    pending[future] = chunk
+
+                    if len(pending) >= max_pending:
+                        break
+
+                if not pending:
+                    break
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    yield (pending.pop(future), *future.result())
+        finally:
+            if own_executor:
+                executor.shutdown(cancel_futures=True)
+
+    def _chunk_values(self, chunk):
+        """Circuit matrix stored element values for each frequency in the chunk."""
+        return self.stamp_pattern.values(self.frequencies[chunk])
+
+    def _create_executor(self):
+        """Create executor for parallel sweeps."""
+        if self.parallel is True:
+            # LAPACK releases the GIL while solving stacks of matrices, but the per-frequency
+            # overhead of the serial solve holds it
+            kind = "thread" if self.batch else "process"
+        else:
+            kind = self.parallel
+
+        if kind == "thread":
+            return ThreadPoolExecutor(max_workers=self.parallel_workers)
+        elif kind == "process":
+            return ProcessPoolExecutor(max_workers=self.parallel_workers)
+
+        raise ValueError(f"unrecognised parallel mode '{self.parallel}' (must be 'thread', "
+                         "'process', a boolean or an executor)")
+
+    @property
+    def parallel_workers(self):
+        """Number of workers used by executors created for parallel sweeps
+
+        This is set by the ``algebra.parallel_workers`` configuration setting,
+        or the number of processors if it is 0.
+
+        Returns
+        -------
+        :class:`int`
+            number of workers
+        """
+        workers = int(CONF["algebra"]["parallel_workers"])
+
+        if workers <= 0:
+            workers = os.cpu_count() or 1
+
+        return workers
+
+    @property
+    def chunk_size(self):
+        """Number of frequencies solved in each chunk
+
+        The frequencies are split into at least 100 chunks, so that progress is
+        reported every 1% of the way there, and parallel sweeps can balance the
+        load between workers. In batched mode, chunks are further limited to
+        :attr:`batch_size` frequencies.
+
+        Returns
+        -------
+        :class:`int`
+            number of frequencies per chunk
+        """
+        size = max(1, -(-self.n_freqs // 100))
+
+        if self.batch:
+            size = min(size, self.batch_size)
+
+        return size
+
+    @property
+    def batch_size(self):
+        """Number of frequencies solved together in batched mode
+
+        This is the number of full circuit matrices that fit within the memory
+        limit set by the ``algebra.batch_max_bytes`` configuration setting.
+
+        Returns
+        -------
+        :class:`int`
+            number of frequencies per batch
+        """
+        matrix_bytes = self.dim_size ** 2 * np.dtype(self.solver.MATRIX_DTYPE).itemsize
+        return max(1, int(float(CONF["algebra"]["batch_max_bytes"]) // matrix_bytes))
+
+
+def _select_rows(results, rows=None):
+    """Select rows of a results matrix, or all rows if `rows` is None."""
+    if rows is None:
+        return results
+
+    return results[rows]
+
+
+def _solve_chunk(pattern, values, solver, rhs, transposed_rhs=None, batch=False, reductions=()):
+    """Solve the circuit, and optionally its transpose, for a chunk of frequencies.
+
+    This is a module level function so that it can be sent to worker processes.
+
+    Parameters
+    ----------
+    pattern : :class:`.StampPattern`
+        The circuit matrix stamp pattern.
+    values : :class:`~np.ndarray`
+        The circuit matrix stored element values, with shape (n_freqs, nnz).
+    solver : :class:`.BaseSolver`
+        The solver.
+    rhs : :class:`~np.ndarray`
+        The right hand sides, with shape (dim_size, n_rhs).
+    transposed_rhs : :class:`~np.ndarray`, optional
+        The right hand sides for the transposed system, with shape (dim_size, n_transposed_rhs).
+    batch : :class:`bool`, optional
+        Whether to assemble and solve the chunk's circuit matrices together.
+    reductions : sequence of :class:`.BlockPattern` or :class:`.CompactPattern`, optional
+        Reductions of the circuit matrices, each of the previous reduction's matrices, to solve
+        instead. The full solutions are recovered from those of the reduced matrices.
+
+    Returns
+    -------
+    :class:`~np.ndarray`
+        The solutions, with shape (dim_size, n_rhs, n_freqs).
+    :class:`~np.ndarray` or None
+        The solutions of the transposed system, with shape (dim_size, n_transposed_rhs, n_freqs),
+        or None if no transposed right hand sides were specified.
+    """
+    if reductions:
+        reduction = reductions[0]
+        results, transposed_results = _solve_chunk(reduction.pattern, reduction.values(values),
+                                                   solver, reduction.reduce(rhs),
+                                                   reduction.reduce(transposed_rhs), batch,
+                                                   reductions[1:])
+
+        return (reduction.expand(results, values),
+                reduction.expand(transposed_results, values, transpose=True))
+
+    dim_size = pattern.shape[0]
+    n_freqs = len(values)
+    results = np.zeros((dim_size, rhs.shape[1], n_freqs), dtype=solver.DTYPE)
+    transposed_results = None
+
+    if transposed_rhs is not None:
+        transposed_results = np.zeros((dim_size, transposed_rhs.shape[1], n_freqs),
+                                      dtype=solver.DTYPE)
+
+    if batch:
+        # full matrices for this chunk of frequencies
+        matrices = pattern.stack_from_values(values)
+
+        try:
+            # solve all of the chunk's systems together
+            results[...] = np.moveaxis(solver.solve_batch(matrices, rhs), 0, -1)
+
+            if transposed_rhs is not None:
+                transposed_results[...] = np.moveaxis(
+                    solver.solve_batch(np.swapaxes(matrices, 1, 2), transposed_rhs), 0, -1)
+
+            return results, transposed_results
+        except np.linalg.LinAlgError:
+            # A singular matrix fails the whole batch, so solve the chunk's frequencies in turn
+            # instead, giving NaN solutions at the singular frequencies as in serial mode.
+            LOGGER.debug("singular matrix in batch of %i frequencies; solving them in turn",
+                         n_freqs)
+
+    for index, data in enumerate(values):
+        # get matrix for this frequency
+        if solver.is_sparse:
+            matrix = pattern.matrix_from_values(data)
+        else:
+            matrix = pattern.full_from_values(data)
+
+        if transposed_rhs is None:
+            # call solver function
+            results[:, :, index] = solver.solve(matrix, rhs).reshape(dim_size, -1)
+        else:
+            # solve both systems with the same factorisation
+            factorisation = solver.factorise(matrix)
+            results[:, :, index] = factorisation.solve(rhs).reshape(dim_size, -1)
+            transposed_results[:, :, index] = factorisation.solve(
+                transposed_rhs, trans="T").reshape(dim_size, -1)
+
+    return results, transposed_results
@@ -0,0 +1,214 @@
+"""Circuits compiled for repeated analyses"""
+
+import logging
+import numpy as np
+
+from .signal import AcSignalAnalysis
+from .noise import AcNoiseAnalysis
+from .cache import UncacheableError, circuit_digest
+from ...components import Node
+
+LOGGER = logging.getLogger(__name__)
+
+
+class CompiledCircuit:
+    """Circuit compiled for repeated signal and noise analyses.
+
+    Each analysis copies the circuit, adds an input component, validates the result and compiles
+    the circuit matrix stamp pattern before it solves anything. A compiled circuit does this once
+    for each input, and keeps the results for subsequent calculations with that input. These then
+    only evaluate the circuit matrices at the requested frequencies, once for each frequency
+    vector, and solve them. Calculations with different frequencies, sinks or, for noise analyses,
+    noise sinks and sums reuse the same compiled input.
+
+    The compiled inputs are discarded when the circuit changes: before each calculation, the hash
+    of the circuit's components, values, op-amp parameters and inductor couplings is compared to
+    that of the circuit the inputs were compiled for.
+
+    Parameters
+    ----------
+    circuit : :class:`.Circuit`
+        The circuit to compile.
+    **kwargs
+        Options for the analyses, e.g. `batch` or `print_progress`. See :class:`.BaseAcAnalysis`.
+        Results are never stored in the result cache.
+    """
+    def __init__(self, circuit, **kwargs):
+        if kwargs.get("incremental"):
+            raise ValueError("compiled circuits cannot be solved incrementally")
+
+        kwargs["cache"] = False
+
+        self.circuit = circuit
+        self._analysis_kwargs = kwargs
+        self._digest = None
+
+        # Analyses retaining each compiled input.
+        self._signal_analyses = {}
+        self._noise_analyses = {}
+
+    @property
+    def n_inputs(self):
+        """Number of compiled inputs."""
+        return len(self._signal_analyses) + len(self._noise_analyses)
+
+    def invalidate(self):
+        """Discard the compiled inputs."""
+        self._digest = None
+        self._signal_analyses.clear()
+        self._noise_analyses.clear()
+
+    def _check(self):
+        """Discard the compiled inputs if the circuit has changed."""
+        try:
+            digest = circuit_digest(self.circuit)
+        except UncacheableError as error:
+            # Changes cannot be detected, so the circuit is compiled every time.
+            LOGGER.debug("recompiling circuit: %s", error)
+            digest = None
+
+        if digest is None or digest != self._digest:
+            if self.n_inputs:
+                LOGGER.debug("circuit changed; discarding %i compiled input(s)", self.n_inputs)
+
+            self.invalidate()
+            self._digest = digest
+
+    def _analysis(self, analyses, analysis_type, input_type, **inputs):
+        """Get the analysis retaining the compiled input, creating it if necessary."""
+        self._check()
+
+        # Nodes are identified by name, so they can be specified either way.
+        key = (input_type.lower(), tuple(sorted(
+            (name, value.name if isinstance(value, Node) else value)
+            for name, value in inputs.items())))
+
+        if key not in analyses:
+            analyses[key] = analysis_type(circuit=self.circuit, **self._analysis_kwargs)
+
+        return analyses[key]
+
+    def solve_signal(self, frequencies, input_type, sinks=None, node=None, node_p=None,
+                     node_n=None, **kwargs):
+        """Calculate responses.
+
+        Parameters
+        ----------
+        frequencies : :class:`np.ndarray` or sequence
+            The frequency vector to calculate the responses with.
+        input_type : str
+            Input type, either "voltage" or "current".
+        sinks : sequence of :class:`str`, :class:`.Node` or :class:`.Component`, optional
+            The elements to calculate responses to. Defaults to every component and node.
+        node, node_p, node_n : :class:`.Node`
+            The node or nodes to make the input. The `node` parameter sets a single, grounded input,
+            whereas `node_p` and `node_n` together create a floating input.
+
+        Other Parameters
+        ----------------
+        adaptive, max_solves, print_equations, print_matrix
+            See :meth:`.AcSignalAnalysis.calculate`.
+
+        Returns
+        -------
+        :class:`~.solution.Solution`
+            Solution containing the responses.
+        """
+        analysis = self._analysis(self._signal_analyses, _CompiledAcSignalAnalysis, input_type,
+                                  node=node, node_p=node_p, node_n=node_n)
+        return analysis.calculate(input_type, frequencies=frequencies, sinks=sinks, node=node,
+                                  node_p=node_p, node_n=node_n, **kwargs)
+
+    def solve_noise(self, frequencies, sink, input_type, impedance=None, node=None, node_p=None,
+                    node_n=None, **kwargs):
+        """Calculate noise from circuit elements at a particular element.
+
+        Parameters
+        ----------
+        frequencies : :class:`np.ndarray` or sequence
+            The frequency vector to calculate the noise with.
+        sink : str or :class:`.Component` or :class:`.Node`
+            The element to calculate noise at.
+        input_type : str
+            Input type, either "voltage" or "current".
+        impedance : float or :class:`.Quantity`, optional
+            Input impedance. If None, the default is used.
+        node, node_p, node_n : :class:`.Node`
+            The node or nodes to make the input. The `node` parameter sets a single, grounded input,
+            whereas `node_p` and `node_n` together create a floating input.
+
+        Other Parameters
+        ----------------
+        incoherent_sum, input_refer, responses, adaptive, max_solves, print_equations, print_matrix
+            See :meth:`.AcNoiseAnalysis.calculate`.
+
+        Returns
+        -------
+        :class:`~.solution.Solution`
+            Solution containing the noise spectra at the sink.
+        """
+        if impedance is None:
+            LOGGER.warning(f"assuming default input impedance of "
+                           f"{AcNoiseAnalysis.DEFAULT_INPUT_IMPEDANCE}")
+            impedance = AcNoiseAnalysis.DEFAULT_INPUT_IMPEDANCE
+
+        analysis = self._analysis(self._noise_analyses, _CompiledAcNoiseAnalysis, input_type,
+                                  impedance=impedance, node=node, node_p=node_p, node_n=node_n)
+        return analysis.calculate(input_type, sink=sink, frequencies=frequencies,
+                                  impedance=impedance, node=node, node_p=node_p, node_n=node_n,
+                                  **kwargs)
+
+
+class CompiledAnalysisMixin:
+    """Mixin retaining an analysis's circuit set up between calculations.
+
+    The circuit copy with the input added, its element index map and the compiled stamp pattern
+    are kept when the analysis is reset, so the analysis must always be calculated with the same
+    circuit and input. The circuit matrices' stored element values are computed once for each
+    frequency vector.
+    """
+    # Attributes set up with the circuit.
+    SET_UP_ATTRIBUTES = ("input_type", "_current_circuit", "_node_sources", "_node_sinks",
+                         "_element_index_map", "_stamp_pattern", "_matrix_reductions")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self._set_up = None
+        # Frequencies and the stored element values computed for them.
+        self._values = None
+
+    def reset(self):
+        """Reset state of the analysis, keeping the circuit set up"""
+        super().reset()
+
+        if self._set_up is not None:
+            for name, value in self._set_up.items():
+                setattr(self, name, value)
+
+    def _set_up_circuit(self, input_type, **inputs):
+        if self._set_up is not None:
+            return
+
+        super()._set_up_circuit(input_type, **inputs)
+
+        # Compile the stamp pattern, which also sets up the sources and sinks.
+        _ = self.stamp_pattern
+        self._set_up = {name: getattr(self, name) for name in self.SET_UP_ATTRIBUTES}
+
+    def _chunk_values(self, chunk):
+        """Circuit matrix stored element values for each frequency in the chunk."""
+        if self._values is None or not np.array_equal(self._values[0], self.frequencies):
+            self._values = (self.frequencies, self.stamp_pattern.values(self.frequencies))
+
+        return self._values[1][chunk]
+
+
+class _CompiledAcSignalAnalysis(CompiledAnalysisMixin, AcSignalAnalysis):
+    """AC signal analysis retaining its circuit set up"""
+    pass
+
+
+class _CompiledAcNoiseAnalysis(CompiledAnalysisMixin, AcNoiseAnalysis):
+    """AC noise analysis retaining its circuit set up"""
+    pass
@@ -0,0 +1,125 @@
+"""Circuit matrix equations and coefficients"""
+
+import abc
+
+
+class BaseEquation(metaclass=abc.ABCMeta):
+    """Represents an equation.
+
+    Parameters
+    ----------
+    coefficients : sequence of :class:`BaseCoefficient`
+        Coefficients that make up the equation.
+    """
+
+    def __init__(self, coefficients):
+        """Instantiate a new equation."""
+
+        self.coefficients = []
+
+        for coefficient in coefficients:
+            self.add_coefficient(coefficient)
+
+    def add_coefficient(self, coefficient):
+        """Add coefficient to equation.
+
+        Parameters
+        ----------
+        coefficient : :class:`BaseCoefficient`
+            Coefficient to add.
+        """
+
+        self.coefficients.append(coefficient)
+
+
+class ComponentEquation(BaseEquation):
+    """Represents a component equation.
+
+    Parameters
+    ----------
+    component : :class:`Component`
+        Component associated with the equation.
+    """
+
+    def __init__(self, component, **kwargs):
+        """Instantiate a new component equation."""
+
+        # call parent constructor
+        super().__init__(**kwargs)
+
+        self.component = component
+
+
+class NodeEquation(BaseEquation):
+    """Represents a node equation.
+
+    Parameters
+    ----------
+    node : :class:`Node`
+        Node associated with the equation.
+    """
+
+    def __init__(self, node, **kwargs):
+        """Instantiate a new node equation."""
+
+        # call parent constructor
+        super().__init__(**kwargs)
+
+        self.node = node
+
+
+class BaseCoefficient(metaclass=abc.ABCMeta):
+    """Represents a coefficient.
+
+    Parameters
+    ----------
+    value : :class:`float`
+        Coefficient value.
+    """
+
+    TYPE = ""
+
+    def __init__(self, value):
+        """Instantiate a new coefficient."""
+        self.value = value
+
+
+class ComponentCoefficient(BaseCoefficient):
+    """Represents a component coefficient.
+
+    Parameters
+    ----------
+    component : :class:`Component`
+        Component this coefficient represents.
+    """
+    def __init__(self, component, **kwargs):
+        super().__init__(**kwargs)
+        self.component = component
+
+
+class ImpedanceCoefficient(ComponentCoefficient):
+    """Represents an impedance coefficient."""
+    TYPE = "impedance"
+
+
+class CurrentCoefficient(ComponentCoefficient):
+    """Represents an current coefficient."""
+    TYPE = "current"
+
+
+class VoltageCoefficient(BaseCoefficient):
+    """Represents a voltage coefficient.
+
+    Parameters
+    ----------
+    node : :class:`Node`
+        Node this voltage coefficient represents.
+    """
+
+    TYPE = "voltage"
+
+    def __init__(self, node, **kwargs):
+        self.node = node
+
+        # call parent constructor
+        super().__init__(**kwargs)
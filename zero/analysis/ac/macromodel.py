@@ -0,0 +1,268 @@
+"""Subcircuit port macromodels"""
+
+import logging
+from collections import OrderedDict
+import numpy as np
+
+from .cache import circuit_digest, UncacheableError
+
+LOGGER = logging.getLogger(__name__)
+
+
+class PortMacromodel:
+    """Representation of a subcircuit by relations between the voltages at, and currents into, its
+    ports.
+
+    With currents :math:`J` flowing into the subcircuit at its ports, the subcircuit's circuit
+    matrix equations are :math:`M x + N J = e`, where :math:`N` adds each port's current to its
+    node's current equation and :math:`e` is the right hand side of a noise source in the
+    subcircuit. The unknowns :math:`x` are partitioned into the port node voltages, :math:`V_P`, and
+    the remaining, interior, unknowns, :math:`x_I`. The interior unknowns are eliminated using a
+    basis :math:`W` of the left null space of :math:`M_{:I}`, computed by QR decomposition, leaving
+    one relation for each port:
+
+    .. math::
+
+        W M_{:P} V_P + W N J = W e.
+
+    Unlike admittance or impedance parameters, which these relations reduce to when
+    :math:`W N` or :math:`W M_{:P}` are invertible, respectively, the relations exist for any
+    subcircuit whose interior unknowns are determined by its port voltages and currents, including
+    those with ports driven by op-amp outputs or left open.
+
+    Parameters
+    ----------
+    pattern : :class:`.StampPattern`
+        The subcircuit's circuit matrix stamp pattern.
+    ports : sequence of :class:`int`
+        The circuit matrix indices of the port node voltages, which are also those of the port
+        nodes' current equations.
+    noise_labels : sequence of :class:`str`
+        The labels of the noise sources in the subcircuit's circuit.
+    noise_excitation : callable
+        Callable returning the right hand sides of the noise sources for a frequency vector, with
+        shape (dim_size, n_noise, n_freqs).
+    """
+    # Maximum number of frequency vectors to retain relations for.
+    MAX_FREQUENCY_VECTORS = 8
+
+    def __init__(self, pattern, ports, noise_labels, noise_excitation):
+        self.pattern = pattern
+        self.ports = np.asarray(ports, dtype=int)
+        self.noise_labels = list(noise_labels)
+        self._noise_excitation = noise_excitation
+
+        is_interior = np.ones(pattern.shape[0], dtype=bool)
+        is_interior[self.ports] = False
+        self.interior = np.flatnonzero(is_interior)
+
+        # Relations computed for recent frequency vectors.
+        self._relations = OrderedDict()
+        self.n_computations = 0
+
+    @property
+    def n_ports(self):
+        """The number of ports."""
+        return len(self.ports)
+
+    def relations(self, frequencies):
+        """Port relations for a frequency vector.
+
+        Relations are retained for the most recently requested frequency vectors, and the relations
+        for a subset of a retained vector are taken from those of the vector. The coefficients of
+        each pair of ports, which are requested separately, are therefore computed together, and
+        the relations for a whole frequency grid can be computed at once before the grid is solved
+        in chunks.
+
+        Parameters
+        ----------
+        frequencies : :class:`np.ndarray` or sequence
+            The frequencies to compute the relations for.
+
+        Returns
+        -------
+        voltage_coefficients : :class:`np.ndarray`
+            The coefficients of the port voltages, with shape (n_freqs, n_ports, n_ports).
+        current_coefficients : :class:`np.ndarray`
+            The coefficients of the port currents, with shape (n_freqs, n_ports, n_ports).
+        noise_excitations : :class:`np.ndarray`
+            The right hand sides of the noise sources, with shape (n_ports, n_noise, n_freqs).
+        """
+        frequencies = np.atleast_1d(np.asarray(frequencies, dtype=float))
+        key = frequencies.tobytes()
+
+        if key in self._relations:
+            self._relations.move_to_end(key)
+            return self._relations[key][1]
+
+        for grid, relations in reversed(self._relations.values()):
+            indices = _subset_indices(grid, frequencies)
+
+            if indices is not None:
+                voltage_coefficients, current_coefficients, noise_excitations = relations
+                return (voltage_coefficients[indices], current_coefficients[indices],
+                        noise_excitations[..., indices])
+
+        relations = self._compute(frequencies)
+        self._relations[key] = (frequencies, relations)
+
+        if len(self._relations) > self.MAX_FREQUENCY_VECTORS:
+            self._relations.popitem(last=False)
+
+        return relations
+
+    def _compute(self, frequencies):
+        """Compute the port relations for a frequency vector."""
+        LOGGER.debug("computing %i port relations at %i frequencies", self.n_ports,
+                     len(frequencies))
+        self.n_computations += 1
+
+        matrices = self.pattern.stack(frequencies)
+
+        # The last columns of the complete QR decomposition's unitary factor span the left null
+        # space of the interior columns.
+        unitary, _ = np.linalg.qr(matrices[:, :, self.interior], mode="complete")
+        basis = np.conj(np.swapaxes(unitary[:, :, len(self.interior):], 1, 2))
+
+        # Right hand sides with shape (n_freqs, dim_size, n_noise).
+        excitations = np.moveaxis(self._noise_excitation(frequencies), 2, 0)
+
+        voltage_coefficients = basis @ matrices[:, :, self.ports]
+        current_coefficients = basis[:, :, self.ports]
+        noise_excitations = basis @ excitations
+
+        return voltage_coefficients, current_coefficients, np.moveaxis(noise_excitations, 0, 2)
+
+    def voltage_coefficient(self, port, other):
+        """Callable returning the coefficient of a port voltage in a port's relation.
+
+        Parameters
+        ----------
+        port : :class:`int`
+            The index of the port whose relation contains the coefficient.
+        other : :class:`int`
+            The index of the port whose voltage the coefficient multiplies.
+
+        Returns
+        -------
+        callable
+            Callable returning the coefficient given a frequency or frequency vector.
+        """
+        return self._coefficient(0, port, other)
+
+    def current_coefficient(self, port, other):
+        """Callable returning the coefficient of a port current in a port's relation.
+
+        Parameters
+        ----------
+        port : :class:`int`
+            The index of the port whose relation contains the coefficient.
+        other : :class:`int`
+            The index of the port whose current the coefficient multiplies.
+
+        Returns
+        -------
+        callable
+            Callable returning the coefficient given a frequency or frequency vector.
+        """
+        return self._coefficient(1, port, other)
+
+    def _coefficient(self, kind, port, other):
+        def value(frequencies):
+            coefficients = self.relations(frequencies)[kind][:, port, other]
+
+            if np.ndim(frequencies) == 0:
+                return coefficients[0]
+
+            return coefficients
+
+        return value
+
+    def noise_excitation(self, label, frequencies):
+        """Right hand side of a noise source in the subcircuit's port relations.
+
+        Parameters
+        ----------
+        label : :class:`str`
+            The noise source label.
+        frequencies : :class:`np.ndarray` or sequence
+            The frequencies to compute the right hand side for.
+
+        Returns
+        -------
+        :class:`np.ndarray`
+            The right hand side per unit noise, with shape (n_ports, n_freqs).
+        """
+        return self.relations(frequencies)[2][:, self.noise_labels.index(label), :]
+
+
+class MacromodelCache:
+    """Cache of subcircuit port macromodels.
+
+    Macromodels are keyed by the subcircuit's circuit and ports, so subcircuits with identical
+    contents, e.g. repeated channels, and analyses of the same circuit share their macromodel.
+
+    Parameters
+    ----------
+    max_size : :class:`int`, optional
+        The maximum number of macromodels to retain.
+    """
+    def __init__(self, max_size=32):
+        self.max_size = int(max_size)
+        self._macromodels = OrderedDict()
+
+    def get(self, subcircuit, factory):
+        """Get the macromodel for a subcircuit, creating it if necessary.
+
+        Parameters
+        ----------
+        subcircuit : :class:`.Subcircuit`
+            The subcircuit.
+        factory : callable
+            Callable returning a new macromodel for the subcircuit.
+
+        Returns
+        -------
+        :class:`PortMacromodel`
+            The macromodel.
+        """
+        try:
+            key = (circuit_digest(subcircuit.circuit),
+                   tuple(port.name for port in subcircuit.ports))
+        except UncacheableError:
+            LOGGER.debug("subcircuit '%s' macromodel cannot be cached", subcircuit.name)
+            return factory()
+
+        if key in self._macromodels:
+            self._macromodels.move_to_end(key)
+            return self._macromodels[key]
+
+        macromodel = factory()
+        self._macromodels[key] = macromodel
+
+        if len(self._macromodels) > self.max_size:
+            self._macromodels.popitem(last=False)
+
+        return macromodel
+
+    def clear(self):
+        """Remove all macromodels."""
+        self._macromodels.clear()
+
+    def __len__(self):
+        return len(self._macromodels)
+
+
+MACROMODELS = MacromodelCache()
+
+
+def _subset_indices(grid, frequencies):
+    """Indices of frequencies within a frequency grid, or None if any are not in the grid."""
+    order = np.argsort(grid)
+    positions = np.clip(np.searchsorted(grid, frequencies, sorter=order), 0, len(grid) - 1)
+    indices = order[positions]
+
+    if np.array_equal(grid[indices], frequencies):
+        return indices
+
+    return None
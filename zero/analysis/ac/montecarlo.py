@@ -0,0 +1,524 @@
+"""Monte Carlo tolerance analyses"""
+
+import logging
+import numpy as np
+
+from .sweep import AcSignalSweepAnalysis, AcNoiseSweepAnalysis, resolve_parameter
+from ..base import BaseAnalysis
+from ...config import ZeroConfig
+from ...misc import element_matches
+
+LOGGER = logging.getLogger(__name__)
+CONF = ZeroConfig()
+
+
+class StreamingStatistics:
+    """Statistics of a sequence of samples, accumulated without storing the samples.
+
+    Each sample is an array, e.g. a response magnitude at each frequency, and the statistics are
+    computed elementwise. The mean and variance are exact. Quantiles are estimated with the P²
+    algorithm of Jain and Chlamtac, which tracks five markers per quantile whose heights converge to
+    the minimum, the quantile and its neighbours, and the maximum as samples are added.
+
+    Parameters
+    ----------
+    quantiles : sequence of :class:`float`
+        The quantiles to estimate, each between 0 and 1.
+    """
+    def __init__(self, quantiles):
+        self.quantiles = tuple(float(quantile) for quantile in quantiles)
+
+        if any(not 0 < quantile < 1 for quantile in self.quantiles):
+            raise ValueError("quantiles must be between 0 and 1")
+
+        self.count = 0
+        self._mean = None
+        # Sum of squared differences from the mean.
+        self._m2 = None
+        # The first samples, used to initialise the quantile markers.
+        self._initial = []
+        # P² marker heights and positions, with shape (n_quantiles, 5, ...).
+        self._heights = None
+        self._positions = None
+
+        probabilities = np.array(self.quantiles)[:, np.newaxis]
+        # Desired marker positions after the first five samples, and their increments per sample.
+        self._desired = 1 + np.array([0, 2, 4, 2, 0]) * probabilities + [0, 0, 0, 2, 4]
+        self._desired_increments = np.array([0, 0.5, 1, 0.5, 0]) * probabilities + [0, 0, 0, 0.5, 1]
+        # The number of samples added to the markers.
+        self._marker_count = 0
+
+    def update(self, samples):
+        """Add samples.
+
+        Parameters
+        ----------
+        samples : :class:`np.ndarray`
+            The samples, with the first axis indexing the samples.
+        """
+        samples = np.asarray(samples, dtype=float)
+
+        if not len(samples):
+            return
+
+        # Combine the batch mean and variance with those of the previous samples.
+        count = len(samples)
+        mean = np.mean(samples, axis=0)
+        m2 = np.sum(np.square(samples - mean), axis=0)
+
+        if self._mean is None:
+            self._mean, self._m2 = mean, m2
+        else:
+            delta = mean - self._mean
+            total = self.count + count
+            self._mean = self._mean + delta * count / total
+            self._m2 = self._m2 + m2 + np.square(delta) * self.count * count / total
+
+        self.count += count
+
+        for sample in samples:
+            self._update_quantiles(sample)
+
+    def _update_quantiles(self, sample):
+        self._marker_count += 1
+
+        if self._heights is None:
+            self._initial.append(sample)
+
+            if len(self._initial) == 5:
+                heights = np.sort(self._initial, axis=0)
+                shape = (len(self.quantiles),) + heights.shape
+                self._heights = np.broadcast_to(heights, shape).copy()
+                positions = np.arange(1, 6, dtype=float).reshape((1, 5) + (1,) * sample.ndim)
+                self._positions = np.broadcast_to(positions, shape).copy()
+                self._initial = []
+
+            return
+
+        heights, positions = self._heights, self._positions
+
+        # Increment the positions of the markers above the sample, then extend the extreme markers.
+        positions[:, 1:4] += sample < heights[:, 1:4]
+        positions[:, 4] += 1
+        heights[:, 0] = np.minimum(heights[:, 0], sample)
+        heights[:, 4] = np.maximum(heights[:, 4], sample)
+        desired = (self._desired + (self._marker_count - 5) * self._desired_increments).reshape(
+            self._desired.shape + (1,) * sample.ndim)
+
+        # Adjust the middle markers that are off their desired positions.
+        for index in range(1, 4):
+            offset = desired[:, index] - positions[:, index]
+            above = positions[:, index + 1] - positions[:, index]
+            below = positions[:, index - 1] - positions[:, index]
+            step = np.where((offset >= 1) & (above > 1), 1,
+                            np.where((offset <= -1) & (below < -1), -1, 0))
+
+            if not np.any(step):
+                continue
+
+            height = heights[:, index]
+            upper, lower = heights[:, index + 1], heights[:, index - 1]
+
+            with np.errstate(divide="ignore", invalid="ignore"):
+                parabolic = height + step / (above - below) * (
+                    (step - below) * (upper - height) / above
+                    + (above - step) * (height - lower) / -below)
+                linear = height + step * np.where(step > 0, (upper - height) / above,
+                                                  (lower - height) / below)
+
+            adjusted = np.where((lower < parabolic) & (parabolic < upper), parabolic, linear)
+            heights[:, index] = np.where(step != 0, adjusted, height)
+            positions[:, index] += step
+
+    @property
+    def mean(self):
+        """The sample mean."""
+        self._check_count(1)
+        return self._mean
+
+    @property
+    def variance(self):
+        """The unbiased sample variance."""
+        self._check_count(2)
+        return self._m2 / (self.count - 1)
+
+    @property
+    def std(self):
+        """The sample standard deviation."""
+        return np.sqrt(self.variance)
+
+    def quantile(self, quantile):
+        """Estimate of a quantile.
+
+        Parameters
+        ----------
+        quantile : :class:`float`
+            The quantile, which must be one of those specified when the statistics were created.
+
+        Returns
+        -------
+        :class:`np.ndarray`
+            The quantile estimate.
+        """
+        self._check_count(1)
+
+        try:
+            index = self.quantiles.index(float(quantile))
+        except ValueError:
+            raise ValueError(f"quantile {quantile} is not estimated")
+
+        if self._heights is None:
+            return np.quantile(self._initial, quantile, axis=0)
+
+        return self._heights[index, 2].copy()
+
+    def _check_count(self, count):
+        if self.count < count:
+            raise ValueError(f"at least {count} sample(s) are required")
+
+
+class MonteCarloSolution:
+    """Statistics of a Monte Carlo tolerance analysis.
+
+    Parameters
+    ----------
+    frequencies : :class:`np.ndarray`
+        The frequencies.
+    tolerances : :class:`dict`
+        The relative tolerance of each parameter.
+    distribution : :class:`str`
+        The tolerance distribution.
+    seed : :class:`int` or None
+        The random number generator seed.
+    quantiles : sequence of :class:`float`
+        The quantiles to estimate.
+    """
+    def __init__(self, frequencies, tolerances, distribution, seed, quantiles):
+        self.frequencies = frequencies
+        self.tolerances = tolerances
+        self.distribution = distribution
+        self.seed = seed
+        self.quantiles = quantiles
+        self.n_samples = 0
+
+        # Map of (source, sink) pairs to response magnitude statistics.
+        self._responses = {}
+        self.noise = None
+        self._integrated_noise = []
+
+    @property
+    def responses(self):
+        """Map of (source, sink) pairs to response magnitude statistics."""
+        return dict(self._responses)
+
+    def add_response_samples(self, responses):
+        """Add the responses of a batch of samples to the statistics.
+
+        Parameters
+        ----------
+        responses : :class:`dict`
+            Map of (source, sink) pairs to the complex responses of each sample, with shape
+            (n_batch_samples, n_freqs).
+        """
+        n_samples = None
+
+        for key, samples in responses.items():
+            if key not in self._responses:
+                self._responses[key] = StreamingStatistics(self.quantiles)
+
+            self._responses[key].update(np.abs(samples))
+            n_samples = len(samples)
+
+        if n_samples is not None:
+            self.n_samples += n_samples
+
+    def add_noise_samples(self, noise, integrated_noise):
+        """Add the total noise of a batch of samples to the statistics.
+
+        Parameters
+        ----------
+        noise : :class:`np.ndarray`
+            The total noise spectral density of each sample, with shape (n_batch_samples, n_freqs).
+        integrated_noise : :class:`np.ndarray`
+            The root mean square noise of each sample, integrated over the frequencies, with shape
+            (n_batch_samples,).
+        """
+        if self.noise is None:
+            self.noise = StreamingStatistics(self.quantiles)
+
+        self.noise.update(noise)
+        self._integrated_noise.append(np.asarray(integrated_noise))
+        self.n_samples += len(noise)
+
+    def has_response(self, sink, source=None):
+        """Check if the solution contains statistics of the response from a source to a sink.
+
+        Parameters
+        ----------
+        sink : :class:`str` or :class:`.Node` or :class:`.Component`
+            The response sink.
+        source : :class:`str` or :class:`.Node` or :class:`.Component`, optional
+            The response source.
+
+        Returns
+        -------
+        :class:`bool`
+            True if there is at least one matching response.
+        """
+        return bool(self._matching_responses(sink, source))
+
+    def response(self, sink, source=None):
+        """Statistics of the magnitude of the response from a source to a sink.
+
+        Parameters
+        ----------
+        sink : :class:`str` or :class:`.Node` or :class:`.Component`
+            The response sink.
+        source : :class:`str` or :class:`.Node` or :class:`.Component`, optional
+            The response source. This can be omitted if there is only one.
+
+        Returns
+        -------
+        :class:`StreamingStatistics`
+            The response magnitude statistics at each frequency.
+        """
+        matches = self._matching_responses(sink, source)
+
+        if not matches:
+            raise ValueError("no response found")
+        if len(matches) > 1:
+            raise ValueError("degenerate response for the specified source and sink")
+
+        return matches[0]
+
+    def _matching_responses(self, sink, source):
+        return [statistics for (response_source, response_sink), statistics
+                in self._responses.items()
+                if element_matches(response_source, source)
+                and element_matches(response_sink, sink)]
+
+    @property
+    def integrated_noise(self):
+        """The root mean square noise of each sample, integrated over the frequencies."""
+        if self.noise is None:
+            raise ValueError("solution does not contain noise")
+
+        return np.concatenate(self._integrated_noise)
+
+
+class BaseAcMonteCarloAnalysis(BaseAnalysis):
+    """Base Monte Carlo tolerance analysis.
+
+    Component parameters are drawn randomly from their tolerance distributions, and the circuit is
+    solved for batches of samples at once using a parameter sweep analysis. Statistics are
+    accumulated batch by batch so the samples' solutions need not all be stored. The batches are
+    solved one after another; in parallel mode, each batch's frequency chunks are solved in
+    parallel, rather than the batches themselves.
+
+    Parameters
+    ----------
+    circuit : :class:`.Circuit`
+        The circuit to analyse.
+    batch_size : :class:`int`, optional
+        The number of samples solved together. Defaults to the ``analysis.monte_carlo.batch_size``
+        configuration setting.
+    parallel : :class:`bool`, :class:`str`, :class:`concurrent.futures.Executor` or None, optional
+        Solve each batch's frequency chunks in parallel. See :class:`.BaseAcAnalysis`.
+
+    Other Parameters
+    ----------------
+    print_progress : :class:`bool`, optional
+        Whether to print analysis output.
+    stream : :class:`io.IOBase`, optional
+        Stream to print analysis output to.
+    """
+    # Quantiles estimated by default.
+    DEFAULT_QUANTILES = (0.05, 0.5, 0.95)
+    # The parameter sweep analysis used to solve each batch.
+    SWEEP_ANALYSIS = None
+
+    def __init__(self, *args, batch_size=None, parallel=None, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        if batch_size is None:
+            batch_size = CONF["analysis"]["monte_carlo"]["batch_size"]
+
+        self.batch_size = int(batch_size)
+        self.parallel = parallel
+
+        if self.batch_size < 1:
+            raise ValueError("batch size must be at least 1")
+
+    def _samples(self, tolerances, n_samples, distribution, seed):
+        """Generate batches of parameter values.
+
+        Variates are drawn in sample-major order, so the samples are the same for any batch size.
+        """
+        if not tolerances:
+            raise ValueError("at least one tolerance must be specified")
+
+        n_samples = int(n_samples)
+
+        if n_samples < 1:
+            raise ValueError("at least one sample is required")
+
+        distribution = distribution.lower()
+
+        if distribution not in ("uniform", "normal"):
+            raise ValueError("distribution must be 'uniform' or 'normal'")
+
+        nominal = []
+
+        for parameter in tolerances:
+            component, attribute = resolve_parameter(self.circuit, parameter)
+            nominal.append(float(getattr(component, attribute)))
+
+        nominal = np.array(nominal)
+        relative = np.array([float(tolerance) for tolerance in tolerances.values()])
+        generator = np.random.default_rng(seed)
+
+        for start in range(0, n_samples, self.batch_size):
+            shape = (min(self.batch_size, n_samples - start), len(tolerances))
+
+            if distribution == "uniform":
+                variates = generator.uniform(-1, 1, size=shape)
+            else:
+                # The tolerance is three standard deviations.
+                variates = generator.standard_normal(size=shape) / 3
+
+            values = nominal * (1 + relative * variates)
+            yield {parameter: values[:, index] for index, parameter in enumerate(tolerances)}
+
+    def _sweeps(self, tolerances, n_samples, distribution, seed, frequencies, **kwargs):
+        """Solve batches of samples, yielding each batch's sweep solution."""
+        analysis = self.SWEEP_ANALYSIS(self.circuit, parallel=self.parallel, stream=self.stream)
+        n_batches = -(-int(n_samples) // self.batch_size)
+        batches = self._samples(tolerances, n_samples, distribution, seed)
+
+        LOGGER.info("solving %i sample(s) in %i batch(es)", n_samples, n_batches)
+
+        for parameters in self.progress(batches, max(n_batches, 1), update=1):
+            yield analysis.calculate(parameters=parameters, frequencies=frequencies, **kwargs)
+
+
+class AcSignalMonteCarloAnalysis(BaseAcMonteCarloAnalysis):
+    """Monte Carlo tolerance analysis of AC signal responses"""
+    SWEEP_ANALYSIS = AcSignalSweepAnalysis
+
+    def calculate(self, input_type, tolerances, n_samples, frequencies, sinks,
+                  distribution="uniform", seed=None, quantiles=None, **kwargs):
+        """Calculate response magnitude statistics over random component parameter values.
+
+        Parameters
+        ----------
+        input_type : str
+            Input type, either "voltage" or "current".
+        tolerances : :class:`dict`
+            Map of parameters to relative tolerances, e.g. 0.01 for 1%. Each parameter is either a
+            component name, to vary the component's value, or a string of the form
+            "component.attribute" to vary another of the component's attributes. The parameters'
+            current values are the nominal values.
+        n_samples : :class:`int`
+            The number of samples.
+        frequencies : :class:`np.ndarray` or sequence
+            The frequency vector.
+        sinks : sequence of :class:`str`, :class:`.Node` or :class:`.Component`
+            The elements to calculate response statistics for.
+        distribution : {"uniform", "normal"}, optional
+            The tolerance distribution. Uniformly distributed parameters lie within their
+            tolerances. For normally distributed parameters, the tolerance is three standard
+            deviations.
+        seed : :class:`int` or None, optional
+            The random number generator seed. Analyses with the same seed draw the same samples,
+            whatever the batch size or parallel mode.
+        quantiles : sequence of :class:`float`, optional
+            The quantiles to estimate. Defaults to 5%, 50% and 95%.
+
+        Other Parameters
+        ----------------
+        node, node_p, node_n : :class:`.Node`
+            The node or nodes to make the input. The `node` parameter sets a single, grounded input,
+            whereas `node_p` and `node_n` together create a floating input.
+
+        Returns
+        -------
+        :class:`MonteCarloSolution`
+            Solution containing the response magnitude statistics.
+        """
+        if quantiles is None:
+            quantiles = self.DEFAULT_QUANTILES
+
+        solution = MonteCarloSolution(np.array(frequencies), dict(tolerances), distribution, seed,
+                                      quantiles)
+
+        for sweep in self._sweeps(tolerances, n_samples, distribution, seed, frequencies,
+                                  input_type=input_type, sinks=sinks, **kwargs):
+            solution.add_response_samples(sweep.responses)
+
+        return solution
+
+
+class AcNoiseMonteCarloAnalysis(BaseAcMonteCarloAnalysis):
+    """Monte Carlo tolerance analysis of AC noise"""
+    SWEEP_ANALYSIS = AcNoiseSweepAnalysis
+
+    def calculate(self, input_type, sink, tolerances, n_samples, frequencies,
+                  distribution="uniform", seed=None, quantiles=None, **kwargs):
+        """Calculate statistics of the total noise at a sink over random component parameter values.
+
+        The statistics of the incoherent sum of the noise from every source at the sink are
+        calculated at each frequency, and the root mean square noise of each sample, integrated
+        over the frequencies with the trapezoidal rule, is stored.
+
+        Parameters
+        ----------
+        input_type : str
+            Input type, either "voltage" or "current".
+        sink : str or :class:`.Component` or :class:`.Node`
+            The element to calculate noise at.
+        tolerances : :class:`dict`
+            Map of parameters to relative tolerances, e.g. 0.01 for 1%. Each parameter is either a
+            component name, to vary the component's value, or a string of the form
+            "component.attribute" to vary another of the component's attributes. The parameters'
+            current values are the nominal values.
+        n_samples : :class:`int`
+            The number of samples.
+        frequencies : :class:`np.ndarray` or sequence
+            The frequency vector.
+        distribution : {"uniform", "normal"}, optional
+            The tolerance distribution. Uniformly distributed parameters lie within their
+            tolerances. For normally distributed parameters, the tolerance is three standard
+            deviations.
+        seed : :class:`int` or None, optional
+            The random number generator seed. Analyses with the same seed draw the same samples,
+            whatever the batch size or parallel mode.
+        quantiles : sequence of :class:`float`, optional
+            The quantiles to estimate. Defaults to 5%, 50% and 95%.
+
+        Other Parameters
+        ----------------
+        node, node_p, node_n : :class:`.Node`
+            The node or nodes to make the input. The `node` parameter sets a single, grounded input,
+            whereas `node_p` and `node_n` together create a floating input.
+        impedance : float or :class:`.Quantity`, optional
+            Input impedance. If None, the default is used.
+        input_refer : bool, optional
+            Refer the noise to the input.
+
+        Returns
+        -------
+        :class:`MonteCarloSolution`
+            Solution containing the noise statistics.
+        """
+        if quantiles is None:
+            quantiles = self.DEFAULT_QUANTILES
+
+        frequencies = np.array(frequencies)
+        solution = MonteCarloSolution(frequencies, dict(tolerances), distribution, seed,
+                                      quantiles)
+
+        for sweep in self._sweeps(tolerances, n_samples, distribution, seed, frequencies,
+                                  input_type=input_type, sink=sink, **kwargs):
+            solution.add_noise_samples(sweep.noise_sum(), sweep.integrated_noise_sum())
+
+        return solution
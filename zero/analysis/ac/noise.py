@@ -2,7 +2,7 @@ import logging
 import numpy as np
 
 from .signal import AcSignalAnalysis
-from ...data import NoiseDensity, MultiNoiseDensity, Series
+from ...data import NoiseDensity, MultiNoiseDensity, Response, Series
 
 LOGGER = logging.getLogger(__name__)
 
@@ -15,6 +15,14 @@ class AcNoiseAnalysis(AcSignalAnalysis):
         super().__init__(*args, **kwargs)
 
         self._noise_sink = None
+        # Whether to solve for the responses from the input alongside the noise.
+        self._solve_input_responses = False
+        self._input_responses = None
+
+    def reset(self):
+        """Reset state of the analysis"""
+        super().reset()
+        self._input_responses = None
 
     @property
     def noise_sink(self):
@@ -29,7 +37,7 @@ class AcNoiseAnalysis(AcSignalAnalysis):
         self._noise_sink = sink
 
     def calculate(self, input_type, sink, impedance=None, incoherent_sum=False, input_refer=False,
-                  **kwargs):
+                  responses=False, **kwargs):
         """Calculate noise from circuit elements at a particular element.
 
         Parameters
@@ -52,11 +60,25 @@ class AcNoiseAnalysis(AcSignalAnalysis):
             ``sum_greyscale_cycle_count`` values.
         input_refer : bool, optional
             Refer the noise to the input.
+        responses : bool, optional
+            Add the responses from the input to every component and node to the solution.
+
+        Notes
+        -----
+        The responses from the input, used for input referral and when `responses` is True, are
+        solved alongside the noise using the same circuit matrices, in the same frequency sweep.
 
         Other Parameters
         ----------------
         frequencies : :class:`np.ndarray` or sequence
-            The frequency vector to calculate the response with.
+            The frequency vector to calculate the response with. In adaptive mode, this is the
+            starting frequency vector.
+        adaptive : :class:`bool`, optional
+            Refine the frequencies where the results change quickly. The solution then contains
+            the refined, non-uniform frequency vector.
+        max_solves : :class:`int`, optional
+            The maximum number of frequencies to solve in adaptive mode. Defaults to the
+            ``analysis.adaptive.max_solves`` configuration setting.
         node, node_p, node_n : :class:`.Node`
             The node or nodes to make the input. The `node` parameter sets a single, grounded input,
             whereas `node_p` and `node_n` together create a floating input.
@@ -71,33 +93,110 @@ class AcNoiseAnalysis(AcSignalAnalysis):
             Solution containing noise spectra at the specified sink (or projected sink).
         """
         self.noise_sink = sink
+        return self._cached_calculate(self._calculate_noise, input_type=input_type,
+                                      sink=self.noise_sink, impedance=impedance,
+                                      incoherent_sum=incoherent_sum, input_refer=input_refer,
+                                      responses=responses, **kwargs)
+
+    def _calculate_noise(self, input_type, sink, impedance=None, incoherent_sum=False,
+                         input_refer=False, responses=False, **kwargs):
         if impedance is None:
             LOGGER.warning(f"assuming default input impedance of {self.DEFAULT_INPUT_IMPEDANCE}")
             impedance = self.DEFAULT_INPUT_IMPEDANCE
+        self._solve_input_responses = input_refer or responses
         self._do_calculate(input_type, impedance=impedance, is_noise=True, **kwargs)
+        if responses:
+            self._add_responses(self._input_responses, self.input_source,
+                                self.element_index_map.components)
         if incoherent_sum:
             self._compute_sums(incoherent_sum)
         if input_refer:
             self._refer_sink_noise_to_input()
         return self.solution
 
-    def circuit_matrix(self, *args, **kwargs):
-        """Calculate and return matrix used to solve for circuit noise at a \
-        given frequency.
+    def _compile_stamp_pattern(self):
+        """Compile the circuit matrix stamp pattern.
 
-        Returns
-        -------
-        :class:`scipy.sparse.spmatrix`
-            The circuit matrix.
+        The noise circuit matrix is the transpose of the response circuit matrix.
         """
-        # Return the transpose of the response matrix.
-        return super().circuit_matrix(*args, **kwargs).T
+        return super()._compile_stamp_pattern().transpose()
 
     @property
     def right_hand_side_index(self):
         """Right hand side excitation component index"""
         return self.noise_element_index
 
+    def solve(self):
+        """Solve the circuit.
+
+        If the responses from the input are required, they are solved for alongside the noise. The
+        noise circuit matrix is the transpose of a signal circuit matrix, so each frequency's
+        factorisation is used to solve both.
+
+        Returns
+        -------
+        :class:`~np.ndarray`
+            The responses from every element to the noise sink.
+        """
+        if not self._solve_input_responses:
+            return super().solve()
+
+        # Excitation at the input component.
+        input_rhs = self.get_empty_results_matrix(1)
+        input_rhs[self.input_component_index, 0] = 1
+
+        noise, responses = self.solve_block_and_transpose(self.right_hand_side(), input_rhs)
+        self._input_responses = self._scale_input_responses(responses[:, 0, :])
+
+        return noise[:, 0, :]
+
+    def _solve_frequencies(self, frequencies):
+        results = super()._solve_frequencies(frequencies)
+
+        if self._solve_input_responses:
+            results.append(self._input_responses)
+
+        return results
+
+    def _set_frequency_results(self, frequencies, results):
+        if self._solve_input_responses:
+            self._input_responses = results[1]
+
+        return super()._set_frequency_results(frequencies, results)
+
+    def _adaptive_quantities(self, results):
+        """Quantities monitored by adaptive sweeps.
+
+        These are the responses from each noise source's element to the sink and, if solved, the
+        responses from the input.
+        """
+        indices = {index for noise in self._current_circuit.noise_sources
+                   for index in self._noise_source_indices(noise)}
+        quantities = results[0][sorted(indices), :]
+
+        if self._solve_input_responses:
+            quantities = np.concatenate((quantities, results[1]))
+
+        return quantities
+
+    def _scale_input_responses(self, responses):
+        """Scale responses to the noise circuit's input to those of a signal circuit.
+
+        The noise circuit's input is a voltage source in series with the input impedance, whereas
+        the signal circuit's input is an ideal voltage or current source. By linearity, the signal
+        circuit's responses are those of the noise circuit scaled to unit voltage across, or unit
+        current through, the input.
+        """
+        if self.has_voltage_input:
+            scale = self._input_voltage(responses, self._current_circuit.input_component)
+        else:
+            scale = responses[self.input_component_index, :]
+
+            if np.any(scale == 0):
+                raise ValueError("current input has infinite impedance")
+
+        return responses / scale
+
     def _build_solution(self, noise_matrix):
         # empty noise sources
         empty = []
@@ -111,17 +210,11 @@ class AcNoiseAnalysis(AcSignalAnalysis):
                 # null noise source
                 empty.append(noise)
 
-            if noise.element_type == "component":
-                # noise is from a component; use its matrix index
-                index = self.component_matrix_index(noise.component)
-            elif noise.element_type == "node":
-                # noise is from a node; use its matrix index
-                index = self.node_matrix_index(noise.node)
-            else:
-                raise ValueError("unrecognised noise source present in circuit")
+            indices = self._noise_source_indices(noise)
+            excitation = self._noise_source_excitation(noise, self.frequencies)
 
-            # get response from this element to every other
-            response = noise_matrix[index, :]
+            # get response from the elements this noise enters at to the noise output element
+            response = np.sum(excitation * noise_matrix[indices, :], axis=0)
 
             # multiply response from element to noise output element by noise entering
             # at that element, for all frequencies
@@ -183,19 +276,9 @@ class AcNoiseAnalysis(AcSignalAnalysis):
         """Project the calculated noise to the input."""
         LOGGER.info("projecting noise to input")
 
-        input_component = self._current_circuit.input_component
-        if self.input_type == "voltage":
-            input_element = input_component.node2
-        else:
-            input_element = input_component
-        projection_analysis = self.to_signal_analysis()
-        # Grab the input nodes from the noise circuit.
-        node_n, node_p = input_component.nodes
-        projection = projection_analysis.calculate(frequencies=self.frequencies,
-                                                   input_type=self.input_type, node_n=node_n,
-                                                   node_p=node_p)
         # Transfer function from input to noise sink.
-        input_response = projection.get_response(source=input_element, sink=self.noise_sink)
+        series = Series(x=self.frequencies, y=self._input_responses[self.noise_element_index, :])
+        input_response = Response(source=self.input_source, sink=self.noise_sink, series=series)
 
         for __, noise_spectra in self.solution.noise.items():
             for noise in noise_spectra:
@@ -208,7 +291,9 @@ class AcNoiseAnalysis(AcSignalAnalysis):
     def to_signal_analysis(self):
         """Return a new signal analysis using the settings defined in the current analysis."""
         return AcSignalAnalysis(self.circuit, print_progress=self.print_progress,
-                                stream=self.stream)
+                                stream=self.stream, batch=self.batch,
+                                parallel=self.parallel, incremental=self.incremental,
+                                cache=self.cache, compact=self.compact)
 
     @property
     def noise_element_index(self):
@@ -0,0 +1,482 @@
+"""Pole-zero analysis"""
+
+import logging
+from math import factorial
+from itertools import zip_longest
+import numpy as np
+from scipy.linalg import eig, solve
+
+from .signal import AcSignalAnalysis
+from ...components import Resistor, Capacitor, Inductor, OpAmp, Node
+from ...config import ZeroConfig
+from ...data import Response, Series
+
+LOGGER = logging.getLogger(__name__)
+CONF = ZeroConfig()
+
+
+class AcPoleZeroAnalysis(AcSignalAnalysis):
+    """Pole-zero analysis
+
+    The circuit is represented in descriptor form, (G + sC) x = b u, where s is the Laplace
+    variable. Each matrix coefficient that depends on frequency is expressed as a rational function
+    of s. Resistors, inductors and mutual inductances contribute directly to G and C, while
+    capacitor impedances and op-amp inverse gains are realised with extra internal states. The
+    poles of a transfer function from the input to a sink are the finite generalised eigenvalues
+    of the pencil (G, -C), and its zeros are those of the pencil augmented with the input and sink.
+
+    Op-amp delays cannot be represented exactly by a rational function. They are instead
+    approximated by a Padé approximant with order set by the ``analysis.pole_zero.delay_order``
+    configuration setting, which adds its poles and zeros to the model.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._sink = None
+        self._model = None
+
+    def reset(self):
+        """Reset state of the analysis"""
+        super().reset()
+        self._model = None
+
+    def calculate(self, input_type, sink, **kwargs):
+        """Calculate the rational transfer function from the input to a sink.
+
+        Parameters
+        ----------
+        input_type : str
+            Input type, either "voltage" or "current".
+        sink : str or :class:`.Component` or :class:`.Node`
+            The element to calculate the transfer function to.
+
+        Other Parameters
+        ----------------
+        node, node_p, node_n : :class:`.Node`
+            The node or nodes to make the input. The `node` parameter sets a single, grounded input,
+            whereas `node_p` and `node_n` together create a floating input.
+        print_equations : :class:`bool`, optional
+            Print the circuit equations.
+        print_matrix : :class:`bool`, optional
+            Print the circuit matrix.
+
+        Returns
+        -------
+        :class:`.RationalModel`
+            The transfer function.
+        """
+        if not hasattr(sink, "name"):
+            sink = self.circuit.get_element(sink)
+
+        self._sink = sink
+
+        if input_type == "current":
+            # Set impedance to give correct scaling.
+            impedance = 1
+        else:
+            impedance = None
+
+        # The pole-zero analysis doesn't use frequencies, but the circuit matrix display does.
+        self._do_calculate(input_type, frequencies=[], impedance=impedance, **kwargs)
+
+        return self._model
+
+    def solve(self):
+        """Solve for the poles, zeros and gain of the transfer function to the sink."""
+        conductance, capacitance = self.descriptor_matrices()
+
+        # Excitation at the input, and observation of the sink.
+        rhs = np.zeros(len(conductance), dtype="complex128")
+        rhs[self.input_component_index] = 1
+        observation = np.zeros(len(conductance), dtype="complex128")
+        observation[self._sink_index] = 1
+
+        poles = _finite_eigenvalues(conductance, -capacitance)
+
+        # The zeros are where the system augmented with the input and sink is singular.
+        augmented_conductance = np.block([[conductance, rhs[:, np.newaxis]],
+                                          [observation[np.newaxis, :], np.zeros((1, 1))]])
+        augmented_capacitance = np.zeros_like(augmented_conductance)
+        augmented_capacitance[:-1, :-1] = capacitance
+        zeros = _finite_eigenvalues(augmented_conductance, -augmented_capacitance)
+
+        # Remove modes that are not excited by the input or not seen by the sink.
+        zeros, poles = _cancel(zeros, poles,
+                               float(CONF["analysis"]["pole_zero"]["cancellation_tolerance"]))
+
+        # Evaluate the transfer function at a point away from the poles and zeros to set the gain.
+        scale = np.median(np.abs(np.concatenate((poles, zeros)))) if len(poles) + len(zeros) else 1
+        s_ref = (scale or 1) * (0.6 + 0.8j)
+        response = solve(conductance + s_ref * capacitance, rhs, check_finite=False)
+        gain = response[self._sink_index] / RationalModel(zeros, poles).evaluate_s(s_ref)
+
+        return RationalModel(zeros, poles, gain, source=self.input_source, sink=self._sink)
+
+    def _build_solution(self, model):
+        self._model = model
+
+    @property
+    def _sink_index(self):
+        """Sink matrix index"""
+        if isinstance(self._sink, Node):
+            return self.node_matrix_index(self._sink)
+
+        return self.component_matrix_index(self._sink)
+
+    def component_equation(self, component):
+        """Equation representing circuit component
+
+        The frequency-dependent coefficients of the equation returned by the parent are replaced
+        with :class:`RationalValue` objects representing them as rational functions of the
+        Laplace variable.
+
+        Returns
+        -------
+        :class:`~.ComponentEquation`
+            Component equation containing :class:`coefficients <.BaseCoefficient>`.
+
+        Raises
+        ------
+        ValueError
+            If a frequency-dependent coefficient cannot be represented as a rational function.
+        """
+        equation = super().component_equation(component)
+
+        for coefficient in equation.coefficients:
+            if callable(coefficient.value):
+                coefficient.value = self._rational_value(component, coefficient)
+
+        return equation
+
+    def _rational_value(self, component, coefficient):
+        """Represent a frequency-dependent component equation coefficient as a rational
+        function."""
+        if component.element_type == "port":
+            # Subcircuit port relations are computed numerically at each frequency.
+            raise ValueError(f"cannot represent the port relations of subcircuit "
+                             f"'{component.subcircuit.name}' as rational functions")
+
+        if coefficient.TYPE == "impedance":
+            if coefficient.component is not component:
+                # Mutual inductance from a coupled inductor.
+                mutual_inductance = component.inductance_from(coefficient.component)
+                return RationalValue(numerator=[(0, mutual_inductance)])
+            elif isinstance(component, Resistor):
+                return RationalValue(gain=component.resistance)
+            elif isinstance(component, Capacitor):
+                return RationalValue(denominator=[(0, component.capacitance)])
+            elif isinstance(component, Inductor):
+                return RationalValue(numerator=[(0, component.inductance)])
+        elif coefficient.TYPE == "voltage" and isinstance(component, OpAmp):
+            # Voltage followers have their output node coefficient added to the inverse gain.
+            offset = 1 if component.node3 == component.node2 else 0
+            return self._inverse_gain(component, offset)
+
+        raise ValueError(f"cannot represent the frequency-dependent coefficients of '{component}' "
+                         "as a rational function")
+
+    def _inverse_gain(self, opamp, offset=0):
+        """Op-amp inverse gain as a rational function.
+
+        See :meth:`.LibraryOpAmp.gain`.
+        """
+        numerator = [(1 / opamp.a0, 1 / (2 * np.pi * opamp.gbw))]
+        numerator.extend([(1, 1 / (2 * np.pi * pole)) for pole in opamp.poles])
+        denominator = [(1, 1 / (2 * np.pi * zero)) for zero in opamp.zeros]
+
+        if opamp.delay:
+            delay_numerator, delay_denominator = _pade_delay_factors(
+                -opamp.delay, int(CONF["analysis"]["pole_zero"]["delay_order"]))
+            numerator.extend(delay_numerator)
+            denominator.extend(delay_denominator)
+
+        return RationalValue(numerator=numerator, denominator=denominator, offset=offset)
+
+    def descriptor_matrices(self):
+        """Descriptor form of the circuit matrix
+
+        The circuit matrix at Laplace variable s is G + sC. The first :attr:`dim_size` rows and
+        columns correspond to those of the circuit matrix, and the rest to the internal states
+        added to realise coefficients that are not linear in s.
+
+        Returns
+        -------
+        :class:`np.ndarray`
+            The G matrix.
+        :class:`np.ndarray`
+            The C matrix.
+        """
+        # Later coefficients for the same element take precedence, as in the stamp pattern.
+        coefficients = {}
+
+        for row, column, value in self.matrix_coefficients():
+            coefficients[row, column] = value
+
+        # Entries of G and C, and the number of rows and columns.
+        conductance = []
+        capacitance = []
+        size = self.dim_size
+
+        for (row, column), value in coefficients.items():
+            if not isinstance(value, RationalValue):
+                conductance.append((row, column, value))
+                continue
+
+            conductance.append((row, column, value.offset))
+
+            pairs = list(zip_longest(value.numerator, value.denominator))
+
+            if pairs and pairs[-1][1] is None:
+                # The last factor is linear in s, so can be stamped directly.
+                *pairs, (direct, _) = pairs
+            else:
+                direct = (1, 0)
+
+            # Realise the other factors as a chain of internal states: den(s) x' = num(s) x.
+            for numerator, denominator in pairs:
+                numerator = numerator if numerator is not None else (1, 0)
+                denominator = denominator if denominator is not None else (1, 0)
+
+                conductance.append((size, size, denominator[0]))
+                capacitance.append((size, size, denominator[1]))
+                conductance.append((size, column, -numerator[0]))
+                capacitance.append((size, column, -numerator[1]))
+
+                column = size
+                size += 1
+
+            conductance.append((row, column, value.gain * direct[0]))
+            capacitance.append((row, column, value.gain * direct[1]))
+
+        return _dense(conductance, size), _dense(capacitance, size)
+
+
+class RationalValue:
+    """Coefficient value as a rational function of the Laplace variable s
+
+    The value is offset + gain * prod(a + b s) / prod(c + d s), where (a, b) are the numerator
+    factors and (c, d) the denominator factors.
+
+    Parameters
+    ----------
+    gain : :class:`complex`, optional
+        The gain.
+    numerator, denominator : sequence of :class:`tuple`, optional
+        The (constant, s coefficient) pairs of the numerator and denominator factors.
+    offset : :class:`complex`, optional
+        The offset.
+    """
+    def __init__(self, gain=1, numerator=None, denominator=None, offset=0):
+        if numerator is None:
+            numerator = []
+        if denominator is None:
+            denominator = []
+
+        self.gain = gain
+        self.numerator = list(numerator)
+        self.denominator = list(denominator)
+        self.offset = offset
+
+    def __call__(self, frequency):
+        s = 2j * np.pi * np.asarray(frequency)
+        value = self.gain * np.ones_like(s)
+
+        for constant, coefficient in self.numerator:
+            value = value * (constant + coefficient * s)
+        for constant, coefficient in self.denominator:
+            value = value / (constant + coefficient * s)
+
+        return self.offset + value
+
+
+class RationalModel:
+    """Rational transfer function in pole-zero form
+
+    The transfer function is gain * prod(s - zeros) / prod(s - poles), where s is the Laplace
+    variable. It can be evaluated at any frequency without solving the circuit. The zeros and poles
+    are sorted by magnitude.
+
+    Parameters
+    ----------
+    zeros : sequence of :class:`complex`
+        The zeros, in rad/s.
+    poles : sequence of :class:`complex`
+        The poles, in rad/s.
+    gain : :class:`complex`, optional
+        The gain.
+    source, sink : :class:`.Node` or :class:`.Component`, optional
+        The transfer function source and sink.
+    """
+    def __init__(self, zeros, poles, gain=1, source=None, sink=None):
+        self.zeros = _sort_by_magnitude(zeros)
+        self.poles = _sort_by_magnitude(poles)
+        self.gain = gain
+        self.source = source
+        self.sink = sink
+
+    @property
+    def order(self):
+        """Number of poles"""
+        return len(self.poles)
+
+    @property
+    def pole_frequencies(self):
+        """Pole magnitudes, in Hz"""
+        return np.abs(self.poles) / (2 * np.pi)
+
+    @property
+    def zero_frequencies(self):
+        """Zero magnitudes, in Hz"""
+        return np.abs(self.zeros) / (2 * np.pi)
+
+    def evaluate_s(self, s):
+        """Evaluate the transfer function at the specified Laplace variable values.
+
+        The products of the pole and zero factors are computed as sums of logarithms to avoid
+        overflow for high order models.
+        """
+        s = np.asarray(s, dtype="complex128")[..., np.newaxis]
+
+        with np.errstate(divide="ignore"):
+            log_value = (np.sum(np.log(s - self.zeros), axis=-1)
+                         - np.sum(np.log(s - self.poles), axis=-1))
+
+        return self.gain * np.exp(log_value)
+
+    def __call__(self, frequencies):
+        """Evaluate the transfer function at the specified frequencies.
+
+        Parameters
+        ----------
+        frequencies : :class:`float` or array_like
+            The frequencies, in Hz.
+
+        Returns
+        -------
+        :class:`complex` or :class:`np.ndarray`
+            The transfer function.
+        """
+        return self.evaluate_s(2j * np.pi * np.asarray(frequencies))
+
+    def response(self, frequencies):
+        """Response evaluated at the specified frequencies.
+
+        Parameters
+        ----------
+        frequencies : array_like
+            The frequencies, in Hz.
+
+        Returns
+        -------
+        :class:`.Response`
+            The response.
+        """
+        frequencies = np.asarray(frequencies)
+        return Response(source=self.source, sink=self.sink,
+                        series=Series(x=frequencies, y=self(frequencies)))
+
+    def __str__(self):
+        return (f"{self.source} to {self.sink}: {self.order} poles, {len(self.zeros)} zeros, "
+                f"gain {self.gain:.4g}")
+
+
+def _sort_by_magnitude(values):
+    """Sort complex values by magnitude, then by angle."""
+    values = np.asarray(values, dtype="complex128")
+    return values[np.lexsort((np.angle(values), np.abs(values)))]
+
+
+def _dense(entries, size):
+    """Dense matrix summing the specified (row, column, value) entries."""
+    matrix = np.zeros((size, size), dtype="complex128")
+
+    for row, column, value in entries:
+        matrix[row, column] += value
+
+    return matrix
+
+
+def _finite_eigenvalues(a, b):
+    """Finite generalised eigenvalues of the pencil (a, b).
+
+    Descriptor systems have infinite eigenvalues corresponding to their algebraic equations. These
+    are returned with a zero or, due to rounding, tiny second homogeneous coordinate.
+
+    Circuit pencils are badly scaled, with entries spanning many orders of magnitude, so the
+    frequency axis is first normalised and the pencil is then equilibrated by alternately scaling
+    its rows and columns to unit maximum magnitude. Neither changes the eigenvalues, apart from the
+    frequency normalisation which is undone afterwards.
+    """
+    b_norm = np.linalg.norm(b, 1)
+    frequency_scale = np.linalg.norm(a, 1) / b_norm if b_norm else 1
+    b = b * frequency_scale
+
+    row_scale = np.ones(len(a))
+    column_scale = np.ones(len(a))
+    magnitudes = np.abs(a) + np.abs(b)
+
+    for _ in range(20):
+        row_max = np.sqrt(np.max(magnitudes * column_scale, axis=1) * row_scale)
+        row_max[row_max == 0] = 1
+        row_scale /= row_max
+        column_max = np.sqrt(np.max(row_scale[:, np.newaxis] * magnitudes, axis=0) * column_scale)
+        column_max[column_max == 0] = 1
+        column_scale /= column_max
+
+    a = row_scale[:, np.newaxis] * a * column_scale
+    b = row_scale[:, np.newaxis] * b * column_scale
+
+    alpha, beta = eig(a, b, right=False, homogeneous_eigvals=True)
+    tolerance = float(CONF["analysis"]["pole_zero"]["infinite_tolerance"])
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        finite = np.abs(beta) > tolerance * np.abs(alpha)
+        return frequency_scale * alpha[finite] / beta[finite]
+
+
+def _cancel(zeros, poles, tolerance):
+    """Cancel coincident zeros and poles.
+
+    Each zero is cancelled with the nearest remaining pole if their separation is within the
+    specified tolerance relative to their magnitude.
+    """
+    poles = list(poles)
+    remaining_zeros = []
+
+    for zero in zeros:
+        if poles:
+            distances = np.abs(np.array(poles) - zero)
+            nearest = np.argmin(distances)
+
+            if distances[nearest] <= tolerance * max(abs(zero), abs(poles[nearest]), 1):
+                del poles[nearest]
+                continue
+
+        remaining_zeros.append(zero)
+
+    return np.array(remaining_zeros, dtype="complex128"), np.array(poles, dtype="complex128")
+
+
+def _pade_delay_factors(delay, order):
+    """Factors of the Padé approximant of exp(-s * delay).
+
+    Returns
+    -------
+    :class:`list`
+        The (constant, s coefficient) pairs of the numerator factors.
+    :class:`list`
+        The (constant, s coefficient) pairs of the denominator factors.
+    """
+    if order < 1:
+        raise ValueError("delay approximation order must be at least 1")
+
+    # exp(x) ~ N(x) / N(-x), with x = -s * delay.
+    coefficients = [factorial(2 * order - k) * factorial(order)
+                    / (factorial(2 * order) * factorial(k) * factorial(order - k))
+                    for k in range(order + 1)]
+    roots = np.roots(coefficients[::-1])
+
+    # N(x) / N(-x) = prod(x - r) / prod(-x - r).
+    numerator = [(-root, -delay) for root in roots]
+    denominator = [(-root, delay) for root in roots]
+
+    return numerator, denominator
@@ -0,0 +1,295 @@
+"""Library op-amp rankings"""
+
+import logging
+import numpy as np
+
+from .signal import AcSignalAnalysis
+from .sweep import AcNoiseSweepAnalysis
+from ..base import BaseAnalysis
+from ...components import OpAmp
+from ...config import ZeroConfig, OpAmpLibrary, LibraryOpAmp, LibraryQueryEngine
+
+LOGGER = logging.getLogger(__name__)
+CONF = ZeroConfig()
+LIBRARY = OpAmpLibrary()
+
+
+class OpAmpRanking:
+    """Performance of candidate op-amps in a circuit's op-amp slots.
+
+    The candidates' integrated noise and response deviations are stored in arrays ordered like
+    :attr:`models`. The solution for a candidate, e.g. for plotting, is retrieved with
+    :meth:`solution`.
+
+    Parameters
+    ----------
+    frequencies : :class:`np.ndarray`
+        The frequencies.
+    slots : sequence of :class:`str`
+        The names of the op-amps replaced by each candidate.
+    sink : :class:`str` or :class:`.Node` or :class:`.Component`
+        The noise sink.
+    input_refer : :class:`bool`
+        Whether the noise is referred to the input.
+    """
+    # Metrics candidates can be ranked by.
+    METRICS = ("noise", "deviation")
+
+    def __init__(self, frequencies, slots, sink, input_refer):
+        self.frequencies = frequencies
+        self.slots = slots
+        self.sink = sink
+        self.input_refer = input_refer
+        self.models = []
+        self.integrated_noise = np.array([])
+        self.deviation = np.array([])
+
+        # Sweep solution and sweep point containing each candidate's results.
+        self._solutions = []
+
+    def __len__(self):
+        return len(self.models)
+
+    def add_candidates(self, models, sweep_solution, deviation):
+        """Add the results of candidates solved in a parameter sweep.
+
+        Parameters
+        ----------
+        models : sequence of :class:`str`
+            The candidate models, one for each sweep point.
+        sweep_solution : :class:`.SweepSolution`
+            The sweep solution.
+        deviation : :class:`np.ndarray`
+            The candidates' response deviations.
+        """
+        self.models.extend(models)
+        self.integrated_noise = np.concatenate((self.integrated_noise,
+                                                sweep_solution.integrated_noise_sum()))
+        self.deviation = np.concatenate((self.deviation, deviation))
+        self._solutions.extend((sweep_solution, point) for point in range(len(models)))
+
+    def ranked(self, by="noise"):
+        """Candidate models, best first.
+
+        Parameters
+        ----------
+        by : :class:`str`, optional
+            The metric to rank by: "noise" for the lowest integrated noise or "deviation" for the
+            smallest response deviation.
+
+        Returns
+        -------
+        :class:`list` of :class:`str`
+            The ranked models.
+
+        Raises
+        ------
+        ValueError
+            If the metric is invalid.
+        """
+        by = by.lower()
+
+        if by not in self.METRICS:
+            raise ValueError(f"metric must be one of {', '.join(self.METRICS)}")
+
+        metric = self.integrated_noise if by == "noise" else self.deviation
+        # Stable sort keeps the library order for equally ranked candidates.
+        return [self.models[index] for index in np.argsort(metric, kind="stable")]
+
+    def index(self, model):
+        """Index of a candidate model in :attr:`models`."""
+        model = OpAmpLibrary.format_name(model)
+
+        for index, candidate in enumerate(self.models):
+            if candidate == model:
+                return index
+
+        raise ValueError(f"op-amp model '{model}' not ranked")
+
+    def solution(self, model):
+        """Solution containing the noise with a candidate in the slots.
+
+        Parameters
+        ----------
+        model : :class:`str`
+            The candidate model.
+
+        Returns
+        -------
+        :class:`.Solution`
+            The solution, named after the model.
+        """
+        sweep_solution, point = self._solutions[self.index(model)]
+        return sweep_solution[point]
+
+
+class AcOpAmpRankingAnalysis(BaseAnalysis):
+    """Ranking of library op-amps for a circuit's op-amp slots.
+
+    Each candidate op-amp's parameters are substituted into the slots, and the noise at the sink is
+    integrated over the frequencies. The candidates' responses from the input to the sink are
+    compared to those of the circuit as given. Swapping op-amps changes only the slots' circuit
+    matrix elements and noise sources, so the candidates are solved together as the points of a
+    parameter sweep, in batches.
+
+    Parameters
+    ----------
+    circuit : :class:`.Circuit`
+        The circuit to analyse.
+    batch_size : :class:`int`, optional
+        The number of candidates solved together. Defaults to the ``analysis.ranking.batch_size``
+        configuration setting.
+    parallel : :class:`bool`, :class:`str`, :class:`concurrent.futures.Executor` or None, optional
+        Solve each batch's frequency chunks in parallel. See :class:`.BaseAcAnalysis`.
+
+    Other Parameters
+    ----------------
+    print_progress : :class:`bool`, optional
+        Whether to print analysis output.
+    stream : :class:`io.IOBase`, optional
+        Stream to print analysis output to.
+    """
+    # Op-amp parameters substituted by each candidate.
+    PARAMETERS = ("a0", "gbw", "delay", "zeros", "poles", "vnoise", "vcorner", "inoise",
+                  "icorner")
+
+    def __init__(self, *args, batch_size=None, parallel=None, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        if batch_size is None:
+            batch_size = CONF["analysis"]["ranking"]["batch_size"]
+
+        self.batch_size = int(batch_size)
+        self.parallel = parallel
+
+        if self.batch_size < 1:
+            raise ValueError("batch size must be at least 1")
+
+    def calculate(self, input_type, sink, slots, frequencies, candidates=None, query=None,
+                  impedance=None, input_refer=False, **kwargs):
+        """Rank candidate op-amps by their noise and response in the specified slots.
+
+        Parameters
+        ----------
+        input_type : str
+            Input type, either "voltage" or "current".
+        sink : str or :class:`.Component` or :class:`.Node`
+            The element to calculate noise and responses at.
+        slots : :class:`str` or sequence of :class:`str`
+            The names of the op-amps to replace. Every slot takes the same candidate.
+        frequencies : :class:`np.ndarray` or sequence
+            The frequencies to integrate the noise and compare the responses over.
+        candidates : sequence of :class:`str` or :class:`.LibraryOpAmp`, optional
+            The candidate op-amps, as library models or op-amp objects.
+        query : :class:`str`, optional
+            Library query selecting the candidates, e.g. "vnoise < 5n". Ignored if `candidates` is
+            specified. If neither are specified, every library op-amp is a candidate.
+        impedance : float or :class:`.Quantity`, optional
+            Input impedance. If None, the default is used.
+        input_refer : bool, optional
+            Refer the noise to the input.
+
+        Other Parameters
+        ----------------
+        node, node_p, node_n : :class:`.Node`
+            The node or nodes to make the input. The `node` parameter sets a single, grounded input,
+            whereas `node_p` and `node_n` together create a floating input.
+
+        Returns
+        -------
+        :class:`OpAmpRanking`
+            The candidates' integrated noise and response deviations.
+
+        Raises
+        ------
+        ValueError
+            If a slot is not an op-amp in the circuit or there are no candidates.
+        """
+        if isinstance(slots, str):
+            slots = [slots]
+
+        slots = [self._slot(slot) for slot in slots]
+
+        if not slots:
+            raise ValueError("at least one op-amp slot must be specified")
+
+        candidates = self._candidates(candidates, query)
+
+        if not candidates:
+            raise ValueError("no candidate op-amps")
+
+        frequencies = np.array(frequencies)
+        reference = self._reference_response(input_type, sink, frequencies, **kwargs)
+        ranking = OpAmpRanking(frequencies, [slot.name for slot in slots], sink, input_refer)
+        analysis = AcNoiseSweepAnalysis(self.circuit, parallel=self.parallel, stream=self.stream)
+        batches = [candidates[start:start + self.batch_size]
+                   for start in range(0, len(candidates), self.batch_size)]
+
+        LOGGER.info("ranking %i op-amp(s) in %i batch(es)", len(candidates), len(batches))
+
+        for batch in self.progress(batches, len(batches), update=1):
+            parameters = {f"{slot.name}.{attribute}": [getattr(opamp, attribute)
+                                                       for opamp in batch]
+                          for slot in slots for attribute in self.PARAMETERS}
+            models = [opamp.model for opamp in batch]
+            sweep_solution = analysis.calculate(input_type=input_type, sink=sink,
+                                                parameters=parameters, frequencies=frequencies,
+                                                impedance=impedance, input_refer=input_refer,
+                                                responses=True, labels=models, **kwargs)
+            responses = sweep_solution.response(sink)
+            deviation = np.max(np.abs(responses / reference - 1), axis=1)
+            ranking.add_candidates(models, sweep_solution, deviation)
+
+        return ranking
+
+    def _slot(self, slot):
+        """Get the op-amp for a slot."""
+        if not self.circuit.has_component(slot):
+            raise ValueError(f"slot '{slot}' is not present in the circuit")
+
+        component = self.circuit.get_component(slot)
+
+        if not isinstance(component, OpAmp):
+            raise ValueError(f"slot '{component.name}' is not an op-amp")
+
+        return component
+
+    def _candidates(self, candidates, query):
+        """Get the candidate op-amps.
+
+        Library op-amps with aliases are included once.
+        """
+        if candidates is None:
+            if query is None:
+                candidates = LIBRARY.opamps
+            else:
+                candidates = LibraryQueryEngine().query(query)
+
+            # Library order, in which op-amps precede their aliases.
+            order = {model: index for index, model in enumerate(LIBRARY.data)}
+            candidates = sorted(candidates, key=lambda opamp: order.get(opamp.model, len(order)))
+
+        unique = []
+        seen = set()
+
+        for candidate in candidates:
+            if not isinstance(candidate, LibraryOpAmp):
+                candidate = LibraryOpAmp(model=candidate, **LIBRARY.get_data(candidate))
+
+            if LIBRARY.has_data(candidate.model):
+                # Aliases share their op-amp's data.
+                key = id(LIBRARY.get_data(candidate.model))
+            else:
+                key = id(candidate)
+
+            if key not in seen:
+                seen.add(key)
+                unique.append(candidate)
+
+        return unique
+
+    def _reference_response(self, input_type, sink, frequencies, **kwargs):
+        """Response from the input to the sink of the circuit as given."""
+        analysis = AcSignalAnalysis(self.circuit, parallel=self.parallel, stream=self.stream)
+        solution = analysis.calculate(input_type=input_type, frequencies=frequencies, **kwargs)
+        return solution.get_response(sink=sink).complex_magnitude
@@ -0,0 +1,386 @@
+"""AC sensitivity analysis"""
+
+import logging
+from contextlib import contextmanager
+import numpy as np
+
+from .signal import AcSignalAnalysis
+from .noise import AcNoiseAnalysis
+from .sweep import resolve_parameter
+from ...components import Node, PassiveComponent, OpAmp
+from ...config import ZeroConfig
+
+LOGGER = logging.getLogger(__name__)
+CONF = ZeroConfig()
+
+
+class AcSensitivityAnalysis(AcSignalAnalysis):
+    """AC sensitivity analysis.
+
+    Calculates the derivatives of the response from the input to a sink, or of the total noise at a
+    sink, with respect to component parameters using the adjoint method. If the response at the sink
+    is H = e^T A^-1 b, where A is the circuit matrix, b the input excitation and e selects the sink,
+    its derivative with respect to a parameter p is
+
+        dH/dp = -λ^T (dA/dp) x,
+
+    where x = A^-1 b and the adjoint solution λ = A^-T e. The derivatives with respect to every
+    parameter therefore need only one extra, transposed, solve per frequency. Each parameter only
+    affects a few matrix elements, whose derivatives are computed from the circuit's element
+    functions by central differences. The derivative of the noise is computed similarly, with a
+    second solve whose right hand side depends on the adjoint solution.
+
+    Sensitivity analyses cannot be incremental or run in parallel.
+    """
+    # Op-amp parameters included by default.
+    OPAMP_PARAMETERS = ("a0", "gbw", "vnoise", "inoise")
+
+    def __init__(self, *args, **kwargs):
+        if kwargs.get("incremental") or kwargs.get("parallel"):
+            raise ValueError("sensitivity analyses cannot be incremental or parallel")
+
+        super().__init__(*args, **kwargs)
+
+        self._sink = None
+        self._is_noise = False
+        self._parameters = None
+        self._sensitivity_solution = None
+        # Noise sources' matrix indices, and their spectral densities squared.
+        self._noise_indices = None
+        self._noise_power = None
+
+    def reset(self):
+        """Reset state of the analysis"""
+        super().reset()
+        self._noise_indices = None
+        self._noise_power = None
+
+    def calculate(self, input_type, sink, noise=False, parameters=None, impedance=None, **kwargs):
+        """Calculate sensitivities of a response or noise to component parameters.
+
+        Parameters
+        ----------
+        input_type : str
+            Input type, either "voltage" or "current".
+        sink : str or :class:`.Component` or :class:`.Node`
+            The element to calculate the response or noise at.
+        noise : :class:`bool`, optional
+            Calculate the sensitivities of the incoherent sum of all noise at the sink instead of
+            those of the response from the input to the sink.
+        parameters : sequence of :class:`str`, optional
+            The parameters. Each parameter is either a component name, referring to the component's
+            value, or a string of the form "component.attribute", e.g. "op1.gbw". Defaults to the
+            value of every passive component and the parameters in :attr:`OPAMP_PARAMETERS` of
+            every op-amp.
+        impedance : float or :class:`.Quantity`, optional
+            Input impedance for noise sensitivities. If None, the noise analysis default is used.
+
+        Other Parameters
+        ----------------
+        frequencies : :class:`np.ndarray` or sequence
+            The frequency vector to calculate the sensitivities with.
+        node, node_p, node_n : :class:`.Node`
+            The node or nodes to make the input. The `node` parameter sets a single, grounded input,
+            whereas `node_p` and `node_n` together create a floating input.
+        print_equations : :class:`bool`, optional
+            Print the circuit equations.
+        print_matrix : :class:`bool`, optional
+            Print the circuit matrix.
+
+        Returns
+        -------
+        :class:`SensitivitySolution`
+            Solution containing the sensitivities.
+        """
+        if kwargs.get("adaptive"):
+            raise ValueError("sensitivity analyses cannot be adaptive")
+
+        if not hasattr(sink, "name"):
+            sink = self.circuit.get_element(sink)
+
+        if parameters is None:
+            parameters = self.default_parameters
+
+        self._sink = sink
+        self._is_noise = bool(noise)
+        self._parameters = {parameter: resolve_parameter(self.circuit, parameter)
+                            for parameter in parameters}
+
+        if not self._parameters:
+            raise ValueError("at least one parameter must be specified")
+
+        if self._is_noise:
+            if impedance is None:
+                impedance = AcNoiseAnalysis.DEFAULT_INPUT_IMPEDANCE
+                LOGGER.warning(f"assuming default input impedance of {impedance}")
+        elif input_type == "current":
+            # Set impedance to give correct scaling.
+            impedance = 1
+        else:
+            impedance = None
+
+        self._do_calculate(input_type, impedance=impedance, is_noise=self._is_noise, **kwargs)
+        return self._sensitivity_solution
+
+    @property
+    def default_parameters(self):
+        """The parameters sensitivities are calculated for by default."""
+        parameters = []
+
+        for component in self.circuit.components:
+            if isinstance(component, PassiveComponent):
+                parameters.append(component.name)
+            elif isinstance(component, OpAmp):
+                parameters.extend(f"{component.name}.{parameter}"
+                                  for parameter in self.OPAMP_PARAMETERS)
+
+        return parameters
+
+    @property
+    def sink_index(self):
+        """Sink matrix index"""
+        if isinstance(self._sink, Node):
+            return self.node_matrix_index(self._sink)
+
+        return self.component_matrix_index(self._sink)
+
+    def solve(self):
+        """Solve the circuit and its adjoint.
+
+        For noise sensitivities, the right hand side of the circuit's equations depends on the
+        adjoint solution (see :meth:`_build_solution`). The circuit is therefore solved with a unit
+        excitation at each element noise enters at, and the solutions are combined once the adjoint
+        solution is known.
+
+        Returns
+        -------
+        :class:`~np.ndarray`
+            The solutions of the circuit, with shape (dim_size, n_freqs).
+        :class:`~np.ndarray`
+            The solutions of the adjoint circuit, with shape (dim_size, n_freqs).
+        """
+        adjoint_rhs = self.get_empty_results_matrix(1)
+        adjoint_rhs[self.sink_index, 0] = 1
+
+        if self._is_noise:
+            self._noise_indices = [self._noise_source_index(noise)
+                                   for noise in self._current_circuit.noise_sources]
+            self._noise_power = np.square([noise.spectral_density(frequencies=self.frequencies)
+                                           for noise in self._current_circuit.noise_sources])
+
+            rows = sorted(set(self._noise_indices))
+            columns = [rows.index(index) for index in self._noise_indices]
+            rhs = self.get_empty_results_matrix(len(rows))
+            rhs[rows, range(len(rows))] = 1
+        else:
+            rhs = self.right_hand_side()
+
+        solutions = self.solver.full((self.dim_size, self.n_freqs))
+        adjoint_solutions = self.solver.full((self.dim_size, self.n_freqs))
+
+        chunks = [slice(start, start + self.chunk_size)
+                  for start in range(0, self.n_freqs, self.chunk_size)]
+        solved_chunks = self._solve_chunks_serial(chunks, rhs, adjoint_rhs)
+
+        for chunk, results, adjoint_results in self.progress(solved_chunks, len(chunks),
+                                                             update=1):
+            adjoint_solutions[:, chunk] = adjoint_results[:, 0, :]
+
+            if self._is_noise:
+                # The derivative of the total noise power with respect to the noise sources'
+                # responses, which weights the solution for each excited element.
+                weights = np.zeros((len(rows), results.shape[2]), dtype=results.dtype)
+                np.add.at(weights, columns, self._noise_power[:, chunk] * np.conj(
+                    adjoint_results[self._noise_indices, 0, :]))
+                solutions[:, chunk] = np.einsum("ijk,jk->ik", results, weights)
+            else:
+                solutions[:, chunk] = results[:, 0, :]
+
+        return solutions, adjoint_solutions
+
+    def _noise_source_index(self, noise):
+        """Matrix index of the element a noise source enters the circuit at."""
+        if noise.element_type == "component" and noise.component.element_type == "subcircuit":
+            raise ValueError("noise sensitivities cannot be calculated for noise from within "
+                             "subcircuits")
+        elif noise.element_type == "component":
+            return self.component_matrix_index(noise.component)
+        elif noise.element_type == "node":
+            return self.node_matrix_index(noise.node)
+
+        raise ValueError("unrecognised noise source present in circuit")
+
+    def _build_solution(self, results):
+        solutions, adjoint_solutions = results
+        pattern = self.stamp_pattern
+        step = float(CONF["analysis"]["sensitivity"]["relative_step"])
+
+        if self._is_noise:
+            # Total noise power at the sink.
+            responses = np.abs(adjoint_solutions[self._noise_indices, :])
+            nominal = np.sqrt(np.sum(np.square(responses) * self._noise_power, axis=0))
+        else:
+            nominal = solutions[self.sink_index, :]
+
+        solution = SensitivitySolution(self.frequencies, self._sink, nominal,
+                                       is_noise=self._is_noise)
+
+        # The circuit matrix's frequency-dependent elements.
+        positions = np.array([position for position, _ in pattern.generators], dtype=int)
+        generators = [generator for _, generator in pattern.generators]
+        values = _evaluate(generators, self.frequencies)
+
+        for parameter, (component, attribute) in self._parameters.items():
+            value = float(getattr(component, attribute))
+            delta = step * abs(value) if value else step
+
+            # Central differences of the elements that depend on the parameter.
+            with _perturbed(component, attribute, value + delta):
+                upper = _evaluate(generators, self.frequencies)
+
+            changed = np.any(upper != values, axis=1)
+
+            with _perturbed(component, attribute, value - delta):
+                lower = _evaluate([generator for generator, is_changed
+                                   in zip(generators, changed) if is_changed], self.frequencies)
+
+            element_derivatives = (upper[changed] - lower) / (2 * delta)
+            rows = pattern.rows[positions[changed]]
+            columns = pattern.columns[positions[changed]]
+
+            # Adjoint product -λ^T (dA/dp) x.
+            derivative = -np.sum(adjoint_solutions[rows, :] * element_derivatives
+                                 * solutions[columns, :], axis=0)
+
+            if self._is_noise:
+                # Derivative of the noise power, d(S^2)/dp, including that of the noise sources.
+                derivative = 2 * np.real(derivative)
+                noise_sources = list(self._current_circuit.noise_sources)
+
+                for index, noise in enumerate(noise_sources):
+                    if getattr(noise, "component", None) is not component:
+                        continue
+
+                    with _perturbed(component, attribute, value + delta):
+                        upper_power = np.square(noise.spectral_density(
+                            frequencies=self.frequencies))
+                    with _perturbed(component, attribute, value - delta):
+                        lower_power = np.square(noise.spectral_density(
+                            frequencies=self.frequencies))
+
+                    derivative += (np.square(responses[index]) * (upper_power - lower_power)
+                                   / (2 * delta))
+
+                # d(S^2)/dp = 2 S dS/dp.
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    derivative = np.where(nominal > 0, derivative / (2 * nominal), 0)
+
+            solution.add_sensitivity(parameter, value, derivative)
+
+        self._sensitivity_solution = solution
+
+
+class SensitivitySolution:
+    """Sensitivities of a response or noise to component parameters.
+
+    Parameters
+    ----------
+    frequencies : :class:`np.ndarray`
+        The frequencies.
+    sink : :class:`.Node` or :class:`.Component`
+        The sink.
+    nominal : :class:`np.ndarray`
+        The complex response from the input to the sink, or the total noise at the sink.
+    is_noise : :class:`bool`, optional
+        Whether the sensitivities are of noise.
+    """
+    def __init__(self, frequencies, sink, nominal, is_noise=False):
+        self.frequencies = frequencies
+        self.sink = sink
+        self.nominal = nominal
+        self.is_noise = is_noise
+        self.values = {}
+        self._derivatives = {}
+
+    @property
+    def parameters(self):
+        """The parameters."""
+        return list(self._derivatives)
+
+    def add_sensitivity(self, parameter, value, derivative):
+        """Add the derivative with respect to a parameter.
+
+        Parameters
+        ----------
+        parameter : :class:`str`
+            The parameter.
+        value : :class:`float`
+            The parameter's value.
+        derivative : :class:`np.ndarray`
+            The derivative at each frequency.
+        """
+        self.values[parameter] = value
+        self._derivatives[parameter] = derivative
+
+    def derivative(self, parameter):
+        """Derivative of the response or noise with respect to a parameter.
+
+        Parameters
+        ----------
+        parameter : :class:`str`
+            The parameter.
+
+        Returns
+        -------
+        :class:`np.ndarray`
+            The derivative at each frequency. This is complex for responses and real for noise.
+        """
+        try:
+            return self._derivatives[parameter]
+        except KeyError:
+            raise ValueError(f"no sensitivity to '{parameter}'")
+
+    def relative(self, parameter):
+        """Relative sensitivity to a parameter.
+
+        The relative sensitivity is the fractional change in the response or noise per fractional
+        change in the parameter, (p / H) dH/dp. For responses, its real part is the relative
+        sensitivity of the magnitude and its imaginary part that of the phase, in radians.
+
+        Parameters
+        ----------
+        parameter : :class:`str`
+            The parameter.
+
+        Returns
+        -------
+        :class:`np.ndarray`
+            The relative sensitivity at each frequency.
+        """
+        derivative = self.derivative(parameter)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(self.nominal != 0, self.values[parameter] * derivative / self.nominal,
+                            0)
+
+
+def _evaluate(generators, frequencies):
+    """Evaluate matrix element generators, returning an array with shape (n_generators, n_freqs)."""
+    values = np.empty((len(generators), len(frequencies)), dtype=complex)
+
+    for index, generator in enumerate(generators):
+        values[index] = generator(frequencies)
+
+    return values
+
+
+@contextmanager
+def _perturbed(component, attribute, value):
+    """Context in which a component attribute has a different value."""
+    original = getattr(component, attribute)
+    setattr(component, attribute, value)
+
+    try:
+        yield
+    finally:
+        setattr(component, attribute, original)
@@ -2,25 +2,50 @@ import logging
 import numpy as np
 
 from .base import BaseAcAnalysis
-from ...data import Response, Series
+from ...components import Component, Input, Node
 
 LOGGER = logging.getLogger(__name__)
 
 
 class AcSignalAnalysis(BaseAcAnalysis):
     """AC signal analysis"""
-    def calculate(self, input_type, **kwargs):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # Elements to calculate responses to, or None for every component and node.
+        self._sinks = None
+        # Matrix indices corresponding to the rows of the solved responses, or None if every
+        # matrix index is solved for.
+        self._result_rows = None
+
+    def reset(self):
+        """Reset state of the analysis"""
+        super().reset()
+        self._result_rows = None
+
+    def calculate(self, input_type, sinks=None, **kwargs):
         """Calculate responses.
 
         Parameters
         ----------
         input_type : str
             Input type, either "voltage" or "current".
+        sinks : sequence of :class:`str`, :class:`.Node` or :class:`.Component`, optional
+            The elements to calculate responses to. Defaults to every component and node. Only the
+            responses to these elements are solved for and kept, which reduces the time and memory
+            used by large circuits.
 
         Other Parameters
         ----------------
         frequencies : :class:`np.ndarray` or sequence
-            The frequency vector to calculate the response with.
+            The frequency vector to calculate the response with. In adaptive mode, this is the
+            starting frequency vector.
+        adaptive : :class:`bool`, optional
+            Refine the frequencies where the results change quickly. The solution then contains
+            the refined, non-uniform frequency vector.
+        max_solves : :class:`int`, optional
+            The maximum number of frequencies to solve in adaptive mode. Defaults to the
+            ``analysis.adaptive.max_solves`` configuration setting.
         node, node_p, node_n : :class:`.Node`
             The node or nodes to make the input. The `node` parameter sets a single, grounded input,
             whereas `node_p` and `node_n` together create a floating input.
@@ -34,6 +59,12 @@ class AcSignalAnalysis(BaseAcAnalysis):
         :class:`~.solution.Solution`
             Solution containing noise spectra at the specified sink (or projected sink).
         """
+        return self._cached_calculate(self._calculate_responses, input_type=input_type,
+                                      sinks=sinks, **kwargs)
+
+    def _calculate_responses(self, input_type, sinks=None, **kwargs):
+        self._sinks = sinks
+
         if input_type == "current":
             # Set impedance to give correct scaling.
             impedance = 1
@@ -47,63 +78,146 @@ class AcSignalAnalysis(BaseAcAnalysis):
         """Right hand side excitation component index"""
         return self.input_component_index
 
-    def _build_solution(self, responses):
-        # Empty responses.
-        empty = []
-
-        # Output component indices.
-        for component in self._current_circuit.components:
-            # Extract response for this component.
-            response = responses[self.component_matrix_index(component), :]
-
-            if np.all(response) == 0:
-                # Null response.
-                empty.append(component)
-
-            # Create data series.
-            series = Series(x=self.frequencies, y=response)
-
-            # Create appropriate response function depending on input type.
-            if self.has_voltage_input:
-                source = self._current_circuit.input_component.node_p
-            elif self.has_current_input:
-                source = self._current_circuit.input_component
-            else:
-                raise ValueError("specify either a current or voltage input")
+    @property
+    def sink_elements(self):
+        """Elements to calculate responses to."""
+        if self._sinks is None:
+            return list(self.element_index_map.components) + list(self.element_index_map.nodes)
 
-            function = Response(source=source, sink=component, series=series)
+        return [self._current_circuit.get_element(sink) if not hasattr(sink, "name") else sink
+                for sink in self._sinks]
 
-            # Add response to solution.
-            self.solution.add_response(function)
+    def solve(self):
+        """Solve the circuit.
 
-        # Output node indices.
-        for node in self._current_circuit.non_gnd_nodes:
-            # Extract response for this node.
-            response = responses[self.node_matrix_index(node), :]
+        Returns
+        -------
+        :class:`~np.ndarray`
+            The responses from the input, with shape (n_rows, n_freqs). The rows correspond to the
+            matrix indices in :attr:`_result_rows`, or to every matrix index if it is None.
+        """
+        return self._solve_rows(self.right_hand_side())[:, 0, :]
 
-            if np.all(response) == 0:
-                # Null response.
-                empty.append(node)
+    def _required_rows(self):
+        """Matrix indices of the results needed for the solution, or None if all are needed."""
+        if self._sinks is None:
+            return None
 
-            # Create series.
-            series = Series(x=self.frequencies, y=response)
+        return [self._element_matrix_index(sink) for sink in self.sink_elements]
 
-            # Create appropriate response function depending on input type.
-            if self.has_voltage_input:
-                source = self._current_circuit.input_component.node_p
-            elif self.has_current_input:
-                source = self._current_circuit.input_component
-            else:
-                raise ValueError("specify either a current or voltage input")
+    def _solve_rows(self, rhs):
+        """Solve the circuit against a block of right hand sides for the rows needed for the
+        solution.
+
+        The rows are kept from the solutions of the circuit (a forward solve), unless there are
+        fewer rows than right hand sides, in which case they are instead calculated from solutions
+        of the transposed circuit (an adjoint solve): the ith row of the solution to Ax = b is
+        y_i^T b, where A^T y_i = e_i and e_i is the ith unit vector. Each solve needs one solution
+        per right hand side, so the adjoint solve is cheaper when there are fewer rows than inputs.
+
+        Parameters
+        ----------
+        rhs : :class:`~np.ndarray`
+            The right hand sides, with shape (dim_size, n_rhs).
+
+        Returns
+        -------
+        :class:`~np.ndarray`
+            The rows of the solutions, with shape (n_rows, n_rhs, n_freqs).
+        """
+        rows = self._required_rows()
+        self._result_rows = rows
+
+        if rows is None:
+            return self.solve_block(rhs)
+
+        if self.incremental or len(rows) >= rhs.shape[1]:
+            return self._solve(rhs, rows=rows)
+
+        LOGGER.debug("solving transposed circuit for %i rows", len(rows))
+
+        adjoint_rhs = self.get_empty_results_matrix(len(rows))
+        adjoint_rhs[rows, np.arange(len(rows))] = 1
+        # Only the elements of the adjoint solutions multiplying nonzero excitations are needed.
+        excited = np.flatnonzero(np.any(rhs, axis=1))
+
+        _, adjoint = self._solve(self.get_empty_results_matrix(0), adjoint_rhs, rows=[],
+                                 transposed_rows=excited)
+        return np.einsum("erf,ej->rjf", adjoint, rhs[excited])
+
+    def _result_row(self, element):
+        """Row of the solved responses corresponding to an element."""
+        index = self._element_matrix_index(element)
+
+        if self._result_rows is None:
+            return index
+
+        return self._result_rows.index(index)
 
-            function = Response(source=source, sink=node, series=series)
+    def _build_solution(self, responses):
+        self._add_responses(responses, self.input_source, self.element_index_map.components)
+
+    def _add_responses(self, responses, source, components):
+        """Add responses from a source to the sinks to the solution.
+
+        Parameters
+        ----------
+        responses : :class:`np.ndarray`
+            The solved responses from the source, with shape (n_rows, n_freqs).
+        source : :class:`.Node` or :class:`.Component`
+            The response source.
+        components : sequence of :class:`.Component`
+            The components that can be sinks. Responses to other components are not added.
+        """
+        components = set(components)
+        sinks = [sink for sink in self.sink_elements
+                 if not isinstance(sink, Component) or sink in components]
+        data = responses[[self._result_row(sink) for sink in sinks], :]
+
+        # Add responses to solution. The response objects are created when requested.
+        self.solution.add_response_data(source, sinks, data)
 
-            # Add response to solution.
-            self.solution.add_response(function)
+        # Null responses.
+        empty = [sink for sink, nonzero in zip(sinks, np.all(data, axis=1)) if not nonzero]
 
         if len(empty):
             LOGGER.debug("empty responses: %s", ", ".join([str(response) for response in empty]))
 
+    @property
+    def input_source(self):
+        """Response source corresponding to the circuit input.
+
+        This is the input's positive node for voltage inputs, and the input component itself for
+        current inputs.
+        """
+        # Create appropriate response function depending on input type.
+        if self.has_voltage_input:
+            return self._current_circuit.input_component.node_p
+        elif self.has_current_input:
+            return self._current_circuit.input_component
+
+        raise ValueError("specify either a current or voltage input")
+
+    def _input_voltage(self, response, component):
+        """Voltage across an input's nodes in the specified response.
+
+        Raises
+        ------
+        ValueError
+            If the voltage is zero at any frequency.
+        """
+        voltage = np.zeros(self.n_freqs, dtype=response.dtype)
+
+        if component.node_p is not Node("gnd"):
+            voltage += response[self._result_row(component.node_p), :]
+        if component.node_n is not Node("gnd"):
+            voltage -= response[self._result_row(component.node_n), :]
+
+        if np.any(voltage == 0):
+            raise ValueError(f"voltage input '{component.name}' has zero impedance")
+
+        return voltage
+
     @property
     def input_component_index(self):
         """Input component's matrix index"""
@@ -123,3 +237,174 @@ class AcSignalAnalysis(BaseAcAnalysis):
     def has_current_input(self):
         """Check if circuit has a current input."""
         return self._current_circuit.input_component.input_type == "current"
+
+
+class AcMultiSignalAnalysis(AcSignalAnalysis):
+    """AC signal analysis with multiple inputs
+
+    Each input is added to the circuit as a unit current injection. Undriven current inputs are
+    open circuits, so a single circuit matrix serves every input: each frequency's matrix is
+    factorised once and solved against a block of right hand sides with one column per input.
+    Responses to voltage inputs are obtained by scaling the responses to each input's current
+    injection by the voltage it develops across the input's nodes.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._inputs = None
+
+    def reset(self):
+        """Reset state of the analysis"""
+        super().reset()
+        self._inputs = None
+
+    def calculate(self, input_type, nodes, sinks=None, **kwargs):
+        """Calculate responses from each input.
+
+        Parameters
+        ----------
+        input_type : str
+            Input type, either "voltage" or "current".
+        nodes : sequence
+            The inputs. Each input is either a node, which creates a grounded input, or a
+            (`node_p`, `node_n`) pair, which creates a floating input.
+        sinks : sequence of :class:`str`, :class:`.Node` or :class:`.Component`, optional
+            The elements to calculate responses to. Defaults to every component and node. If there
+            are fewer sinks than inputs, the responses are solved for using the transposed circuit
+            matrix, with one solution per sink instead of one per input.
+
+        Other Parameters
+        ----------------
+        frequencies : :class:`np.ndarray` or sequence
+            The frequency vector to calculate the responses with.
+        print_equations : :class:`bool`, optional
+            Print the circuit equations.
+        print_matrix : :class:`bool`, optional
+            Print the circuit matrix.
+
+        Returns
+        -------
+        :class:`~.solution.Solution`
+            Solution containing responses from each input to each sink. The source of each response
+            is the input's positive node for voltage inputs, and the input component for current
+            inputs.
+
+        Raises
+        ------
+        ValueError
+            If no inputs are specified, an input is specified more than once, or a voltage input
+            has zero impedance.
+        """
+        self._sinks = sinks
+        self._do_calculate(input_type, nodes=nodes, **kwargs)
+        return self.solution
+
+    def validate_circuit(self):
+        """Validate circuit"""
+        if not self._inputs:
+            raise ValueError("at least one input must be specified")
+
+    def _set_input(self, input_type, nodes):
+        """Set circuit inputs."""
+        input_type = input_type.lower()
+
+        if input_type not in ("voltage", "current"):
+            raise ValueError("unrecognised input type")
+
+        self.input_type = input_type
+
+        if self.input_components:
+            raise Exception("circuit already has input")
+
+        self._inputs = []
+
+        for spec in nodes:
+            if isinstance(spec, (tuple, list)):
+                if len(spec) != 2:
+                    raise ValueError(f"floating input '{spec}' must be a (node_p, node_n) pair")
+
+                node_p, node_n = spec
+            else:
+                node_p, node_n = spec, Node("gnd")
+
+            self._create_input_component(node_n, node_p, impedance=1, is_noise=False)
+
+    def _create_input_component(self, node_n, node_p, impedance, is_noise):
+        """Create circuit input component.
+
+        Inputs are always created as current inputs with unit impedance, so that inputs which are
+        not driven are open circuits.
+        """
+        component = Input([node_n, node_p], "current", impedance=impedance, is_noise=is_noise)
+
+        # Give each input a unique name.
+        if component.node_n is Node("gnd"):
+            component.name = f"input_{component.node_p.name}"
+        else:
+            component.name = f"input_{component.node_p.name}_{component.node_n.name}"
+
+        if component in self._inputs:
+            raise ValueError(f"input '{component.name}' specified more than once")
+
+        if self.input_type == "voltage":
+            if component.node_p in [other.node_p for other in self._inputs]:
+                raise ValueError(f"voltage inputs must have unique positive nodes (node "
+                                 f"'{component.node_p}' used more than once)")
+
+        self._current_circuit.add_component(component)
+        self._inputs.append(component)
+
+    def right_hand_side(self):
+        """Circuit signal excitation matrix.
+
+        This creates a matrix of size nxm, where n is the number of elements in the circuit and m is
+        the number of inputs, with all elements zero except for each input component in its
+        respective column, which is set to 1.
+
+        Returns
+        -------
+        :class:`np.ndarray`
+            The circuit's excitation matrix.
+        """
+        rhs = self.get_empty_results_matrix(len(self._inputs))
+
+        for column, component in enumerate(self._inputs):
+            rhs[self.component_matrix_index(component), column] = 1
+
+        return rhs
+
+    def solve(self):
+        """Solve the circuit for every input.
+
+        Returns
+        -------
+        :class:`~np.ndarray`
+            The responses, with shape (n_rows, n_inputs, n_freqs).
+        """
+        return self._solve_rows(self.right_hand_side())
+
+    def _required_rows(self):
+        rows = super()._required_rows()
+
+        if rows is None or self.input_type != "voltage":
+            return rows
+
+        # The responses to voltage inputs are scaled by the voltages across the inputs.
+        return rows + [self.node_matrix_index(node) for component in self._inputs
+                       for node in (component.node_p, component.node_n) if node is not Node("gnd")]
+
+    def _build_solution(self, responses):
+        for column, component in enumerate(self._inputs):
+            response = responses[:, column, :]
+
+            if self.input_type == "voltage":
+                # Scale to unit voltage across the input.
+                response = response / self._input_voltage(response, component)
+                source = component.node_p
+            else:
+                source = component
+
+            # Other inputs are not part of this input's circuit.
+            components = [other for other in self.element_index_map.components
+                          if other not in self._inputs or other is component]
+
+            self._add_responses(response, source, components)
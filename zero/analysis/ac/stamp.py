@@ -0,0 +1,661 @@
+"""Compiled circuit matrix stamps"""
+
+from collections import defaultdict
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components, maximum_bipartite_matching
+
+
+class StampPattern:
+    """Compiled representation of a circuit matrix.
+
+    The sparsity pattern of the circuit matrix is identical at every frequency; only the values of
+    the frequency-dependent elements change. A stamp pattern stores the matrix coordinates once, in
+    compressed sparse row order, alongside the constant element values and the callables that
+    generate the frequency-dependent values, so that building the matrix for a new frequency (or
+    block of frequencies) requires only a single array fill.
+
+    Parameters
+    ----------
+    shape : :class:`tuple`
+        The matrix shape.
+    rows, columns : :class:`np.ndarray`
+        The row and column indices of each stored element, in compressed sparse row order.
+    constants : :class:`np.ndarray`
+        The stored element values, with zeros in place of frequency-dependent elements.
+    generators : :class:`list` of :class:`tuple`
+        Pairs containing the position in the stored element array of each frequency-dependent
+        element and a callable returning its value given a frequency or frequency vector.
+    """
+    def __init__(self, shape, rows, columns, constants, generators):
+        self.shape = tuple(shape)
+        self.rows = np.asarray(rows, dtype=int)
+        self.columns = np.asarray(columns, dtype=int)
+        self.constants = np.asarray(constants)
+        self.generators = list(generators)
+
+        # Compressed sparse row index pointers.
+        self.indptr = np.concatenate(([0], np.cumsum(np.bincount(self.rows,
+                                                                 minlength=self.shape[0]))))
+
+    @classmethod
+    def from_coefficients(cls, shape, coefficients, dtype):
+        """Compile a stamp pattern from matrix coefficients.
+
+        Where more than one coefficient is specified for the same matrix element, the last takes
+        precedence.
+
+        Parameters
+        ----------
+        shape : :class:`tuple`
+            The matrix shape.
+        coefficients : sequence of :class:`tuple`
+            The row index, column index and value of each coefficient. The value is either a
+            constant or a callable accepting a frequency or frequency vector.
+        dtype : :class:`str` or :class:`np.dtype`
+            The matrix data type.
+
+        Returns
+        -------
+        :class:`StampPattern`
+            The compiled stamp pattern.
+        """
+        elements = {}
+
+        for row, column, value in coefficients:
+            elements[(row, column)] = value
+
+        # Sort the elements into compressed sparse row order.
+        coordinates = sorted(elements)
+
+        rows = [row for row, _ in coordinates]
+        columns = [column for _, column in coordinates]
+        constants = np.zeros(len(coordinates), dtype=dtype)
+        generators = []
+
+        for position, coordinate in enumerate(coordinates):
+            value = elements[coordinate]
+
+            if callable(value):
+                generators.append((position, value))
+            else:
+                constants[position] = value
+
+        return cls(shape, rows, columns, constants, generators)
+
+    def transpose(self):
+        """Stamp pattern of the transposed matrix.
+
+        Returns
+        -------
+        :class:`StampPattern`
+            The transposed stamp pattern.
+        """
+        # Sort the transposed coordinates into compressed sparse row order.
+        order = np.lexsort((self.rows, self.columns))
+
+        # Map from original to transposed stored element positions.
+        positions = np.empty_like(order)
+        positions[order] = np.arange(len(order))
+
+        generators = [(positions[position], generator) for position, generator in self.generators]
+
+        return self.__class__(self.shape[::-1], self.columns[order], self.rows[order],
+                              self.constants[order], generators)
+
+    def without_generators(self):
+        """Copy of the stamp pattern without its frequency-dependent value generators.
+
+        The copy can build matrices from stored element values computed by this pattern, but not
+        compute values itself. Unlike this pattern, it can be pickled, e.g. to be sent to another
+        process.
+
+        Returns
+        -------
+        :class:`StampPattern`
+            The stamp pattern copy.
+        """
+        return self.__class__(self.shape, self.rows, self.columns, self.constants, [])
+
+    @property
+    def nnz(self):
+        """Number of stored elements."""
+        return len(self.constants)
+
+    @property
+    def dtype(self):
+        """Matrix data type."""
+        return self.constants.dtype
+
+    def values(self, frequencies):
+        """Stored element values for a frequency vector.
+
+        Parameters
+        ----------
+        frequencies : :class:`np.ndarray` or sequence
+            The frequencies to compute the values for.
+
+        Returns
+        -------
+        :class:`np.ndarray`
+            The stored element values, with shape (n_freqs, nnz).
+        """
+        frequencies = np.asarray(frequencies)
+        values = np.tile(self.constants, (len(frequencies), 1))
+
+        for position, generator in self.generators:
+            values[:, position] = generator(frequencies)
+
+        return values
+
+    def matrix(self, frequency):
+        """Sparse matrix for a single frequency.
+
+        Parameters
+        ----------
+        frequency : :class:`float`
+            The frequency to compute the matrix for.
+
+        Returns
+        -------
+        :class:`scipy.sparse.csr_matrix`
+            The sparse matrix.
+        """
+        data = self.constants.copy()
+
+        for position, generator in self.generators:
+            data[position] = generator(frequency)
+
+        return self.matrix_from_values(data)
+
+    def full(self, frequency):
+        """Full matrix for a single frequency.
+
+        Parameters
+        ----------
+        frequency : :class:`float`
+            The frequency to compute the matrix for.
+
+        Returns
+        -------
+        :class:`np.ndarray`
+            The full matrix.
+        """
+        data = self.constants.copy()
+
+        for position, generator in self.generators:
+            data[position] = generator(frequency)
+
+        return self.full_from_values(data)
+
+    def matrix_from_values(self, data):
+        """Sparse matrix containing the specified stored element values.
+
+        Parameters
+        ----------
+        data : :class:`np.ndarray`
+            The stored element values, e.g. one row of the array returned by :meth:`values`.
+
+        Returns
+        -------
+        :class:`scipy.sparse.csr_matrix`
+            The sparse matrix.
+        """
+        return csr_matrix((data, self.columns, self.indptr), shape=self.shape)
+
+    def full_from_values(self, data):
+        """Full matrix containing the specified stored element values.
+
+        Parameters
+        ----------
+        data : :class:`np.ndarray`
+            The stored element values, e.g. one row of the array returned by :meth:`values`.
+
+        Returns
+        -------
+        :class:`np.ndarray`
+            The full matrix.
+        """
+        matrix = np.zeros(self.shape, dtype=self.dtype)
+        matrix[self.rows, self.columns] = data
+
+        return matrix
+
+    def stack(self, frequencies):
+        """Full matrices for a frequency vector.
+
+        Parameters
+        ----------
+        frequencies : :class:`np.ndarray` or sequence
+            The frequencies to compute the matrices for.
+
+        Returns
+        -------
+        :class:`np.ndarray`
+            The full matrices, with shape (n_freqs, \\*shape).
+        """
+        return self.stack_from_values(self.values(frequencies))
+
+    def stack_from_values(self, values):
+        """Full matrices containing the specified stored element values.
+
+        Parameters
+        ----------
+        values : :class:`np.ndarray`
+            The stored element values, with shape (n_matrices, nnz), e.g. as returned by
+            :meth:`values`.
+
+        Returns
+        -------
+        :class:`np.ndarray`
+            The full matrices, with shape (n_matrices, \\*shape).
+        """
+        stack = np.zeros((len(values), *self.shape), dtype=self.dtype)
+        stack[:, self.rows, self.columns] = values
+
+        return stack
+
+    def submatrix(self, rows, columns):
+        """Stamp pattern of the submatrix containing the specified rows and columns.
+
+        Parameters
+        ----------
+        rows, columns : sequence of :class:`int`
+            The indices of the rows and columns to keep.
+
+        Returns
+        -------
+        :class:`StampPattern`
+            The submatrix stamp pattern.
+        """
+        rows = np.array(sorted(set(rows)), dtype=int)
+        columns = np.array(sorted(set(columns)), dtype=int)
+
+        # Indices within the submatrix.
+        row_indices = np.full(self.shape[0], -1)
+        row_indices[rows] = np.arange(len(rows))
+        column_indices = np.full(self.shape[1], -1)
+        column_indices[columns] = np.arange(len(columns))
+
+        # Stored element positions within the submatrix, which remain in compressed sparse row
+        # order.
+        positions = np.flatnonzero((row_indices[self.rows] >= 0)
+                                   & (column_indices[self.columns] >= 0))
+        new_positions = np.full(self.nnz, -1)
+        new_positions[positions] = np.arange(len(positions))
+
+        generators = [(new_positions[position], generator)
+                      for position, generator in self.generators if new_positions[position] >= 0]
+
+        return self.__class__((len(rows), len(columns)),
+                              row_indices[self.rows[positions]],
+                              column_indices[self.columns[positions]], self.constants[positions],
+                              generators)
+
+    def _graph(self):
+        """Sparse matrix with a stored element wherever the pattern has one."""
+        return csr_matrix((np.ones(self.nnz), self.columns, self.indptr), shape=self.shape)
+
+    def blocks(self):
+        """Independent blocks of the matrix.
+
+        Unknowns are in the same block if they are connected by a chain of stored elements. The
+        matrix is block diagonal when its unknowns are ordered by block, so each block can be
+        solved separately.
+
+        Returns
+        -------
+        :class:`np.ndarray`
+            The block label of each unknown.
+        """
+        _, labels = connected_components(self._graph(), directed=False)
+
+        return labels
+
+    def unmatched_columns(self):
+        """Columns not matched to a row by a maximum matching of the stored elements.
+
+        A matrix is structurally singular, i.e. singular whatever its stored element values, if
+        its rows and columns cannot be matched in pairs by stored elements.
+
+        Returns
+        -------
+        :class:`np.ndarray`
+            The unmatched column indices, empty if the matrix is structurally nonsingular.
+        """
+        if not self.nnz:
+            return np.arange(self.shape[1])
+
+        matches = maximum_bipartite_matching(self._graph(), perm_type="row")
+
+        return np.flatnonzero(matches < 0)
+
+
+class BlockPattern:
+    """Circuit matrix restricted to some of its independent blocks.
+
+    Unknowns in blocks without excited rows are zero, so only the blocks containing the excited
+    rows need to be solved. The solutions of the other unknowns are zero.
+
+    Parameters
+    ----------
+    pattern : :class:`StampPattern`
+        The circuit matrix stamp pattern.
+    kept : sequence of :class:`int`
+        The matrix indices of the unknowns to keep, which must be the union of blocks.
+    """
+    def __init__(self, pattern, kept):
+        self.full_shape = pattern.shape
+        self.kept = np.array(sorted(set(kept)), dtype=int)
+
+        is_kept = np.zeros(pattern.shape[0], dtype=bool)
+        is_kept[self.kept] = True
+        # Stored element positions within the blocks, which remain in compressed sparse row order.
+        self._positions = np.flatnonzero(is_kept[pattern.rows])
+
+        if not np.all(is_kept[pattern.columns[self._positions]]):
+            raise ValueError("kept unknowns must be a union of blocks")
+
+        indices = np.full(pattern.shape[0], -1)
+        indices[self.kept] = np.arange(len(self.kept))
+        size = len(self.kept)
+
+        self.pattern = StampPattern((size, size), indices[pattern.rows[self._positions]],
+                                    indices[pattern.columns[self._positions]],
+                                    pattern.constants[self._positions], [])
+
+    @property
+    def shape(self):
+        """Block matrix shape."""
+        return self.pattern.shape
+
+    @property
+    def nnz(self):
+        """Number of stored elements of the block matrix."""
+        return self.pattern.nnz
+
+    def values(self, values):
+        """Block matrix stored element values.
+
+        Parameters
+        ----------
+        values : :class:`np.ndarray`
+            The full matrix stored element values, with shape (n_freqs, nnz).
+
+        Returns
+        -------
+        :class:`np.ndarray`
+            The block matrix stored element values, with shape (n_freqs, block nnz).
+        """
+        return values[:, self._positions]
+
+    def reduce(self, rhs):
+        """Block right hand sides.
+
+        Parameters
+        ----------
+        rhs : :class:`np.ndarray` or None
+            The right hand sides, with shape (dim_size, n_rhs).
+
+        Returns
+        -------
+        :class:`np.ndarray` or None
+            The right hand sides of the kept unknowns, with shape (block dim_size, n_rhs), or
+            None if `rhs` is None.
+
+        Raises
+        ------
+        ValueError
+            If the right hand sides of the other unknowns are not zero.
+        """
+        if rhs is None:
+            return None
+
+        if np.any(np.delete(rhs, self.kept, axis=0)):
+            raise ValueError("unknowns outside the blocks cannot be excited")
+
+        return rhs[self.kept]
+
+    def expand(self, results, values, transpose=False):
+        """Full solutions from those of the blocks.
+
+        Parameters
+        ----------
+        results : :class:`np.ndarray` or None
+            The solutions of the blocks, with shape (block dim_size, n_rhs, n_freqs).
+        values : :class:`np.ndarray`
+            The full matrix stored element values, with shape (n_freqs, nnz). Unused.
+        transpose : :class:`bool`, optional
+            Whether the results are solutions of the transposed system. Unused.
+
+        Returns
+        -------
+        :class:`np.ndarray` or None
+            The full solutions, with shape (dim_size, n_rhs, n_freqs), or None if `results` is
+            None.
+        """
+        if results is None:
+            return None
+
+        full = np.zeros((self.full_shape[0], *results.shape[1:]), dtype=results.dtype)
+        full[self.kept] = results
+
+        return full
+
+
+class CompactPattern:
+    """Circuit matrix with component currents eliminated.
+
+    Currents through components whose matrix rows contain only their own impedance and node
+    voltage coefficients, and whose columns otherwise appear only in node current equations, can
+    be eliminated from the circuit matrix. Partitioning the unknowns of Ax = b into the eliminated
+    currents x_e, whose impedances form the diagonal matrix D, and the remaining unknowns x_r
+    gives::
+
+        [D E] [x_e]   [ 0 ]
+        [F G] [x_r] = [b_r]
+
+    so the remaining unknowns solve the compact system (G - F D^-1 E) x_r = b_r, and the eliminated
+    currents are recovered as x_e = -D^-1 E x_r. This is modified nodal analysis: the compact
+    matrix has one row for each node and each component whose current is kept. The transposed
+    system is solved using the transposed compact matrix, with y_e = -D^-1 F^T y_r. The right hand
+    sides must be zero for the eliminated currents.
+
+    Parameters
+    ----------
+    pattern : :class:`StampPattern`
+        The circuit matrix stamp pattern.
+    eliminated : sequence of :class:`int`
+        The matrix indices of the currents to eliminate.
+
+    Raises
+    ------
+    ValueError
+        If a current cannot be eliminated.
+    """
+    def __init__(self, pattern, eliminated):
+        size = pattern.shape[0]
+        self.full_shape = pattern.shape
+        self.eliminated = np.array(sorted(set(eliminated)), dtype=int)
+
+        is_eliminated = np.zeros(size, dtype=bool)
+        is_eliminated[self.eliminated] = True
+        self.kept = np.flatnonzero(~is_eliminated)
+
+        # Position of each eliminated current in the eliminated currents, and of each kept unknown
+        # in the compact matrix.
+        ordinals = np.full(size, -1)
+        ordinals[self.eliminated] = np.arange(len(self.eliminated))
+        compact_indices = np.full(size, -1)
+        compact_indices[self.kept] = np.arange(len(self.kept))
+
+        rows, columns = pattern.rows, pattern.columns
+        eliminated_rows = is_eliminated[rows]
+        eliminated_columns = is_eliminated[columns]
+
+        if np.any(eliminated_rows & eliminated_columns & (rows != columns)):
+            raise ValueError("eliminated currents must not be coupled to each other")
+
+        diagonals = np.full(size, -1)
+        diagonal = np.flatnonzero(eliminated_rows & (rows == columns))
+        diagonals[rows[diagonal]] = diagonal
+        # Stored element positions of each eliminated current's impedance.
+        self._diagonals = diagonals[self.eliminated]
+
+        if np.any(self._diagonals < 0):
+            raise ValueError("eliminated currents must have impedances")
+
+        # Stored element positions of E, F and G.
+        self._e = np.flatnonzero(eliminated_rows & ~eliminated_columns)
+        self._f = np.flatnonzero(~eliminated_rows & eliminated_columns)
+        self._g = np.flatnonzero(~eliminated_rows & ~eliminated_columns)
+
+        # The products F D^-1 E, with an E and F element for each eliminated current.
+        e_by_current = defaultdict(list)
+        f_by_current = defaultdict(list)
+
+        for position in self._e:
+            e_by_current[ordinals[rows[position]]].append(position)
+
+        for position in self._f:
+            f_by_current[ordinals[columns[position]]].append(position)
+
+        terms = np.array([(f, e, ordinal) for ordinal, f_positions in f_by_current.items()
+                          for f in f_positions for e in e_by_current[ordinal]],
+                         dtype=int).reshape(-1, 3)
+        self._term_f, self._term_e, self._term_ordinals = terms.T
+
+        # Compact matrix coordinates of G and the products, in compressed sparse row order.
+        compact_size = len(self.kept)
+        keys = np.concatenate((compact_indices[rows[self._g]] * compact_size
+                               + compact_indices[columns[self._g]],
+                               compact_indices[rows[self._term_f]] * compact_size
+                               + compact_indices[columns[self._term_e]]))
+        keys, targets = np.unique(keys, return_inverse=True)
+        self._g_targets = targets[:len(self._g)]
+        self._terms = csr_matrix((np.ones(len(self._term_f)),
+                                  (targets[len(self._g):], np.arange(len(self._term_f)))),
+                                 shape=(len(keys), len(self._term_f)))
+
+        self.pattern = StampPattern((compact_size, compact_size), keys // compact_size,
+                                    keys % compact_size, np.zeros(len(keys), dtype=pattern.dtype),
+                                    [])
+
+        # Sums over the E and F elements of each eliminated current, for recovering them.
+        self._e_sums = csr_matrix((np.ones(len(self._e)), (ordinals[rows[self._e]],
+                                                           np.arange(len(self._e)))),
+                                  shape=(len(self.eliminated), len(self._e)))
+        self._f_sums = csr_matrix((np.ones(len(self._f)), (ordinals[columns[self._f]],
+                                                           np.arange(len(self._f)))),
+                                  shape=(len(self.eliminated), len(self._f)))
+        self._e_columns = compact_indices[columns[self._e]]
+        self._f_rows = compact_indices[rows[self._f]]
+
+    @property
+    def shape(self):
+        """Compact matrix shape."""
+        return self.pattern.shape
+
+    @property
+    def nnz(self):
+        """Number of stored elements of the compact matrix."""
+        return self.pattern.nnz
+
+    def values(self, values):
+        """Compact matrix stored element values.
+
+        Parameters
+        ----------
+        values : :class:`np.ndarray`
+            The full matrix stored element values, with shape (n_freqs, nnz).
+
+        Returns
+        -------
+        :class:`np.ndarray`
+            The compact matrix stored element values, with shape (n_freqs, compact nnz).
+
+        Raises
+        ------
+        ValueError
+            If an eliminated current's impedance is zero.
+        """
+        diagonals = values[:, self._diagonals]
+
+        if np.any(diagonals == 0):
+            raise ValueError("currents through components with zero impedance cannot be "
+                             "eliminated")
+
+        compact = np.zeros((len(values), self.nnz), dtype=values.dtype)
+        compact[:, self._g_targets] = values[:, self._g]
+
+        terms = (values[:, self._term_f] * values[:, self._term_e]
+                 / diagonals[:, self._term_ordinals])
+        compact -= (self._terms @ terms.T).T
+
+        return compact
+
+    def reduce(self, rhs):
+        """Compact right hand sides.
+
+        Parameters
+        ----------
+        rhs : :class:`np.ndarray` or None
+            The right hand sides, with shape (dim_size, n_rhs).
+
+        Returns
+        -------
+        :class:`np.ndarray` or None
+            The right hand sides of the kept unknowns, with shape (compact dim_size, n_rhs), or
+            None if `rhs` is None.
+
+        Raises
+        ------
+        ValueError
+            If the right hand sides of the eliminated currents are not zero.
+        """
+        if rhs is None:
+            return None
+
+        if np.any(rhs[self.eliminated]):
+            raise ValueError("eliminated currents cannot be excited")
+
+        return rhs[self.kept]
+
+    def expand(self, results, values, transpose=False):
+        """Full solutions from those of the compact system.
+
+        Parameters
+        ----------
+        results : :class:`np.ndarray` or None
+            The solutions of the compact system, with shape (compact dim_size, n_rhs, n_freqs).
+        values : :class:`np.ndarray`
+            The full matrix stored element values, with shape (n_freqs, nnz).
+        transpose : :class:`bool`, optional
+            Whether the results are solutions of the transposed system.
+
+        Returns
+        -------
+        :class:`np.ndarray` or None
+            The full solutions, with shape (dim_size, n_rhs, n_freqs), or None if `results` is
+            None.
+        """
+        if results is None:
+            return None
+
+        if transpose:
+            positions, indices, sums = self._f, self._f_rows, self._f_sums
+        else:
+            positions, indices, sums = self._e, self._e_columns, self._e_sums
+
+        n_rhs, n_freqs = results.shape[1:]
+        full = np.zeros((self.full_shape[0], n_rhs, n_freqs), dtype=results.dtype)
+        full[self.kept] = results
+
+        # Sum the products of each eliminated current's E (or F) elements and the unknowns they
+        # multiply, then divide by its impedance.
+        products = values[:, positions].T[:, np.newaxis, :] * results[indices]
+        sums = sums @ products.reshape(len(positions), n_rhs * n_freqs)
+        sums = sums.reshape(len(self.eliminated), n_rhs, n_freqs)
+        full[self.eliminated] = -sums / values[:, self._diagonals].T[:, np.newaxis, :]
+
+        return full
@@ -0,0 +1,306 @@
+"""Circuit matrix structure"""
+
+import logging
+import numpy as np
+
+from .stamp import StampPattern, BlockPattern, CompactPattern
+from ...components import PassiveComponent, Inductor, Input, Node
+
+LOGGER = logging.getLogger(__name__)
+
+
+class StructurallySingularError(ValueError):
+    """Circuit matrix that is singular whatever its component values"""
+    pass
+
+
+class MatrixStructureMixin:
+    """Mixin compiling an AC analysis's circuit matrix stamp pattern and checking its structure.
+
+    The circuit matrix is solved in reduced form where possible: only the independent blocks of the
+    matrix containing excited rows are kept and, in compact analyses, the currents through
+    resistors and capacitors are eliminated.
+    """
+    @property
+    def stamp_pattern(self):
+        """Compiled circuit matrix stamp pattern
+
+        The pattern is compiled from the circuit's equations the first time it
+        is requested after the analysis is reset, and reused for every
+        frequency thereafter.
+
+        Returns
+        -------
+        :class:`.StampPattern`
+            the compiled stamp pattern
+
+        Raises
+        ------
+        ValueError
+            if an invalid coefficient type is encountered
+        StructurallySingularError
+            if the circuit matrix is structurally singular
+        """
+        if self._stamp_pattern is None:
+            pattern = self._compile_stamp_pattern()
+            self._check_structure(pattern)
+            self._stamp_pattern = pattern
+
+            # Let the solver prepare for the matrix structure.
+            self.solver.prepare(self._stamp_pattern.shape, self._stamp_pattern.nnz)
+
+        return self._stamp_pattern
+
+    def _compile_stamp_pattern(self):
+        """Compile the circuit matrix stamp pattern."""
+        return StampPattern.from_coefficients((self.dim_size, self.dim_size),
+                                              self.matrix_coefficients(),
+                                              dtype=self.solver.MATRIX_DTYPE)
+
+    def _check_structure(self, pattern):
+        """Check the circuit matrix is not structurally singular.
+
+        A structurally singular matrix, e.g. of a circuit with a floating node or op-amp outputs
+        connected together, cannot be solved whatever the component values. The elements in the
+        independent blocks of the matrix containing the undetermined unknowns are reported.
+
+        Circuits containing only the input are not checked, and are solved as before, giving
+        undefined responses for inputs that cannot be satisfied.
+        """
+        if all(isinstance(component, Input) for component in self._current_circuit.components):
+            return
+
+        unmatched = pattern.unmatched_columns()
+
+        if not len(unmatched):
+            return
+
+        labels = pattern.blocks()
+        singular = np.flatnonzero(np.isin(labels, labels[unmatched]))
+        names = ", ".join(self.element_names[index] for index in singular)
+
+        raise StructurallySingularError(f"circuit matrix is structurally singular (check for "
+                                        f"floating nodes or connected op-amp outputs among "
+                                        f"{names})")
+
+    def _reductions(self, rhs, transposed_rhs=None):
+        """Reductions of the circuit matrix to solve instead of the full matrix for the specified
+        right hand sides.
+
+        Only the independent blocks of the circuit matrix containing excited rows are solved. If
+        the analysis is compact, the currents through the passive components in these blocks that
+        are not excited by either set of right hand sides are also eliminated.
+        """
+        excited = np.any(rhs, axis=1)
+
+        if transposed_rhs is not None:
+            excited |= np.any(transposed_rhs, axis=1)
+
+        key = tuple(np.flatnonzero(excited))
+
+        if key not in self._matrix_reductions:
+            self._matrix_reductions[key] = self._create_reductions(excited)
+
+        reductions = self._matrix_reductions[key]
+
+        if reductions:
+            # Let the solver prepare for the reduced matrix structure.
+            self.solver.prepare(reductions[-1].shape, reductions[-1].nnz)
+
+        return reductions
+
+    def _create_reductions(self, excited):
+        """Create the reductions of the circuit matrix for the specified excited rows."""
+        reductions = []
+        pattern = self.stamp_pattern
+        kept = np.arange(self.dim_size)
+
+        if np.any(excited):
+            labels = pattern.blocks()
+            is_kept = np.isin(labels, labels[excited])
+
+            if not np.all(is_kept):
+                block = BlockPattern(pattern, np.flatnonzero(is_kept))
+                LOGGER.debug("solving %i of %i circuit matrix unknowns in excited blocks",
+                             len(block.kept), self.dim_size)
+                reductions.append(block)
+                pattern = block.pattern
+                kept = block.kept
+
+        if self.compact:
+            # Indices within the kept blocks.
+            indices = np.full(self.dim_size, -1)
+            indices[kept] = np.arange(len(kept))
+            eliminated = [indices[index] for index in self._eliminable_indices
+                          if indices[index] >= 0 and not excited[index]]
+            LOGGER.debug("eliminating %i currents from %ix%i circuit matrix", len(eliminated),
+                         *pattern.shape)
+            reductions.append(CompactPattern(pattern, eliminated))
+
+        return reductions
+
+    @property
+    def _eliminable_indices(self):
+        """Matrix indices of the currents that can be eliminated from the circuit matrix.
+
+        These are the currents through resistors and capacitors with nonzero values. As in standard
+        modified nodal analysis, the currents through inductors are kept, as their impedances are
+        zero at zero frequency.
+        """
+        return [self.component_matrix_index(component)
+                for component in self._current_circuit.components
+                if isinstance(component, PassiveComponent) and component.value != 0
+                and not isinstance(component, Inductor)]
+
+
+class ElementIndexMap:
+    """Frozen map of circuit elements to circuit matrix indices.
+
+    Components are indexed first, in the order in which they were added to the circuit, followed by
+    the non-ground nodes in the order in which they first appear in the components' node lists. The
+    ordering is therefore deterministic for a given circuit, unlike the ordering of the circuit's
+    node set. Lookups take constant time. Subcircuits are represented by their ports, which each
+    have a current.
+
+    Parameters
+    ----------
+    components : sequence of :class:`.Component`
+        The components, in matrix order.
+    nodes : sequence of :class:`.Node`
+        The non-ground nodes, in matrix order.
+    """
+    def __init__(self, components, nodes):
+        self.components = tuple(components)
+        self.nodes = tuple(nodes)
+
+        self._component_indices = {component: index
+                                   for index, component in enumerate(self.components)}
+        self._node_indices = {node: index for index, node in enumerate(self.nodes)}
+
+    @classmethod
+    def from_circuit(cls, circuit, previous=None):
+        """Create element index map for the specified circuit.
+
+        Parameters
+        ----------
+        circuit : :class:`.Circuit`
+            The circuit to map.
+        previous : :class:`ElementIndexMap`, optional
+            A map of a previous version of the circuit. Elements also in the previous map keep
+            their indices where possible, and new elements take the places of removed ones, so that
+            the circuit matrix changes as little as possible.
+
+        Returns
+        -------
+        :class:`ElementIndexMap`
+            The element index map.
+        """
+        gnd = Node("gnd")
+        nodes = {}
+
+        for component in circuit.components:
+            for node in component.nodes:
+                if node is not gnd:
+                    # Dicts retain insertion order.
+                    nodes.setdefault(node, None)
+
+        # Add any nodes not attached to a component, sorted by name.
+        orphans = [node for node in circuit.non_gnd_nodes if node not in nodes]
+        nodes.update(dict.fromkeys(sorted(orphans, key=lambda node: node.name)))
+
+        components = []
+
+        for component in circuit.components:
+            if component.element_type == "subcircuit":
+                components.extend(component.port_components)
+            else:
+                components.append(component)
+
+        nodes = list(nodes)
+
+        if previous is not None:
+            components = _align_elements(components, previous.components)
+            nodes = _align_elements(nodes, previous.nodes)
+
+        return cls(components, nodes)
+
+    @property
+    def n_components(self):
+        """The number of mapped components."""
+        return len(self.components)
+
+    @property
+    def n_nodes(self):
+        """The number of mapped nodes."""
+        return len(self.nodes)
+
+    @property
+    def elements(self):
+        """The mapped components and nodes, in matrix order."""
+        return self.components + self.nodes
+
+    def component_index(self, component):
+        """Get component serial number.
+
+        Parameters
+        ----------
+        component : :class:`.Component`
+            The component.
+
+        Returns
+        -------
+        :class:`int`
+            The component serial number.
+
+        Raises
+        ------
+        ValueError
+            If the component is not found.
+        """
+        try:
+            return self._component_indices[component]
+        except (KeyError, TypeError):
+            raise ValueError(f"component '{component}' is not in the circuit")
+
+    def node_index(self, node):
+        """Get node serial number.
+
+        Parameters
+        ----------
+        node : :class:`.Node`
+            The node.
+
+        Returns
+        -------
+        :class:`int`
+            The node serial number.
+
+        Raises
+        ------
+        ValueError
+            If the node is not found.
+        """
+        try:
+            return self._node_indices[node]
+        except (KeyError, TypeError):
+            raise ValueError(f"node '{node}' is not in the circuit")
+
+    def __len__(self):
+        return self.n_components + self.n_nodes
+
+
+def _align_elements(elements, previous):
+    """Order elements to match a previous ordering.
+
+    Elements in the previous ordering keep their positions, and the remaining elements fill the
+    positions of previous elements that are no longer present, in turn, before being appended.
+    """
+    # Map each element to itself, so that the current element can be looked up from a previous
+    # element with the same name.
+    remaining = {element: element for element in elements}
+    aligned = [remaining.pop(element, None) for element in previous]
+
+    remaining = iter(list(remaining))
+    aligned = [element if element is not None else next(remaining, None) for element in aligned]
+
+    return [element for element in aligned if element is not None] + list(remaining)
@@ -0,0 +1,94 @@
+"""Subcircuit analysis"""
+
+from copy import deepcopy
+import numpy as np
+
+from .base import BaseAcAnalysis
+from .stamp import StampPattern
+from .structure import StructurallySingularError
+from .macromodel import PortMacromodel
+
+
+class _SubcircuitAnalysis(BaseAcAnalysis):
+    """Analysis of a subcircuit's circuit, used to compute its port macromodel
+
+    The macromodel is shared by subcircuits with identical contents, so it is computed from a
+    private copy of the subcircuit's circuit: its matrix elements then keep the component values
+    the macromodel was cached for when the components of any of the subcircuits are changed.
+
+    Parameters
+    ----------
+    subcircuit : :class:`.Subcircuit`
+        the subcircuit
+    """
+    def __init__(self, subcircuit, **kwargs):
+        circuit = deepcopy(subcircuit.circuit)
+        super().__init__(circuit, **kwargs)
+        self.subcircuit = subcircuit
+        self._current_circuit = circuit
+
+    def calculate(self):
+        raise NotImplementedError("subcircuits cannot be analysed on their own")
+
+    @property
+    def right_hand_side_index(self):
+        raise NotImplementedError("subcircuits have no input")
+
+    def _build_solution(self, results_matrix):
+        raise NotImplementedError("subcircuits cannot be analysed on their own")
+
+    def macromodel(self):
+        """Compute the subcircuit's port macromodel
+
+        Returns
+        -------
+        :class:`.PortMacromodel`
+            the macromodel
+
+        Raises
+        ------
+        StructurallySingularError
+            if the subcircuit's interior unknowns are not determined by its ports
+        """
+        pattern = self._compile_stamp_pattern()
+        ports = [self.node_matrix_index(port) for port in self.subcircuit.ports]
+
+        # The interior unknowns must be determined by the port voltages and currents, and each
+        # equation must constrain the unknowns once the port currents are added to the port nodes'
+        # current equations.
+        is_interior = np.ones(self.dim_size, dtype=bool)
+        is_interior[ports] = False
+        interior = np.flatnonzero(is_interior)
+        undetermined = pattern.submatrix(range(self.dim_size), interior).unmatched_columns()
+
+        coefficients = [(row, column, 1) for row, column in zip(pattern.rows, pattern.columns)]
+        coefficients.extend((port, self.dim_size + index, 1) for index, port in enumerate(ports))
+        augmented = StampPattern.from_coefficients((self.dim_size, self.dim_size + len(ports)),
+                                                   coefficients, dtype=float)
+        unconstrained = augmented.transpose().unmatched_columns()
+
+        if len(undetermined) or len(unconstrained):
+            labels = pattern.blocks()
+            singular_labels = np.concatenate((labels[interior[undetermined]],
+                                              labels[unconstrained]))
+            singular = np.flatnonzero(np.isin(labels, singular_labels))
+            names = ", ".join(self.element_names[index] for index in singular)
+
+            raise StructurallySingularError(f"subcircuit '{self.subcircuit.name}' circuit matrix "
+                                            f"is structurally singular (check for floating nodes "
+                                            f"or connected op-amp outputs among {names})")
+
+        noise_sources = self._current_circuit.noise_sources
+
+        def noise_excitation(frequencies):
+            excitation = np.zeros((self.dim_size, len(noise_sources), len(frequencies)),
+                                  dtype=complex)
+
+            for column, noise in enumerate(noise_sources):
+                np.add.at(excitation[:, column, :], self._noise_source_indices(noise),
+                          self._noise_source_excitation(noise, frequencies))
+
+            return excitation
+
+        return PortMacromodel(pattern, ports, [noise.label for noise in noise_sources],
+                              noise_excitation)
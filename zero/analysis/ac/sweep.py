@@ -0,0 +1,679 @@
+"""Component parameter sweeps"""
+
+import logging
+from copy import copy, deepcopy
+from contextlib import contextmanager
+import numpy as np
+from quantiphy import InvalidNumber
+
+from .signal import AcSignalAnalysis
+from .noise import AcNoiseAnalysis
+from ...components import Node
+from ...data import NoiseDensity, MultiNoiseDensity, Series
+from ...solution import Solution
+from ...format import Quantity
+from ...misc import element_matches
+
+LOGGER = logging.getLogger(__name__)
+
+
+class ParameterSweep:
+    """Component parameter values at each point of a sweep.
+
+    The swept parameters are set on the components of the circuit the sweep is created with while
+    the values at each sweep point are computed, so sweep analyses create their sweeps with a
+    private copy of the circuit rather than that of the user.
+
+    Parameters
+    ----------
+    circuit : :class:`.Circuit`
+        The circuit containing the swept components.
+    parameters : :class:`dict`
+        Map of parameters to sequences of values, one for each sweep point. Each parameter is
+        either a component name, to sweep the component's value, or a string of the form
+        "component.attribute", e.g. "op1.gbw", to sweep another of the component's attributes.
+    frequencies : :class:`np.ndarray` or sequence
+        The frequencies solved at each sweep point.
+    labels : sequence of :class:`str`, optional
+        Label for each sweep point. Defaults to labels describing the parameter values.
+
+    Raises
+    ------
+    ValueError
+        If no parameters are specified, a component does not have a specified attribute, or the
+        parameters or labels have different numbers of values.
+    """
+    def __init__(self, circuit, parameters, frequencies, labels=None):
+        if not parameters:
+            raise ValueError("at least one parameter must be swept")
+
+        self.frequencies = np.array(frequencies)
+        self.parameters = {}
+        self._targets = []
+
+        for parameter, values in parameters.items():
+            self.parameters[parameter] = list(values)
+            self._targets.append(resolve_parameter(circuit, parameter))
+
+        n_points = {len(values) for values in self.parameters.values()}
+
+        if len(n_points) != 1:
+            raise ValueError("swept parameters must have the same number of values")
+
+        if not self.n_points:
+            raise ValueError("swept parameters must have at least one value")
+
+        if labels is not None:
+            labels = [str(label) for label in labels]
+
+            if len(labels) != self.n_points:
+                raise ValueError("there must be a label for each sweep point")
+
+        self.labels = labels
+
+    @property
+    def n_points(self):
+        """The number of sweep points."""
+        return len(next(iter(self.parameters.values())))
+
+    @property
+    def n_freqs(self):
+        """The number of frequencies solved at each sweep point."""
+        return len(self.frequencies)
+
+    @property
+    def flat_frequencies(self):
+        """The frequencies of every sweep point, concatenated."""
+        return np.tile(self.frequencies, self.n_points)
+
+    @contextmanager
+    def at(self, point):
+        """Context in which the swept parameters have their values at the specified sweep point.
+
+        The parameters' original values are restored on exit.
+
+        Parameters
+        ----------
+        point : :class:`int`
+            The sweep point index.
+        """
+        original = [getattr(component, attribute) for component, attribute in self._targets]
+
+        try:
+            for (component, attribute), values in zip(self._targets, self.parameters.values()):
+                setattr(component, attribute, values[point])
+
+            yield
+        finally:
+            for (component, attribute), value in zip(self._targets, original):
+                setattr(component, attribute, value)
+
+    def values(self, pattern, chunk):
+        """Circuit matrix stored element values for a chunk of the concatenated sweep frequencies.
+
+        Parameters
+        ----------
+        pattern : :class:`.StampPattern`
+            The circuit matrix stamp pattern.
+        chunk : :class:`slice`
+            The chunk of :attr:`flat_frequencies`.
+
+        Returns
+        -------
+        :class:`np.ndarray`
+            The stored element values, with shape (n_chunk_freqs, nnz).
+        """
+        indices = np.arange(self.n_points * self.n_freqs)[chunk]
+        points, frequency_indices = np.divmod(indices, self.n_freqs)
+        values = np.empty((len(indices), pattern.nnz), dtype=pattern.dtype)
+
+        for point in np.unique(points):
+            in_point = points == point
+
+            with self.at(point):
+                values[in_point] = pattern.values(self.frequencies[frequency_indices[in_point]])
+
+        return values
+
+    def label(self, point):
+        """Label describing the parameter values at the specified sweep point."""
+        if self.labels is not None:
+            return self.labels[point]
+
+        return ", ".join(f"{parameter}={_format_value(values[point])}"
+                         for parameter, values in self.parameters.items())
+
+
+class SweepSolution:
+    """Results of a component parameter sweep.
+
+    Responses and noise spectral densities are stored as arrays with a row for each sweep point,
+    retrieved with :meth:`response` and :meth:`noise`. Indexing the sweep solution with a sweep
+    point index gives a :class:`.Solution` containing that point's results, e.g. for plotting.
+
+    Parameters
+    ----------
+    sweep : :class:`ParameterSweep`
+        The parameter sweep.
+    """
+    def __init__(self, sweep):
+        self.sweep = sweep
+        self.incoherent_sum = False
+
+        # Maps of (source, sink) pairs to arrays with shape (n_points, n_freqs).
+        self._responses = {}
+        self._noise = {}
+
+    @property
+    def frequencies(self):
+        """The frequencies solved at each sweep point."""
+        return self.sweep.frequencies
+
+    @property
+    def parameters(self):
+        """Map of swept parameters to their values at each sweep point."""
+        return self.sweep.parameters
+
+    @property
+    def n_points(self):
+        """The number of sweep points."""
+        return self.sweep.n_points
+
+    def __len__(self):
+        return self.n_points
+
+    @property
+    def responses(self):
+        """Map of (source, sink) pairs to responses, with shape (n_points, n_freqs)."""
+        return dict(self._responses)
+
+    def add_responses(self, source, sinks, responses):
+        """Add responses from a source to sinks.
+
+        Parameters
+        ----------
+        source : :class:`.Node` or :class:`.Component`
+            The response source.
+        sinks : sequence of :class:`.Node` or :class:`.Component`
+            The response sinks.
+        responses : :class:`np.ndarray`
+            The responses, with shape (n_sinks, n_points, n_freqs).
+        """
+        for sink, response in zip(sinks, responses):
+            self._responses[(source, sink)] = response
+
+    def add_noise(self, sources, sink, noise):
+        """Add noise spectral densities from sources at a sink.
+
+        Parameters
+        ----------
+        sources : sequence of :class:`~.noise.Noise`
+            The noise sources.
+        sink : :class:`.Node` or :class:`.Component`
+            The noise sink.
+        noise : :class:`np.ndarray`
+            The noise spectral densities, with shape (n_sources, n_points, n_freqs).
+        """
+        for source, spectral_density in zip(sources, noise):
+            self._noise[(source, sink)] = spectral_density
+
+    def response(self, sink, source=None):
+        """Get the response from a source to a sink at each sweep point.
+
+        Parameters
+        ----------
+        sink : :class:`str` or :class:`.Node` or :class:`.Component`
+            The response sink.
+        source : :class:`str` or :class:`.Node` or :class:`.Component`, optional
+            The response source. This can be omitted if there is only one.
+
+        Returns
+        -------
+        :class:`np.ndarray`
+            The complex responses, with shape (n_points, n_freqs).
+        """
+        return self._get(self._responses, source, sink, "response")
+
+    def noise(self, source, sink=None):
+        """Get the noise spectral density from a source at a sink at each sweep point.
+
+        Parameters
+        ----------
+        source : :class:`str` or :class:`~.noise.Noise`
+            The noise source, or its label, e.g. "R(r1)".
+        sink : :class:`str` or :class:`.Node` or :class:`.Component`, optional
+            The noise sink. This can be omitted if there is only one.
+
+        Returns
+        -------
+        :class:`np.ndarray`
+            The noise spectral densities, with shape (n_points, n_freqs).
+        """
+        return self._get(self._noise, source, sink, "noise")
+
+    def noise_sum(self, sink=None):
+        """Get the incoherent sum of the noise from every source at a sink at each sweep point.
+
+        Parameters
+        ----------
+        sink : :class:`str` or :class:`.Node` or :class:`.Component`, optional
+            The noise sink. This can be omitted if there is only one.
+
+        Returns
+        -------
+        :class:`np.ndarray`
+            The summed noise spectral densities, with shape (n_points, n_freqs).
+        """
+        constituents = [spectral_density for (_, noise_sink), spectral_density
+                        in self._noise.items() if element_matches(noise_sink, sink)]
+
+        if not constituents:
+            raise ValueError("no noise found")
+
+        return np.sqrt(np.sum(np.square(constituents), axis=0))
+
+    def integrated_noise_sum(self, sink=None):
+        """Get the root mean square of the incoherent noise sum at a sink at each sweep point.
+
+        The noise power is integrated over the solved frequencies using the trapezoidal rule.
+
+        Parameters
+        ----------
+        sink : :class:`str` or :class:`.Node` or :class:`.Component`, optional
+            The noise sink. This can be omitted if there is only one.
+
+        Returns
+        -------
+        :class:`np.ndarray`
+            The root mean square noise, with shape (n_points,).
+        """
+        power = np.square(self.noise_sum(sink=sink))
+        frequencies = self.frequencies
+        return np.sqrt(np.sum(np.diff(frequencies) * (power[:, 1:] + power[:, :-1]) / 2, axis=1))
+
+    @staticmethod
+    def _get(functions, source, sink, description):
+        matches = [function for (function_source, function_sink), function in functions.items()
+                   if element_matches(function_source, source)
+                   and element_matches(function_sink, sink)]
+
+        if not matches:
+            raise ValueError(f"no {description} found")
+        if len(matches) > 1:
+            raise ValueError(f"degenerate {description} for the specified source and sink")
+
+        return matches[0]
+
+    def __getitem__(self, point):
+        """Solution containing the results at the specified sweep point.
+
+        Parameters
+        ----------
+        point : :class:`int`
+            The sweep point index.
+
+        Returns
+        -------
+        :class:`.Solution`
+            The solution, named after the point's parameter values.
+        """
+        if not -self.n_points <= point < self.n_points:
+            raise IndexError("sweep point index out of range")
+
+        point %= self.n_points
+        solution = Solution(self.frequencies, name=self.sweep.label(point))
+
+        # Responses from each source, created by the solution when requested.
+        sources = {}
+
+        for (source, sink), response in self._responses.items():
+            sources.setdefault(source, []).append((sink, response[point]))
+
+        for source, responses in sources.items():
+            sinks, data = zip(*responses)
+            solution.add_response_data(source, sinks, np.array(data))
+
+        sinks = []
+
+        for (source, sink), spectral_density in self._noise.items():
+            series = Series(x=self.frequencies, y=spectral_density[point])
+            solution.add_noise(NoiseDensity(source=source, sink=sink, series=series))
+
+            if sink not in sinks:
+                sinks.append(sink)
+
+        if self.incoherent_sum:
+            for sink in sinks:
+                constituents = solution.filter_noise(sink=sink)[solution.DEFAULT_GROUP_NAME]
+                solution.add_noise_sum(MultiNoiseDensity(constituents=constituents, sink=sink))
+
+        return solution
+
+    def __iter__(self):
+        for point in range(self.n_points):
+            yield self[point]
+
+
+class BaseAcSweepAnalysis:
+    """Mixin solving an AC analysis at each point of a component parameter sweep.
+
+    The circuit matrices for every combination of sweep point and frequency are solved together as
+    one long sequence of frequencies, so the analysis's batched and parallel modes apply across
+    the whole sweep. Batched mode is enabled by default. Only the solutions needed for the results
+    are kept.
+
+    The swept parameters are set on the components of a private copy of the circuit made for each
+    calculation, so the analysed circuit is never changed and may be shared with other threads.
+    """
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("batch", True)
+
+        if kwargs.get("incremental"):
+            raise ValueError("sweep analyses cannot be incremental")
+
+        super().__init__(*args, **kwargs)
+
+        self._sweep = None
+        self._sweep_solution = None
+        # Private copy of the circuit with the swept components.
+        self._sweep_circuit = None
+
+    def _start_sweep(self, parameters, frequencies, labels, kwargs):
+        """Set up the parameter sweep, returning the concatenated sweep frequencies."""
+        if kwargs.get("adaptive"):
+            raise ValueError("sweep analyses cannot be adaptive")
+
+        self._sweep_circuit = deepcopy(self.circuit)
+        self._sweep = ParameterSweep(self._sweep_circuit, parameters, frequencies, labels=labels)
+        self._sweep_solution = SweepSolution(self._sweep)
+
+        LOGGER.info("sweeping %i parameter(s) over %i points", len(self._sweep.parameters),
+                    self._sweep.n_points)
+
+        return self._sweep.flat_frequencies
+
+    def _set_up_circuit(self, input_type, **inputs):
+        """Set up the circuit to solve from the private copy, with the input added."""
+        self._current_circuit = copy(self._sweep_circuit)
+        self._set_input(input_type, **inputs)
+        self.validate_circuit()
+
+    def _chunk_values(self, chunk):
+        """Circuit matrix stored element values for each sweep frequency in the chunk."""
+        return self._sweep.values(self.stamp_pattern, chunk)
+
+    def _split_points(self, results):
+        """Split results along the concatenated sweep frequencies into sweep points.
+
+        Parameters
+        ----------
+        results : :class:`np.ndarray`
+            The results, with shape (n, n_points * n_freqs).
+
+        Returns
+        -------
+        :class:`np.ndarray`
+            The results, with shape (n, n_points, n_freqs).
+        """
+        return results.reshape(results.shape[0], self._sweep.n_points, self._sweep.n_freqs)
+
+
+class AcSignalSweepAnalysis(BaseAcSweepAnalysis, AcSignalAnalysis):
+    """AC signal analysis swept over component parameter values"""
+    def calculate(self, input_type, parameters, frequencies, sinks=None, labels=None, **kwargs):
+        """Calculate responses at each point of a component parameter sweep.
+
+        Parameters
+        ----------
+        input_type : str
+            Input type, either "voltage" or "current".
+        parameters : :class:`dict`
+            Map of parameters to sequences of values, one for each sweep point. Each parameter is
+            either a component name, to sweep the component's value, or a string of the form
+            "component.attribute", e.g. "op1.gbw", to sweep another of the component's attributes.
+            To sweep a grid of values, flatten the arrays created by :func:`numpy.meshgrid`.
+        frequencies : :class:`np.ndarray` or sequence
+            The frequency vector to calculate the responses with at each sweep point.
+        sinks : sequence of :class:`str`, :class:`.Node` or :class:`.Component`, optional
+            The elements to calculate responses to. Defaults to every component and node. Only the
+            responses to these elements are kept, so specifying them reduces the memory used.
+        labels : sequence of :class:`str`, optional
+            Label for each sweep point, used to name the sweep points' solutions. Defaults to labels
+            describing the parameter values.
+
+        Other Parameters
+        ----------------
+        node, node_p, node_n : :class:`.Node`
+            The node or nodes to make the input. The `node` parameter sets a single, grounded input,
+            whereas `node_p` and `node_n` together create a floating input.
+        print_equations : :class:`bool`, optional
+            Print the circuit equations.
+        print_matrix : :class:`bool`, optional
+            Print the circuit matrix.
+
+        Returns
+        -------
+        :class:`SweepSolution`
+            Solution containing the responses at each sweep point.
+        """
+        self._sinks = sinks
+        frequencies = self._start_sweep(parameters, frequencies, labels, kwargs)
+
+        if input_type == "current":
+            # Set impedance to give correct scaling.
+            impedance = 1
+        else:
+            impedance = None
+
+        self._do_calculate(input_type, frequencies=frequencies, impedance=impedance, **kwargs)
+        return self._sweep_solution
+
+    def _build_solution(self, responses):
+        self._sweep_solution.add_responses(self.input_source, self.sink_elements,
+                                           self._split_points(responses))
+
+
+class AcNoiseSweepAnalysis(BaseAcSweepAnalysis, AcNoiseAnalysis):
+    """AC noise analysis swept over component parameter values"""
+    def calculate(self, input_type, sink, parameters, frequencies, impedance=None,
+                  incoherent_sum=False, input_refer=False, responses=False, labels=None,
+                  **kwargs):
+        """Calculate noise from circuit elements at a sink at each point of a component parameter
+        sweep.
+
+        The noise spectral densities are evaluated with the swept parameter values, so e.g. the
+        Johnson noise of swept resistors changes across the sweep.
+
+        Parameters
+        ----------
+        input_type : str
+            Input type, either "voltage" or "current".
+        sink : str or :class:`.Component` or :class:`.Node`
+            The element to calculate noise at.
+        parameters : :class:`dict`
+            Map of parameters to sequences of values, one for each sweep point. Each parameter is
+            either a component name, to sweep the component's value, or a string of the form
+            "component.attribute", e.g. "op1.gbw", to sweep another of the component's attributes.
+            To sweep a grid of values, flatten the arrays created by :func:`numpy.meshgrid`.
+        frequencies : :class:`np.ndarray` or sequence
+            The frequency vector to calculate the noise with at each sweep point.
+        impedance : float or :class:`.Quantity`, optional
+            Input impedance. If None, the default is used.
+        incoherent_sum : :class:`bool`, optional
+            Add the incoherent sum of all noise at the sink to each sweep point's solution.
+        input_refer : bool, optional
+            Refer the noise to the input. The noise then appears at the input, and the responses
+            from the input to the sink are added to the solution.
+        responses : bool, optional
+            Add the responses from the input to the sink to the solution even if the noise is not
+            referred to the input.
+        labels : sequence of :class:`str`, optional
+            Label for each sweep point, used to name the sweep points' solutions. Defaults to labels
+            describing the parameter values.
+
+        Other Parameters
+        ----------------
+        node, node_p, node_n : :class:`.Node`
+            The node or nodes to make the input. The `node` parameter sets a single, grounded input,
+            whereas `node_p` and `node_n` together create a floating input.
+        print_equations : :class:`bool`, optional
+            Print the circuit equations.
+        print_matrix : :class:`bool`, optional
+            Print the circuit matrix.
+
+        Returns
+        -------
+        :class:`SweepSolution`
+            Solution containing the noise spectral densities at each sweep point.
+        """
+        self.noise_sink = sink
+        frequencies = self._start_sweep(parameters, frequencies, labels, kwargs)
+        self._sweep_solution.incoherent_sum = bool(incoherent_sum)
+
+        if impedance is None:
+            LOGGER.warning(f"assuming default input impedance of {self.DEFAULT_INPUT_IMPEDANCE}")
+            impedance = self.DEFAULT_INPUT_IMPEDANCE
+
+        self._input_refer = bool(input_refer)
+        self._solve_input_responses = self._input_refer or bool(responses)
+        self._do_calculate(input_type, frequencies=frequencies, impedance=impedance,
+                           is_noise=True, **kwargs)
+        return self._sweep_solution
+
+    @property
+    def noise_source_rows(self):
+        """Matrix indices of the elements the circuit's noise sources enter at."""
+        return sorted({index for noise in self._current_circuit.noise_sources
+                       for index in self._noise_source_indices(noise)})
+
+    def solve(self):
+        """Solve the circuit at each sweep point.
+
+        If the noise is referred to the input, or the responses are requested, the responses from
+        the input to the sink are solved for alongside the noise.
+
+        Returns
+        -------
+        :class:`~np.ndarray`
+            The responses from each noise source element to the noise sink, with shape
+            (n_noise_source_elements, n_points * n_freqs).
+        """
+        rows = self.noise_source_rows
+
+        if not self._solve_input_responses:
+            return self._solve(self.right_hand_side(), rows=rows)[:, 0, :]
+
+        # Excitation at the input component.
+        input_rhs = self.get_empty_results_matrix(1)
+        input_rhs[self.input_component_index, 0] = 1
+
+        # The responses at the sink, and those that determine the input's scale (see
+        # _scale_input_responses).
+        input_component = self._current_circuit.input_component
+
+        if self.has_voltage_input:
+            scale_terms = [(self.node_matrix_index(node), sign)
+                           for node, sign in ((input_component.node_p, 1),
+                                              (input_component.node_n, -1))
+                           if node is not Node("gnd")]
+        else:
+            scale_terms = [(self.input_component_index, 1)]
+
+        input_rows = [self.noise_element_index] + [row for row, _ in scale_terms]
+
+        noise, responses = self._solve(self.right_hand_side(), input_rhs, rows=rows,
+                                       transposed_rows=input_rows)
+        responses = responses[:, 0, :]
+        scale = sum(sign * responses[index + 1] for index, (_, sign) in enumerate(scale_terms))
+
+        if np.any(scale == 0):
+            raise ValueError("input has zero or infinite impedance")
+
+        self._input_responses = responses[0] / scale
+
+        return noise[:, 0, :]
+
+    def _build_solution(self, noise_matrix):
+        noise_matrix = self._split_points(noise_matrix)
+        rows = self.noise_source_rows
+        sources = list(self._current_circuit.noise_sources)
+        frequencies = self._sweep.frequencies
+
+        # Noise spectral densities at each sweep point.
+        spectral_densities = np.empty((len(sources), self._sweep.n_points, self._sweep.n_freqs))
+
+        for point in range(self._sweep.n_points):
+            with self._sweep.at(point):
+                for index, noise in enumerate(sources):
+                    spectral_densities[index, point] = noise.spectral_density(
+                        frequencies=frequencies)
+
+        # Responses from each noise source to the sink.
+        responses = np.empty_like(noise_matrix, shape=(len(sources), *noise_matrix.shape[1:]))
+
+        for index, noise in enumerate(sources):
+            source_rows = [rows.index(row) for row in self._noise_source_indices(noise)]
+            excitation = self._noise_source_excitation(noise, frequencies)
+            responses[index] = np.sum(excitation[:, np.newaxis, :] * noise_matrix[source_rows],
+                                      axis=0)
+
+        projected_noise = np.abs(responses) * spectral_densities
+
+        sink = self.noise_sink
+
+        if self._solve_input_responses:
+            input_responses = self._split_points(self._input_responses[np.newaxis, :])
+            self._sweep_solution.add_responses(self.input_source, [sink], input_responses)
+
+            if self._input_refer:
+                LOGGER.info("projecting noise to input")
+                projected_noise /= np.abs(input_responses)
+
+                # Referred noise appears at the input.
+                sink = self.input_source
+
+        self._sweep_solution.add_noise(sources, sink, projected_noise)
+
+
+def resolve_parameter(circuit, parameter):
+    """Get the component and attribute a parameter refers to.
+
+    Parameters
+    ----------
+    circuit : :class:`.Circuit`
+        The circuit containing the component.
+    parameter : :class:`str`
+        The parameter. This is either a component name, referring to the component's value, or a
+        string of the form "component.attribute", e.g. "op1.gbw".
+
+    Returns
+    -------
+    :class:`.Component`
+        The component.
+    :class:`str`
+        The attribute.
+
+    Raises
+    ------
+    ValueError
+        If the component does not have the attribute.
+    """
+    name, _, attribute = str(parameter).partition(".")
+    component = circuit.get_component(name)
+
+    if not attribute:
+        attribute = "value"
+
+    if not hasattr(component, attribute):
+        raise ValueError(f"component '{component.name}' has no parameter '{attribute}'")
+
+    return component, attribute
+
+
+def _format_value(value):
+    """Format a swept parameter value."""
+    try:
+        return str(Quantity(value))
+    except InvalidNumber:
+        # Non-scalar values such as op-amp pole and zero lists.
+        return str(value)
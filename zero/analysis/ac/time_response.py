@@ -0,0 +1,308 @@
+"""Impulse and step responses calculated from AC signal analyses"""
+
+import logging
+import numpy as np
+from scipy.fft import irfft, next_fast_len
+from scipy.signal import get_window
+
+from .signal import AcSignalAnalysis
+from ...data import Series
+from ...config import ZeroConfig
+from ...misc import element_matches
+
+LOGGER = logging.getLogger(__name__)
+CONF = ZeroConfig()
+
+
+class AcTimeResponseAnalysis(AcSignalAnalysis):
+    """Impulse and step response analysis
+
+    The responses from the input to the sinks are calculated by an AC signal analysis on a uniform
+    frequency grid, from zero to the Nyquist frequency, and inverse Fourier transformed. The grid is
+    solved in batched mode by default.
+
+    Parameters
+    ----------
+    batch : :class:`bool`, optional
+        Whether to solve the frequency grid in batched mode. Defaults to True.
+    """
+    def __init__(self, *args, batch=True, **kwargs):
+        if kwargs.get("incremental"):
+            batch = False
+
+        super().__init__(*args, batch=batch, **kwargs)
+
+    def calculate(self, input_type, sinks, duration, sample_rate, window=None,
+                  causality_tolerance=None, **kwargs):
+        """Calculate impulse and step responses.
+
+        Parameters
+        ----------
+        input_type : str
+            Input type, either "voltage" or "current".
+        sinks : sequence of :class:`str`, :class:`.Node` or :class:`.Component`
+            The elements to calculate responses to.
+        duration : :class:`float`
+            The duration of the responses, in seconds.
+        sample_rate : :class:`float`
+            The rate at which the responses are sampled, in Hz. Features of the responses faster
+            than the Nyquist frequency, half of this rate, are not resolved.
+        window : :class:`str`, :class:`tuple` or :class:`float`, optional
+            Window applied to the frequency responses before they are transformed, specified as for
+            :func:`scipy.signal.get_window`, e.g. "hann" or ("tukey", 0.5). The window tapers the
+            responses from unity at zero frequency to zero at the Nyquist frequency, reducing the
+            ringing caused by responses which have not decayed by then at the expense of time
+            resolution. Defaults to no window.
+        causality_tolerance : :class:`float`, optional
+            The largest fraction of each impulse response's energy allowed at negative times before
+            a warning is logged. Defaults to the ``analysis.time_response.causality_tolerance``
+            configuration setting.
+
+        Other Parameters
+        ----------------
+        node, node_p, node_n : :class:`.Node`
+            The node or nodes to make the input. The `node` parameter sets a single, grounded input,
+            whereas `node_p` and `node_n` together create a floating input.
+        print_equations : :class:`bool`, optional
+            Print the circuit equations.
+        print_matrix : :class:`bool`, optional
+            Print the circuit matrix.
+
+        Returns
+        -------
+        :class:`TimeResponseSolution`
+            Solution containing the impulse and step responses, and the frequency responses they
+            were calculated from.
+
+        Raises
+        ------
+        ValueError
+            If the duration or sample rate is not positive, no sinks are specified, or frequencies
+            or adaptive sampling are specified.
+        """
+        duration = float(duration)
+        sample_rate = float(sample_rate)
+
+        if duration <= 0 or sample_rate <= 0:
+            raise ValueError("duration and sample rate must be positive")
+        if not sinks:
+            raise ValueError("at least one sink must be specified")
+        if "frequencies" in kwargs:
+            raise ValueError("the frequencies of time response analyses are set by the duration "
+                             "and sample rate")
+        if kwargs.get("adaptive"):
+            raise ValueError("time response analyses require a uniform frequency grid")
+
+        if causality_tolerance is None:
+            causality_tolerance = float(CONF["analysis"]["time_response"]["causality_tolerance"])
+
+        n_samples = max(int(np.ceil(duration * sample_rate)), 1)
+        # The responses are circular over the transform length, so pad it to twice the duration to
+        # separate responses at negative times from those at positive times.
+        n_fft = next_fast_len(2 * n_samples, real=True)
+        frequencies = np.fft.rfftfreq(n_fft, d=1 / sample_rate)
+
+        # Capacitor and inductor impedances are infinite or zero at zero frequency, so the zero
+        # frequency bin is evaluated close to it instead.
+        grid = frequencies.copy()
+        grid[0] = frequencies[1] * float(CONF["analysis"]["time_response"]["dc_fraction"])
+
+        frequency_solution = super().calculate(input_type=input_type, sinks=sinks,
+                                               frequencies=grid, **kwargs)
+        responses = frequency_solution.filter_responses(
+            sinks=sinks)[frequency_solution.DEFAULT_GROUP_NAME]
+
+        solution = TimeResponseSolution(np.arange(n_samples) / sample_rate, frequencies,
+                                        frequency_solution)
+
+        if not responses:
+            return solution
+
+        data = np.array([response.complex_magnitude for response in responses])
+
+        if window is not None:
+            n_freqs = len(frequencies)
+            # The decaying half of a symmetric window.
+            data = data * get_window(window, 2 * n_freqs - 1, fftbins=False)[n_freqs - 1:]
+
+        # Samples of the impulse responses divided by the sample rate, with shape (n_sinks, n_fft).
+        samples = irfft(data, n=n_fft, axis=1)
+
+        energy = np.sum(np.square(samples), axis=1)
+        non_causal = np.sum(np.square(samples[:, n_fft - n_samples:]), axis=1)
+        fractions = np.divide(non_causal, energy, out=np.zeros_like(energy), where=energy > 0)
+
+        for response, fraction in zip(responses, fractions):
+            if fraction > causality_tolerance:
+                LOGGER.warning("%.2g of the energy of the impulse response from '%s' to '%s' is at "
+                               "negative times; increase the duration or sample rate, or apply a "
+                               "window", fraction, response.source.name, response.sink.name)
+
+        # Integrate the impulse responses to the sample times by the midpoint rule, the samples
+        # being centred on their times.
+        steps = np.cumsum(samples, axis=1) - samples / 2
+
+        solution.add_responses(responses[0].source, [response.sink for response in responses],
+                               sample_rate * samples[:, :n_samples],
+                               steps[:, :n_samples], fractions)
+
+        return solution
+
+
+class TimeResponseSolution:
+    """Impulse and step responses calculated by a time response analysis.
+
+    Responses are stored as arrays, retrieved as :class:`.Series` of time and response with
+    :meth:`impulse_response` and :meth:`step_response`. The frequency responses they were
+    calculated from are available as :attr:`frequency_solution`, e.g. for Bode plots.
+
+    Parameters
+    ----------
+    times : :class:`np.ndarray`
+        The sample times.
+    frequencies : :class:`np.ndarray`
+        The frequencies of the uniform grid the responses were transformed from.
+    frequency_solution : :class:`.Solution`
+        The solution containing the frequency responses.
+    """
+    def __init__(self, times, frequencies, frequency_solution):
+        self.times = times
+        self.frequencies = frequencies
+        self.frequency_solution = frequency_solution
+
+        # Maps of (source, sink) pairs to arrays with shape (n_samples,).
+        self._impulse_responses = {}
+        self._step_responses = {}
+        self._non_causal_fractions = {}
+
+    @property
+    def n_samples(self):
+        """The number of samples."""
+        return len(self.times)
+
+    def add_responses(self, source, sinks, impulse_responses, step_responses, non_causal_fractions):
+        """Add responses from a source to sinks.
+
+        Parameters
+        ----------
+        source : :class:`.Node` or :class:`.Component`
+            The response source.
+        sinks : sequence of :class:`.Node` or :class:`.Component`
+            The response sinks.
+        impulse_responses, step_responses : :class:`np.ndarray`
+            The impulse and step responses, with shape (n_sinks, n_samples).
+        non_causal_fractions : :class:`np.ndarray`
+            The fraction of each impulse response's energy at negative times, with shape
+            (n_sinks,).
+        """
+        for sink, impulse, step, fraction in zip(sinks, impulse_responses, step_responses,
+                                                 non_causal_fractions):
+            self._impulse_responses[(source, sink)] = impulse
+            self._step_responses[(source, sink)] = step
+            self._non_causal_fractions[(source, sink)] = fraction
+
+    def impulse_response(self, sink, source=None):
+        """Get the impulse response from a source to a sink.
+
+        Parameters
+        ----------
+        sink : :class:`str` or :class:`.Node` or :class:`.Component`
+            The response sink.
+        source : :class:`str` or :class:`.Node` or :class:`.Component`, optional
+            The response source. This can be omitted if there is only one.
+
+        Returns
+        -------
+        :class:`.Series`
+            The impulse response, in the response's units per second, against time.
+        """
+        return Series(x=self.times, y=self._get(self._impulse_responses, source, sink))
+
+    def step_response(self, sink, source=None):
+        """Get the step response from a source to a sink.
+
+        Parameters
+        ----------
+        sink : :class:`str` or :class:`.Node` or :class:`.Component`
+            The response sink.
+        source : :class:`str` or :class:`.Node` or :class:`.Component`, optional
+            The response source. This can be omitted if there is only one.
+
+        Returns
+        -------
+        :class:`.Series`
+            The step response against time.
+        """
+        return Series(x=self.times, y=self._get(self._step_responses, source, sink))
+
+    def non_causal_fraction(self, sink, source=None):
+        """Get the fraction of the energy of an impulse response at negative times.
+
+        Responses of real circuits are causal, so a significant fraction indicates that the
+        response has not decayed within the transform length or that the frequency response has
+        not decayed by the Nyquist frequency.
+
+        Parameters
+        ----------
+        sink : :class:`str` or :class:`.Node` or :class:`.Component`
+            The response sink.
+        source : :class:`str` or :class:`.Node` or :class:`.Component`, optional
+            The response source. This can be omitted if there is only one.
+
+        Returns
+        -------
+        :class:`float`
+            The fraction of the energy.
+        """
+        return self._get(self._non_causal_fractions, source, sink)
+
+    def plot(self, step=True, sinks=None, axis=None):
+        """Plot step or impulse responses against time.
+
+        Parameters
+        ----------
+        step : :class:`bool`, optional
+            Plot the step responses. If False, the impulse responses are plotted.
+        sinks : sequence of :class:`str`, :class:`.Node` or :class:`.Component`, optional
+            The sinks to plot the responses to. Defaults to every sink.
+        axis : :class:`~matplotlib.axes.Axes`, optional
+            Axis to plot to. If not specified, a new figure is created.
+
+        Returns
+        -------
+        :class:`~matplotlib.axes.Axes`
+            The axis.
+        """
+        import matplotlib.pyplot as plt
+
+        if axis is None:
+            _, axis = plt.subplots()
+
+        responses = self._step_responses if step else self._impulse_responses
+
+        for (source, sink), response in responses.items():
+            if sinks is not None and not any(element_matches(sink, other) for other in sinks):
+                continue
+
+            axis.plot(self.times, response, label=f"{source.name} to {sink.name}")
+
+        axis.set_xlabel("Time (s)")
+        axis.set_ylabel("Step response" if step else "Impulse response")
+        axis.grid(True)
+        axis.legend()
+
+        return axis
+
+    @staticmethod
+    def _get(functions, source, sink):
+        matches = [function for (function_source, function_sink), function in functions.items()
+                   if element_matches(function_source, source)
+                   and element_matches(function_sink, sink)]
+
+        if not matches:
+            raise ValueError("no response found")
+        if len(matches) > 1:
+            raise ValueError("degenerate response for the specified source and sink")
+
+        return matches[0]
+
@@ -0,0 +1,325 @@
+"""Low-rank updates of factorised circuit matrices"""
+
+import logging
+import numpy as np
+from scipy.sparse import csr_matrix
+
+LOGGER = logging.getLogger(__name__)
+
+
+class FactorisedSweep:
+    """Circuit matrix factorisations for a frequency sweep.
+
+    The factorisations are retained so that the sweep can be solved again after a change to the
+    circuit matrices without refactorising them. The change is applied as a low-rank correction
+    using the Sherman-Morrison-Woodbury formula: if the new matrix A' = A + U V^T differs from the
+    factorised matrix A only in k rows, U selects those rows and V^T contains their differences,
+    and the solution of A' x = b is
+
+        x = y - Z (I + V^T Z)^-1 V^T y,
+
+    where y = A^-1 b and Z = A^-1 U require only k + 1 solves with the existing factorisation.
+    The transposed system is solved similarly. This is much cheaper than refactorising the matrix
+    when k is small, e.g. when a single component's value has changed.
+
+    Parameters
+    ----------
+    frequencies : :class:`np.ndarray`
+        The frequencies.
+    element_index_map : :class:`.ElementIndexMap`
+        The map of circuit elements to matrix indices used to build the matrices.
+    rows, columns : :class:`np.ndarray`
+        The row and column indices of each stored element of the factorised matrices.
+    values : :class:`np.ndarray`
+        The stored element values of the factorised matrices, with shape (n_freqs, nnz).
+    factorisations : :class:`list`
+        The factorisation of the matrix at each frequency.
+    """
+    def __init__(self, frequencies, element_index_map, rows, columns, values, factorisations):
+        self.frequencies = np.array(frequencies)
+        self.element_index_map = element_index_map
+        self.rows = np.asarray(rows, dtype=int)
+        self.columns = np.asarray(columns, dtype=int)
+        self.values = np.array(values)
+        self.factorisations = list(factorisations)
+
+    @property
+    def dim_size(self):
+        """The matrix dimension size."""
+        return len(self.element_index_map)
+
+    def is_compatible(self, frequencies, pattern):
+        """Check if the sweep can be updated to solve the specified frequencies and pattern.
+
+        Parameters
+        ----------
+        frequencies : :class:`np.ndarray`
+            The frequencies to solve.
+        pattern : :class:`.StampPattern`
+            The stamp pattern of the new circuit matrices.
+
+        Returns
+        -------
+        :class:`bool`
+            True if the frequencies and matrix shape are unchanged, False otherwise.
+        """
+        return (pattern.shape == (self.dim_size, self.dim_size)
+                and pattern.dtype == self.values.dtype
+                and np.array_equal(frequencies, self.frequencies))
+
+    def differences(self, pattern, values):
+        """Differences between the specified and factorised matrices.
+
+        If the specified pattern has elements not stored by the factorised matrices, the sweep's
+        stored elements are extended to include them.
+
+        Parameters
+        ----------
+        pattern : :class:`.StampPattern`
+            The stamp pattern of the new circuit matrices.
+        values : :class:`np.ndarray`
+            The stored element values of the new circuit matrices, with shape (n_freqs, nnz).
+
+        Returns
+        -------
+        :class:`np.ndarray`
+            The new circuit matrices' stored element values, mapped to the sweep's stored elements.
+        :class:`np.ndarray`
+            The differences between the new and factorised stored element values.
+        """
+        if (not np.array_equal(pattern.rows, self.rows)
+                or not np.array_equal(pattern.columns, self.columns)):
+            # Extend the stored elements to the union of both patterns.
+            size = self.dim_size
+            old_keys = self.rows * size + self.columns
+            new_keys = pattern.rows * size + pattern.columns
+            keys = np.union1d(old_keys, new_keys)
+
+            old_values = np.zeros((len(self.values), len(keys)), dtype=self.values.dtype)
+            old_values[:, np.searchsorted(keys, old_keys)] = self.values
+            self.rows, self.columns = np.divmod(keys, size)
+            self.values = old_values
+
+            new_values = np.zeros_like(old_values)
+            new_values[:, np.searchsorted(keys, new_keys)] = values
+            values = new_values
+
+        return values, values - self.values
+
+    def solve(self, pattern, values, solver, rhs, transposed_rhs=None, max_rank=None,
+              tolerance=None):
+        """Solve the new circuit matrices using low-rank updates of the factorisations.
+
+        The backward error of the updated solution at each frequency is checked. Where it exceeds
+        the tolerance, or everywhere if the update's rank exceeds the maximum, the new matrix is
+        instead factorised and the factorisation retained for subsequent updates.
+
+        Parameters
+        ----------
+        pattern : :class:`.StampPattern`
+            The stamp pattern of the new circuit matrices.
+        values : :class:`np.ndarray`
+            The stored element values of the new circuit matrices, with shape (n_freqs, nnz).
+        solver : :class:`.BaseSolver`
+            The solver, used to factorise matrices that cannot be updated.
+        rhs : :class:`~np.ndarray`
+            The right hand sides, with shape (dim_size, n_rhs).
+        transposed_rhs : :class:`~np.ndarray`, optional
+            The right hand sides for the transposed system, with shape (dim_size, n_transposed_rhs).
+        max_rank : :class:`int`, optional
+            The maximum rank of the updates. Defaults to no limit.
+        tolerance : :class:`float`, optional
+            The maximum normwise backward error of updated solutions. Defaults to no limit.
+
+        Returns
+        -------
+        :class:`~np.ndarray`
+            The solutions, with shape (dim_size, n_rhs, n_freqs).
+        :class:`~np.ndarray` or None
+            The solutions of the transposed system, with shape
+            (dim_size, n_transposed_rhs, n_freqs), or None if no transposed right hand sides were
+            specified.
+        """
+        values, differences = self.differences(pattern, values)
+        n_freqs = len(values)
+
+        results = np.zeros((self.dim_size, rhs.shape[1], n_freqs), dtype=values.dtype)
+        transposed_results = None
+
+        if transposed_rhs is not None:
+            transposed_results = np.zeros((self.dim_size, transposed_rhs.shape[1], n_freqs),
+                                          dtype=values.dtype)
+
+        # The rows containing changed elements.
+        changed = np.any(differences != 0, axis=0)
+        changed_rows = np.unique(self.rows[changed])
+        rank = len(changed_rows)
+
+        # Positions of the changed elements in the update matrices.
+        update_rows = np.searchsorted(changed_rows, self.rows[changed])
+        update_columns = self.columns[changed]
+
+        if max_rank is not None and rank > max_rank:
+            LOGGER.debug("rank %i update exceeds maximum of %i; refactorising", rank, max_rank)
+            refactorise = np.ones(n_freqs, dtype=bool)
+        else:
+            refactorise = np.zeros(n_freqs, dtype=bool)
+
+            for index, difference in enumerate(differences[:, changed]):
+                if not rank:
+                    # Nothing has changed.
+                    solution = _factorisation_solve(self.factorisations[index], rhs,
+                                                    transposed_rhs)
+                else:
+                    # V^T.
+                    v_transpose = np.zeros((rank, self.dim_size), dtype=difference.dtype)
+                    v_transpose[update_rows, update_columns] = difference
+
+                    solution = _updated_solve(self.factorisations[index], changed_rows,
+                                              v_transpose, rhs, transposed_rhs)
+
+                if solution is None:
+                    refactorise[index] = True
+                    continue
+
+                results[:, :, index], transposed_solution = solution
+
+                if transposed_rhs is not None:
+                    transposed_results[:, :, index] = transposed_solution
+
+            if rank and tolerance is not None:
+                errors = _backward_errors(self.rows, self.columns, values, rhs, results)
+
+                if transposed_rhs is not None:
+                    errors = np.maximum(errors, _backward_errors(
+                        self.columns, self.rows, values, transposed_rhs, transposed_results))
+
+                refactorise |= errors > tolerance
+
+        for index in np.flatnonzero(refactorise):
+            # Factorise the new matrix and use it for subsequent updates.
+            matrix = _sparse_matrix(self.rows, self.columns, values[index], self.dim_size)
+
+            if not solver.is_sparse:
+                matrix = matrix.toarray()
+
+            self.factorisations[index] = solver.factorise(matrix)
+            self.values[index] = values[index]
+
+            results[:, :, index], transposed_solution = _factorisation_solve(
+                self.factorisations[index], rhs, transposed_rhs)
+
+            if transposed_rhs is not None:
+                transposed_results[:, :, index] = transposed_solution
+
+        LOGGER.info("updated %i of %i frequencies with rank %i corrections",
+                    n_freqs - np.count_nonzero(refactorise), n_freqs, rank)
+
+        return results, transposed_results
+
+
+def _sparse_matrix(rows, columns, data, dim_size):
+    """Sparse circuit matrix containing the specified stored elements, in compressed sparse row
+    order."""
+    indptr = np.concatenate(([0], np.cumsum(np.bincount(rows, minlength=dim_size))))
+    return csr_matrix((data, columns, indptr), shape=(dim_size, dim_size))
+
+
+def _factorisation_solve(factorisation, rhs, transposed_rhs=None):
+    """Solve the system, and optionally its transpose, using the factorisation."""
+    dim_size = rhs.shape[0]
+    results = factorisation.solve(rhs).reshape(dim_size, -1)
+
+    if transposed_rhs is None:
+        return results, None
+
+    return results, factorisation.solve(transposed_rhs, trans="T").reshape(dim_size, -1)
+
+
+def _updated_solve(factorisation, changed_rows, v_transpose, rhs, transposed_rhs=None):
+    """Solve the updated system, and optionally its transpose, using the Sherman-Morrison-Woodbury
+    formula.
+
+    Returns None if the update is singular.
+    """
+    dim_size, n_rhs = rhs.shape
+    rank = len(changed_rows)
+
+    # Solve for the right hand sides and the update columns U together.
+    block = np.zeros((dim_size, n_rhs + rank), dtype=v_transpose.dtype)
+    block[:, :n_rhs] = rhs
+    block[changed_rows, n_rhs + np.arange(rank)] = 1
+    solutions = factorisation.solve(block).reshape(dim_size, -1)
+    y, z = solutions[:, :n_rhs], solutions[:, n_rhs:]
+
+    try:
+        # (I + V^T Z)^-1 V^T y.
+        correction = np.linalg.solve(np.eye(rank) + v_transpose @ z, v_transpose @ y)
+    except np.linalg.LinAlgError:
+        return None
+
+    results = y - z @ correction
+
+    if transposed_rhs is None:
+        return results, None
+
+    # The transposed update is V U^T.
+    n_transposed_rhs = transposed_rhs.shape[1]
+    block = np.concatenate((transposed_rhs, v_transpose.T), axis=1)
+    solutions = factorisation.solve(block, trans="T").reshape(dim_size, -1)
+    y, z = solutions[:, :n_transposed_rhs], solutions[:, n_transposed_rhs:]
+
+    try:
+        correction = np.linalg.solve(np.eye(rank) + z[changed_rows, :], y[changed_rows, :])
+    except np.linalg.LinAlgError:
+        return None
+
+    return results, y - z @ correction
+
+
+def _backward_errors(rows, columns, values, rhs, results):
+    """Normwise backward errors of the solutions of a sequence of systems.
+
+    The backward error of an approximate solution x of Ax = b is ||b - Ax|| / (||A|| ||x|| + ||b||),
+    using infinity norms. A stable direct solve achieves a backward error of the order of the
+    machine precision.
+
+    Parameters
+    ----------
+    rows, columns : :class:`np.ndarray`
+        The row and column indices of each stored element of the matrices.
+    values : :class:`np.ndarray`
+        The stored element values, with shape (n_systems, nnz).
+    rhs : :class:`~np.ndarray`
+        The right hand sides, with shape (dim_size, n_rhs).
+    results : :class:`~np.ndarray`
+        The solutions, with shape (dim_size, n_rhs, n_systems).
+
+    Returns
+    -------
+    :class:`~np.ndarray`
+        The backward error of each system.
+    """
+    dim_size, n_rhs, n_systems = results.shape
+    nnz = len(rows)
+
+    # Matrix summing the stored elements in each row.
+    row_sum = csr_matrix((np.ones(nnz), (rows, np.arange(nnz))), shape=(dim_size, nnz))
+    norms = np.max(row_sum @ np.abs(values.T), axis=0)
+    errors = np.zeros(n_systems)
+
+    # Limit the memory used by the products of the stored elements and solutions.
+    chunk_size = max(1, int(1e7 // (nnz * n_rhs + 1)))
+
+    for start in range(0, n_systems, chunk_size):
+        chunk = slice(start, start + chunk_size)
+        terms = values[chunk].T[:, np.newaxis, :] * results[columns, :, chunk]
+        products = (row_sum @ terms.reshape(nnz, -1)).reshape(dim_size, n_rhs, -1)
+        residuals = np.max(np.abs(rhs[:, :, np.newaxis] - products), axis=(0, 1))
+        scales = (norms[chunk] * np.max(np.abs(results[:, :, chunk]), axis=(0, 1))
+                  + np.max(np.abs(rhs)))
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            errors[chunk] = np.where(scales > 0, residuals / scales, 0)
+
+    return errors
@@ -0,0 +1,356 @@
+"""Transient analysis"""
+
+import logging
+import warnings
+import numpy as np
+from numpy.lib.format import open_memmap
+from scipy.linalg import lu_factor, lu_solve, get_lapack_funcs, LinAlgError, LinAlgWarning
+
+from .ac.pole_zero import AcPoleZeroAnalysis
+from ..config import ZeroConfig
+from ..data import Series
+from ..misc import element_matches
+
+LOGGER = logging.getLogger(__name__)
+CONF = ZeroConfig()
+
+
+class TransientAnalysis(AcPoleZeroAnalysis):
+    """Transient analysis
+
+    The circuit's descriptor system, C dx/dt + G x = b u(t), where u(t) is the input waveform, is
+    integrated with fixed time steps using the implicit trapezoidal rule or the second order
+    backward differentiation formula (BDF2). The G and C matrices are those of the
+    :class:`pole-zero analysis <.AcPoleZeroAnalysis>`, in which op-amps are modelled by their
+    open loop gain, gain-bandwidth product, poles and zeros, and their delays by Padé approximants.
+
+    With a fixed time step, the matrix multiplying the state at each step is constant, so it is
+    factorised once and the factorisation is reused for every step. The circuit starts at its
+    operating point for the input held at its initial value.
+    """
+    METHODS = ("trapezoidal", "bdf2")
+
+    def calculate(self, input_type, sinks, waveform, time_step, duration, method="trapezoidal",
+                  path=None, **kwargs):
+        """Calculate the responses to an input waveform.
+
+        Parameters
+        ----------
+        input_type : str
+            Input type, either "voltage" or "current".
+        sinks : sequence of :class:`str`, :class:`.Node` or :class:`.Component`
+            The elements to calculate responses to.
+        waveform : callable or :class:`np.ndarray`
+            The input waveform. This is either a callable returning the input at each time of a
+            time vector, or the input at each time step, including the start.
+        time_step : :class:`float`
+            The time step, in seconds.
+        duration : :class:`float`
+            The duration, in seconds. The number of steps is rounded up to cover it.
+        method : :class:`str`, optional
+            The integration method, either "trapezoidal" or "bdf2".
+        path : :class:`str` or :class:`os.PathLike`, optional
+            Path to a ``.npy`` file to write the responses to as they are calculated. The responses
+            are then a memory-mapped array backed by the file instead of being held in memory.
+
+        Other Parameters
+        ----------------
+        node, node_p, node_n : :class:`.Node`
+            The node or nodes to make the input. The `node` parameter sets a single, grounded input,
+            whereas `node_p` and `node_n` together create a floating input.
+        chunk_size : :class:`int`, optional
+            The number of time steps calculated between writes to the responses. Defaults to the
+            ``analysis.transient.chunk_size`` configuration setting.
+
+        Returns
+        -------
+        :class:`TransientSolution`
+            Solution containing the response to each sink.
+        """
+        n_samples = _n_steps(time_step, duration) + 1
+        shape = (len(sinks), n_samples)
+
+        if path is not None:
+            responses = open_memmap(path, mode="w+", dtype="float64", shape=shape)
+        else:
+            responses = np.empty(shape)
+
+        chunks = self.iter_responses(input_type, sinks, waveform, time_step, duration,
+                                     method=method, **kwargs)
+
+        for times, chunk in chunks:
+            start = int(round(times[0] / time_step))
+            responses[:, start:start + len(times)] = chunk
+
+        if path is not None:
+            responses.flush()
+
+        solution = TransientSolution(time_step, self.input_source)
+        solution.add_responses(self.sink_elements, responses)
+
+        return solution
+
+    def iter_responses(self, input_type, sinks, waveform, time_step, duration, method="trapezoidal",
+                       chunk_size=None, **inputs):
+        """Calculate the responses to an input waveform, a chunk of time steps at a time.
+
+        The parameters are those of :meth:`calculate`.
+
+        Yields
+        ------
+        :class:`np.ndarray`
+            The times of the chunk's steps.
+        :class:`np.ndarray`
+            The responses at the chunk's steps, with shape (n_sinks, n_times).
+
+        Raises
+        ------
+        ValueError
+            If no sinks are specified, the time step, duration or chunk size is not positive, the
+            method is not recognised, the waveform does not have a value for each step, or the
+            circuit has no operating point.
+        """
+        method = method.lower()
+
+        if method not in self.METHODS:
+            raise ValueError(f"unrecognised integration method '{method}' (must be one of "
+                             f"{', '.join(self.METHODS)})")
+        if not sinks:
+            raise ValueError("at least one sink must be specified")
+        if chunk_size is None:
+            chunk_size = int(CONF["analysis"]["transient"]["chunk_size"])
+        if chunk_size < 1:
+            raise ValueError("chunk size must be positive")
+
+        n_steps = _n_steps(time_step, duration)
+
+        if not callable(waveform):
+            waveform = np.asarray(waveform, dtype=float)
+
+            if waveform.shape != (n_steps + 1,):
+                raise ValueError(f"waveform must have a value for each of the {n_steps + 1} "
+                                 "times")
+
+        self.reset()
+        self.frequencies = np.array([])
+        self._sinks = sinks
+
+        # Set impedance to give correct scaling of current inputs.
+        impedance = 1 if input_type == "current" else None
+        self._set_up_circuit(input_type, impedance=impedance, **inputs)
+
+        conductance, capacitance = self.descriptor_matrices()
+        input_index = self.input_component_index
+        excitation = np.zeros(len(conductance))
+        excitation[input_index] = 1
+        rows = [self._element_matrix_index(sink) for sink in self.sink_elements]
+
+        if not np.any(conductance.imag) and not np.any(capacitance.imag):
+            conductance = conductance.real
+            capacitance = capacitance.real
+
+        LOGGER.debug("integrating %i states over %i steps with the %s method", len(conductance),
+                     n_steps, method)
+
+        if method == "trapezoidal":
+            # (2C/h + G) x[n+1] = (2C/h - G) x[n] + b (u[n] + u[n+1]).
+            matrix = 2 * capacitance / time_step + conductance
+            history = 2 * capacitance / time_step - conductance
+        else:
+            # (3C/2h + G) x[n+1] = 2C/h (x[n] - x[n-1] / 4) + b u[n+1].
+            matrix = 3 * capacitance / (2 * time_step) + conductance
+            history = 2 * capacitance / time_step
+
+        step_matrix = _factorise(matrix, "the circuit's step matrix is singular")
+        operating_point = _factorise(conductance, "the circuit has no operating point (check for "
+                                     "nodes with no resistive path to ground)")
+        # The LAPACK routine is called directly, as the overhead of the SciPy wrapper dominates the
+        # time taken to solve the small systems of most circuits.
+        getrs, = get_lapack_funcs(("getrs",), step_matrix)
+
+        for start in range(0, n_steps + 1, chunk_size):
+            indices = np.arange(start, min(start + chunk_size, n_steps + 1))
+            times = indices * time_step
+
+            if callable(waveform):
+                inputs = np.broadcast_to(np.asarray(waveform(times), dtype=float), times.shape)
+            else:
+                inputs = waveform[indices]
+
+            states = np.empty((len(rows), len(indices)), dtype=conductance.dtype)
+
+            for column, (index, value) in enumerate(zip(indices, inputs)):
+                if index == 0:
+                    # The circuit is at its operating point before the start.
+                    state = lu_solve(operating_point, excitation * value, check_finite=False)
+                    previous_state = state
+                elif method == "trapezoidal":
+                    rhs = history @ state
+                    rhs[input_index] += previous_value + value
+                    state, _ = getrs(*step_matrix, rhs)
+                else:
+                    rhs = history @ (state - previous_state / 4)
+                    rhs[input_index] += value
+                    previous_state = state
+                    state, _ = getrs(*step_matrix, rhs)
+
+                previous_value = value
+                states[:, column] = state[rows]
+
+            # Conjugate pairs of internal states of complex descriptor matrices give real
+            # responses.
+            yield times, states.real
+
+
+class TransientSolution:
+    """Responses calculated by a transient analysis.
+
+    Responses are stored as arrays, which are memory-mapped if the analysis wrote them to a file,
+    and retrieved as :class:`.Series` of response against time with :meth:`response`.
+
+    Parameters
+    ----------
+    time_step : :class:`float`
+        The time step.
+    source : :class:`.Node` or :class:`.Component`
+        The response source.
+    """
+    def __init__(self, time_step, source):
+        self.time_step = time_step
+        self.source = source
+        self.sinks = []
+        self.responses = None
+
+    @property
+    def n_samples(self):
+        """The number of samples, including the start."""
+        return self.responses.shape[1] if self.responses is not None else 0
+
+    @property
+    def times(self):
+        """The sample times."""
+        return np.arange(self.n_samples) * self.time_step
+
+    def add_responses(self, sinks, responses):
+        """Set the responses to the sinks.
+
+        Parameters
+        ----------
+        sinks : sequence of :class:`.Node` or :class:`.Component`
+            The response sinks.
+        responses : :class:`np.ndarray`
+            The responses, with shape (n_sinks, n_samples).
+        """
+        self.sinks = list(sinks)
+        self.responses = responses
+
+    def response(self, sink):
+        """Get the response to a sink.
+
+        Parameters
+        ----------
+        sink : :class:`str` or :class:`.Node` or :class:`.Component`
+            The response sink.
+
+        Returns
+        -------
+        :class:`.Series`
+            The response against time.
+        """
+        indices = [index for index, other in enumerate(self.sinks) if element_matches(other, sink)]
+
+        if not indices:
+            raise ValueError("no response found")
+
+        return Series(x=self.times, y=self.responses[indices[0]])
+
+    def settling_time(self, sink, tolerance, final_value=None):
+        """Get the time after which a response stays within a tolerance of its final value.
+
+        Parameters
+        ----------
+        sink : :class:`str` or :class:`.Node` or :class:`.Component`
+            The response sink.
+        tolerance : :class:`float`
+            The tolerance, relative to the magnitude of the final value.
+        final_value : :class:`float`, optional
+            The final value. Defaults to the last sample of the response.
+
+        Returns
+        -------
+        :class:`float`
+            The settling time, or zero if the response is always within the tolerance.
+        """
+        response = self.response(sink).y
+
+        if final_value is None:
+            final_value = response[-1]
+
+        outside = np.flatnonzero(np.abs(response - final_value) > tolerance * abs(final_value))
+
+        if not len(outside):
+            return 0.0
+
+        return (outside[-1] + 1) * self.time_step
+
+    def plot(self, sinks=None, axis=None):
+        """Plot responses against time.
+
+        Parameters
+        ----------
+        sinks : sequence of :class:`str`, :class:`.Node` or :class:`.Component`, optional
+            The sinks to plot the responses to. Defaults to every sink.
+        axis : :class:`~matplotlib.axes.Axes`, optional
+            Axis to plot to. If not specified, a new figure is created.
+
+        Returns
+        -------
+        :class:`~matplotlib.axes.Axes`
+            The axis.
+        """
+        import matplotlib.pyplot as plt
+
+        if axis is None:
+            _, axis = plt.subplots()
+
+        times = self.times
+
+        for sink, response in zip(self.sinks, self.responses):
+            if sinks is not None and not any(element_matches(sink, other) for other in sinks):
+                continue
+
+            axis.plot(times, response, label=f"{self.source.name} to {sink.name}")
+
+        axis.set_xlabel("Time (s)")
+        axis.set_ylabel("Response")
+        axis.grid(True)
+        axis.legend()
+
+        return axis
+
+
+def _n_steps(time_step, duration):
+    """Number of time steps covering a duration."""
+    if time_step <= 0 or duration <= 0:
+        raise ValueError("time step and duration must be positive")
+
+    # Allow for rounding in the ratio of the duration to the time step.
+    return int(np.ceil(duration / time_step - 1e-9))
+
+
+def _factorise(matrix, message):
+    """LU factorisation of a matrix, raising a ValueError with the specified message if it is
+    singular."""
+    with warnings.catch_warnings():
+        # Singular matrices are reported below.
+        warnings.simplefilter("ignore", LinAlgWarning)
+
+        try:
+            factors = lu_factor(matrix, check_finite=False)
+        except LinAlgError:
+            raise ValueError(message)
+
+    if not np.all(np.isfinite(factors[0])) or np.any(np.diag(factors[0]) == 0):
+        raise ValueError(message)
+
+    return factors
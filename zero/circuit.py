@@ -6,8 +6,9 @@ from copy import deepcopy
 import numpy as np
 
 from .config import ZeroConfig, OpAmpLibrary
-from .components import (Resistor, Capacitor, Inductor, OpAmp, Node, ElementNotFoundError,
-                         ComponentNotFoundError, NodeNotFoundError, NoiseNotFoundError)
+from .components import (Resistor, Capacitor, Inductor, OpAmp, Subcircuit, Node,
+                         ElementNotFoundError, ComponentNotFoundError, NodeNotFoundError,
+                         NoiseNotFoundError)
 
 LOGGER = logging.getLogger(__name__)
 CONF = ZeroConfig()
@@ -172,6 +173,10 @@ class Circuit:
         """Add op-amp to circuit."""
         self.add_component(OpAmp(*args, **kwargs))
 
+    def add_subcircuit(self, *args, **kwargs):
+        """Add subcircuit to circuit."""
+        self.add_component(Subcircuit(*args, **kwargs))
+
     def add_library_opamp(self, model, **kwargs):
         """Add library op-amp to circuit.
 
@@ -597,6 +602,18 @@ class Circuit:
         """
         return [component for component in self.components if component.element_type == "op-amp"]
 
+    @property
+    def subcircuits(self):
+        """The subcircuits in the circuit.
+
+        Returns
+        -------
+        :class:`list` of :class:`.Subcircuit`
+            The subcircuits.
+        """
+        return [component for component in self.components
+                if component.element_type == "subcircuit"]
+
     @property
     def noise_sources(self):
         """The noise sources in the circuit.
@@ -5,7 +5,8 @@ from collections.abc import MutableMapping
 import numpy as np
 
 from .elements import BaseElement, ElementNotFoundError
-from .noise import OpAmpVoltageNoise, OpAmpCurrentNoise, ResistorJohnsonNoise, NoiseNotFoundError
+from .noise import (OpAmpVoltageNoise, OpAmpCurrentNoise, ResistorJohnsonNoise, SubcircuitNoise,
+                    NoiseNotFoundError)
 from .misc import NamedInstance
 from .format import Quantity
 from .config import ZeroConfig, LibraryOpAmp
@@ -518,6 +519,121 @@ class Inductor(PassiveComponent):
         return super().__str__() + f" [in={self.node1}, out={self.node2}, L={self.inductance}]"
 
 
+class Subcircuit(Component):
+    """Represents a group of components connected to the rest of the circuit at its ports.
+
+    The subcircuit is represented in the circuit matrix by relations between the voltages at, and
+    the currents into, its ports, computed from its circuit (see :class:`.PortMacromodel`), rather
+    than by its components. Each port has a current, that flowing into the subcircuit, represented
+    by a :class:`SubcircuitPort`. Noise from the components within the subcircuit enters the rest
+    of the circuit through the port relations.
+
+    Parameters
+    ----------
+    circuit : :class:`.Circuit`
+        The circuit within the subcircuit. Its ground node is that of the circuit containing the
+        subcircuit.
+    ports : sequence of :class:`~Node` or :class:`str`
+        The nodes of `circuit` that connect to the rest of the circuit.
+    nodes : sequence of :class:`~Node` or :class:`str`
+        The nodes each port connects to, in the same order.
+
+    Raises
+    ------
+    ValueError
+        If the ports are not distinct, non-ground nodes of `circuit`, or there is not one node for
+        each port.
+    """
+    ELEMENT_TYPE = "subcircuit"
+    BASE_NAME = "x"
+
+    def __init__(self, circuit, ports, nodes, **kwargs):
+        ports = [port if isinstance(port, Node) else Node(str(port)) for port in ports]
+
+        if len(set(ports)) != len(ports):
+            raise ValueError("subcircuit ports must be distinct")
+        if not ports:
+            raise ValueError("subcircuit must have at least one port")
+
+        for port in ports:
+            if port is Node("gnd"):
+                raise ValueError("subcircuit ports cannot be the ground node")
+            if port not in circuit.nodes:
+                raise ValueError(f"subcircuit port '{port}' is not in its circuit")
+
+        if circuit.has_input:
+            raise ValueError("subcircuit circuits cannot have inputs")
+
+        nodes = list(nodes)
+
+        if len(nodes) != len(ports):
+            raise ValueError("subcircuits must have one node for each port")
+
+        self.circuit = circuit
+        self.ports = ports
+        super().__init__(nodes=nodes, **kwargs)
+
+    @property
+    def noise(self):
+        """The noise sources within the subcircuit.
+
+        Returns
+        -------
+        :class:`list` of :class:`.SubcircuitNoise`
+            The noise sources.
+        """
+        return [SubcircuitNoise(source, component=self) for source in self.circuit.noise_sources]
+
+    @noise.setter
+    def noise(self, noise):
+        if noise:
+            raise ValueError("subcircuit noise is determined by its circuit")
+
+    def add_noise(self, noise):
+        raise ValueError("subcircuit noise is determined by its circuit")
+
+    @property
+    def port_components(self):
+        """The ports of the subcircuit, which each have a current.
+
+        Returns
+        -------
+        :class:`list` of :class:`SubcircuitPort`
+            The ports.
+        """
+        return [SubcircuitPort(self, index) for index in range(len(self.ports))]
+
+    def __str__(self):
+        ports = ", ".join(f"{port}={node}" for port, node in zip(self.ports, self.nodes))
+        return super().__str__() + f" [{ports}]"
+
+
+class SubcircuitPort(Component):
+    """Represents the current flowing into a subcircuit at one of its ports.
+
+    Ports are named after their subcircuit and the node within the subcircuit, e.g. "x1.nin".
+
+    Parameters
+    ----------
+    subcircuit : :class:`Subcircuit`
+        The subcircuit.
+    index : :class:`int`
+        The index of the port within the subcircuit's ports.
+    """
+    ELEMENT_TYPE = "port"
+
+    def __init__(self, subcircuit, index):
+        self.subcircuit = subcircuit
+        self.index = int(index)
+        super().__init__(name=f"{subcircuit.name}.{subcircuit.ports[index].name}",
+                         nodes=[subcircuit.nodes[index]])
+
+    @property
+    def node(self):
+        """The node the port connects to."""
+        return self.nodes[0]
+
+
 class ComponentNotFoundError(ElementNotFoundError):
     def __init__(self, name, *args, **kwargs):
         super().__init__(name=name, message="component '%s' not found", *args, **kwargs)
@@ -552,6 +668,10 @@ class Node(BaseElement, metaclass=NamedInstance):
     def __repr__(self):
         return str(self)
 
+    def __reduce__(self):
+        # Unpickle as the named instance.
+        return self.__class__, (self.name,)
+
 
 class NodeNotFoundError(ElementNotFoundError):
     def __init__(self, name, *args, **kwargs):
@@ -633,3 +753,20 @@ class CouplingFactorDict(MutableMapping):
 
     def __contains__(self, key):
         return key in self._couplings
+
+    def __getstate__(self):
+        # Coupled inductors refer to each other, so when unpickled, an inductor in the map may not
+        # yet have the name it is hashed by. The couplings are instead stored as pairs and the map
+        # is rebuilt when first used.
+        return {"inductor": self.inductor, "pairs": list(self._couplings.items())}
+
+    def __setstate__(self, state):
+        self.inductor = state["inductor"]
+        self._pairs = state["pairs"]
+
+    def __getattr__(self, name):
+        if name == "_couplings" and "_pairs" in self.__dict__:
+            self._couplings = dict(self.__dict__.pop("_pairs"))
+            return self._couplings
+
+        raise AttributeError(name)
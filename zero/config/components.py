@@ -429,19 +429,22 @@ class LibraryOpAmp:
 
         Parameters
         ----------
-        frequency : :class:`float`
-            Frequency to compute gain at.
+        frequency : :class:`float` or array_like
+            Frequency or frequencies to compute gain at.
 
         Returns
         -------
-        :class:`float`
-            Op-amp gain at specified frequency.
+        :class:`complex` or :class:`np.ndarray`
+            Op-amp gain at specified frequency or frequencies.
         """
+        frequency = np.asarray(frequency)
+        # Extra axis allows the zeros and poles to be broadcast against a frequency vector.
+        ratio = 1j * frequency[..., np.newaxis]
         return (self.a0
                 / (1 + self.a0 * 1j * frequency / self.gbw)
                 * np.exp(-2j * np.pi * self.delay * frequency)
-                * np.prod(1 + 1j * frequency / self.zeros)
-                / np.prod(1 + 1j * frequency / self.poles))
+                * np.prod(1 + ratio / self.zeros, axis=-1)
+                / np.prod(1 + ratio / self.poles, axis=-1))
 
     def inverse_gain(self, *args, **kwargs):
         """Op-amp inverse gain.
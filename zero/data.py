@@ -269,6 +269,10 @@ class BaseFunction(metaclass=abc.ABCMeta):
 
         This does not check for data equality.
         """
+        # Compare sources and sinks first, since building labels is comparatively slow.
+        if set(self.sources) != set(other.sources) or set(self.sinks) != set(other.sinks):
+            return False
+
         return self.meta_data() == other.meta_data() \
                and frequencies_match(self.frequencies, other.frequencies)
 
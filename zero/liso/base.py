@@ -476,7 +476,10 @@ class LisoParser(metaclass=abc.ABCMeta):
             analysis_args['node_n'] = self.input_node_n
             analysis_args['node_p'] = self.input_node_p
 
-        if self.output_type == "noise":
+        if self.output_type == "response":
+            # Only the responses to the outputs are calculated, unless sinks are specified.
+            kwargs.setdefault('sinks', self.default_response_sinks())
+        elif self.output_type == "noise":
             analysis_args['sink'] = self.circuit[self.noise_output_element]
             analysis_args['impedance'] = self.input_impedance
             analysis_args['input_refer'] = self.input_refer
@@ -148,3 +148,29 @@ def db_to_mag(quantity):
 
 def mag_to_db(quantity):
     return 20 * np.log10(quantity)
+
+
+def element_matches(element, specifier):
+    """Check if a circuit element, or a noise source, matches a specifier.
+
+    Parameters
+    ----------
+    element : :class:`.BaseElement` or :class:`.Noise`
+        The element or noise source.
+    specifier : :class:`str`, :class:`.BaseElement`, :class:`.Noise` or None
+        The specifier. Strings match the element's name or label, case insensitively, and None
+        matches any element.
+
+    Returns
+    -------
+    :class:`bool`
+        True if the element matches.
+    """
+    if specifier is None:
+        return True
+
+    if isinstance(specifier, str):
+        names = {getattr(element, "name", None), getattr(element, "label", None)}
+        return specifier.lower() in {str(name).lower() for name in names if name is not None}
+
+    return element == specifier
@@ -164,3 +164,34 @@ class OpAmpCurrentNoise(CurrentNoise):
     @property
     def corner_frequency(self):
         return self.component.params["icorner"]
+
+
+class SubcircuitNoise(ComponentNoise):
+    """Noise source within a subcircuit.
+
+    The noise enters the circuit containing the subcircuit as currents at the subcircuit's ports.
+
+    Parameters
+    ----------
+    source : :class:`Noise`
+        The noise source within the subcircuit's circuit.
+    """
+    def __init__(self, source, **kwargs):
+        super().__init__(function=source.spectral_density, **kwargs)
+        self.source = source
+
+    @property
+    def noise_type(self):
+        return self.source.noise_type
+
+    @property
+    def component_type(self):
+        """The type of the component within the subcircuit that produces the noise."""
+        if isinstance(self.source, ComponentNoise):
+            return self.source.component_type
+
+        return self.source.component.element_type
+
+    @property
+    def label(self):
+        return f"{self.component.name}.{self.source.label}"
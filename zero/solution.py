@@ -6,8 +6,8 @@ import datetime
 import numpy as np
 
 from .config import ZeroConfig
-from .data import (Response, NoiseDensity, MultiNoiseDensity, ReferenceResponse, ReferenceNoise,
-                   frequencies_match)
+from .data import (Series, Response, NoiseDensity, MultiNoiseDensity, ReferenceResponse,
+                   ReferenceNoise, frequencies_match)
 from .components import BaseElement
 from .noise import Noise
 from .format import Quantity
@@ -41,8 +41,8 @@ class Solution:
         :type frequencies: :class:`~np.ndarray`
         """
         # Functions by group. The order of functions in their groups, and the groups themselves,
-        # determine plotting order.
-        self.functions = defaultdict(list)
+        # determine plotting order. Responses added as arrays are stored in blocks until requested.
+        self._functions = defaultdict(list)
         # Map of functions to their groups, for quick look-ups.
         self._function_groups = {}
 
@@ -70,15 +70,51 @@ class Solution:
 
         self.frequencies = frequencies
 
+    @property
+    def functions(self):
+        """Functions by group.
+
+        Responses added with :meth:`add_response_data` that have not yet been requested are
+        created first.
+        """
+        for group, functions in self._functions.items():
+            if not any(isinstance(function, ResponseBlock) for function in functions):
+                continue
+
+            materialised = []
+
+            for function in functions:
+                if isinstance(function, ResponseBlock):
+                    materialised.extend(self._block_responses(function, group))
+                else:
+                    materialised.append(function)
+
+            functions[:] = materialised
+
+        return self._functions
+
+    @functions.setter
+    def functions(self, functions):
+        self._functions = functions
+
+    @property
+    def stored_functions(self):
+        """Functions by group, as stored.
+
+        Unlike :attr:`functions`, responses added with :meth:`add_response_data` that have not yet
+        been requested are not created, but are instead contained in :class:`ResponseBlock` objects.
+        """
+        return self._functions
+
     @property
     def groups(self):
-        return list(self.functions) + [self.DEFAULT_REF_GROUP_NAME]
+        return list(self._functions) + [self.DEFAULT_REF_GROUP_NAME]
 
     def get_group_functions(self, group=None):
         """Get functions by group"""
         if group is None:
             group = self.DEFAULT_GROUP_NAME
-        elif group not in self.functions:
+        elif group not in self._functions:
             raise ValueError(f"group '{group}' does not exist")
 
         return self.functions[group]
@@ -159,6 +195,80 @@ class Solution:
         if default:
             self.set_response_as_default(response, group)
 
+    def add_responses(self, responses, group=None):
+        """Add responses to the solution.
+
+        This is equivalent to calling :meth:`.add_response` for each response, but checks for
+        duplicate responses in a single pass, which is substantially faster when adding many
+        responses at once.
+
+        Parameters
+        ----------
+        responses : sequence of :class:`.Response`
+            The responses to add.
+        group : `str`, optional
+            Group name.
+
+        Raises
+        ------
+        ValueError
+            If any of the specified responses is incompatible with this solution.
+        """
+        responses = list(responses)
+
+        # Dimension sanity checks.
+        for response in responses:
+            if not np.all(response.frequencies == self.frequencies):
+                raise ValueError(f"response '{response}' doesn't fit this solution")
+
+        self._add_functions(responses, group=group)
+
+    def add_response_data(self, source, sinks, data, group=None):
+        """Add responses from a source to many sinks, stored as an array.
+
+        The :class:`.Response` objects are only created when they are requested, e.g. by
+        :meth:`.filter_responses`, :meth:`.get_response` or a plot. This avoids the cost of
+        creating responses to every element of large circuits when only a few are used.
+
+        Parameters
+        ----------
+        source : :class:`.Node` or :class:`.Component`
+            The response source.
+        sinks : sequence of :class:`.Node` or :class:`.Component`
+            The response sinks.
+        data : :class:`np.ndarray`
+            The complex responses to each sink, with shape (n_sinks, n_freqs).
+        group : `str`, optional
+            Group name.
+
+        Raises
+        ------
+        ValueError
+            If the data is incompatible with this solution, or a response to one of the sinks from
+            the source is already present in the group.
+        """
+        block = ResponseBlock(self.frequencies, source, sinks, data)
+
+        if block.data.shape != (len(block.sinks), len(self.frequencies)):
+            raise ValueError(f"response data from '{source}' doesn't fit this solution")
+
+        group = self._function_group_name(group)
+
+        for function in self._functions[group]:
+            if isinstance(function, ResponseBlock):
+                sinks = function.sinks if function.source == source else []
+            elif isinstance(function, Response) and function.source == source:
+                sinks = [function.sink]
+            else:
+                continue
+
+            for sink in sinks:
+                if sink in block:
+                    raise ValueError(f"duplicate response from '{source}' to '{sink}' in group "
+                                     f"'{group}'")
+
+        self._functions[group].append(block)
+
     def is_default_response(self, response, group=None):
         if group is None:
             group = self.DEFAULT_GROUP_NAME
@@ -183,7 +293,7 @@ class Solution:
         if group is None:
             group = self.DEFAULT_GROUP_NAME
 
-        if response not in self.responses[group]:
+        if response not in self._responses(groups=[group], sinks=[response.sink]).get(group, []):
             raise ValueError(f"response '{response}' is not in the solution")
 
         if self.is_default_response(response, group):
@@ -303,20 +413,101 @@ class Solution:
             raise ValueError("noise reference is already present in the solution")
         self.noise_references.append(reference)
 
-    def _add_function(self, function, group=None):
+    def _function_group_name(self, group):
         if group is None:
-            group = self.DEFAULT_GROUP_NAME
+            return self.DEFAULT_GROUP_NAME
         elif group in (self.DEFAULT_GROUP_NAME, self.DEFAULT_REF_GROUP_NAME):
             raise ValueError(f"group '{group}' is a reserved keyword")
 
-        group = str(group)
+        return str(group)
+
+    def _add_function(self, function, group=None):
+        group = self._function_group_name(group)
+
+        existing = [function for function in self._functions[group]
+                    if not isinstance(function, ResponseBlock)]
 
-        if function in self.functions[group]:
+        if function in existing or self._in_response_block(function, group):
             raise ValueError(f"duplicate function '{function}' in group '{group}'")
 
-        self.functions[group].append(function)
+        self._functions[group].append(function)
         self._function_groups[function] = group
 
+    def _add_functions(self, functions, group=None):
+        group = self._function_group_name(group)
+
+        # Equivalent functions have equal hashes, so only functions with matching hashes need to
+        # be compared.
+        candidates = defaultdict(list)
+        for function in self._functions[group]:
+            if not isinstance(function, ResponseBlock):
+                candidates[hash(function)].append(function)
+
+        for function in functions:
+            matches = candidates[hash(function)]
+
+            if function in matches or self._in_response_block(function, group):
+                raise ValueError(f"duplicate function '{function}' in group '{group}'")
+
+            matches.append(function)
+
+        self._functions[group].extend(functions)
+
+        for function in functions:
+            self._function_groups[function] = group
+
+    def _in_response_block(self, function, group):
+        """Check if a function is equal to a response stored in one of the group's blocks."""
+        if not isinstance(function, Response):
+            return False
+
+        for block in self._functions[group]:
+            if (isinstance(block, ResponseBlock) and block.source == function.source
+                    and function.sink in block):
+                if function in self._block_responses(block, group, sinks=[function.sink]):
+                    return True
+
+        return False
+
+    def _block_responses(self, block, group, sinks=None):
+        """Get responses stored in a block, creating them if necessary."""
+        responses = block.responses(sinks)
+
+        for response in responses:
+            self._function_groups[response] = group
+
+        return responses
+
+    def _responses(self, groups=None, sinks=None):
+        """Responses by group.
+
+        Responses stored in blocks are only created for the specified groups and sinks.
+        """
+        if groups is None:
+            groups = self.RESPONSE_GROUPS_ALL
+        if sinks is None:
+            sinks = self.RESPONSE_SINKS_ALL
+
+        responses = {}
+
+        for group, functions in self._functions.items():
+            group_responses = []
+
+            for function in functions:
+                if isinstance(function, ResponseBlock):
+                    if groups == self.RESPONSE_GROUPS_ALL or group in groups:
+                        if sinks == self.RESPONSE_SINKS_ALL:
+                            group_responses.extend(self._block_responses(function, group))
+                        else:
+                            group_responses.extend(self._block_responses(function, group,
+                                                                         sinks=sinks))
+                elif isinstance(function, Response):
+                    group_responses.append(function)
+
+            responses[group] = group_responses
+
+        return responses
+
     @classmethod
     def __group_params(cls, sparam, mparam, sparam_name, mparam_name, default=None, allmstr=None):
         """Create list with either the singular or multiple valued parameter's value(s).
@@ -346,7 +537,9 @@ class Solution:
         sinks = self.__group_params(sink, sinks, "sink", "sinks", allmstr=self.RESPONSE_SINKS_ALL)
         labels = self.__group_params(label, labels, "label", "labels",
                                      allmstr=self.RESPONSE_LABELS_ALL)
-        return self._apply_response_filters(self.responses, groups=groups, sources=sources,
+        # Only create the responses stored in blocks that can match the filters.
+        responses = self._responses(groups=groups, sinks=sinks)
+        return self._apply_response_filters(responses, groups=groups, sources=sources,
                                             sinks=sinks, labels=labels)
 
     def _apply_response_filters(self, responses, groups=None, sources=None, sinks=None,
@@ -769,13 +962,12 @@ class Solution:
 
     @property
     def responses(self):
-        return {group: [function for function in functions if isinstance(function, Response)]
-                for group, functions in self.functions.items()}
+        return self._responses()
 
     @property
     def noise(self):
         return {group: [function for function in functions if isinstance(function, NoiseDensity)]
-                for group, functions in self.functions.items()}
+                for group, functions in self._functions.items()}
 
     @property
     def component_noise(self):
@@ -797,13 +989,14 @@ class Solution:
     @property
     def noise_sums(self):
         return {group: [function for function in functions if isinstance(function, MultiNoiseDensity)]
-                for group, functions in self.functions.items()}
+                for group, functions in self._functions.items()}
 
     @property
     def has_responses(self):
-        for responses in self.responses.values():
-            if responses:
-                return True
+        for functions in self._functions.values():
+            for function in functions:
+                if isinstance(function, (Response, ResponseBlock)):
+                    return True
         return False
 
     @property
@@ -829,8 +1022,9 @@ class Solution:
     @property
     def response_sources(self):
         sources = set()
-        for responses in self.responses.values():
-            sources.update([response.source for response in responses])
+        for functions in self._functions.values():
+            sources.update([function.source for function in functions
+                            if isinstance(function, (Response, ResponseBlock))])
         return sources
 
     def get_response_source(self, source_name):
@@ -845,8 +1039,12 @@ class Solution:
     @property
     def response_sinks(self):
         sinks = set()
-        for responses in self.responses.values():
-            sinks.update([response.sink for response in responses])
+        for functions in self._functions.values():
+            for function in functions:
+                if isinstance(function, ResponseBlock):
+                    sinks.update(function.sinks)
+                elif isinstance(function, Response):
+                    sinks.add(function.sink)
         return sinks
 
     def get_response_sink(self, sink_name):
@@ -1288,6 +1486,79 @@ class Solution:
         return header, rows
 
 
+class ResponseBlock:
+    """Responses from a source to many sinks, stored as an array.
+
+    The :class:`.Response` for each sink is created when it is first requested, and reused
+    thereafter.
+
+    Parameters
+    ----------
+    frequencies : :class:`np.ndarray`
+        The frequencies.
+    source : :class:`.Node` or :class:`.Component`
+        The response source.
+    sinks : sequence of :class:`.Node` or :class:`.Component`
+        The response sinks.
+    data : :class:`np.ndarray`
+        The complex responses to each sink, with shape (n_sinks, n_freqs).
+    """
+    def __init__(self, frequencies, source, sinks, data):
+        self.frequencies = frequencies
+        self.source = source
+        self.sinks = list(sinks)
+        self.data = np.asarray(data)
+        self._indices = {sink: index for index, sink in enumerate(self.sinks)}
+        self._responses = {}
+
+    def __len__(self):
+        return len(self.sinks)
+
+    def __contains__(self, sink):
+        return sink in self._indices
+
+    def responses(self, sinks=None):
+        """Get the responses to the specified sinks, in block order.
+
+        Parameters
+        ----------
+        sinks : sequence of :class:`str`, :class:`.Node` or :class:`.Component`, optional
+            The sinks, or their names. If None, the responses to every sink are returned.
+
+        Returns
+        -------
+        :class:`list` of :class:`.Response`
+            The responses.
+        """
+        if sinks is None:
+            indices = range(len(self.sinks))
+        else:
+            indices = set()
+            names = set()
+
+            for sink in sinks:
+                if isinstance(sink, str):
+                    names.add(sink.lower())
+                elif sink in self._indices:
+                    indices.add(self._indices[sink])
+
+            if names:
+                indices.update(index for index, sink in enumerate(self.sinks)
+                               if sink.name.lower() in names)
+
+            indices = sorted(indices)
+
+        return [self._response(index) for index in indices]
+
+    def _response(self, index):
+        if index not in self._responses:
+            series = Series(x=self.frequencies, y=self.data[index])
+            self._responses[index] = Response(source=self.source, sink=self.sinks[index],
+                                              series=series)
+
+        return self._responses[index]
+
+
 class NoDataException(Exception):
     pass
 
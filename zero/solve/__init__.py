@@ -1,12 +1,15 @@
 from ..config import ZeroConfig
 
 # solvers
-from .scipy import ScipySolver
+from .scipy import ScipySolver, ScipyLuSolver
+from .numpy import NumpySolver
+from .auto import AutoSolver
+from .mixed import MixedPrecisionSolver
 
 CONF = ZeroConfig()
 
 # available solver classes
-solver_classes = [ScipySolver]
+solver_classes = [ScipySolver, ScipyLuSolver, NumpySolver, AutoSolver, MixedPrecisionSolver]
 
 # dict of solver names and types
 available_solvers = {_class.NAME: _class for _class in solver_classes}
@@ -0,0 +1,149 @@
+import logging
+
+from .base import BaseSolver
+from .numpy import NumpySolver
+from .scipy import ScipyLuSolver
+from ..config import ZeroConfig
+
+LOGGER = logging.getLogger(__name__)
+CONF = ZeroConfig()
+
+
+class AutoSolver(BaseSolver):
+    """Matrix solver choosing between dense and sparse solvers by matrix size
+
+    Dense solvers are faster for small matrices, where the bookkeeping
+    overhead of sparse solvers dominates, while sparse solvers are essential
+    for large matrices. This solver delegates to a dense solver if the matrix
+    dimension is no larger than the ``algebra.auto_dense_max_size``
+    configuration setting or the fraction of the matrix that is stored is at
+    least ``algebra.auto_dense_min_density``, and a sparse solver otherwise.
+
+    The choice is made when :meth:`prepare` is called with the shape and number
+    of stored elements of the matrices to be solved. Until then, the sparse
+    solver is used.
+    """
+
+    # solver name
+    NAME = "auto"
+
+    # default data type
+    DTYPE = "complex128"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.dense_solver = NumpySolver()
+        self.sparse_solver = ScipyLuSolver()
+        self.solver = self.sparse_solver
+
+    @property
+    def is_sparse(self):
+        """Whether the chosen solver operates on sparse matrices"""
+        return self.solver.is_sparse
+
+    def prepare(self, shape, nnz):
+        """Choose solver for matrices with the specified shape and number of stored elements
+
+        Parameters
+        ----------
+        shape : :class:`tuple`
+            matrix shape
+        nnz : :class:`int`
+            number of stored elements
+        """
+        max_size = int(CONF["algebra"]["auto_dense_max_size"])
+        min_density = float(CONF["algebra"]["auto_dense_min_density"])
+
+        size = max(shape)
+        density = nnz / (shape[0] * shape[1])
+
+        if size <= max_size or density >= min_density:
+            self.solver = self.dense_solver
+        else:
+            self.solver = self.sparse_solver
+
+        self.solver.prepare(shape, nnz)
+
+        LOGGER.debug("using %s solver for %ix%i matrix with %i stored elements (density %.3f)",
+                    self.solver.NAME, *shape, nnz, density)
+
+    def reset(self):
+        """Reset the solvers"""
+        self.dense_solver.reset()
+        self.sparse_solver.reset()
+
+    def full(self, dimensions):
+        """Create new complex-valued full matrix
+
+        Parameters
+        ----------
+        dimensions : :class:`tuple`
+            matrix shape
+
+        Returns
+        -------
+        :class:`~np.ndarray`
+            full matrix
+        """
+        return self.solver.full(dimensions)
+
+    def sparse(self, dimensions):
+        """Create new complex-valued matrix of the type used by the chosen solver
+
+        Parameters
+        ----------
+        dimensions : :class:`tuple`
+            matrix shape
+        """
+        return self.solver.sparse(dimensions)
+
+    def solve(self, A, b):
+        """Solve linear system using the chosen solver
+
+        Parameters
+        ----------
+        A : :class:`~np.ndarray`, :class:`~scipy.sparse.spmatrix`
+            square matrix
+        b : :class:`~np.ndarray`
+            matrix or vector representing right hand side of matrix equation
+
+        Returns
+        -------
+        :class:`~np.ndarray`
+            x in the equation Ax = b
+        """
+        return self.solver.solve(A, b)
+
+    def factorise(self, A):
+        """Factorise matrix using the chosen solver
+
+        Parameters
+        ----------
+        A : :class:`~np.ndarray`, :class:`~scipy.sparse.spmatrix`
+            square matrix
+
+        Returns
+        -------
+        factorisation
+            factorisation of A
+        """
+        return self.solver.factorise(A)
+
+    def solve_batch(self, A, b):
+        """Solve stack of linear systems with a common right hand side using the chosen solver
+
+        Parameters
+        ----------
+        A : :class:`~np.ndarray`
+            stack of square matrices, with shape (n, m, m)
+        b : :class:`~np.ndarray`
+            matrix representing right hand side of matrix equation, with
+            shape (m, k)
+
+        Returns
+        -------
+        :class:`~np.ndarray`
+            x in the equation Ax = b for each matrix in the stack, with shape
+            (n, m, k)
+        """
+        return self.solver.solve_batch(A, b)
@@ -1,4 +1,5 @@
 import abc
+import numpy as np
 
 class BaseSolver(metaclass=abc.ABCMeta):
     """Base class for matrix solvers"""
@@ -6,6 +7,15 @@ class BaseSolver(metaclass=abc.ABCMeta):
     # solver name
     NAME = "base"
 
+    # solution data type
+    DTYPE = "complex128"
+
+    # data type of the matrices to solve
+    MATRIX_DTYPE = "complex128"
+
+    # whether the solver operates on sparse matrices
+    is_sparse = True
+
     @abc.abstractmethod
     def full(self, dimensions):
         """Create new complex-valued full matrix
@@ -32,3 +42,64 @@ class BaseSolver(metaclass=abc.ABCMeta):
     def solve(self, A, b):
         """Solve linear system"""
         raise NotImplementedError
+
+    def factorise(self, A):
+        """Factorise matrix for repeated solves
+
+        Parameters
+        ----------
+        A : :class:`~np.ndarray`, :class:`~scipy.sparse.spmatrix`
+            square matrix
+
+        Returns
+        -------
+        factorisation
+            object with a ``solve(b, trans="N")`` method solving Ax = b, or the
+            transposed system if ``trans`` is "T"
+        """
+        raise NotImplementedError
+
+    def prepare(self, shape, nnz):
+        """Prepare solver for matrices with the specified shape and number of
+        stored elements
+
+        This is called by analyses once the structure of the matrices they will
+        solve is known.
+
+        Parameters
+        ----------
+        shape : :class:`tuple`
+            matrix shape
+        nnz : :class:`int`
+            number of stored elements
+        """
+        pass
+
+    def reset(self):
+        """Reset any state retained between solves
+
+        This is called by analyses before the solver is used for a new
+        circuit.
+        """
+        pass
+
+    def solve_batch(self, A, b):
+        """Solve stack of linear systems with a common right hand side
+
+        Parameters
+        ----------
+        A : :class:`~np.ndarray`
+            stack of square matrices, with shape (n, m, m)
+        b : :class:`~np.ndarray`
+            matrix representing right hand side of matrix equation, with
+            shape (m, k)
+
+        Returns
+        -------
+        :class:`~np.ndarray`
+            x in the equation Ax = b for each matrix in the stack, with shape
+            (n, m, k)
+        """
+        # broadcast right hand side across the stack so each system is solved
+        # by the batched LAPACK routines in one call
+        return np.linalg.solve(A, np.broadcast_to(b, (A.shape[0], *b.shape)))
@@ -0,0 +1,149 @@
+import warnings
+import numpy as np
+from scipy.sparse import issparse
+from scipy.sparse.linalg import MatrixRankWarning
+from scipy.linalg import lu_factor, lu_solve
+
+from .base import BaseSolver
+
+
+class NumpySolver(BaseSolver):
+    """Numpy-based dense matrix solver
+
+    Dense LAPACK routines avoid the bookkeeping overhead of sparse solvers,
+    which dominates the solve time for small circuits.
+    """
+
+    # solver name
+    NAME = "numpy-dense"
+
+    # default data type
+    DTYPE = "complex128"
+
+    # this solver operates on full matrices
+    is_sparse = False
+
+    def full(self, dimensions):
+        """Create new complex-valued full matrix
+
+        Creates a Numpy full matrix.
+
+        Parameters
+        ----------
+        dimensions : :class:`tuple`
+            matrix shape
+
+        Returns
+        -------
+        :class:`~np.ndarray`
+            full matrix
+        """
+        return np.zeros(dimensions, dtype=self.DTYPE)
+
+    def sparse(self, dimensions):
+        """Create new complex-valued matrix
+
+        This solver operates on full matrices, so this creates a Numpy full
+        matrix.
+
+        Parameters
+        ----------
+        dimensions : :class:`tuple`
+            matrix shape
+
+        Returns
+        -------
+        :class:`~np.ndarray`
+            full matrix
+        """
+        return self.full(dimensions)
+
+    def solve(self, A, b):
+        """Solve linear system
+
+        Parameters
+        ----------
+        A : :class:`~np.ndarray`, :class:`~scipy.sparse.spmatrix`
+            square matrix
+        b : :class:`~np.ndarray`
+            matrix or vector representing right hand side of matrix equation
+
+        Returns
+        -------
+        :class:`~np.ndarray`
+            x in the equation Ax = b; a vector if b is a vector or single
+            column matrix, or NaN if A is singular
+        """
+        try:
+            x = np.linalg.solve(self._full(A), b)
+        except np.linalg.LinAlgError:
+            # behave like the sparse solvers
+            warnings.warn("Matrix is exactly singular", MatrixRankWarning)
+            x = np.full(np.shape(b), np.nan, dtype=self.DTYPE)
+
+        if x.ndim == 2 and x.shape[1] == 1:
+            # behave like the sparse solvers
+            x = x[:, 0]
+
+        return x
+
+    def factorise(self, A):
+        """Factorise matrix
+
+        Parameters
+        ----------
+        A : :class:`~np.ndarray`, :class:`~scipy.sparse.spmatrix`
+            square matrix
+
+        Returns
+        -------
+        :class:`NumpyLuFactorisation`
+            LU factorisation of A
+        """
+        return NumpyLuFactorisation(lu_factor(self._full(A), check_finite=False))
+
+    @staticmethod
+    def _full(A):
+        """Full matrix equivalent of the specified matrix"""
+        if issparse(A):
+            return A.toarray()
+
+        return A
+
+
+class NumpyLuFactorisation:
+    """Dense LU factorisation
+
+    Parameters
+    ----------
+    lu_and_pivots : :class:`tuple`
+        LU factors and pivot indices, as returned by :func:`scipy.linalg.lu_factor`
+    """
+    def __init__(self, lu_and_pivots):
+        self.lu_and_pivots = lu_and_pivots
+
+    @property
+    def shape(self):
+        """Factorised matrix shape"""
+        return self.lu_and_pivots[0].shape
+
+    def solve(self, b, trans="N"):
+        """Solve linear system using the factorisation
+
+        Parameters
+        ----------
+        b : :class:`~np.ndarray`
+            matrix or vector representing right hand side of matrix equation
+        trans : {"N", "T"}, optional
+            solve Ax = b if "N", or the transposed system A^T x = b if "T"
+
+        Returns
+        -------
+        :class:`~np.ndarray`
+            x in the equation Ax = b or A^T x = b
+        """
+        if trans not in ("N", "T"):
+            raise ValueError("trans must be 'N' or 'T'")
+
+        return lu_solve(self.lu_and_pivots, b, trans=0 if trans == "N" else 1,
+                        check_finite=False)
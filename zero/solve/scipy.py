@@ -1,9 +1,13 @@
-from scipy.sparse import lil_matrix
-from scipy.sparse.linalg import spsolve
+import logging
+from scipy.sparse import lil_matrix, csc_matrix
+from scipy.sparse.linalg import spsolve, splu
 import numpy as np
 
 from .base import BaseSolver
 
+LOGGER = logging.getLogger(__name__)
+
+
 class ScipySolver(BaseSolver):
     """Scipy-based matrix solver"""
 
@@ -69,3 +73,254 @@ class ScipySolver(BaseSolver):
             x in the equation Ax = b
         """
         return spsolve(A, b)
+
+    def factorise(self, A):
+        """Factorise matrix
+
+        Parameters
+        ----------
+        A : :class:`~scipy.sparse.spmatrix`
+            square matrix
+
+        Returns
+        -------
+        :class:`ScipyLuFactorisation`
+            LU factorisation of A
+        """
+        matrix, transposed = self._csc(A)
+        return ScipyLuFactorisation(splu(matrix), None, matrix.dtype, transposed)
+
+    @staticmethod
+    def _csc(A):
+        """Compressed sparse column matrix to factorise in place of the specified matrix
+
+        Returns
+        -------
+        :class:`~scipy.sparse.csc_matrix`
+            A, or its transpose if A is in compressed sparse row format
+        :class:`bool`
+            whether the returned matrix is the transpose of A
+        """
+        if A.format == "csr":
+            # the CSR arrays of A are the CSC arrays of its transpose, which is
+            # factorised instead to avoid a format conversion
+            return A.T, True
+
+        return csc_matrix(A), False
+
+
+class ScipyLuSolver(ScipySolver):
+    """Scipy-based sparse LU matrix solver with reusable column ordering
+
+    The sparsity pattern of a circuit matrix is the same at every frequency;
+    only the values change. This solver computes the fill-reducing column
+    ordering the first time it factorises a matrix after being reset.
+    Subsequent factorisations of matrices with the same sparsity pattern
+    gather the matrix values directly into the ordered pattern and perform
+    only the numeric factorisation.
+    """
+
+    # solver name
+    NAME = "scipy-lu"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.reset()
+
+    def reset(self):
+        """Reset the column ordering and factorisation statistics"""
+        # sparsity pattern the column ordering was computed for, the column
+        # ordering, the column-ordered pattern and the map from the original
+        # values to it; these are replaced together so that the solver can be
+        # shared between threads
+        self._ordering = None
+
+        # statistics
+        self.n_factorisations = 0
+        self.n_orderings = 0
+        self.nnz_matrix = None
+        self.nnz_factors = None
+
+    @property
+    def fill_ratio(self):
+        """Ratio of the number of stored elements in the last factorisation's
+        L and U factors to that in its matrix"""
+        if not self.nnz_matrix:
+            return None
+
+        return self.nnz_factors / self.nnz_matrix
+
+    @property
+    def statistics(self):
+        """Factorisation statistics
+
+        Returns
+        -------
+        :class:`dict`
+            number of factorisations and column orderings since the last reset,
+            and the number of stored elements in the last factorised matrix and
+            its factors
+        """
+        return {"factorisations": self.n_factorisations, "orderings": self.n_orderings,
+                "nnz(A)": self.nnz_matrix, "nnz(LU)": self.nnz_factors,
+                "fill ratio": self.fill_ratio}
+
+    def factorise(self, A):
+        """Factorise matrix
+
+        Parameters
+        ----------
+        A : :class:`~scipy.sparse.spmatrix`
+            square matrix
+
+        Returns
+        -------
+        :class:`ScipyLuFactorisation`
+            LU factorisation of A
+        """
+        matrix, transposed = self._csc(A)
+
+        ordering = self._ordering
+
+        if self._pattern_matches(matrix, ordering):
+            # reuse ordering, skipping the column ordering step
+            _, column_order, ordered_pattern, gather = ordering
+            ordered = csc_matrix((matrix.data[gather], *ordered_pattern), shape=matrix.shape)
+            lu = splu(ordered, permc_spec="NATURAL")
+            factorisation = ScipyLuFactorisation(lu, column_order, matrix.dtype, transposed)
+        else:
+            # compute fill-reducing ordering as part of a full factorisation
+            lu = splu(matrix, permc_spec="COLAMD")
+            self._set_ordering(matrix, lu)
+            factorisation = ScipyLuFactorisation(lu, None, matrix.dtype, transposed)
+
+            LOGGER.debug("computed column ordering for %ix%i matrix (nnz(A)=%i, nnz(LU)=%i, "
+                         "fill ratio %.2f)", *matrix.shape, matrix.nnz, lu.nnz,
+                         lu.nnz / matrix.nnz)
+
+        self.n_factorisations += 1
+        self.nnz_matrix = matrix.nnz
+        self.nnz_factors = lu.nnz
+
+        return factorisation
+
+    @staticmethod
+    def _pattern_matches(matrix, ordering):
+        """Check if the specified CSC matrix has the pattern the ordering was computed for"""
+        if ordering is None:
+            return False
+
+        indptr, indices, shape = ordering[0]
+
+        return (matrix.shape == shape and np.array_equal(matrix.indptr, indptr)
+                and np.array_equal(matrix.indices, indices))
+
+    def _set_ordering(self, matrix, lu):
+        """Store the column ordering computed by a factorisation of the specified CSC matrix"""
+        # SuperLU's column permutation maps the ordered columns back to the original ones
+        order = np.argsort(lu.perm_c)
+
+        # map from the stored values of the matrix to those of the column-ordered matrix
+        starts = matrix.indptr[order]
+        lengths = matrix.indptr[order + 1] - starts
+        ordered_indptr = np.concatenate(([0], np.cumsum(lengths)))
+        gather = np.repeat(starts - ordered_indptr[:-1], lengths) + np.arange(ordered_indptr[-1])
+
+        pattern = (matrix.indptr.copy(), matrix.indices.copy(), matrix.shape)
+        self._ordering = (pattern, order, (matrix.indices[gather], ordered_indptr), gather)
+        self.n_orderings += 1
+
+    def solve(self, A, b):
+        """Solve linear system
+
+        Parameters
+        ----------
+        A : :class:`~scipy.sparse.spmatrix`
+            square matrix
+        b : :class:`~np.ndarray`
+            matrix or vector representing right hand side of matrix equation
+
+        Returns
+        -------
+        :class:`~np.ndarray`
+            x in the equation Ax = b; a vector if b is a vector or single
+            column matrix
+        """
+        x = self.factorise(A).solve(b)
+
+        if x.ndim == 2 and x.shape[1] == 1:
+            # behave like spsolve
+            x = x[:, 0]
+
+        return x
+
+
+class ScipyLuFactorisation:
+    """Sparse LU factorisation
+
+    Parameters
+    ----------
+    lu : :class:`~scipy.sparse.linalg.SuperLU`
+        LU factorisation of M, or of M[:, column_order] if a column order is
+        specified, where M is the matrix or, if ``transposed`` is True, its
+        transpose.
+    column_order : :class:`~np.ndarray` or None
+        column permutation applied to M before factorisation
+    dtype : :class:`np.dtype`
+        factorised matrix data type
+    transposed : :class:`bool`, optional
+        whether the transpose of the matrix was factorised
+    """
+    def __init__(self, lu, column_order, dtype, transposed=False):
+        self.lu = lu
+        self._dtype = np.dtype(dtype)
+        self.column_order = column_order
+        self.transposed = bool(transposed)
+
+    @property
+    def shape(self):
+        """Factorised matrix shape"""
+        return self.lu.shape
+
+    @property
+    def dtype(self):
+        """Factorised matrix data type"""
+        return self._dtype
+
+    def solve(self, b, trans="N"):
+        """Solve linear system using the factorisation
+
+        Parameters
+        ----------
+        b : :class:`~np.ndarray`
+            matrix or vector representing right hand side of matrix equation
+        trans : {"N", "T"}, optional
+            solve Ax = b if "N", or the transposed system A^T x = b if "T"
+
+        Returns
+        -------
+        :class:`~np.ndarray`
+            x in the equation Ax = b or A^T x = b
+        """
+        if trans not in ("N", "T"):
+            raise ValueError("trans must be 'N' or 'T'")
+
+        b = np.asarray(b, dtype=self.dtype)
+
+        if self.transposed:
+            # the factorised matrix is the transpose of A
+            trans = "T" if trans == "N" else "N"
+
+        if self.column_order is None:
+            return self.lu.solve(b, trans=trans)
+
+        if trans == "N":
+            # M[:, order] y = b, with x[order] = y
+            y = self.lu.solve(b)
+            x = np.empty_like(y)
+            x[self.column_order] = y
+        else:
+            # M[:, order]^T x = b[order] is equivalent to M^T x = b
+            x = self.lu.solve(np.ascontiguousarray(b[self.column_order]), trans="T")
+
+        return x